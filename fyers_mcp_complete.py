@@ -1,599 +1,7088 @@
 #!/usr/bin/env python3
 """
 Smart Fyers MCP Server with Complete Trading Tools
+
+The MCP host respawns this process often, so only what the handshake needs is
+imported up front; aiohttp, numpy, fyers_apiv3 and the OAuth helpers are
+imported on first use.
 """
 
+import asyncio
+import bisect
+import contextvars
+import csv
+import functools
+import hashlib
+import heapq
+import inspect
+import itertools
+import json
+import logging
 import os
+import random
+import re
+import secrets
 import sys
-import logging
-import urllib.parse
-import webbrowser
-import threading
+import tempfile
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Dict, Any, Optional
+import urllib.parse
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    DefaultDict,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
+if TYPE_CHECKING:
+    import aiohttp
+    import aiohttp.web
+    import numpy as np
 
 # Disable logging
 logging.disable(logging.CRITICAL)
 import warnings
+
 warnings.filterwarnings("ignore")
 
-def load_env_file():
+
+def load_env_file() -> None:
     """Load environment variables from .env file."""
     env_path = os.path.join(os.path.dirname(__file__), ".env")
     if os.path.exists(env_path):
         try:
-            with open(env_path, 'r') as f:
+            with open(env_path, "r") as f:
                 for line in f:
                     line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
+                    if line and not line.startswith("#") and "=" in line:
+                        key, value = line.split("=", 1)
                         os.environ[key.strip()] = value.strip()
         except Exception as e:
-            print(f"Warning: Could not load .env file: {e}")
+            print(f"Warning: Could not load .env file: {e}", file=sys.stderr)
+
 
 load_env_file()
 
 try:
     from mcp.server.fastmcp import FastMCP
-    mcp = FastMCP("fyers-mcp-complete")
 except ImportError:
-    import subprocess
-    subprocess.run([sys.executable, "-m", "pip", "install", "mcp"])
-    from mcp.server.fastmcp import FastMCP
-    mcp = FastMCP("fyers-mcp-complete")
-
-# Global variables for OAuth flow
-auth_result = {}
-auth_server = None
-fyers_client = None
-
-class OAuthHandler(BaseHTTPRequestHandler):
-    """Handle OAuth redirect from Fyers."""
-    
-    def do_GET(self):
-        global auth_result
-        
-        # Parse query parameters
-        parsed_url = urllib.parse.urlparse(self.path)
-        query_params = urllib.parse.parse_qs(parsed_url.query)
-        
-        auth_code = query_params.get('auth_code', [None])[0] or query_params.get('code', [None])[0]
-        
-        if auth_code:
-            auth_result['auth_code'] = auth_code
-            auth_result['status'] = 'success'
-            
-            # Send success response
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            html_response = '''
-            <html><body>
-            <h2>Authentication Successful!</h2>
-            <p>You can close this browser window.</p>
-            <p>Return to Claude to continue.</p>
-            </body></html>
-            '''
-            self.wfile.write(html_response.encode('utf-8'))
-        else:
-            auth_result['status'] = 'error'
-            auth_result['error'] = 'No auth code received'
-            
-            self.send_response(400)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            html_error = '''
-            <html><body>
-            <h2>Authentication Failed</h2>
-            <p>No authorization code received.</p>
-            </body></html>
-            '''
-            self.wfile.write(html_error.encode('utf-8'))
-    
-    def log_message(self, format, *args):
-        # Suppress server logs
-        pass
-
-def start_auth_server():
-    """Start local server to capture OAuth redirect."""
-    global auth_server
-    
+    sys.exit(
+        "fyers-mcp-complete needs the 'mcp' package (mcp>=1.0,<2): run 'uv sync' or 'pip install \"mcp<2\"'"
+    )
+
+# Metrics: fixed-bucket histograms so recording is a bisect and two adds,
+# cheap enough to leave on. FYERS_METRICS_PORT also serves them to Prometheus.
+METRICS_PORT = int(os.getenv("FYERS_METRICS_PORT", "0"))
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Counts per fixed upper bound (Prometheus "le" layout) plus running sum and count."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+# Upstream seconds spent on behalf of the current tool call
+_upstream_time: contextvars.ContextVar = contextvars.ContextVar(
+    "upstream_time", default=None
+)
+
+
+class ServerMetrics:
+    """Per-tool and per-upstream-endpoint latency, error and payload size metrics."""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.tool_latency: Dict[str, Histogram] = {}
+        self.tool_upstream: DefaultDict[str, float] = defaultdict(float)
+        self.tool_errors: Counter = Counter()
+        self.upstream_latency: Dict[str, Histogram] = {}
+        self.upstream_decode: Dict[str, Histogram] = {}
+        self.upstream_bytes: Dict[str, Histogram] = {}
+        self.upstream_errors: Counter = Counter()
+
+    def record_tool(
+        self, tool: str, elapsed: float, upstream: float, failed: bool
+    ) -> None:
+        histogram = self.tool_latency.get(tool)
+        if histogram is None:
+            histogram = self.tool_latency[tool] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(elapsed)
+        # Concurrent upstream calls overlap, so cap the attributed time at the wall time
+        self.tool_upstream[tool] += min(upstream, elapsed)
+        if failed:
+            self.tool_errors[tool] += 1
+
+    def record_upstream(
+        self,
+        endpoint: str,
+        elapsed: float,
+        decode: float,
+        size: int,
+        code: Any,
+        failed: bool,
+    ) -> None:
+        if endpoint not in self.upstream_latency:
+            self.upstream_latency[endpoint] = Histogram(LATENCY_BUCKETS)
+            self.upstream_decode[endpoint] = Histogram(LATENCY_BUCKETS)
+            self.upstream_bytes[endpoint] = Histogram(SIZE_BUCKETS)
+        self.upstream_latency[endpoint].observe(elapsed)
+        self.upstream_decode[endpoint].observe(decode)
+        self.upstream_bytes[endpoint].observe(size)
+        if failed:
+            self.upstream_errors[(endpoint, str(code))] += 1
+        spent = _upstream_time.get()
+        if spent is not None:
+            spent[0] += elapsed + decode
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime": time.time() - self.started,
+            "tools": {
+                tool: {
+                    **h.summary(),
+                    "errors": self.tool_errors[tool],
+                    "upstream_share": (
+                        self.tool_upstream[tool] / h.sum if h.sum else 0.0
+                    ),
+                }
+                for tool, h in self.tool_latency.items()
+            },
+            "upstream": {
+                endpoint: {
+                    **h.summary(),
+                    "decode_mean": self.upstream_decode[endpoint].summary()["mean"],
+                    "bytes_mean": self.upstream_bytes[endpoint].summary()["mean"],
+                    "errors": {
+                        code: n
+                        for (ep, code), n in self.upstream_errors.items()
+                        if ep == endpoint
+                    },
+                }
+                for endpoint, h in self.upstream_latency.items()
+            },
+        }
+
+    def prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(
+            name: str, help_text: str, label: str, table: Dict[str, Histogram]
+        ) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in table.items():
+                cumulative = 0
+                for bound, n in zip(h.bounds + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(
+                        f'{name}_bucket{{{label}="{key}",le="{le}"}} {cumulative}'
+                    )
+                lines.append(f'{name}_sum{{{label}="{key}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {h.count}')
+
+        histogram(
+            "fyers_mcp_tool_latency_seconds",
+            "Tool call latency.",
+            "tool",
+            self.tool_latency,
+        )
+        lines.append(
+            "# HELP fyers_mcp_tool_errors_total Tool calls that returned an error."
+        )
+        lines.append("# TYPE fyers_mcp_tool_errors_total counter")
+        lines.extend(
+            f'fyers_mcp_tool_errors_total{{tool="{tool}"}} {n}'
+            for tool, n in self.tool_errors.items()
+        )
+        histogram(
+            "fyers_mcp_upstream_latency_seconds",
+            "Fyers API round-trip time, excluding JSON decoding.",
+            "endpoint",
+            self.upstream_latency,
+        )
+        histogram(
+            "fyers_mcp_upstream_decode_seconds",
+            "Fyers API response JSON decoding time.",
+            "endpoint",
+            self.upstream_decode,
+        )
+        histogram(
+            "fyers_mcp_upstream_response_bytes",
+            "Fyers API response body size.",
+            "endpoint",
+            self.upstream_bytes,
+        )
+        lines.append(
+            "# HELP fyers_mcp_upstream_errors_total Fyers API error responses by code."
+        )
+        lines.append("# TYPE fyers_mcp_upstream_errors_total counter")
+        lines.extend(
+            f'fyers_mcp_upstream_errors_total{{endpoint="{ep}",code="{code}"}} {n}'
+            for (ep, code), n in self.upstream_errors.items()
+        )
+        return "\n".join(lines) + "\n"
+
+
+server_metrics = ServerMetrics()
+
+
+def is_error_result(result: Any) -> bool:
+    return isinstance(result, str) and (
+        result.startswith("❌") or result.startswith('{"ok":false')
+    )
+
+
+def instrument_tool(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Wrap a tool coroutine to record its latency, upstream share and errors."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        spent = [0.0]
+        token = _upstream_time.set(spent)
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await fn(*args, **kwargs)
+            failed = is_error_result(result)
+            return result
+        finally:
+            server_metrics.record_tool(
+                name, time.perf_counter() - start, spent[0], failed
+            )
+            _upstream_time.reset(token)
+
+    return wrapper
+
+
+def forward_tool(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Send calls to the shared daemon when this process is a front-end for one."""
+    name = fn.__name__
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if daemon_link is None or not await daemon_link.connect():
+            return await fn(*args, **kwargs)
+        arguments = dict(signature.bind(*args, **kwargs).arguments)
+        try:
+            return await daemon_link.call(name, arguments)
+        except ConnectionError as e:
+            return error_result(
+                arguments.get("output_format", "text"),
+                f"❌ Lost the connection to the Fyers daemon ({e}). The call may have completed there; check get_orders before resending orders.",
+            )
+        except DaemonError as e:
+            return error_result(
+                arguments.get("output_format", "text"), f"❌ Fyers daemon error: {e}"
+            )
+
+    return wrapper
+
+
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP whose @tool() registrations are wrapped with metrics.
+
+    ``tool_functions`` keeps each instrumented tool by name for the daemon to
+    call; what is registered with FastMCP also forwards to the daemon.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.tool_functions: Dict[str, Any] = {}
+
+    def tool(self, *args: Any, **kwargs: Any) -> Callable[[Callable], Any]:
+        register = super().tool(*args, **kwargs)
+
+        def decorator(fn: Callable[..., Awaitable[Any]]) -> Any:
+            instrumented = self.tool_functions[fn.__name__] = instrument_tool(fn)
+            return register(forward_tool(instrumented))
+
+        return decorator
+
+
+async def start_metrics_server(port: int) -> "aiohttp.web.AppRunner":
+    """Serve GET /metrics in Prometheus format on localhost."""
+    from aiohttp import web
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=server_metrics.prometheus(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+# Open the Fyers connection in the background once the server starts, so the
+# first tool call does not pay for it (the symbol master always loads this way)
+FYERS_PREWARM = os.getenv("FYERS_PREWARM", "0") == "1"
+
+
+async def prewarm() -> None:
+    """Create the client and warm its connection pool and caches; failures are ignored."""
+    # Let the initialize handshake go first, then import off the event loop
+    await asyncio.sleep(0.05)
+    await asyncio.to_thread(__import__, "aiohttp")
+    client = get_fyers_client()
+    jobs: List[Awaitable[Any]] = [preload_symbol_master()]
+    if client:
+        jobs.append(client.get_profile())
+    await asyncio.gather(*jobs, return_exceptions=True)
+
+
+async def preload_symbol_master() -> None:
+    """Load the symbol index used for order checks, so requests never wait for the download."""
+    if SYMBOL_VALIDATION:
+        await asyncio.sleep(0.05)
+        await asyncio.to_thread(__import__, "aiohttp")
+        await get_symbol_master()
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    task = asyncio.create_task(prewarm() if FYERS_PREWARM else preload_symbol_master())
+    get_token_manager().start()
+    metrics_runner = await start_metrics_server(METRICS_PORT) if METRICS_PORT else None
     try:
-        auth_server = HTTPServer(('localhost', 8080), OAuthHandler)
-        auth_server.timeout = 60  # 1 minute timeout
-        auth_server.handle_request()  # Handle single request
-    except Exception as e:
-        print(f"Server error: {e}")
-
-def get_fyers_client():
-    """Initialize and return Fyers client."""
-    global fyers_client
-    if fyers_client is None:
-        try:
-            from fyers_apiv3 import fyersModel
-            
-            client_id = os.getenv("FYERS_CLIENT_ID")
-            access_token = os.getenv("FYERS_ACCESS_TOKEN")
-            
-            if not client_id or not access_token:
-                return None
-            
-            fyers_client = fyersModel.FyersModel(
-                client_id=client_id,
-                is_async=False,
-                token=access_token,
-                log_path=""
-            )
-            
+        yield {}
+    finally:
+        task.cancel()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if auth_flow is not None:
+            await auth_flow.cancel()
+        await get_token_manager().stop()
+        await reset_fyers_client()
+
+
+@asynccontextmanager
+async def mcp_lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+
+    # A daemon front-end holds no account state of its own
+    lifespan = daemon_frontend_lifespan if DAEMON_ENABLED else server_lifespan
+    async with lifespan(server) as state:
+        yield state
+
+
+mcp = InstrumentedFastMCP("fyers-mcp-complete", lifespan=mcp_lifespan)
+
+# Shared market data and order update streams (clients live in the account registry)
+market_stream = None
+order_stream = None
+
+# Local state (candle store, caches) lives here
+FYERS_DATA_DIR = os.getenv(
+    "FYERS_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fyers_data"),
+)
+
+# Shared HTTP session settings (override via .env or environment)
+FYERS_API_URL = os.getenv("FYERS_API_URL", "https://api-t1.fyers.in/api/v3")
+FYERS_DATA_URL = os.getenv("FYERS_DATA_URL", "https://api-t1.fyers.in/data")
+FYERS_POOL_SIZE = int(os.getenv("FYERS_POOL_SIZE", "10"))
+FYERS_TIMEOUT = float(os.getenv("FYERS_TIMEOUT", "10"))
+
+# Read-only endpoint cache lifetimes in seconds (0 disables caching)
+CACHE_TTLS = {
+    "profile": float(os.getenv("FYERS_CACHE_TTL_PROFILE", "300")),
+    "funds": float(os.getenv("FYERS_CACHE_TTL_FUNDS", "5")),
+    "holdings": float(os.getenv("FYERS_CACHE_TTL_HOLDINGS", "30")),
+    "positions": float(os.getenv("FYERS_CACHE_TTL_POSITIONS", "5")),
+    "orders": float(os.getenv("FYERS_CACHE_TTL_ORDERS", "3")),
+    "option_chain": float(os.getenv("FYERS_CACHE_TTL_OPTION_CHAIN", "3")),
+}
+CACHE_SIZE = int(os.getenv("FYERS_CACHE_SIZE", "128"))
+
+# Cache entries a successful order write makes stale
+WRITE_INVALIDATES = ("orders", "positions", "funds")
+
+# Order strings -> Fyers API codes
+ORDER_TYPES = {"MARKET": 1, "LIMIT": 2, "STOP": 3, "STOPLIMIT": 4}
+ORDER_SIDES = {"BUY": 1, "SELL": -1}
+
+# Basket orders: the multi-order endpoints take up to 10 legs per call
+BASKET_CHUNK_SIZE = 10
+BASKET_CONCURRENCY = int(os.getenv("FYERS_BASKET_CONCURRENCY", "5"))
+BASKET_MULTI_ORDER = os.getenv("FYERS_BASKET_MULTI_ORDER", "1") != "0"
+
+# Local order book: full downloads are spaced out; in between, orders this server
+# writes are refetched by ID (more than ORDER_BOOK_DIFF_MAX and one full fetch is cheaper)
+ORDER_BOOK_RESYNC = float(os.getenv("FYERS_ORDER_BOOK_RESYNC", "60"))
+ORDER_BOOK_DIFF_MAX = 10
+ORDER_STATUSES = {
+    "CANCELLED": 1,
+    "FILLED": 2,
+    "TRANSIT": 4,
+    "REJECTED": 5,
+    "PENDING": 6,
+    "EXPIRED": 7,
+}
+OPEN_ORDER_STATUSES = (4, 6)
+FINAL_ORDER_STATUSES = (1, 2, 5, 7)
+
+
+def build_order_data(
+    symbol: str,
+    quantity: int,
+    order_type: str,
+    side: str,
+    product_type: str = "MARGIN",
+    limit_price: float = 0,
+    stop_price: float = 0,
+    validity: str = "DAY",
+) -> Dict[str, Any]:
+    """Map tool arguments to a Fyers order payload; raises ValueError for an unknown order type or side."""
+    if order_type.upper() not in ORDER_TYPES:
+        raise ValueError(
+            f"unknown order_type {order_type!r} (use {', '.join(ORDER_TYPES)})"
+        )
+    if side.upper() not in ORDER_SIDES:
+        raise ValueError(f"unknown side {side!r} (use BUY or SELL)")
+    return {
+        "symbol": symbol,
+        "qty": quantity,
+        "type": ORDER_TYPES[order_type.upper()],
+        "side": ORDER_SIDES[side.upper()],
+        "productType": product_type,
+        "limitPrice": limit_price,
+        "stopPrice": stop_price,
+        "validity": validity,
+        "disclosedQty": 0,
+        "offlineOrder": False,
+    }
+
+
+def validate_order_spec(spec: Dict[str, Any]) -> Optional[str]:
+    """Return a description of what is wrong with an order spec, or None if it is valid."""
+    order_type = str(spec.get("order_type", "")).upper()
+    if not spec.get("symbol"):
+        return "missing symbol"
+    if not isinstance(spec.get("quantity"), int) or spec["quantity"] <= 0:
+        return f"quantity must be a positive integer, got {spec.get('quantity')!r}"
+    if order_type not in ORDER_TYPES:
+        return f"unknown order_type {spec.get('order_type')!r} (use {', '.join(ORDER_TYPES)})"
+    if str(spec.get("side", "")).upper() not in ORDER_SIDES:
+        return f"unknown side {spec.get('side')!r} (use BUY or SELL)"
+    if order_type in ("LIMIT", "STOPLIMIT") and not spec.get("limit_price", 0) > 0:
+        return f"{order_type} orders need a positive limit_price"
+    if order_type in ("STOP", "STOPLIMIT") and not spec.get("stop_price", 0) > 0:
+        return f"{order_type} orders need a positive stop_price"
+    return None
+
+
+# Quote batching: Fyers accepts at most 50 symbols per quotes request
+QUOTES_MAX_SYMBOLS = 50
+QUOTE_BATCH_WINDOW = float(os.getenv("FYERS_QUOTE_BATCH_WINDOW", "0.005"))
+
+
+class FyersAPIError(Exception):
+    """Raised when Fyers answers with a non-success response."""
+
+    def __init__(self, response: Dict[str, Any]) -> None:
+        super().__init__(response.get("message", "Unknown error"))
+        self.response = response
+
+
+def normalize_symbols(symbols: str) -> list:
+    """Split a comma-separated symbol string, uppercase it and drop duplicates, keeping order."""
+    return list(
+        dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip())
+    )
+
+
+class QuoteBatcher:
+    """Coalesces quote requests arriving within a short window into chunked upstream calls."""
+
+    def __init__(
+        self,
+        fetch: Callable[[list], Awaitable[Dict[str, Any]]],
+        window: float = QUOTE_BATCH_WINDOW,
+        chunk_size: int = QUOTES_MAX_SYMBOLS,
+    ) -> None:
+        self.fetch = fetch
+        self.window = window
+        self.chunk_size = chunk_size
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def get(self, symbols: list) -> Dict[str, Any]:
+        """Return ``{symbol: quote item or None}`` in the order requested."""
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for symbol in symbols:
+            future = self._pending.get(symbol)
+            if future is None:
+                future = self._pending[symbol] = loop.create_future()
+            futures[symbol] = future
+
+        if futures and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+
+        # asyncio.wait, unlike gather, won't cancel futures other callers share
+        if futures:
+            await asyncio.wait(futures.values())
+        return {symbol: future.result() for symbol, future in futures.items()}
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.window)
+        pending, self._pending = self._pending, {}
+        self._flush_task = None
+
+        symbols = list(pending)
+        chunks = [
+            symbols[i : i + self.chunk_size]
+            for i in range(0, len(symbols), self.chunk_size)
+        ]
+        await asyncio.gather(*(self._fetch_chunk(chunk, pending) for chunk in chunks))
+
+    async def _fetch_chunk(
+        self, chunk: list, pending: Dict[str, asyncio.Future]
+    ) -> None:
+        try:
+            response = await self.fetch(chunk)
+            if response.get("code") != 200:
+                raise FyersAPIError(response)
         except Exception as e:
-            print(f"Error initializing Fyers client: {e}")
-            return None
-    
-    return fyers_client
+            for symbol in chunk:
+                pending[symbol].set_exception(e)
+            return
 
-@mcp.tool()
-def authenticate() -> str:
-    """Smart OAuth authentication - opens browser and captures redirect automatically."""
-    global auth_result
-    
-    client_id = os.getenv("FYERS_CLIENT_ID")
-    secret_key = os.getenv("FYERS_SECRET_KEY")
-    redirect_uri = "http://localhost:8080/"
-    
-    if not client_id or not secret_key:
-        return "❌ Missing FYERS_CLIENT_ID or FYERS_SECRET_KEY in environment"
-    
-    # Reset auth result
-    auth_result = {}
-    
-    # Generate auth URL
-    auth_url = f"https://api-t1.fyers.in/api/v3/generate-authcode?client_id={client_id}&redirect_uri={redirect_uri}&response_type=code&state=sample_state"
-    
+        quotes_data = response.get("d", [])
+        if isinstance(quotes_data, list):
+            quotes_data = {item.get("n"): item for item in quotes_data}
+        for symbol in chunk:
+            pending[symbol].set_result(quotes_data.get(symbol))
+
+
+# Client-side pacing. Fyers API v3 allows 10 requests/second and 200/minute
+# per user across all endpoints; per-class buckets can be tightened to keep
+# read traffic from eating the order budget.
+RATE_LIMIT_BUCKETS = {
+    "second": (float(os.getenv("FYERS_RATE_LIMIT_PER_SECOND", "10")), 1.0),
+    "minute": (float(os.getenv("FYERS_RATE_LIMIT_PER_MINUTE", "200")), 60.0),
+    "order": (float(os.getenv("FYERS_RATE_LIMIT_ORDER", "10")), 1.0),
+    "account": (float(os.getenv("FYERS_RATE_LIMIT_ACCOUNT", "10")), 1.0),
+    "data": (float(os.getenv("FYERS_RATE_LIMIT_DATA", "10")), 1.0),
+}
+
+# Endpoint class -> (priority, buckets); lower priority values go first
+ENDPOINT_CLASSES = {
+    "order": (0, ("second", "minute", "order")),
+    "account": (1, ("second", "minute", "account")),
+    "data": (1, ("second", "minute", "data")),
+}
+
+
+def endpoint_class(method: str, path: str, data_api: bool = False) -> str:
+    """Classify a request for rate limiting."""
+    if method != "GET" and "order" in path:
+        return "order"
+    return "data" if data_api else "account"
+
+
+class TokenBucket:
+    """Token bucket holding up to ``capacity`` tokens refilled over ``period`` seconds."""
+
+    def __init__(self, capacity: float, period: float) -> None:
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+
+class RequestScheduler:
+    """Paces API calls through token buckets, releasing order calls ahead of reads."""
+
+    def __init__(
+        self, buckets: Dict[str, Tuple[float, float]] = RATE_LIMIT_BUCKETS
+    ) -> None:
+        self.buckets = {
+            name: TokenBucket(capacity, period)
+            for name, (capacity, period) in buckets.items()
+        }
+        self.max_queue_depth = 0
+        self.requests: Counter = Counter()
+        self.throttled: Counter = Counter()
+        self.wait_total: DefaultDict[str, float] = defaultdict(float)
+        self.wait_max: Dict[str, float] = {}
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _wait_time(self, request_class: str) -> float:
+        return max(
+            self.buckets[name].wait_time()
+            for name in ENDPOINT_CLASSES[request_class][1]
+        )
+
+    def _consume(self, request_class: str) -> None:
+        for name in ENDPOINT_CLASSES[request_class][1]:
+            self.buckets[name].consume()
+
+    async def acquire(self, request_class: str) -> None:
+        """Wait until ``request_class`` may send one request."""
+        self.requests[request_class] += 1
+        # Fast path: nothing queued and tokens available
+        if not self._queue and self._wait_time(request_class) <= 0:
+            self._consume(request_class)
+            return
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._queue,
+            (
+                ENDPOINT_CLASSES[request_class][0],
+                next(self._sequence),
+                request_class,
+                future,
+            ),
+        )
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch(self._wakeup))
+
+        await future
+        waited = time.monotonic() - start
+        self.throttled[request_class] += 1
+        self.wait_total[request_class] += waited
+        self.wait_max[request_class] = max(
+            self.wait_max.get(request_class, 0.0), waited
+        )
+
+    async def _dispatch(self, wakeup: asyncio.Event) -> None:
+        while self._queue:
+            _, _, request_class, future = self._queue[0]
+            if future.cancelled():
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(request_class)
+            if wait <= 0:
+                heapq.heappop(self._queue)
+                self._consume(request_class)
+                future.set_result(None)
+                continue
+            # Sleep until tokens refill, or until a higher-priority call arrives
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_queue_depth,
+            "classes": {
+                request_class: {
+                    "requests": self.requests[request_class],
+                    "throttled": self.throttled[request_class],
+                    "avg_wait": (
+                        self.wait_total[request_class] / self.throttled[request_class]
+                        if self.throttled[request_class]
+                        else 0.0
+                    ),
+                    "max_wait": self.wait_max.get(request_class, 0.0),
+                }
+                for request_class in ENDPOINT_CLASSES
+            },
+        }
+
+
+class TTLCache:
+    """LRU cache whose entries expire after a per-endpoint TTL."""
+
+    def __init__(self, ttls: Dict[str, float], maxsize: int = 128) -> None:
+        self.ttls = ttls
+        self.maxsize = maxsize
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Counter = Counter()
+
+    def get(self, endpoint: str, key: str = "") -> Any:
+        entry = self._entries.get((endpoint, key))
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end((endpoint, key))
+                self.hits[endpoint] += 1
+                return value
+            del self._entries[(endpoint, key)]
+        self.misses[endpoint] += 1
+        return None
+
+    def generation(self, endpoint: str) -> int:
+        return self._generations[endpoint]
+
+    def set(
+        self, endpoint: str, value: Any, key: str = "", generation: Optional[int] = None
+    ) -> None:
+        ttl = self.ttls.get(endpoint, 0)
+        # Drop results fetched before an invalidation landed
+        if ttl <= 0 or (
+            generation is not None and generation != self._generations[endpoint]
+        ):
+            return
+        self._entries[(endpoint, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((endpoint, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *endpoints: str) -> None:
+        for endpoint in endpoints:
+            self._generations[endpoint] += 1
+        for cache_key in [k for k in self._entries if k[0] in endpoints]:
+            del self._entries[cache_key]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            endpoint: {"hits": self.hits[endpoint], "misses": self.misses[endpoint]}
+            for endpoint in self.ttls
+        }
+
+
+@functools.lru_cache(maxsize=64)
+def _ist_day_start(day: str) -> float:
+    return datetime.strptime(day, "%d-%b-%Y").replace(tzinfo=IST).timestamp()
+
+
+def order_time(order: Dict[str, Any]) -> float:
+    """Epoch seconds of a Fyers order's ``orderDateTime`` ("15-Oct-2026 09:20:01" IST), 0 if missing."""
+    # strptime per order dominates loading a busy day's book, so only the date part goes through it
     try:
-        # Start server in background
-        server_thread = threading.Thread(target=start_auth_server, daemon=True)
-        server_thread.start()
-        
-        # Give server time to start
-        time.sleep(1)
-        
-        # Open browser
-        webbrowser.open(auth_url)
-        
-        # Wait for response (max 60 seconds)
-        for _ in range(60):
-            if auth_result:
-                break
-            time.sleep(1)
-        
-        if not auth_result:
-            return "❌ Authentication timeout. Please try again."
-        
-        if auth_result.get('status') != 'success':
-            return f"❌ Authentication failed: {auth_result.get('error', 'Unknown error')}"
-        
-        # Exchange auth code for token
-        auth_code = auth_result['auth_code']
-        
-        from fyers_apiv3 import fyersModel
-        
-        session = fyersModel.SessionModel(
-            client_id=client_id,
-            secret_key=secret_key,
-            redirect_uri=redirect_uri,
-            grant_type="authorization_code"
-        )
-        
-        session.set_token(auth_code)
-        response = session.generate_token()
-        
-        if response.get("code") == 200:
-            access_token = response["access_token"]
-            
-            # Save token to .env file (not just environment)
-            env_path = os.path.join(os.path.dirname(__file__), ".env")
-            
-            # Read current .env
-            env_lines = []
-            if os.path.exists(env_path):
-                with open(env_path, 'r') as f:
-                    env_lines = f.readlines()
-            
-            # Update or add token
-            token_found = False
-            for i, line in enumerate(env_lines):
-                if line.startswith('FYERS_ACCESS_TOKEN='):
-                    env_lines[i] = f'FYERS_ACCESS_TOKEN={access_token}\n'
-                    token_found = True
-                    break
-            
-            if not token_found:
-                env_lines.append(f'FYERS_ACCESS_TOKEN={access_token}\n')
-            
-            # Write back to .env
-            with open(env_path, 'w') as f:
-                f.writelines(env_lines)
-            
-            # Also set in current environment
-            os.environ["FYERS_ACCESS_TOKEN"] = access_token
-            
-            # Reset global client
-            global fyers_client
-            fyers_client = None
-            
-            return "✅ Authentication successful! All trading functions are now available."
-        else:
-            return f"❌ Token generation failed: {response}"
-            
-    except Exception as e:
-        return f"❌ Authentication error: {str(e)}"
+        day, clock = order["orderDateTime"].split(" ")
+        hours, minutes, seconds = clock.split(":")
+        return (
+            _ist_day_start(day) + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+        )
+    except (KeyError, AttributeError, ValueError):
+        return 0.0
 
-@mcp.tool()
-def check_auth_status() -> str:
-    """Check current authentication status."""
-    access_token = os.getenv("FYERS_ACCESS_TOKEN")
-    
-    if access_token:
+
+def written_order_ids(data: Any, response: Optional[Dict[str, Any]]) -> List[str]:
+    """Order IDs an order write touched, from the request legs and the response."""
+    ids = [
+        leg.get("id")
+        for leg in (data if isinstance(data, list) else [data])
+        if isinstance(leg, dict)
+    ]
+    if response:
+        ids.append(response.get("id"))
+        if isinstance(response.get("data"), list):
+            ids.extend(
+                item.get("body", item).get("id")
+                for item in response["data"]
+                if isinstance(item, dict)
+            )
+    return [order_id for order_id in ids if order_id]
+
+
+class OrderBook:
+    """Local copy of the Fyers order book, indexed by status, symbol and side.
+
+    Orders are kept by ID and ordered by (order time, ID), so filtered pages
+    are slices of a sorted key list. ``apply`` upserts one order (from a
+    by-ID fetch or an order update event) and ``replace`` diffs a full
+    download against what is already held. While ``live`` (the order update
+    socket is connected) the periodic full download is skipped.
+    """
+
+    def __init__(self) -> None:
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self.live = False
+        self.synced_at = 0.0
+        self.dirty: set = set()
+        self.resync = False
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self.lock = asyncio.Lock()
+        # Called with every inserted or changed order (the risk engine tracks open orders from it)
+        self.on_apply: Optional[Callable[[Dict[str, Any]], None]] = None
+        # Writes noted so far, and how many of them the last successful sync covered
+        self.writes = 0
+        self.synced_writes = 0
+        self._keys: List[Tuple[float, str]] = []
+        self._key_of: Dict[str, Tuple[float, str]] = {}
+        self._index: Dict[Tuple[str, Any], set] = {}
+
+    def _fields(self, order: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+        return (
+            ("status", order.get("status")),
+            ("symbol", order.get("symbol")),
+            ("side", order.get("side")),
+        )
+
+    def _add(self, order_id: str, order: Dict[str, Any]) -> None:
+        key = self._key_of.get(order_id) or (order_time(order), order_id)
+        self._key_of[order_id] = key
+        bisect.insort(self._keys, key)
+        for field in self._fields(order):
+            self._index.setdefault(field, set()).add(order_id)
+
+    def _remove(self, order_id: str) -> None:
+        order = self.orders.pop(order_id)
+        key = self._key_of.pop(order_id)
+        del self._keys[bisect.bisect_left(self._keys, key)]
+        for field in self._fields(order):
+            self._index[field].discard(order_id)
+
+    def apply(self, order: Dict[str, Any]) -> bool:
+        """Insert or update one order; returns whether anything changed."""
+        order_id = order.get("id")
+        if not order_id or self.orders.get(order_id) == order:
+            return False
+        if order_id in self.orders:
+            key = self._key_of[order_id]
+            self._remove(order_id)
+            # Keep the original position when an update omits the order time
+            if not order.get("orderDateTime"):
+                self._key_of[order_id] = key
+        self.orders[order_id] = order
+        self._add(order_id, order)
+        if self.on_apply is not None:
+            self.on_apply(order)
+        for waiter in self._waiters.pop(order_id, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+        return True
+
+    async def wait_change(self, order_id: str, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for ``order_id`` to change; returns whether it did."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(order_id, []).append(waiter)
         try:
-            client = get_fyers_client()
-            if client:
-                response = client.get_profile()
-                if response.get("code") == 200:
-                    name = response["data"].get("name", "User")
-                    return f"✅ Authenticated as: {name}"
-                else:
-                    return "❌ Token expired or invalid"
-            else:
-                return "❌ Client initialization failed"
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._waiters.get(order_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[order_id]
+
+    def replace(self, orders: List[Dict[str, Any]]) -> int:
+        """Bring the book in line with a full download; returns the number of orders changed."""
+        seen = {order.get("id") for order in orders}
+        gone = [order_id for order_id in self.orders if order_id not in seen]
+        for order_id in gone:
+            self._remove(order_id)
+        changed = len(gone) + sum(self.apply(order) for order in orders)
+        self.loaded = True
+        self.resync = False
+        self.dirty.clear()
+        self.synced_at = time.monotonic()
+        return changed
+
+    def note_write(self, data: Any, response: Optional[Dict[str, Any]]) -> None:
+        """Mark orders touched by a write for refetching; resync fully if the outcome is unknown."""
+        ids = written_order_ids(data, response)
+        self.writes += 1
+        self.dirty.update(ids)
+        if response is None or (not ids and response.get("s") != "error"):
+            self.resync = True
+
+    def needs_full_sync(self) -> bool:
+        return (
+            not self.loaded
+            or self.resync
+            or len(self.dirty) > ORDER_BOOK_DIFF_MAX
+            or (
+                not self.live and time.monotonic() - self.synced_at >= ORDER_BOOK_RESYNC
+            )
+        )
+
+    def query(
+        self,
+        statuses: Optional[List[int]] = None,
+        symbol: Optional[str] = None,
+        side: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """Return ``(orders newest first, number matching, cursor for the next page or None)``."""
+        candidates = None
+        if statuses is not None:
+            candidates = set().union(
+                *(self._index.get(("status", s), set()) for s in statuses)
+            )
+        for field in (("symbol", symbol), ("side", side)):
+            if field[1] is not None:
+                ids = self._index.get(field, set())
+                candidates = ids if candidates is None else candidates & ids
+        keys = (
+            self._keys
+            if candidates is None
+            else sorted(self._key_of[i] for i in candidates)
+        )
+
+        lo = bisect.bisect_left(keys, (start, "")) if start is not None else 0
+        hi = (
+            bisect.bisect_right(keys, (end, "\uffff")) if end is not None else len(keys)
+        )
+        matched = max(0, hi - lo)
+        if cursor:
+            cursor_time, _, cursor_id = cursor.partition(":")
+            hi = min(hi, bisect.bisect_left(keys, (float(cursor_time), cursor_id)))
+        first = max(lo, hi - max(limit, 0))
+        page = [self.orders[order_id] for _, order_id in reversed(keys[first:hi])]
+        next_cursor = (
+            f"{keys[first][0]}:{keys[first][1]}" if first > lo and page else None
+        )
+        return page, matched, next_cursor
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "orders": len(self.orders),
+            "open": sum(
+                len(self._index.get(("status", s), ())) for s in OPEN_ORDER_STATUSES
+            ),
+            "pending_refetch": len(self.dirty),
+            "live": self.live,
+            "synced_ago": (
+                round(time.monotonic() - self.synced_at, 1) if self.loaded else None
+            ),
+        }
+
+
+# Trade journal: every order write and every fill seen in the order book is
+# appended to a local SQLite database (WAL mode, log rows are never updated), so
+# P&L and turnover over past sessions are answered without calling Fyers.
+TRADE_JOURNAL_ENABLED = os.getenv("FYERS_TRADE_JOURNAL", "1") != "0"
+TRADE_JOURNAL_PATH = os.getenv(
+    "FYERS_TRADE_JOURNAL_PATH", os.path.join(FYERS_DATA_DIR, "journal.sqlite3")
+)
+JOURNAL_ACTIONS = {"POST": "place", "PATCH": "modify", "DELETE": "cancel"}
+JOURNAL_GROUPS = ("strategy", "symbol", "day", "account")
+# Columns of daily_totals summed by queries, in order
+JOURNAL_TOTALS = (
+    "fills",
+    "buy_qty",
+    "buy_value",
+    "sell_qty",
+    "sell_value",
+    "orders",
+    "rejected",
+    "unanswered",
+)
+
+# daily_totals is a per day/account/strategy/symbol rollup kept by triggers in the
+# same transaction as each log insert; a fill ignored as already seen adds nothing
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    seq INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    account TEXT NOT NULL,
+    action TEXT NOT NULL,
+    order_id TEXT,
+    symbol TEXT,
+    side INTEGER,
+    qty REAL,
+    order_type INTEGER,
+    product_type TEXT,
+    limit_price REAL,
+    stop_price REAL,
+    strategy TEXT NOT NULL DEFAULT '',
+    ok INTEGER,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS submissions_day ON submissions(day);
+CREATE INDEX IF NOT EXISTS submissions_symbol_day ON submissions(symbol, day);
+CREATE INDEX IF NOT EXISTS submissions_order ON submissions(order_id);
+CREATE TABLE IF NOT EXISTS fills (
+    account TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    filled_qty REAL NOT NULL,
+    filled_value REAL NOT NULL,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side INTEGER NOT NULL,
+    qty REAL NOT NULL,
+    price REAL NOT NULL,
+    product_type TEXT,
+    strategy TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (account, order_id, filled_qty)
+);
+CREATE INDEX IF NOT EXISTS fills_day ON fills(day);
+CREATE INDEX IF NOT EXISTS fills_symbol_day ON fills(symbol, day);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    account TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    fills INTEGER NOT NULL DEFAULT 0,
+    buy_qty REAL NOT NULL DEFAULT 0,
+    buy_value REAL NOT NULL DEFAULT 0,
+    sell_qty REAL NOT NULL DEFAULT 0,
+    sell_value REAL NOT NULL DEFAULT 0,
+    orders INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    unanswered INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, account, strategy, symbol)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS fills_daily_totals AFTER INSERT ON fills BEGIN
+    INSERT INTO daily_totals (day, account, strategy, symbol, fills, buy_qty, buy_value, sell_qty, sell_value)
+    VALUES (
+        NEW.day, NEW.account, NEW.strategy, NEW.symbol, 1,
+        CASE WHEN NEW.side > 0 THEN NEW.qty ELSE 0 END, CASE WHEN NEW.side > 0 THEN NEW.qty * NEW.price ELSE 0 END,
+        CASE WHEN NEW.side < 0 THEN NEW.qty ELSE 0 END, CASE WHEN NEW.side < 0 THEN NEW.qty * NEW.price ELSE 0 END
+    )
+    ON CONFLICT (day, account, strategy, symbol) DO UPDATE SET
+        fills = fills + 1,
+        buy_qty = buy_qty + excluded.buy_qty,
+        buy_value = buy_value + excluded.buy_value,
+        sell_qty = sell_qty + excluded.sell_qty,
+        sell_value = sell_value + excluded.sell_value;
+END;
+CREATE TRIGGER IF NOT EXISTS submissions_daily_totals AFTER INSERT ON submissions
+WHEN NEW.action = 'place' AND NEW.symbol IS NOT NULL BEGIN
+    INSERT INTO daily_totals (day, account, strategy, symbol, orders, rejected, unanswered)
+    VALUES (NEW.day, NEW.account, NEW.strategy, NEW.symbol, 1, NEW.ok = 0, NEW.ok IS NULL)
+    ON CONFLICT (day, account, strategy, symbol) DO UPDATE SET
+        orders = orders + 1,
+        rejected = rejected + excluded.rejected,
+        unanswered = unanswered + excluded.unanswered;
+END;
+"""
+
+
+def journal_day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, IST).strftime("%Y-%m-%d")
+
+
+def journal_legs(
+    data: Any, response: Optional[Dict[str, Any]]
+) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Pair each leg of an order write with its own response (None if the write got no answer)."""
+    legs = [
+        leg
+        for leg in (data if isinstance(data, list) else [data])
+        if isinstance(leg, dict)
+    ]
+    if response is not None and isinstance(data, list):
+        items = response.get("data")
+        if (
+            response.get("s") == "ok"
+            and isinstance(items, list)
+            and len(items) == len(legs)
+        ):
+            return [(leg, item.get("body", item)) for leg, item in zip(legs, items)]
+    return [(leg, response) for leg in legs]
+
+
+class TradeJournal:
+    """Append-only SQLite log of order writes and fills, across sessions and accounts.
+
+    Fills are derived from an order's cumulative ``filledQty`` and average
+    ``tradedPrice``: each increase becomes one row keyed by (account, order,
+    cumulative quantity), so the same fill seen again from the order socket, a
+    REST sync or after a restart is ignored. Strategy tags given when an order
+    is placed carry over to its modifications and fills.
+
+    All SQLite work runs on one writer thread that owns the connection:
+    ``record_write`` and ``record_order`` queue their rows and return at once,
+    and queries passed to ``call`` run behind the writes queued before them,
+    so the event loop never waits on the database or its write lock.
+
+    Queries run on an in-memory copy of ``daily_totals`` as NumPy columns.
+    Past days never change, so they are read once; today's rows are reread
+    after a write from this or another process. Realized P&L is computed per
+    symbol on the matched quantity at the average buy and sell price of the
+    period, the way Fyers reports realized profit on positions; the unmatched
+    rest counts as open quantity.
+    """
+
+    def __init__(self, path: str) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.path = path
+        # sqlite3.Connection once open; only touched on the writer thread, through _run
+        self.db: Any = None
+        # Rows written by this process
+        self.submissions = 0
+        self.fills = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        # (account, order ID) -> (cumulative filled qty, filled value) last recorded
+        self._filled: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        # (account, order ID) -> the order as placed: strategy, symbol, side, qty, type, product
+        self._placed: Dict[Tuple[str, str], Tuple[Any, ...]] = {}
+        # Query snapshot: label -> code per text column, rows before the cutoff day, and all rows
+        self._codes: Dict[str, Dict[str, int]] = {
+            "account": {},
+            "strategy": {},
+            "symbol": {},
+        }
+        self._cutoff: Optional[str] = None
+        self._history: Optional[Tuple["np.ndarray", ...]] = None
+        self._snapshot: Optional[Tuple["np.ndarray", ...]] = None
+        self._version = None
+        self._dirty = True
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="trade-journal"
+        )
+        self._submit(self._open)
+
+    def _open(self) -> None:
+        import sqlite3
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit; a second server on the same data directory waits for the write lock
+        db = sqlite3.connect(
+            self.path, timeout=10.0, isolation_level=None, check_same_thread=False
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(JOURNAL_SCHEMA)
+        self.db = db
+
+    def _failed(self, e: Exception) -> None:
+        # The journal must never stand in the way of an order
+        self.errors += 1
+        self.last_error = str(e)
+
+    def _run(self, fn: Callable, *args: Any) -> Any:
+        if self.db is None and fn != self._open:
+            raise RuntimeError(f"journal database not open: {self.last_error}")
+        return fn(*args)
+
+    def _submit(self, fn: Callable, *args: Any) -> None:
+        """Queue ``fn(*args)`` on the writer thread; failures are counted, never raised."""
+
+        def job() -> None:
+            try:
+                self._run(fn, *args)
+            except Exception as e:
+                self._failed(e)
+
+        try:
+            self._executor.submit(job)
+        except RuntimeError as e:
+            # Already closed
+            self._failed(e)
+
+    async def call(self, fn: Callable, *args: Any) -> Any:
+        """Run ``fn(*args)`` on the writer thread, after the writes already queued."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run, fn, *args
+        )
+
+    def flush(self) -> None:
+        """Block until every queued write has been applied."""
+        self._executor.submit(int).result()
+
+    def placed(self, account: str, order_id: Optional[str]) -> Tuple[Any, ...]:
+        """``(strategy, symbol, side, qty, order type, product type)`` an order was placed with, if logged here."""
+        if not order_id:
+            return ("", None, None, None, None, None)
+        key = (account, order_id)
+        if key not in self._placed:
+            row = self.db.execute(
+                "SELECT strategy, symbol, side, qty, order_type, product_type FROM submissions "
+                "WHERE order_id = ? AND account = ? AND action = 'place' ORDER BY seq LIMIT 1",
+                (order_id, account),
+            ).fetchone()
+            self._placed[key] = (
+                tuple(row) if row else ("", None, None, None, None, None)
+            )
+        return self._placed[key]
+
+    def record_write(
+        self,
+        account: str,
+        method: str,
+        data: Any,
+        response: Optional[Dict[str, Any]],
+        orders: Dict[str, Dict[str, Any]],
+        strategies: Any = None,
+    ) -> None:
+        """Queue one order write (a single order or a basket chunk) to be logged with each leg's outcome.
+
+        ``orders`` is the local order book, for the symbol and side of modified
+        and cancelled orders; ``strategies`` is a tag or one tag per leg.
+        """
+        try:
+            legs = journal_legs(data, response)
+            # Copies: the book and the request may change before the writer thread gets to them
+            legs = [(dict(leg), result) for leg, result in legs]
+            known = {
+                leg["id"]: dict(orders[leg["id"]])
+                for leg, _ in legs
+                if leg.get("id") in orders
+            }
         except Exception as e:
-            return f"❌ Auth check failed: {str(e)}"
-    else:
-        return "❌ Not authenticated. Use 'authenticate' tool."
+            self._failed(e)
+            return
+        self._submit(
+            self._record_write, time.time(), account, method, legs, known, strategies
+        )
+
+    def _record_write(
+        self,
+        now: float,
+        account: str,
+        method: str,
+        legs: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+        orders: Dict[str, Dict[str, Any]],
+        strategies: Any,
+    ) -> None:
+        day = journal_day(now)
+        action = JOURNAL_ACTIONS.get(method, method.lower())
+        if not isinstance(strategies, list):
+            strategies = [strategies] * len(legs)
+        rows = []
+        for (leg, result), strategy in zip(legs, strategies):
+            order_id = leg.get("id") or (result or {}).get("id")
+            if action == "place":
+                placed: Tuple[Any, ...] = (
+                    (strategy or "").strip(),
+                    leg.get("symbol"),
+                    leg.get("side"),
+                    leg.get("qty"),
+                    leg.get("type"),
+                    leg.get("productType"),
+                )
+                if order_id:
+                    self._placed[(account, order_id)] = placed
+            else:
+                placed = self.placed(account, order_id)
+                known = orders.get(order_id or "") or {}
+                placed = (
+                    placed[0],
+                    *(
+                        leg.get(field, known.get(field, fallback))
+                        for field, fallback in zip(
+                            ("symbol", "side", "qty", "type", "productType"), placed[1:]
+                        )
+                    ),
+                )
+            ok = None if result is None else int(result.get("s") == "ok")
+            message = (
+                "no response"
+                if result is None
+                else None if ok else result.get("message")
+            )
+            rows.append(
+                (
+                    now,
+                    day,
+                    account,
+                    action,
+                    order_id,
+                    *placed[1:],
+                    leg.get("limitPrice"),
+                    leg.get("stopPrice"),
+                    placed[0],
+                    ok,
+                    message,
+                )
+            )
+        self.db.executemany(
+            "INSERT INTO submissions (ts, day, account, action, order_id, symbol, side, qty, order_type, "
+            "product_type, limit_price, stop_price, strategy, ok, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.submissions += len(rows)
+        self._dirty = True
+
+    def record_order(self, account: str, order: Dict[str, Any]) -> None:
+        """Queue the fill, if any, that an order book update reveals to be logged."""
+        filled = order.get("filledQty") or 0
+        if not filled and order.get("status") == ORDER_STATUSES["FILLED"]:
+            filled = order.get("qty") or 0
+        if order.get("id") and filled > 0:
+            self._submit(self._record_order, time.time(), account, dict(order), filled)
+
+    def _record_order(
+        self, now: float, account: str, order: Dict[str, Any], filled: float
+    ) -> None:
+        order_id = order["id"]
+        key = (account, order_id)
+        if key not in self._filled:
+            row = self.db.execute(
+                "SELECT filled_qty, filled_value FROM fills WHERE account = ? AND order_id = ? ORDER BY filled_qty DESC LIMIT 1",
+                key,
+            ).fetchone()
+            self._filled[key] = tuple(row) if row else (0.0, 0.0)
+        prior_qty, prior_value = self._filled[key]
+        if filled > prior_qty:
+            average = (
+                order.get("tradedPrice")
+                or order.get("limitPrice")
+                or order.get("stopPrice")
+                or 0
+            )
+            value = average * filled
+            qty = filled - prior_qty
+            # The average moves with each partial fill; this fill's price is what moved it
+            price = (value - prior_value) / qty if value > prior_value else average
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO fills (account, order_id, filled_qty, filled_value, ts, day, symbol, side, qty, "
+                "price, product_type, strategy) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    account,
+                    order_id,
+                    filled,
+                    value,
+                    now,
+                    journal_day(now),
+                    order.get("symbol", ""),
+                    1 if (order.get("side") or 0) > 0 else -1,
+                    qty,
+                    price,
+                    order.get("productType"),
+                    self.placed(account, order_id)[0],
+                ),
+            ).rowcount
+            self.fills += inserted
+            self._filled[key] = (filled, value)
+            self._dirty = True
+        if order.get("status") in FINAL_ORDER_STATUSES:
+            self._filled.pop(key, None)
+            self._placed.pop(key, None)
+
+    def _load(self, where: str, params: Tuple[Any, ...]) -> Tuple["np.ndarray", ...]:
+        """Read daily_totals rows as ``(day as YYYYMMDD, account, strategy, symbol codes, totals)`` arrays."""
+        import numpy as np
+
+        rows = self.db.execute(
+            f"SELECT day, account, strategy, symbol, {', '.join(JOURNAL_TOTALS)} FROM daily_totals WHERE {where}",
+            params,
+        ).fetchall()
+        codes = [
+            [
+                self._codes[column].setdefault(row[i], len(self._codes[column]))
+                for row in rows
+            ]
+            for i, column in enumerate(("account", "strategy", "symbol"), 1)
+        ]
+        return (
+            np.array([int(row[0].replace("-", "")) for row in rows], dtype=np.int64),
+            *(np.array(column, dtype=np.int64) for column in codes),
+            np.array([row[4:] for row in rows], dtype=np.float64).reshape(
+                -1, len(JOURNAL_TOTALS)
+            ),
+        )
+
+    def snapshot(self) -> Tuple["np.ndarray", ...]:
+        """Current daily_totals as NumPy columns, rereading only what may have changed."""
+        import numpy as np
+
+        version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        if self._history is None:
+            self._cutoff = journal_day(time.time())
+            self._history = self._load("day < ?", (self._cutoff,))
+        if self._dirty or version != self._version or self._snapshot is None:
+            self._dirty = False
+            self._version = version
+            recent = self._load("day >= ?", (self._cutoff,))
+            self._snapshot = tuple(
+                np.concatenate(pair) for pair in zip(self._history, recent)
+            )
+        return self._snapshot
+
+    def query(
+        self,
+        start_day: str = "",
+        end_day: str = "",
+        account: Optional[str] = None,
+        symbol: Optional[str] = None,
+        strategy: Optional[str] = None,
+        group_by: str = "strategy",
+    ) -> Dict[str, Any]:
+        """Realized P&L, turnover, fills and order counts over a day range, in total and per group."""
+        import numpy as np
+
+        if group_by not in JOURNAL_GROUPS:
+            raise ValueError(
+                f"unknown group_by {group_by!r} (use {', '.join(JOURNAL_GROUPS)})"
+            )
+        days, accounts, strategies, symbols, totals = self.snapshot()
+        columns = {
+            "day": days,
+            "account": accounts,
+            "strategy": strategies,
+            "symbol": symbols,
+        }
+
+        mask = np.ones(len(days), dtype=bool)
+        if start_day:
+            mask &= days >= int(start_day.replace("-", ""))
+        if end_day:
+            mask &= days <= int(end_day.replace("-", ""))
+        for column, value in (
+            ("account", account),
+            ("symbol", symbol),
+            ("strategy", strategy),
+        ):
+            if value is not None:
+                mask &= columns[column] == self._codes[column].get(value, -1)
+
+        # Buys and sells are matched per symbol (and account) within each group
+        groups = columns[group_by][mask]
+        width = len(self._codes["symbol"]) + 1
+        pairs = (
+            groups * (len(self._codes["account"]) + 1) + accounts[mask]
+        ) * width + symbols[mask]
+        pairs, inverse = np.unique(pairs, return_inverse=True)
+        sums = {
+            name: np.bincount(inverse, totals[mask, i], len(pairs))
+            for i, name in enumerate(JOURNAL_TOTALS)
+        }
+        matched = np.minimum(sums["buy_qty"], sums["sell_qty"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl = np.where(
+                matched > 0,
+                matched
+                * (
+                    sums["sell_value"] / sums["sell_qty"]
+                    - sums["buy_value"] / sums["buy_qty"]
+                ),
+                0.0,
+            )
+        per_pair = {
+            "realized_pnl": pnl,
+            "turnover": sums["buy_value"] + sums["sell_value"],
+            "fills": sums["fills"],
+            "buy_qty": sums["buy_qty"],
+            "sell_qty": sums["sell_qty"],
+            "open_symbols": sums["buy_qty"] != sums["sell_qty"],
+            "winners": (matched > 0) & (pnl > 0),
+            "losers": (matched > 0) & (pnl < 0),
+            "orders": sums["orders"],
+            "rejected": sums["rejected"],
+            "unanswered": sums["unanswered"],
+        }
+        keys, group_of = np.unique(
+            pairs // (width * (len(self._codes["account"]) + 1)), return_inverse=True
+        )
+        per_group = {
+            name: np.bincount(group_of, values.astype(np.float64), len(keys))
+            for name, values in per_pair.items()
+        }
+
+        def summary(values: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                name: (
+                    round(float(value), 2)
+                    if name in ("realized_pnl", "turnover", "buy_qty", "sell_qty")
+                    else int(value)
+                )
+                for name, value in values.items()
+            }
+
+        if group_by == "day":
+            labels = [
+                f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+                for key in keys.tolist()
+            ]
+        else:
+            names = {code: label for label, code in self._codes[group_by].items()}
+            labels = [names[key] for key in keys.tolist()]
+        return {
+            "total": summary({name: values.sum() for name, values in per_pair.items()}),
+            "groups": dict(
+                sorted(
+                    (
+                        label,
+                        summary(
+                            {name: values[i] for name, values in per_group.items()}
+                        ),
+                    )
+                    for i, label in enumerate(labels)
+                )
+            ),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "submissions": self.submissions,
+            "fills": self.fills,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def close(self) -> None:
+        """Apply the queued writes, then close the database."""
+        self._executor.submit(lambda: self.db is not None and self.db.close())
+        self._executor.shutdown(wait=True)
+
+
+trade_journal: Optional[TradeJournal] = None
+trade_journal_error: Optional[str] = None
+
+
+def get_trade_journal() -> Optional[TradeJournal]:
+    """Return the shared trade journal, opened on first use (None if disabled or it could not be opened)."""
+    global trade_journal, trade_journal_error
+    if trade_journal is None and TRADE_JOURNAL_ENABLED and trade_journal_error is None:
+        try:
+            trade_journal = TradeJournal(TRADE_JOURNAL_PATH)
+        except Exception as e:
+            trade_journal_error = str(e)
+    return trade_journal
+
+
+# Resilience: reads (GET) are retried with jittered exponential backoff and may be
+# hedged; writes are retried only when Fyers provably did not take them (the
+# connection was refused, or HTTP 429). A per-endpoint breaker fails fast while
+# an endpoint keeps failing with timeouts, dropped connections or 5xx responses.
+RETRY_ATTEMPTS = int(os.getenv("FYERS_RETRY_ATTEMPTS", "3"))
+RETRY_BACKOFF = float(os.getenv("FYERS_RETRY_BACKOFF", "0.2"))
+RETRY_BACKOFF_MAX = 2.0
+# Fyers quotas are per second, so a throttled call waits out the window before retrying
+THROTTLE_RETRY_DELAY = 1.0
+HEDGE_READS = os.getenv("FYERS_HEDGE_READS", "0") != "0"
+HEDGE_DELAY = float(os.getenv("FYERS_HEDGE_DELAY", "0.5"))
+HEDGE_MIN_SAMPLES = 20
+BREAKER_FAILURES = int(os.getenv("FYERS_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("FYERS_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitOpenError(FyersAPIError):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+    def __init__(self, endpoint: str, retry_in: float) -> None:
+        super().__init__(
+            {
+                "s": "error",
+                "code": 503,
+                "message": f"{endpoint} is failing, not calling it for another {retry_in:.1f}s",
+            }
+        )
+        self.endpoint = endpoint
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open for a cooldown -> one half-open probe."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probing = False
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead."""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + BREAKER_COOLDOWN - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.endpoint, max(remaining, 0))
+
+    def release(self) -> None:
+        """End a call that neither proved nor disproved the endpoint (cancelled, or failed locally)."""
+        self._probing = False
+
+    def record(self, ok: bool) -> None:
+        self._probing = False
+        if ok:
+            self.state = "closed"
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= BREAKER_FAILURES:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class Resilience:
+    """Breakers and retry/hedge counters per endpoint, shared by every account's client."""
+
+    def __init__(self) -> None:
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retries: Counter = Counter()
+        self.hedges: Counter = Counter()
+        self.hedge_wins: Counter = Counter()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+    def hedge_delay(self, endpoint: str) -> float:
+        """Launch the duplicate once the first attempt is slower than the endpoint's p95."""
+        histogram = server_metrics.upstream_latency.get(endpoint)
+        if histogram is None or histogram.count < HEDGE_MIN_SAMPLES:
+            return HEDGE_DELAY
+        return histogram.quantile(0.95)
+
+    def snapshot(self) -> Dict[str, Any]:
+        endpoints = sorted(set(self.breakers) | set(self.retries) | set(self.hedges))
+        return {
+            endpoint: {
+                "breaker": (
+                    self.breakers[endpoint].state
+                    if endpoint in self.breakers
+                    else "closed"
+                ),
+                "trips": (
+                    self.breakers[endpoint].trips if endpoint in self.breakers else 0
+                ),
+                "rejected": (
+                    self.breakers[endpoint].rejected if endpoint in self.breakers else 0
+                ),
+                "retries": self.retries[endpoint],
+                "hedges": self.hedges[endpoint],
+                "hedge_wins": self.hedge_wins[endpoint],
+            }
+            for endpoint in endpoints
+        }
+
+
+resilience = Resilience()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (attempt - 1)))
+
+
+# Pre-trade risk: orders are checked in-process against locally held funds,
+# positions, open orders and last prices before they are sent. Limits set to 0
+# are off; the price band is the allowed deviation from the last price.
+RISK_CHECKS_ENABLED = os.getenv("FYERS_RISK_CHECKS", "1") != "0"
+RISK_MAX_NOTIONAL = float(os.getenv("FYERS_RISK_MAX_NOTIONAL", "0"))
+RISK_MAX_POSITION = int(os.getenv("FYERS_RISK_MAX_POSITION", "0"))
+RISK_PRICE_BAND = float(os.getenv("FYERS_RISK_PRICE_BAND", "0.1"))
+RISK_MARGIN_CHECK = os.getenv("FYERS_RISK_MARGIN_CHECK", "1") != "0"
+RISK_DUPLICATE_WINDOW = float(os.getenv("FYERS_RISK_DUPLICATE_WINDOW", "10"))
+RISK_QUOTE_MAX_AGE = float(os.getenv("FYERS_RISK_QUOTE_MAX_AGE", "60"))
+# Funds and positions snapshots older than this are refreshed in the background
+RISK_STATE_TTL = float(os.getenv("FYERS_RISK_STATE_TTL", "30"))
+# Share of an order's value blocked as margin, by product type: a rough stand-in
+# for the broker's margin calculator. CNC sells deliver shares already held.
+RISK_MARGIN_RATES = {"CNC": 1.0, "INTRADAY": 0.2, "MARGIN": 0.2, "CO": 0.2, "BO": 0.2}
+RISK_RELEASED_STATUSES = (1, 5, 7)
+
+
+def net_quantity(position: Dict[str, Any]) -> float:
+    """Signed net quantity of a position row (long positive)."""
+    if "netQty" in position:
+        net: float = position["netQty"] or 0
+        return net
+    side = position.get("side") or 0
+    qty: float = abs(position.get("qty") or 0)
+    return qty * (1 if side > 0 else -1 if side < 0 else 0)
+
+
+def fund_bucket(symbol: str) -> str:
+    return "commodity" if symbol.startswith("MCX:") else "equity"
+
+
+class RiskOrder(NamedTuple):
+    """What the checks need to know about one order payload."""
+
+    symbol: str
+    qty: int
+    prices: Tuple[Tuple[str, float], ...]
+    last: Optional[float]
+    value: Optional[float]
+    margin: Optional[float]
+    fingerprint: Tuple[Any, ...]
+
+
+class RiskEngine:
+    """Pre-trade checks against account state held in process.
+
+    Funds and positions start from REST snapshots (positions follow the order
+    update stream while it is connected). Between snapshots, orders sent from
+    here hold their estimated margin and count as open exposure, and fills
+    seen in order book updates move positions, so a check never waits on the
+    network. Each ``check_*`` method returns a description of the problem or
+    None; ``check`` runs them all and holds the order's exposure until
+    ``settle`` learns whether the broker took it. A write that got no answer
+    may be live at the broker, so its hold stays until an order book download
+    shows whether it went through (``resolve_unanswered``).
+    """
+
+    CHECKS = ("price_band", "notional", "position", "margin", "duplicate")
+
+    def __init__(self) -> None:
+        self.funds: Optional[Dict[str, float]] = None
+        self.funds_at = 0.0
+        self.positions: DefaultDict[str, float] = defaultdict(float)
+        self.positions_loaded = False
+        self.positions_live = False
+        self.positions_at = 0.0
+        self._position_rows: Dict[str, Tuple[str, float]] = {}
+        # Fills seen since the positions snapshot: (time, symbol, signed qty)
+        self._fills: List[Tuple[float, str, float]] = []
+        self.fill_delta: DefaultDict[str, float] = defaultdict(float)
+        # Symbol -> (last price, wall time)
+        self.prices: Dict[str, Tuple[float, float]] = {}
+        # Order ID (or hold key before the broker answers) -> {"symbol", "qty" (signed, unfilled), "filled", "fingerprint"}
+        self.open: Dict[str, Dict[str, Any]] = {}
+        self.open_buy: DefaultDict[str, float] = defaultdict(float)
+        self.open_sell: DefaultDict[str, float] = defaultdict(float)
+        # Margin held by orders sent since the funds snapshot: key -> (time, bucket, amount)
+        self._held: Dict[str, Tuple[float, str, float]] = {}
+        self.held: DefaultDict[str, float] = defaultdict(float)
+        self._recent: Dict[Tuple[Any, ...], Tuple[float, str]] = {}
+        # Hold key -> when it was sent, for writes Fyers never answered
+        self.unanswered: Dict[str, float] = {}
+        # Order ID -> (added signed qty, added margin) of modifications Fyers has not answered yet
+        self._modifies: Dict[str, Tuple[float, float]] = {}
+        self._final: set = set()
+        self._hold_ids = itertools.count(1)
+        self.checked = 0
+        self.rejected: Counter = Counter()
+
+    # State updates
+
+    def set_funds(self, response: Dict[str, Any], taken_at: float) -> None:
+        """Take a funds snapshot fetched from ``taken_at`` (monotonic); holds older than it are in it."""
+        rows = response.get("fund_limit")
+        row = (
+            next((r for r in rows if r.get("id") == 10), None)
+            if isinstance(rows, list)
+            else None
+        )
+        row = row or fund_summary(response)
+        self.funds = {
+            "equity": row.get("equityAmount") or 0,
+            "commodity": row.get("commodityAmount") or 0,
+        }
+        self.funds_at = taken_at
+        self._held = {
+            key: hold for key, hold in self._held.items() if hold[0] >= taken_at
+        }
+        self.held = defaultdict(float)
+        for _, bucket, amount in self._held.values():
+            self.held[bucket] += amount
+
+    def set_positions(
+        self, positions: Iterable[Dict[str, Any]], taken_at: float, live: bool = False
+    ) -> None:
+        """Take a positions snapshot fetched from ``taken_at``; fills seen before it are in it."""
+        self._position_rows = {
+            position_key(p): (p.get("symbol", ""), net_quantity(p)) for p in positions
+        }
+        self.positions = defaultdict(float)
+        for symbol, net in self._position_rows.values():
+            self.positions[symbol] += net
+        self._fills = [fill for fill in self._fills if fill[0] >= taken_at]
+        self.fill_delta = defaultdict(float)
+        for _, symbol, qty in self._fills:
+            self.fill_delta[symbol] += qty
+        self.positions_loaded = True
+        self.positions_live = live
+        self.positions_at = taken_at
+
+    def apply_position(self, position: Dict[str, Any]) -> None:
+        """Apply one streamed position row."""
+        key = position_key(position)
+        symbol, net = self._position_rows.get(key, (position.get("symbol", ""), 0))
+        self.positions[symbol] -= net
+        self._position_rows[key] = (symbol, net_quantity(position))
+        self.positions[symbol] += self._position_rows[key][1]
+
+    def go_offline(self) -> None:
+        """The position stream dropped: fall back to REST snapshots."""
+        self.positions_live = False
+        self.positions_at = 0.0
+
+    def note_quotes(self, quotes: Dict[str, Any]) -> None:
+        now = time.time()
+        for symbol, item in quotes.items():
+            if isinstance(item, dict):
+                price = item.get("v", item).get("lp")
+                if price:
+                    self.prices[symbol] = (price, now)
+
+    def price(self, symbol: str) -> Optional[float]:
+        """Last price no older than ``RISK_QUOTE_MAX_AGE``, from the tick table or the last quote."""
+        now = time.time()
+        if market_stream is not None:
+            tick = market_stream.get_tick(symbol)
+            if tick is not None and now - tick["ts"] <= RISK_QUOTE_MAX_AGE:
+                price: float = tick["lp"]
+                return price
+        entry = self.prices.get(symbol)
+        if entry is not None and now - entry[1] <= RISK_QUOTE_MAX_AGE:
+            return entry[0]
+        return None
+
+    def _add_open(self, key: str, entry: Dict[str, Any]) -> None:
+        self.open[key] = entry
+        (self.open_buy if entry["qty"] > 0 else self.open_sell)[entry["symbol"]] += abs(
+            entry["qty"]
+        )
+
+    def _drop_open(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.open.pop(key, None)
+        if entry is not None:
+            (self.open_buy if entry["qty"] > 0 else self.open_sell)[
+                entry["symbol"]
+            ] -= abs(entry["qty"])
+        return entry
+
+    def _forget(self, key: str, entry: Optional[Dict[str, Any]]) -> None:
+        """Release what an order that did not trade was holding, so it may be sent again."""
+        hold = self._held.pop(key, None)
+        if hold is not None:
+            self.held[hold[1]] -= hold[2]
+        if (
+            entry is not None
+            and self._recent.get(entry["fingerprint"], (0, None))[1] == key
+        ):
+            del self._recent[entry["fingerprint"]]
+
+    def _claim(self, key: str, order_id: str) -> None:
+        """Move what a hold was holding over to the broker's order ID."""
+        entry = self._drop_open(key)
+        hold = self._held.pop(key, None)
+        if hold is not None:
+            self._held[order_id] = hold
+        if entry is None:
+            return
+        recent = self._recent.get(entry["fingerprint"])
+        if recent is not None and recent[1] == key:
+            self._recent[entry["fingerprint"]] = (recent[0], order_id)
+        # An order update may have got here before the response did
+        if order_id in self.open:
+            self.open[order_id]["fingerprint"] = entry["fingerprint"]
+        elif order_id not in self._final:
+            self._add_open(order_id, entry)
+
+    def on_order(self, order: Dict[str, Any]) -> None:
+        """Track one order from the order book (a by-ID fetch, a full download or a stream event)."""
+        order_id: str = order["id"]
+        symbol = order.get("symbol", "")
+        status = order.get("status")
+        side = 1 if (order.get("side") or 0) > 0 else -1
+        filled = order.get("filledQty") or 0
+        entry = self._drop_open(order_id)
+        if entry is not None and filled > entry["filled"] and not self.positions_live:
+            self._fills.append(
+                (time.monotonic(), symbol, side * (filled - entry["filled"]))
+            )
+            self.fill_delta[symbol] += side * (filled - entry["filled"])
+        if status in OPEN_ORDER_STATUSES:
+            remaining = max((order.get("qty") or 0) - filled, 0)
+            fingerprint = entry["fingerprint"] if entry is not None else ()
+            self._add_open(
+                order_id,
+                {
+                    "symbol": symbol,
+                    "qty": side * remaining,
+                    "filled": filled,
+                    "fingerprint": fingerprint,
+                },
+            )
+            return
+        self._final.add(order_id)
+        if status in RISK_RELEASED_STATUSES:
+            self._forget(order_id, entry)
+
+    def invalidate_funds(self) -> None:
+        self.funds_at = 0.0
+
+    # Checks
+
+    @staticmethod
+    def fingerprint(order: Dict[str, Any]) -> Tuple[Any, ...]:
+        """What makes two order payloads (or an order book row and a payload) the same order."""
+        qty = (order.get("qty") or 0) * (1 if (order.get("side") or 0) > 0 else -1)
+        return (
+            order.get("symbol", ""),
+            qty,
+            order.get("type"),
+            order.get("productType"),
+            order.get("limitPrice") or 0,
+            order.get("stopPrice") or 0,
+        )
+
+    def prepare(self, order: Dict[str, Any]) -> RiskOrder:
+        """Work out the order's signed quantity, prices, value and margin from a Fyers payload."""
+        symbol = order["symbol"]
+        qty = order["qty"] * order["side"]
+        prices = tuple(
+            (label, order[field])
+            for label, field in (
+                ("limit_price", "limitPrice"),
+                ("stop_price", "stopPrice"),
+            )
+            if (order.get(field) or 0) > 0
+        )
+        last = self.price(symbol)
+        price = prices[0][1] if prices else last
+        value = abs(qty) * price if price else None
+        margin = None
+        if value is not None:
+            net = self.positions[symbol] + self.fill_delta[symbol]
+            # Only the part of the order that grows the position needs margin
+            reducing = min(abs(qty), abs(net)) if net * qty < 0 else 0
+            rate = (
+                0.0
+                if order.get("productType") == "CNC" and qty < 0
+                else RISK_MARGIN_RATES.get(order.get("productType", ""), 1.0)
+            )
+            margin = (abs(qty) - reducing) * price * rate
+        return RiskOrder(
+            symbol, qty, prices, last, value, margin, self.fingerprint(order)
+        )
+
+    def check_price_band(self, o: RiskOrder) -> Optional[str]:
+        if RISK_PRICE_BAND <= 0 or not o.last:
+            return None
+        for label, price in o.prices:
+            deviation = price / o.last - 1
+            if abs(deviation) > RISK_PRICE_BAND:
+                return (
+                    f"{label} {price:g} is {abs(deviation):.1%} {'above' if deviation > 0 else 'below'} "
+                    f"the last price {o.last:g} for {o.symbol} (band ±{RISK_PRICE_BAND:.0%})"
+                )
+        return None
+
+    def check_notional(self, o: RiskOrder) -> Optional[str]:
+        if RISK_MAX_NOTIONAL <= 0 or o.value is None or o.value <= RISK_MAX_NOTIONAL:
+            return None
+        return (
+            f"order value ₹{o.value:,.2f} is over the ₹{RISK_MAX_NOTIONAL:,.2f} limit"
+        )
+
+    def check_position(self, o: RiskOrder) -> Optional[str]:
+        if RISK_MAX_POSITION <= 0:
+            return None
+        net = self.positions[o.symbol] + self.fill_delta[o.symbol]
+        # Worst case: every open order on the same side fills too
+        if o.qty > 0:
+            projected = net + self.open_buy[o.symbol] + o.qty
+        else:
+            projected = net - self.open_sell[o.symbol] + o.qty
+        if abs(projected) <= RISK_MAX_POSITION or abs(projected) <= abs(net):
+            return None
+        return (
+            f"{o.symbol} could reach {projected:+g} (position {net:+g}, open orders "
+            f"+{self.open_buy[o.symbol]:g}/-{self.open_sell[o.symbol]:g}), over the {RISK_MAX_POSITION} limit"
+        )
+
+    def check_margin(self, o: RiskOrder) -> Optional[str]:
+        if not RISK_MARGIN_CHECK or self.funds is None or not o.margin:
+            return None
+        bucket = fund_bucket(o.symbol)
+        available = self.funds[bucket] - self.held[bucket]
+        if o.margin <= available:
+            return None
+        return f"needs about ₹{o.margin:,.2f} margin, ₹{available:,.2f} available"
+
+    def check_duplicate(self, o: RiskOrder) -> Optional[str]:
+        if RISK_DUPLICATE_WINDOW <= 0:
+            return None
+        recent = self._recent.get(o.fingerprint)
+        if recent is None:
+            return None
+        if recent[1] in self.unanswered:
+            return (
+                f"an identical order sent {time.monotonic() - recent[0]:.1f}s ago got no answer and may have gone "
+                "through (check get_orders, or set allow_duplicate to send it anyway)"
+            )
+        if time.monotonic() - recent[0] > RISK_DUPLICATE_WINDOW:
+            return None
+        sent = (
+            "an identical order"
+            if recent[1].startswith("hold-")
+            else f"identical order {recent[1]}"
+        )
+        return f"{sent} was sent {time.monotonic() - recent[0]:.1f}s ago (set allow_duplicate to send it anyway)"
+
+    def check_modify(
+        self, order: Dict[str, Any], change: Dict[str, Any]
+    ) -> Optional[str]:
+        """Check a modification payload of a known order as the order it would become.
+
+        New prices get the price band check; the modified order gets the
+        notional check, and only what it adds (unfilled quantity, margin) is
+        counted against the position and margin limits. A passing change is
+        applied to the held exposure at once; ``settle_modify`` undoes it if
+        Fyers refuses the modification.
+        """
+        self.checked += 1
+        symbol = order["symbol"]
+        side = 1 if (order.get("side") or 0) > 0 else -1
+        filled = order.get("filledQty") or 0
+        merged = {
+            **order,
+            **{
+                field: change[field]
+                for field in ("qty", "limitPrice", "stopPrice")
+                if change.get(field) is not None
+            },
+            "side": side,
+        }
+        before = self.prepare(
+            {**order, "side": side, "qty": max((order.get("qty") or 0) - filled, 0)}
+        )
+        after = self.prepare(
+            {**merged, "qty": max((merged.get("qty") or 0) - filled, 0)}
+        )
+        added = after.qty - before.qty if abs(after.qty) > abs(before.qty) else 0
+        extra = (after.margin or 0) - (before.margin or 0)
+        prices = tuple(
+            (label, change[field])
+            for label, field in (
+                ("limit_price", "limitPrice"),
+                ("stop_price", "stopPrice"),
+            )
+            if (change.get(field) or 0) > 0
+        )
+        orders = {
+            "price_band": RiskOrder(symbol, 0, prices, after.last, None, None, ()),
+            "notional": self.prepare(merged),
+            "position": RiskOrder(symbol, added, (), after.last, None, None, ()),
+            "margin": RiskOrder(symbol, added, (), after.last, None, max(extra, 0), ()),
+        }
+        for name, o in orders.items():
+            if name == "position" and not added:
+                continue
+            problem: Optional[str] = getattr(self, f"check_{name}")(o)
+            if problem:
+                self.rejected[name] += 1
+                return problem
+        self._adjust(order["id"], symbol, after.qty - before.qty, extra)
+        return None
+
+    def _adjust(self, order_id: str, symbol: str, qty: float, margin: float) -> None:
+        """Change an open order's unfilled quantity and held margin by a modification's difference."""
+        entry = self.open.get(order_id)
+        if entry is not None and qty:
+            self._drop_open(order_id)
+            self._add_open(order_id, {**entry, "qty": entry["qty"] + qty})
+        hold = self._held.get(order_id)
+        bucket = fund_bucket(symbol)
+        # Margin the funds snapshot already reflects is only freed by the next snapshot
+        applied = max(margin, -hold[2]) if hold is not None else max(margin, 0)
+        if applied:
+            self._held[order_id] = (
+                hold[0] if hold is not None else time.monotonic(),
+                bucket,
+                (hold[2] if hold is not None else 0) + applied,
+            )
+            self.held[bucket] += applied
+        pending = self._modifies.get(order_id, (0, 0))
+        self._modifies[order_id] = (pending[0] + qty, pending[1] + applied)
+
+    def settle_modify(
+        self, order_ids: List[str], responses: Sequence[Optional[Dict[str, Any]]]
+    ) -> None:
+        """Keep the exposure of accepted (or unanswered) modifications and undo refused ones."""
+        for order_id, response in zip(order_ids, responses):
+            pending = self._modifies.pop(order_id, None)
+            if (
+                pending is None
+                or not isinstance(response, dict)
+                or response.get("unanswered")
+                or response.get("s") == "ok"
+            ):
+                continue
+            self._undo_modify(order_id, pending)
+
+    def release_modify(self, order_ids: List[str]) -> None:
+        """Undo modifications that passed their checks but were never sent."""
+        for order_id in order_ids:
+            pending = self._modifies.pop(order_id, None)
+            if pending is not None:
+                self._undo_modify(order_id, pending)
+
+    def _undo_modify(self, order_id: str, pending: Tuple[float, float]) -> None:
+        qty, margin = pending
+        entry = self.open.get(order_id)
+        if entry is not None and qty:
+            self._drop_open(order_id)
+            self._add_open(order_id, {**entry, "qty": entry["qty"] - qty})
+        hold = self._held.get(order_id)
+        if hold is not None and margin:
+            self._held[order_id] = (hold[0], hold[1], hold[2] - margin)
+            self.held[hold[1]] -= margin
+
+    def check(
+        self, order: Dict[str, Any], allow_duplicate: bool = False
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Run every check on a Fyers order payload; returns ``(problem, None)`` or ``(None, hold key)``."""
+        self.checked += 1
+        o = self.prepare(order)
+        for name in self.CHECKS:
+            if name == "duplicate" and allow_duplicate:
+                continue
+            problem = getattr(self, f"check_{name}")(o)
+            if problem:
+                self.rejected[name] += 1
+                return problem, None
+
+        key = f"hold-{next(self._hold_ids)}"
+        now = time.monotonic()
+        self._add_open(
+            key,
+            {
+                "symbol": o.symbol,
+                "qty": o.qty,
+                "filled": 0,
+                "fingerprint": o.fingerprint,
+            },
+        )
+        if o.margin:
+            bucket = fund_bucket(o.symbol)
+            self._held[key] = (now, bucket, o.margin)
+            self.held[bucket] += o.margin
+        self._recent[o.fingerprint] = (now, key)
+        if len(self._recent) > 256:
+            self._recent = {
+                f: r
+                for f, r in self._recent.items()
+                if now - r[0] <= RISK_DUPLICATE_WINDOW or r[1] in self.unanswered
+            }
+        return None, key
+
+    def release(self, holds: List[Optional[str]]) -> None:
+        """Release holds for orders that were never sent."""
+        for key in holds:
+            if key is not None:
+                self._forget(key, self._drop_open(key))
+
+    def settle(
+        self,
+        holds: List[Optional[str]],
+        responses: Sequence[Optional[Dict[str, Any]]],
+    ) -> None:
+        """Turn each hold into the broker's order ID, or release it if the broker refused the order.
+
+        A missing response (or one marked ``unanswered``) keeps the hold: the
+        order may have gone through, so margin and the duplicate check stay
+        until ``resolve_unanswered`` finds out.
+        """
+        for key, response in zip(holds, responses):
+            if key is None:
+                continue
+            if not isinstance(response, dict) or response.get("unanswered"):
+                self.unanswered[key] = time.monotonic()
+                continue
+            order_id = response.get("id") if response.get("s") == "ok" else None
+            if order_id:
+                self._claim(key, order_id)
+            else:
+                self._forget(key, self._drop_open(key))
+
+    def resolve_unanswered(
+        self, orders: Iterable[Dict[str, Any]], taken_at: float
+    ) -> None:
+        """Settle unanswered writes sent before a full order book download fetched from ``taken_at``.
+
+        A hold whose order shows up in the book (same symbol, side, quantity,
+        type and prices, not already tracked under another write) moves to that
+        order; one that does not was never taken and is released.
+        """
+        pending = [key for key, sent in self.unanswered.items() if sent < taken_at]
+        if not pending:
+            return
+        claimed = {r[1] for r in self._recent.values()} | set(self._held)
+        candidates: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+        for order in orders:
+            if order.get("id") not in claimed:
+                candidates.setdefault(self.fingerprint(order), []).append(order)
+        for key in pending:
+            del self.unanswered[key]
+            entry = self.open.get(key)
+            matches = (
+                candidates.get(entry["fingerprint"]) if entry is not None else None
+            )
+            match = matches.pop(0) if matches else None
+            if match is None or match.get("status") in RISK_RELEASED_STATUSES:
+                self._forget(key, self._drop_open(key))
+            else:
+                self._claim(key, match["id"])
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "checked": self.checked,
+            "rejected": dict(self.rejected),
+            "open_orders": len(self.open),
+            "unanswered": len(self.unanswered),
+            "margin_held": round(sum(self.held.values()), 2),
+            "funds_age": (
+                round(now - self.funds_at, 1) if self.funds is not None else None
+            ),
+            "positions": (
+                "live"
+                if self.positions_live
+                else (
+                    round(now - self.positions_at, 1) if self.positions_loaded else None
+                )
+            ),
+            "prices": len(self.prices),
+        }
+
+
+class AsyncFyersClient:
+    """Async Fyers API v3 client on one keep-alive, bounded HTTP session.
+
+    Mirrors the ``fyersModel.FyersModel`` method names used by the tools so
+    concurrent tool calls overlap instead of blocking the stdio loop.
+    """
+
+    def __init__(
+        self, client_id: str, access_token: str, account: Optional[str] = None
+    ) -> None:
+        self.client_id = client_id
+        self.access_token = access_token
+        # Name the trade journal files this client's orders and fills under
+        self.account = account or DEFAULT_ACCOUNT
+        self.cache = TTLCache(CACHE_TTLS, CACHE_SIZE)
+        self.scheduler = RequestScheduler()
+        self.quote_batcher = QuoteBatcher(lambda chunk: self.quotes({"symbols": chunk}))
+        self.order_book = OrderBook()
+        self.risk = RiskEngine()
+        self.order_book.on_apply = self._on_order
+        # Position ID -> position, kept by the order update stream while it is connected
+        self.live_positions: Optional[Dict[str, Dict[str, Any]]] = None
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._risk_refresh: Optional[asyncio.Task] = None
+        self._inflight: Dict[Tuple[str, str], Tuple[int, asyncio.Future]] = {}
+        # Underlying -> {"YYYY-MM-DD": Fyers expiry timestamp}, learnt from option chain responses
+        self.option_expiries: Dict[str, Dict[str, str]] = {}
+
+    def _on_order(self, order: Dict[str, Any]) -> None:
+        self.risk.on_order(order)
+        journal = get_trade_journal()
+        if journal is not None:
+            journal.record_order(self.account, order)
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # Created lazily so the session binds to the server's running loop
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=FYERS_POOL_SIZE, keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=FYERS_TIMEOUT),
+                headers={"Content-Type": "application/json", "version": "3"},
+            )
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        data: Any = None,
+        data_api: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Send one request and return the decoded JSON body.
+
+        Transient failures (timeouts, dropped connections, 5xx, 429) are
+        retried with jittered backoff for reads; writes are retried only when
+        Fyers cannot have acted on them. Raises CircuitOpenError while the
+        endpoint's breaker is open.
+        """
+        url = (FYERS_DATA_URL if data_api else FYERS_API_URL) + path
+        kwargs: Dict[str, Any] = {}
+        if method == "GET":
+            if data:
+                kwargs["params"] = data
+        elif data is not None:
+            kwargs["data"] = json.dumps(data)
+        if timeout is not None:
+            import aiohttp
+
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        endpoint = f"{method} {path}"
+        request_class = endpoint_class(method, path, data_api)
+        breaker = resilience.breaker(endpoint)
+        idempotent = method == "GET"
+        attempt = 1
+        while True:
+            breaker.check()
+            throttled = False
+            try:
+                if idempotent and HEDGE_READS:
+                    status, result = await self._hedged(
+                        endpoint,
+                        lambda: self._send(
+                            method, url, kwargs, endpoint, request_class
+                        ),
+                    )
+                else:
+                    status, result = await self._send(
+                        method, url, kwargs, endpoint, request_class
+                    )
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                import aiohttp
+
+                if not isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+                    breaker.release()
+                    raise
+                breaker.record(False)
+                # A refused connection means nothing was sent, so even writes are safe to resend
+                if not (idempotent or isinstance(e, aiohttp.ClientConnectorError)):
+                    raise
+                if attempt >= RETRY_ATTEMPTS:
+                    if not idempotent:
+                        raise
+                    raise FyersAPIError(
+                        {
+                            "s": "error",
+                            "message": f"no response from Fyers ({type(e).__name__}) after {attempt} attempts",
+                        }
+                    ) from e
+            else:
+                throttled = status == 429 or result.get("code") == 429
+                failed = status >= 500
+                breaker.record(not failed)
+                if attempt >= RETRY_ATTEMPTS or not (
+                    throttled or (failed and idempotent)
+                ):
+                    return result
+            resilience.retries[endpoint] += 1
+            await asyncio.sleep(
+                backoff_delay(attempt) + (THROTTLE_RETRY_DELAY if throttled else 0)
+            )
+            attempt += 1
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        request_class: str,
+    ) -> Tuple[int, Dict[str, Any]]:
+        """One rate-limited round trip; returns ``(HTTP status, decoded body)``."""
+        # Sent per request so a refreshed token applies without a new session
+        headers = {"Authorization": f"{self.client_id}:{self.access_token}"}
+        await self.scheduler.acquire(request_class)
+        start = time.perf_counter()
+        try:
+            async with self._get_session().request(
+                method, url, headers=headers, **kwargs
+            ) as response:
+                status = response.status
+                body = await response.read()
+        except Exception as e:
+            server_metrics.record_upstream(
+                endpoint, time.perf_counter() - start, 0.0, 0, type(e).__name__, True
+            )
+            raise
+
+        # Timed apart from the round-trip so slow decoding of large payloads shows up
+        fetched = time.perf_counter()
+        try:
+            result = json.loads(body)
+        except ValueError:
+            result = None
+        # A proxy error page or an unexpected shape is an error response like any other
+        if not isinstance(result, dict):
+            result = {
+                "s": "error",
+                "code": status,
+                "message": body.decode(errors="replace"),
+            }
+        code = result.get("code", status)
+        server_metrics.record_upstream(
+            endpoint,
+            fetched - start,
+            time.perf_counter() - fetched,
+            len(body),
+            code,
+            status >= 400 or result.get("s") == "error",
+        )
+        return status, result
+
+    async def _hedged(
+        self,
+        endpoint: str,
+        send: Callable[[], Coroutine[Any, Any, Tuple[int, Dict[str, Any]]]],
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Run ``send``; if it is slower than the endpoint's p95, race a duplicate and keep the first to finish."""
+        first = asyncio.create_task(send())
+        done, _ = await asyncio.wait({first}, timeout=resilience.hedge_delay(endpoint))
+        if done:
+            return first.result()
+
+        resilience.hedges[endpoint] += 1
+        second = asyncio.create_task(send())
+        pending = {first, second}
+        errors: List[BaseException] = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is second:
+                            resilience.hedge_wins[endpoint] += 1
+                        return task.result()
+                    errors.append(error)
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _cached(
+        self,
+        endpoint: str,
+        path: str,
+        refresh: bool = False,
+        params: Optional[Dict[str, Any]] = None,
+        data_api: bool = False,
+    ) -> Dict[str, Any]:
+        key = urllib.parse.urlencode(params) if params else ""
+        generation = self.cache.generation(endpoint)
+        if not refresh:
+            cached: Optional[Dict[str, Any]] = self.cache.get(endpoint, key)
+            if cached is not None:
+                return cached
+            # Concurrent misses (many daemon front-ends at once) share one request
+            inflight = self._inflight.get((endpoint, key))
+            if inflight is not None and inflight[0] == generation:
+                return await asyncio.shield(inflight[1])
+
+        async def fetch() -> Dict[str, Any]:
+            response = await self.request("GET", path, params, data_api=data_api)
+            if response.get("code") == 200:
+                self.cache.set(endpoint, response, key, generation=generation)
+            return response
+
+        task = asyncio.ensure_future(fetch())
+        self._inflight[(endpoint, key)] = (generation, task)
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight.get((endpoint, key), (None, None))[1] is task:
+                del self._inflight[(endpoint, key)]
+
+    async def get_profile(self, refresh: bool = False) -> Dict[str, Any]:
+        return await self._cached("profile", "/profile", refresh)
+
+    async def funds(self, refresh: bool = False) -> Dict[str, Any]:
+        return await self._cached("funds", "/funds", refresh)
+
+    async def holdings(self, refresh: bool = False) -> Dict[str, Any]:
+        return await self._cached("holdings", "/holdings", refresh)
+
+    async def positions(self, refresh: bool = False) -> Dict[str, Any]:
+        if self.live_positions is not None and not refresh:
+            return {
+                "s": "ok",
+                "code": 200,
+                "netPositions": list(self.live_positions.values()),
+            }
+        return await self._cached("positions", "/positions", refresh)
+
+    async def orderbook(self, refresh: bool = False) -> Dict[str, Any]:
+        return await self._cached("orders", "/orders", refresh)
+
+    async def quotes(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        symbols = data.get("symbols", "")
+        if isinstance(symbols, (list, tuple)):
+            symbols = ",".join(symbols)
+        return await self.request("GET", "/quotes", {"symbols": symbols}, data_api=True)
+
+    async def option_chain(
+        self, symbol: str, strike_count: int, expiry: str = "", refresh: bool = False
+    ) -> Dict[str, Any]:
+        """One underlying/expiry chain (nearest expiry when ``expiry`` is blank), cached briefly."""
+        params = {"symbol": symbol, "strikecount": strike_count, "timestamp": expiry}
+        response = await self._cached(
+            "option_chain", "/options-chain-v3", refresh, params, data_api=True
+        )
+        expiries = (response.get("data") or {}).get("expiryData") or []
+        if expiries:
+            self.option_expiries[symbol] = {
+                datetime.strptime(item["date"], "%d-%m-%Y").strftime("%Y-%m-%d"): str(
+                    item["expiry"]
+                )
+                for item in expiries
+            }
+        return response
+
+    async def batch_quotes(self, symbols: list) -> Dict[str, Any]:
+        """Fetch quotes through the coalescing batcher, chunked to the API limit."""
+        quotes = await self.quote_batcher.get(symbols)
+        self.risk.note_quotes(quotes)
+        return quotes
+
+    async def _refresh_risk_state(self) -> None:
+        risk = self.risk
+        now = time.monotonic()
+
+        async def funds() -> None:
+            response = await self.funds(refresh=True)
+            if response.get("code") == 200:
+                risk.set_funds(response, now)
+
+        async def positions() -> None:
+            response = await self.positions(refresh=True)
+            # The stream may have taken over positions while the snapshot was loading
+            if response.get("code") == 200 and not risk.positions_live:
+                risk.set_positions(response.get("netPositions") or [], now)
+
+        jobs = []
+        if now - risk.funds_at >= RISK_STATE_TTL:
+            jobs.append(funds())
+        if not risk.positions_live and now - risk.positions_at >= RISK_STATE_TTL:
+            jobs.append(positions())
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def refresh_risk(self, symbols: Iterable[str]) -> None:
+        """Make sure the risk engine has funds, positions and a last price for ``symbols``.
+
+        Only the first snapshot is waited for; stale ones are refreshed in the
+        background so orders are checked against the state already held.
+        """
+        risk = self.risk
+        now = time.monotonic()
+        stale = now - risk.funds_at >= RISK_STATE_TTL or (
+            not risk.positions_live and now - risk.positions_at >= RISK_STATE_TTL
+        )
+        if stale and (self._risk_refresh is None or self._risk_refresh.done()):
+            self._risk_refresh = asyncio.create_task(self._refresh_risk_state())
+        jobs: List[Awaitable[Any]] = []
+        if self._risk_refresh is not None and (
+            risk.funds is None or not risk.positions_loaded
+        ):
+            jobs.append(asyncio.shield(self._risk_refresh))
+        missing = [symbol for symbol in symbols if risk.price(symbol) is None]
+        if missing:
+            jobs.append(self.batch_quotes(missing))
+        if jobs:
+            # A failed refresh leaves the checks that need it skipped, it does not block the order
+            await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def pre_trade_check(
+        self, legs: List[Dict[str, Any]], allow_duplicate: bool = False
+    ) -> Tuple[List[Optional[str]], List[Optional[str]]]:
+        """Run the risk checks on order payloads; returns ``(problem per leg, hold per leg)``.
+
+        Legs that pass hold their margin and exposure (so later legs see them)
+        until ``risk.settle``; if any leg fails, every hold is released.
+        """
+        if not RISK_CHECKS_ENABLED:
+            return [None] * len(legs), [None] * len(legs)
+        if self.risk.unanswered:
+            # Learn whether unanswered writes went through before checking what may be a resend
+            await asyncio.gather(self.sync_orders(), return_exceptions=True)
+        # Priced legs only need a quote for the price band; market orders need one to be valued
+        await self.refresh_risk(
+            {
+                leg["symbol"]
+                for leg in legs
+                if RISK_PRICE_BAND > 0
+                or not (leg.get("limitPrice") or leg.get("stopPrice"))
+            }
+        )
+        problems, holds = [], []
+        for leg in legs:
+            problem, hold = self.risk.check(leg, allow_duplicate)
+            problems.append(problem)
+            holds.append(hold)
+        if any(problems):
+            self.risk.release(holds)
+        return problems, holds
+
+    async def pre_modify_check(self, legs: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Run the risk checks on modifications of orders in the local order book.
+
+        Passing legs change the held exposure until ``risk.settle_modify``; if
+        any leg fails, every change is undone.
+        """
+        if not RISK_CHECKS_ENABLED:
+            return [None] * len(legs)
+        if any(leg.get("id") not in self.order_book.orders for leg in legs):
+            # Orders placed since the last sync are not in the book yet; a failed sync skips the check
+            await asyncio.gather(self.sync_orders(), return_exceptions=True)
+        known = [(leg, self.order_book.orders.get(leg.get("id", ""))) for leg in legs]
+        await self.refresh_risk(
+            {order["symbol"] for _, order in known if order and order.get("symbol")}
+        )
+        problems = [
+            self.risk.check_modify(order, leg) if order else None
+            for leg, order in known
+        ]
+        if any(problems):
+            self.risk.release_modify([leg["id"] for leg in legs])
+        return problems
+
+    async def sync_orders(self, refresh: bool = False) -> Dict[str, Any]:
+        """Bring the local order book up to date and return the last upstream response.
+
+        Downloads the full book on first use, when ``refresh`` is set, after
+        ``ORDER_BOOK_RESYNC`` seconds or when many orders changed; otherwise only
+        orders written since the last sync are refetched by ID.
+        """
+        book = self.order_book
+        wanted = book.writes
+        async with book.lock:
+            # A sync that finished while we waited for the lock may already cover our writes
+            fresh = book.loaded and (
+                book.live or time.monotonic() - book.synced_at < ORDER_BOOK_RESYNC
+            )
+            if (
+                not refresh
+                and fresh
+                and not book.resync
+                and book.synced_writes >= wanted
+            ):
+                return {"s": "ok", "code": 200}
+
+            covered = book.writes
+            if refresh or book.needs_full_sync():
+                taken_at = time.monotonic()
+                response = await self.orderbook(refresh)
+                if response.get("code") == 200:
+                    book.replace(response.get("orderBook") or [])
+                    book.synced_writes = covered
+                    self.risk.resolve_unanswered(book.orders.values(), taken_at)
+                    # Writes sent while the book was downloading still need the next one
+                    book.resync = bool(self.risk.unanswered)
+                return response
+
+            ids = list(book.dirty)
+            book.dirty.clear()
+            responses = await asyncio.gather(
+                *(self.fetch_order(order_id) for order_id in ids),
+                return_exceptions=True,
+            )
+            for order_id, result in zip(ids, responses):
+                if not isinstance(result, dict) or result.get("code") != 200:
+
+                    book.dirty.add(order_id)
+            if not book.dirty.intersection(ids):
+                book.synced_writes = covered
+            return {"s": "ok", "code": 200}
+
+    async def fetch_order(self, order_id: str) -> Dict[str, Any]:
+        """Fetch one order by ID into the local order book and return the response."""
+        response = await self.request("GET", "/orders", {"id": order_id})
+        if response.get("code") == 200:
+            for order in response.get("orderBook") or []:
+                self.order_book.apply(order)
+        return response
+
+    async def _write(
+        self, method: str, data: Any, path: str = "/orders/sync", strategy: Any = None
+    ) -> Dict[str, Any]:
+        response = None
+        try:
+            response = await self.request(method, path, data)
+            return response
+        except Exception as e:
+            import aiohttp
+
+            # Sent but unanswered: not retried, and the caller must not resend blindly either
+            if isinstance(
+                e, (aiohttp.ClientError, asyncio.TimeoutError)
+            ) and not isinstance(e, aiohttp.ClientConnectorError):
+                raise FyersAPIError(
+                    {
+                        "s": "error",
+                        "unanswered": True,
+                        "message": f"no response from Fyers ({type(e).__name__}); the order may have gone through, check get_orders before retrying",
+                    }
+                ) from e
+            raise
+        finally:
+            # Invalidate even on errors: the order may have reached the broker
+            self.cache.invalidate(*WRITE_INVALIDATES)
+            self.order_book.note_write(data, response)
+            journal = get_trade_journal()
+            if journal is not None:
+                journal.record_write(
+                    self.account,
+                    method,
+                    data,
+                    response,
+                    self.order_book.orders,
+                    strategy,
+                )
+
+    async def history(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        params = {"date_format": 0, "cont_flag": 1, **data}
+        return await self.request("GET", "/history", params, data_api=True)
+
+    async def place_order(
+        self, data: Dict[str, Any], strategy: str = ""
+    ) -> Dict[str, Any]:
+        return await self._write("POST", data, strategy=strategy)
+
+    async def modify_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._write("PATCH", data)
+
+    async def cancel_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._write("DELETE", data)
+
+    async def _basket(
+        self,
+        method: str,
+        legs: List[Dict[str, Any]],
+        strategies: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Submit legs via the multi-order endpoint, or fan out single-order calls.
+
+        Returns one single-order style response per leg, in input order.
+        """
+        semaphore = asyncio.Semaphore(BASKET_CONCURRENCY)
+        strategies = strategies or [""] * len(legs)
+
+        async def send_chunk(
+            chunk: List[Dict[str, Any]], tags: List[str]
+        ) -> List[Dict[str, Any]]:
+            try:
+                async with semaphore:
+                    response = await self._write(
+                        method, chunk, "/multi-order/sync", tags
+                    )
+            except Exception as e:
+                return [
+                    {
+                        "s": "error",
+                        "message": str(e),
+                        "unanswered": isinstance(e, FyersAPIError)
+                        and bool(e.response.get("unanswered")),
+                    }
+                ] * len(chunk)
+            data = response.get("data")
+            if (
+                response.get("s") == "ok"
+                and isinstance(data, list)
+                and len(data) == len(chunk)
+            ):
+                return [item.get("body", item) for item in data]
+            return [response] * len(chunk)
+
+        async def send_leg(leg: Dict[str, Any], tag: str) -> List[Dict[str, Any]]:
+            try:
+                async with semaphore:
+                    return [await self._write(method, leg, strategy=tag)]
+            except Exception as e:
+                return [
+                    {
+                        "s": "error",
+                        "message": str(e),
+                        "unanswered": isinstance(e, FyersAPIError)
+                        and bool(e.response.get("unanswered")),
+                    }
+                ]
+
+        if BASKET_MULTI_ORDER:
+            batches = [
+                send_chunk(
+                    legs[i : i + BASKET_CHUNK_SIZE],
+                    strategies[i : i + BASKET_CHUNK_SIZE],
+                )
+                for i in range(0, len(legs), BASKET_CHUNK_SIZE)
+            ]
+        else:
+            batches = [send_leg(leg, tag) for leg, tag in zip(legs, strategies)]
+        results = await asyncio.gather(*batches)
+        return [response for batch in results for response in batch]
+
+    async def place_basket_orders(
+        self, orders: List[Dict[str, Any]], strategies: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        return await self._basket("POST", orders, strategies)
+
+    async def modify_basket_orders(
+        self, orders: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return await self._basket("PATCH", orders)
+
+    async def cancel_basket_orders(
+        self, orders: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return await self._basket("DELETE", orders)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+# Token store: access and refresh tokens live in a small JSON file rather than .env
+TOKEN_STORE_PATH = os.getenv(
+    "FYERS_TOKEN_STORE", os.path.join(FYERS_DATA_DIR, "token.json")
+)
+TOKEN_REFRESH_MARGIN = float(os.getenv("FYERS_TOKEN_REFRESH_MARGIN", "900"))
+TOKEN_REFRESH_RETRY = 60
+
+
+def app_id_hash(client_id: str, secret_key: str) -> str:
+    """The appIdHash Fyers expects in token requests: SHA-256 of "client_id:secret_key"."""
+    return hashlib.sha256(f"{client_id}:{secret_key}".encode()).hexdigest()
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Expiry (epoch seconds) from a JWT's exp claim, or None for tokens without one."""
+    import jwt
+
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        return None
+    return float(exp) if exp else None
+
+
+class TokenManager:
+    """Holds an account's access token, persists it atomically and refreshes it before expiry.
+
+    Refreshing uses the Fyers refresh-token flow, which needs the app secret and
+    the account PIN; without them the token is only checked for expiry.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        client_id: Optional[str],
+        secret_key: Optional[str] = None,
+        pin: Optional[str] = None,
+        env_token: Optional[str] = None,
+        on_refresh: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.path = path
+        self.client_id = client_id
+        self.secret_key = secret_key
+        self.pin = pin
+        self.env_token = env_token
+        self.on_refresh = on_refresh
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at: Optional[float] = None
+        self.refreshes = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+
+    def _load(self) -> None:
+        stored = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+        self.refresh_token = stored.get("refresh_token")
+        # A token pasted into .env still works; whichever expires last wins
+        candidates = [t for t in (stored.get("access_token"), self.env_token) if t]
+        if candidates:
+            self.access_token = max(candidates, key=lambda t: token_expiry(t) or 0)
+            self.expires_at = token_expiry(self.access_token)
+
+    def save(self, access_token: str, refresh_token: Optional[str] = None) -> None:
+        """Store tokens by writing a private temp file and renaming it over the old one."""
+        self.access_token = access_token
+        self.expires_at = token_expiry(access_token)
+        if refresh_token:
+            self.refresh_token = refresh_token
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".token-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {
+                        "access_token": self.access_token,
+                        "refresh_token": self.refresh_token,
+                        "expires_at": self.expires_at,
+                        "saved_at": time.time(),
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def can_refresh(self) -> bool:
+        return bool(
+            self.refresh_token and self.client_id and self.secret_key and self.pin
+        )
+
+    async def refresh(self) -> bool:
+        """Exchange the refresh token for a new access token and switch live clients to it."""
+        import aiohttp
+
+        if not self.client_id or not self.secret_key:
+            self.last_error = "No client ID or secret key to refresh with"
+            return False
+        payload = {
+            "grant_type": "refresh_token",
+            "appIdHash": app_id_hash(self.client_id, self.secret_key),
+            "refresh_token": self.refresh_token,
+            "pin": self.pin,
+        }
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=FYERS_TIMEOUT)
+        ) as session:
+            async with session.post(
+                f"{FYERS_API_URL}/validate-refresh-token", json=payload
+            ) as response:
+                body = await response.json(content_type=None)
+
+        if body.get("s") != "ok" or not body.get("access_token"):
+            self.last_error = body.get("message", str(body))
+            return False
+        self.save(body["access_token"])
+        self.refreshes += 1
+        self.last_error = None
+        if self.on_refresh is not None:
+            self.on_refresh(body["access_token"])
+        return True
+
+    def start(self) -> None:
+        """Schedule the background refresher on the running loop if the token can be refreshed."""
+        if (
+            (self._task is None or self._task.done())
+            and self.expires_at
+            and self.can_refresh()
+        ):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        # Refresh ahead of expiry so no tool call ever goes out with a dead token
+        while self.expires_at and self.can_refresh():
+            delay = self.expires_at - TOKEN_REFRESH_MARGIN - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                refreshed = await self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                refreshed = False
+            if not refreshed:
+                if self.expired():
+                    return
+                await asyncio.sleep(TOKEN_REFRESH_RETRY)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# Accounts: the FYERS_* credentials form the "default" account, and
+# FYERS_ACCOUNTS=alpha,beta adds accounts read from FYERS_ALPHA_CLIENT_ID,
+# FYERS_ALPHA_SECRET_KEY, FYERS_ALPHA_PIN, FYERS_ALPHA_ACCESS_TOKEN, ...
+DEFAULT_ACCOUNT = "default"
+ALL_ACCOUNTS = "all"
+FYERS_ACCOUNTS = list(
+    dict.fromkeys(
+        [DEFAULT_ACCOUNT]
+        + [
+            name.strip().lower()
+            for name in os.getenv("FYERS_ACCOUNTS", "").split(",")
+            if name.strip()
+        ]
+    )
+)
+
+
+def account_setting(name: str, key: str) -> Optional[str]:
+    prefix = "FYERS_" if name == DEFAULT_ACCOUNT else f"FYERS_{name.upper()}_"
+    return os.getenv(prefix + key)
+
+
+class Account:
+    """A named Fyers login with its own token store and client (and so its own cache and rate limiter)."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.client_id = account_setting(name, "CLIENT_ID")
+        self.secret_key = account_setting(name, "SECRET_KEY")
+        if name == DEFAULT_ACCOUNT:
+            token_path = TOKEN_STORE_PATH
+        else:
+            token_path = os.path.join(
+                os.path.dirname(TOKEN_STORE_PATH), f"token-{name}.json"
+            )
+        self.tokens = TokenManager(
+            token_path,
+            self.client_id,
+            self.secret_key,
+            account_setting(name, "PIN"),
+            account_setting(name, "ACCESS_TOKEN"),
+            on_refresh=self.apply_access_token,
+        )
+        self.client: Optional[AsyncFyersClient] = None
+
+    def get_client(self) -> Optional[AsyncFyersClient]:
+        """Return this account's client, or None without credentials or a live token."""
+        self.tokens.start()
+        if not self.client_id or not self.tokens.access_token or self.tokens.expired():
+            return None
+        if self.client is None:
+            self.client = AsyncFyersClient(
+                self.client_id, self.tokens.access_token, self.name
+            )
+        return self.client
+
+    def apply_access_token(self, access_token: str) -> None:
+        """Point the live client (and, for the default account, the stream) at a new token."""
+        if self.client is not None:
+            self.client.access_token = access_token
+        if self.name == DEFAULT_ACCOUNT and market_stream is not None:
+            market_stream.access_token = f"{self.client_id}:{access_token}"
+        if self.name == DEFAULT_ACCOUNT and order_stream is not None:
+            order_stream.access_token = f"{self.client_id}:{access_token}"
+
+
+accounts: Dict[str, Account] = {}
+
+
+def get_account(name: str = DEFAULT_ACCOUNT) -> Optional[Account]:
+    """Return a configured account by name (case-insensitive), or None if unknown."""
+    name = (name or DEFAULT_ACCOUNT).strip().lower()
+    if name not in FYERS_ACCOUNTS:
+        return None
+    if name not in accounts:
+        accounts[name] = Account(name)
+    return accounts[name]
+
+
+def require_account(name: str = DEFAULT_ACCOUNT) -> Account:
+    """Like ``get_account`` for names known to be configured, as the default always is."""
+    selected = get_account(name)
+    if selected is None:
+        raise KeyError(f"Unknown account '{name}'")
+    return selected
+
+
+def get_token_manager(account: str = DEFAULT_ACCOUNT) -> TokenManager:
+    return require_account(account).tokens
+
+
+def get_fyers_client(account: str = DEFAULT_ACCOUNT) -> Optional[AsyncFyersClient]:
+    """Return the client for an account, or None without a live token."""
+    selected = get_account(account)
+    return selected.get_client() if selected else None
+
+
+def account_client(account: str) -> Union[AsyncFyersClient, str]:
+    """Resolve an account selector to its client, or to the error message to show."""
+    selected = get_account(account)
+    if selected is None:
+        return (
+            f"❌ Unknown account '{account}'. Configured: {', '.join(FYERS_ACCOUNTS)}"
+        )
+    client = selected.get_client()
+    if client is None:
+        suffix = (
+            "" if selected.name == DEFAULT_ACCOUNT else f'(account="{selected.name}")'
+        )
+        return f"❌ Not authenticated. Use 'authenticate{suffix}' tool first."
+    return client
+
+
+async def fetch_all_accounts(
+    fetch: Callable[["AsyncFyersClient"], Awaitable[Dict[str, Any]]],
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Call ``fetch(client)`` on every configured account concurrently.
+
+    Returns successful responses and error messages, both keyed by account name.
+    """
+
+    async def fetch_one(name: str) -> Union[Dict[str, Any], str]:
+        client = account_client(name)
+        if isinstance(client, str):
+            return client.replace("❌ ", "")
+        try:
+            response = await fetch(client)
+        except Exception as e:
+            return str(e)
+        return (
+            response
+            if response.get("code") == 200
+            else str(response.get("message", response))
+        )
+
+    names = [name for name in FYERS_ACCOUNTS if require_account(name).client_id]
+    results = await asyncio.gather(*(fetch_one(name) for name in names))
+    responses = {
+        name: result for name, result in zip(names, results) if isinstance(result, dict)
+    }
+    errors = {
+        name: result
+        for name, result in zip(names, results)
+        if not isinstance(result, dict)
+    }
+    return responses, errors
+
+
+async def reset_fyers_client() -> None:
+    """Close every account's client so the next call picks up a fresh token."""
+    global market_stream, order_stream
+    if market_stream is not None:
+        await market_stream.stop()
+        market_stream = None
+    if order_stream is not None:
+        await order_stream.stop()
+        order_stream = None
+    for selected in accounts.values():
+        if selected.client is not None:
+            await selected.client.close()
+            selected.client = None
+
+
+# Market data stream reconnect backoff in seconds
+STREAM_RECONNECT_MIN = float(os.getenv("FYERS_STREAM_RECONNECT_MIN", "1"))
+STREAM_RECONNECT_MAX = float(os.getenv("FYERS_STREAM_RECONNECT_MAX", "30"))
+
+
+# Socket callbacks take the SDK's message (usually a dict)
+SocketCallback = Callable[[Any], None]
+
+
+def _sdk_data_socket(
+    access_token: str,
+    on_message: SocketCallback,
+    on_error: SocketCallback,
+    on_close: SocketCallback,
+) -> Any:
+    """Build the Fyers SDK data socket, which speaks the binary HSM protocol."""
+    from fyers_apiv3.FyersWebsocket import data_ws
+
+    # write_to_file keeps SDK output off stdout, which carries the MCP protocol;
+    # reconnect is off because MarketDataStream resubscribes on its own
+    return data_ws.FyersDataSocket(
+        access_token=access_token,
+        write_to_file=True,
+        log_path=tempfile.gettempdir(),
+        litemode=False,
+        reconnect=False,
+        on_message=on_message,
+        on_error=on_error,
+        on_close=on_close,
+    )
+
+
+class MarketDataStream:
+    """Background market data subscription keeping a last-tick table.
+
+    The socket runs on its own threads; ticks land in ``ticks`` and the
+    supervisor task reconnects with backoff and resubscribes every symbol.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        socket_factory: Callable[..., Any] = _sdk_data_socket,
+    ) -> None:
+        self.access_token = access_token
+        self.socket_factory = socket_factory
+        self.symbols: set = set()
+        self.ticks: Dict[str, Dict[str, Any]] = {}
+        self.connected = False
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self._socket: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        symbol = message.get("symbol") if isinstance(message, dict) else None
+        if symbol and symbol in self.symbols and "ltp" in message:
+            self.ticks[symbol] = {
+                "lp": message.get("ltp") or 0,
+                "ch": message.get("ch") or 0,
+                "chp": message.get("chp") or 0,
+                "volume": message.get("vol_traded_today") or 0,
+                "ts": time.time(),
+            }
+
+    def _on_error(self, message: Any) -> None:
+        self.last_error = str(message)
+
+    def _on_close(self, message: Any = None) -> None:
+        if self._loop is not None and self._closed is not None:
+            self._loop.call_soon_threadsafe(self._closed.set)
+
+    def _connect(self) -> Tuple[Any, set]:
+        # Blocking: the SDK handshake sleeps while the socket thread starts
+        sock = self.socket_factory(
+            self.access_token, self._on_message, self._on_error, self._on_close
+        )
+        sock.connect()
+
+        if not sock.is_connected():
+            raise ConnectionError(self.last_error or "Data socket connection failed")
+        subscribed = set(self.symbols)
+        if subscribed:
+            sock.subscribe(symbols=sorted(subscribed), data_type="SymbolUpdate")
+        return sock, subscribed
+
+    async def _run(self) -> None:
+        delay = STREAM_RECONNECT_MIN
+        while not self._stopping:
+            self._closed = asyncio.Event()
+            try:
+                self._socket, subscribed = await asyncio.to_thread(self._connect)
+                self.connected = True
+                # Pick up symbols added while the handshake was running
+                missed = self.symbols - subscribed
+                if missed:
+                    await asyncio.to_thread(
+                        self._socket.subscribe,
+                        symbols=sorted(missed),
+                        data_type="SymbolUpdate",
+                    )
+                delay = STREAM_RECONNECT_MIN
+                await self._closed.wait()
+            except Exception as e:
+                self.last_error = str(e)
+            self.connected = False
+            self._socket = None
+            if self._stopping:
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STREAM_RECONNECT_MAX)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def subscribe(self, symbols: list) -> None:
+        new_symbols = [s for s in symbols if s not in self.symbols]
+        self.symbols.update(new_symbols)
+        self.start()
+        if new_symbols and self.connected and self._socket is not None:
+            await asyncio.to_thread(
+                self._socket.subscribe, symbols=new_symbols, data_type="SymbolUpdate"
+            )
+
+    async def unsubscribe(self, symbols: list) -> None:
+        removed = [s for s in symbols if s in self.symbols]
+        for symbol in removed:
+            self.symbols.discard(symbol)
+            self.ticks.pop(symbol, None)
+        if removed and self.connected and self._socket is not None:
+            await asyncio.to_thread(
+                self._socket.unsubscribe, symbols=removed, data_type="SymbolUpdate"
+            )
+
+    def get_tick(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return the last tick for a subscribed symbol while the stream is live."""
+        if not self.connected:
+            return None
+        return self.ticks.get(symbol)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._socket is not None:
+            await asyncio.to_thread(self._socket.close_connection)
+        if self._closed is not None:
+            self._closed.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.connected = False
+
+
+def get_market_stream() -> Optional[MarketDataStream]:
+    """Return the shared market data stream, creating it on first use."""
+    global market_stream
+    if market_stream is None:
+        default = require_account()
+        client_id = default.client_id
+        access_token = default.tokens.access_token
+
+        if not client_id or not access_token:
+            return None
+
+        market_stream = MarketDataStream(f"{client_id}:{access_token}")
+
+    return market_stream
+
+
+# Order update stream: set FYERS_ORDER_STREAM=0 to track orders by REST polling only
+ORDER_STREAM_ENABLED = os.getenv("FYERS_ORDER_STREAM", "1") != "0"
+ORDER_STREAM_TYPES = "OnOrders,OnTrades,OnPositions"
+
+
+def _sdk_order_socket(
+    access_token: str,
+    on_orders: SocketCallback,
+    on_positions: SocketCallback,
+    on_trades: SocketCallback,
+    on_error: SocketCallback,
+    on_close: SocketCallback,
+) -> Any:
+    """Build the Fyers SDK order socket (orders, trades and positions for the account)."""
+    from fyers_apiv3.FyersWebsocket import order_ws
+
+    return order_ws.FyersOrderSocket(
+        access_token=access_token,
+        write_to_file=True,
+        log_path=tempfile.gettempdir(),
+        reconnect=False,
+        on_orders=on_orders,
+        on_positions=on_positions,
+        on_trades=on_trades,
+        on_error=on_error,
+        on_close=on_close,
+    )
+
+
+def position_key(position: Dict[str, Any]) -> str:
+    return (
+        position.get("id") or f"{position.get('symbol')}-{position.get('productType')}"
+    )
+
+
+class OrderUpdateStream:
+    """Background order, trade and position subscription for the default account.
+
+    Socket callbacks run on SDK threads and are handed to the event loop.
+    Order events go into the client's OrderBook (waking ``wait_change``
+    callers); position events keep ``client.live_positions``, which is
+    seeded from one REST snapshot per connection. Reconnects use the same
+    backoff as the market data stream, and force a full order book resync
+    since events may have been missed while disconnected.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        get_client: Callable[[], Optional["AsyncFyersClient"]],
+        socket_factory: Callable[..., Any] = _sdk_order_socket,
+    ) -> None:
+        self.access_token = access_token
+        self.get_client = get_client
+        self.socket_factory = socket_factory
+        self.connected = False
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self.events: Counter = Counter()
+        self._socket: Any = None
+        self._pending_positions: Optional[List[Dict[str, Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def _threadsafe(self, handler: Callable[[Dict[str, Any]], None]) -> SocketCallback:
+        def callback(message: Any) -> None:
+            if self._loop is not None and isinstance(message, dict):
+                self._loop.call_soon_threadsafe(handler, message)
+
+        return callback
+
+    def _on_orders(self, message: Dict[str, Any]) -> None:
+        update = message.get("orders")
+        client = self.get_client()
+        if not update or not update.get("id") or client is None:
+            return
+        self.events["orders"] += 1
+        book = client.order_book
+        book.apply({**book.orders.get(update["id"], {}), **update})
+        client.cache.invalidate("orders")
+
+    def _on_positions(self, message: Dict[str, Any]) -> None:
+        update = message.get("positions")
+        client = self.get_client()
+        if not update or client is None:
+            return
+        self.events["positions"] += 1
+        client.cache.invalidate("positions")
+        if client.live_positions is None:
+            if self._pending_positions is not None:
+                self._pending_positions.append(update)
+            return
+        key = position_key(update)
+        client.live_positions[key] = {**client.live_positions.get(key, {}), **update}
+        client.risk.apply_position(client.live_positions[key])
+
+    def _on_trades(self, message: Dict[str, Any]) -> None:
+        client = self.get_client()
+        if message.get("trades") and client is not None:
+            self.events["trades"] += 1
+            client.cache.invalidate("funds")
+            client.risk.invalidate_funds()
+
+    def _on_error(self, message: Any) -> None:
+        self.last_error = str(message)
+
+    def _on_close(self, message: Any = None) -> None:
+        if self._loop is not None and self._closed is not None:
+            self._loop.call_soon_threadsafe(self._closed.set)
+
+    def _connect(self) -> Any:
+        # Blocking: the SDK handshake sleeps while the socket thread starts
+        sock = self.socket_factory(
+            self.access_token,
+            self._threadsafe(self._on_orders),
+            self._threadsafe(self._on_positions),
+            self._threadsafe(self._on_trades),
+            self._on_error,
+            self._on_close,
+        )
+        sock.connect()
+        if not sock.is_connected():
+            raise ConnectionError(self.last_error or "Order socket connection failed")
+        sock.subscribe(data_type=ORDER_STREAM_TYPES)
+        return sock
+
+    async def _go_live(self) -> None:
+        client = self.get_client()
+        if client is None:
+            return
+        client.order_book.live = True
+        client.order_book.resync = True
+        # Position events that arrive while the snapshot loads are replayed on top of it
+        self._pending_positions = []
+        taken_at = time.monotonic()
+        response = await client.positions(refresh=True)
+        if response.get("code") == 200 and self.connected:
+            table = {position_key(p): p for p in response.get("netPositions") or []}
+            for update in self._pending_positions:
+                table[position_key(update)] = {
+                    **table.get(position_key(update), {}),
+                    **update,
+                }
+            client.live_positions = table
+            client.risk.set_positions(table.values(), taken_at, live=True)
+        self._pending_positions = None
+
+    def _go_offline(self) -> None:
+        self.connected = False
+        self._pending_positions = None
+        client = self.get_client()
+        if client is not None:
+            client.order_book.live = False
+            client.live_positions = None
+            client.risk.go_offline()
+
+    async def _run(self) -> None:
+        delay = STREAM_RECONNECT_MIN
+        while not self._stopping:
+            self._closed = asyncio.Event()
+            try:
+                self._socket = await asyncio.to_thread(self._connect)
+                self.connected = True
+                delay = STREAM_RECONNECT_MIN
+                await self._go_live()
+                await self._closed.wait()
+            except Exception as e:
+                self.last_error = str(e)
+            self._go_offline()
+            self._socket = None
+            if self._stopping:
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STREAM_RECONNECT_MAX)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._socket is not None:
+            try:
+                await asyncio.to_thread(self._socket.close_connection)
+            except Exception as e:
+                self.last_error = str(e)
+        if self._closed is not None:
+            self._closed.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._go_offline()
+
+
+def get_order_stream() -> Optional[OrderUpdateStream]:
+    """Return the default account's order update stream, started on first use (None if disabled or logged out)."""
+    global order_stream
+    if order_stream is None:
+        if not ORDER_STREAM_ENABLED:
+            return None
+        default = require_account()
+        if not default.client_id or not default.tokens.access_token:
+            return None
+        order_stream = OrderUpdateStream(
+            f"{default.client_id}:{default.tokens.access_token}", get_fyers_client
+        )
+    order_stream.start()
+    return order_stream
+
+
+# OAuth: Fyers redirects the browser to a local listener. FYERS_AUTH_PORT=0 picks
+# a free port (handy for tests; Fyers itself only redirects to the registered URI)
+FYERS_REDIRECT_URI = os.getenv("FYERS_REDIRECT_URI", "http://localhost:8080/")
+AUTH_PORT = int(
+    os.getenv(
+        "FYERS_AUTH_PORT", str(urllib.parse.urlparse(FYERS_REDIRECT_URI).port or 80)
+    )
+)
+AUTH_TIMEOUT = float(os.getenv("FYERS_AUTH_TIMEOUT", "300"))
+AUTH_OPEN_BROWSER = os.getenv("FYERS_AUTH_BROWSER", "1") != "0"
+AUTH_FOLLOWUP_WAIT = 30
+
+AUTH_SUCCESS_HTML = """
+<html><body>
+<h2>Authentication Successful!</h2>
+<p>You can close this browser window.</p>
+<p>Return to Claude to continue.</p>
+</body></html>
+"""
+
+AUTH_FAILED_HTML = """
+<html><body>
+<h2>Authentication Failed</h2>
+<p>{reason}</p>
+</body></html>
+"""
+
+
+async def exchange_auth_code(
+    client_id: str, secret_key: str, auth_code: str
+) -> Dict[str, Any]:
+    """Trade an OAuth auth code for access and refresh tokens."""
+    import aiohttp
+
+    payload = {
+        "grant_type": "authorization_code",
+        "appIdHash": app_id_hash(client_id, secret_key),
+        "code": auth_code,
+    }
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=FYERS_TIMEOUT)
+    ) as session:
+        async with session.post(
+            f"{FYERS_API_URL}/validate-authcode", json=payload
+        ) as response:
+            body: Dict[str, Any] = await response.json(content_type=None)
+            return body
+
+
+class OAuthFlow:
+    """One login attempt: a local callback listener whose redirect resolves a future,
+    followed by the auth-code-for-token exchange, all on the event loop."""
+
+    def __init__(
+        self,
+        account: Account,
+        exchange: Callable[
+            [str, str, str], Awaitable[Dict[str, Any]]
+        ] = exchange_auth_code,
+    ) -> None:
+        self.account = account
+        # authenticate only starts a flow for accounts that have both
+        self.client_id = account.client_id or ""
+        self.secret_key = account.secret_key or ""
+        self.exchange = exchange
+        self.state = secrets.token_urlsafe(16)
+        self.status = "pending"
+        self.message = ""
+        self.redirect_uri = FYERS_REDIRECT_URI
+        self.auth_url = ""
+        self._code: Optional[asyncio.Future] = None
+        self._runner: Optional["aiohttp.web.AppRunner"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> str:
+        """Start listening for the redirect and return the URL the user must open."""
+        from aiohttp import web
+
+        code = self._code = asyncio.get_running_loop().create_future()
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._callback)
+        runner = self._runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+
+        parsed = urllib.parse.urlparse(FYERS_REDIRECT_URI)
+        host = parsed.hostname or "localhost"
+        try:
+            await web.TCPSite(
+                runner, "127.0.0.1" if host == "localhost" else host, AUTH_PORT
+            ).start()
+        except OSError:
+            await runner.cleanup()
+            raise
+        port = runner.addresses[0][1]
+        self.redirect_uri = parsed._replace(netloc=f"{host}:{port}").geturl()
+        self.auth_url = f"{FYERS_API_URL}/generate-authcode?" + urllib.parse.urlencode(
+            {
+                "client_id": self.client_id,
+                "redirect_uri": self.redirect_uri,
+                "response_type": "code",
+                "state": self.state,
+            }
+        )
+        self._task = asyncio.create_task(self._complete(code, runner))
+        return self.auth_url
+
+    async def _callback(self, request: "aiohttp.web.Request") -> "aiohttp.web.Response":
+        from aiohttp import web
+
+        params = request.query
+        if params.get("state") != self.state:
+            # Not our redirect (stale tab or forged request); keep waiting
+            return web.Response(
+                status=400,
+                text=AUTH_FAILED_HTML.format(reason="Unexpected login state."),
+                content_type="text/html",
+            )
+
+        auth_code = params.get("auth_code") or params.get("code")
+        if self._code is not None and not self._code.done():
+            if auth_code:
+                self._code.set_result(auth_code)
+            else:
+                self._code.set_exception(
+                    FyersAPIError(
+                        {"message": params.get("message", "No auth code received")}
+                    )
+                )
+        if not auth_code:
+            return web.Response(
+                status=400,
+                text=AUTH_FAILED_HTML.format(reason="No authorization code received."),
+                content_type="text/html",
+            )
+        return web.Response(text=AUTH_SUCCESS_HTML, content_type="text/html")
+
+    async def _complete(
+        self, code: asyncio.Future, runner: "aiohttp.web.AppRunner"
+    ) -> None:
+        try:
+            auth_code = await asyncio.wait_for(code, AUTH_TIMEOUT)
+            response = await self.exchange(self.client_id, self.secret_key, auth_code)
+            if response.get("s") == "ok" and response.get("access_token"):
+                # Persist to the account's token store and switch its live clients over
+                tokens = self.account.tokens
+                tokens.save(response["access_token"], response.get("refresh_token"))
+                self.account.apply_access_token(response["access_token"])
+                tokens.start()
+                self.status = "success"
+            else:
+                self.status = "error"
+                self.message = (
+                    f"Token generation failed: {response.get('message', response)}"
+                )
+        except asyncio.TimeoutError:
+            self.status = "timeout"
+        except Exception as e:
+            self.status = "error"
+            self.message = str(e)
+        finally:
+            await runner.cleanup()
+
+    async def wait(self, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for the flow to finish."""
+        if timeout > 0 and self._task is not None:
+            await asyncio.wait({self._task}, timeout=timeout)
+
+    async def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait({self._task})
+
+
+auth_flow: Optional[OAuthFlow] = None
+
+
+@mcp.tool()
+async def authenticate(
+    account: str = DEFAULT_ACCOUNT, wait_seconds: Optional[float] = None
+) -> str:
+    """Start OAuth login in the browser, or report on (and wait for) a login already in progress.
+
+    Args:
+        account: Account to log in (see FYERS_ACCOUNTS); "default" uses FYERS_CLIENT_ID
+        wait_seconds: How long to wait for the login to finish. By default a new login returns
+            immediately with a pending status, and a call while one is pending waits up to 30 seconds.
+    """
+    global auth_flow
+
+    if auth_flow is not None and auth_flow.account.name != account.strip().lower():
+        if auth_flow.status == "pending":
+            return f"⏳ A login for account '{auth_flow.account.name}' is in progress. Finish it first (call authenticate(account=\"{auth_flow.account.name}\"))."
+        # Another account's login finished unreported; its outcome is already in effect
+        auth_flow = None
+
+    if auth_flow is None:
+        selected = get_account(account)
+        if selected is None:
+            return f"❌ Unknown account '{account}'. Configured: {', '.join(FYERS_ACCOUNTS)}"
+        if not selected.client_id or not selected.secret_key:
+            return f"❌ Missing client ID or secret key for account '{selected.name}' in environment"
+
+        flow = OAuthFlow(selected)
+        try:
+            auth_url = await flow.start()
+        except OSError as e:
+            return (
+                f"❌ Could not listen for the login redirect on port {AUTH_PORT}: {e}"
+            )
+        auth_flow = flow
+
+        if AUTH_OPEN_BROWSER:
+            import webbrowser
+
+            await asyncio.to_thread(webbrowser.open, auth_url)
+        await flow.wait(wait_seconds or 0)
+    elif auth_flow.status == "pending":
+        await auth_flow.wait(
+            AUTH_FOLLOWUP_WAIT if wait_seconds is None else wait_seconds
+        )
+
+    flow = auth_flow
+    if flow.status == "pending":
+        return f"""⏳ Waiting for login in the browser.
+If it did not open, visit:
+{flow.auth_url}
+
+Call authenticate again to wait for completion."""
+
+    # Report a finished flow once; the next call starts a new login
+    auth_flow = None
+    if flow.status == "success":
+        if flow.account.name != DEFAULT_ACCOUNT:
+            return f"✅ Authentication successful for account '{flow.account.name}'!"
+        return "✅ Authentication successful! All trading functions are now available."
+    if flow.status == "timeout":
+        return "❌ Authentication timeout. Please try again."
+    return f"❌ Authentication failed: {flow.message}"
+
+
+# Output formats: "text" renders the emoji summaries, "json" returns compact
+# structured records built straight from the API response.
+class HoldingRecord(TypedDict):
+    symbol: str
+    qty: float
+    ltp: float
+    avg_price: float
+    value: float
+    pnl: float
+    pnl_pct: float
+
+
+class PositionRecord(TypedDict):
+    symbol: str
+    side: str
+    qty: float
+    avg_price: float
+    ltp: float
+    pnl: float
+
+
+class OrderRecord(TypedDict):
+    id: str
+    symbol: str
+    side: str
+    qty: float
+    price: float
+    type: Any
+    status: Any
+    time: str
+
+
+class QuoteRecord(TypedDict):
+    symbol: str
+    ltp: float
+    change: float
+    change_pct: float
+    volume: float
+
+
+class OptionLegRecord(TypedDict):
+    symbol: str
+    ltp: float
+    bid: float
+    ask: float
+    oi: float
+    volume: float
+    iv: Optional[float]
+    delta: Optional[float]
+    gamma: Optional[float]
+    theta: Optional[float]
+    vega: Optional[float]
+
+
+class BasketLegRecord(TypedDict):
+    leg: str
+    ok: bool
+    order_id: Optional[str]
+    message: Optional[str]
+
+
+def to_json(data: Any) -> str:
+    """Serialize a successful structured result."""
+    return json.dumps(
+        {"ok": True, "data": data},
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def error_result(output_format: str, message: str) -> str:
+    """Return an error message in the requested output format."""
+    if output_format == "json":
+        return json.dumps(
+            {"ok": False, "error": message.removeprefix("❌ ")},
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+    return message
+
+
+def holding_records(holdings: List[Dict[str, Any]]) -> List[HoldingRecord]:
+    records: List[HoldingRecord] = []
+    for holding in holdings:
+        qty = holding.get("quantity", holding.get("qty")) or 0
+        ltp = holding.get("ltp") or 0
+        avg_price = holding.get("costPrice") or 0
+        current_value = qty * ltp
+        pnl = current_value - (qty * avg_price)
+        records.append(
+            {
+                "symbol": holding.get("symbol", "N/A"),
+                "qty": qty,
+                "ltp": ltp,
+                "avg_price": avg_price,
+                "value": current_value,
+                "pnl": pnl,
+                "pnl_pct": (pnl / (qty * avg_price) * 100) if avg_price > 0 else 0,
+            }
+        )
+    return records
+
+
+def render_holdings(
+    records: List[HoldingRecord], total_value: float, total_pnl: float
+) -> str:
+    parts = ["📊 Portfolio Holdings:\n\n"]
+    for r in records:
+        parts.append(f"""📈 {r['symbol']}
+Qty: {r['qty']} | LTP: ₹{r['ltp']:.2f} | Avg: ₹{r['avg_price']:.2f}
+Current Value: ₹{r['value']:,.2f}
+P&L: ₹{r['pnl']:,.2f} ({r['pnl_pct']:+.2f}%)
+
+""")
+    parts.append(f"""💰 Summary:
+Total Value: ₹{total_value:,.2f}
+Total P&L: ₹{total_pnl:,.2f}""")
+    return "".join(parts)
+
+
+def position_records(positions: List[Dict[str, Any]]) -> List[PositionRecord]:
+    return [
+        {
+            "symbol": pos.get("symbol", "N/A"),
+            "side": "LONG" if (pos.get("side") or 0) > 0 else "SHORT",
+            "qty": abs(pos.get("qty") or 0),
+            "avg_price": pos.get("avgPrice") or 0,
+            "ltp": pos.get("ltp") or 0,
+            "pnl": pos.get("pl") or 0,
+        }
+        for pos in positions
+    ]
+
+
+def render_positions(records: List[PositionRecord], total_pnl: float) -> str:
+    parts = ["📊 Current Positions:\n\n"]
+    for r in records:
+        parts.append(f"""📈 {r['symbol']} ({r['side']})
+Qty: {r['qty']} | Avg: ₹{r['avg_price']:.2f} | LTP: ₹{r['ltp']:.2f}
+P&L: ₹{r['pnl']:,.2f}
+
+""")
+    parts.append(f"💰 Total P&L: ₹{total_pnl:,.2f}")
+    return "".join(parts)
+
+
+def order_records(orders: List[Dict[str, Any]]) -> List[OrderRecord]:
+    return [
+        {
+            "id": order.get("id", ""),
+            "symbol": order.get("symbol", "N/A"),
+            "side": "BUY" if (order.get("side") or 0) > 0 else "SELL",
+            "qty": order.get("qty") or 0,
+            "price": order.get("limitPrice") or 0,
+            "type": order.get("type", "N/A"),
+            "status": order.get("status", "N/A"),
+            "time": order.get("orderDateTime", ""),
+        }
+        for order in orders
+    ]
+
+
+def render_orders(records: List[OrderRecord]) -> str:
+    parts = ["📊 Recent Orders:\n\n"]
+    for r in records:
+        parts.append(f"""📋 {r['symbol']} - {r['side']} | {r['id']}
+Qty: {r['qty']} | Price: ₹{r['price']:.2f}
+Type: {r['type']} | Status: {r['status']} | {r['time']}
+
+""")
+    return "".join(parts)
+
+
+def quote_record(symbol: str, data: Dict[str, Any]) -> QuoteRecord:
+    quote = data.get("v", data)
+    return {
+        "symbol": symbol,
+        "ltp": quote.get("lp", quote.get("c")) or 0,
+        "change": quote.get("ch", quote.get("change")) or 0,
+        "change_pct": quote.get("chp", quote.get("changePer")) or 0,
+        "volume": quote.get("volume", quote.get("vol")) or 0,
+    }
+
+
+def render_quotes(records: List[QuoteRecord]) -> str:
+    parts = ["📊 Live Quotes:\n\n"]
+    for r in records:
+        parts.append(f"""📈 {r['symbol']}
+LTP: ₹{r['ltp']:.2f}
+Change: ₹{r['change']:+.2f} ({r['change_pct']:+.2f}%)
+Volume: {r['volume']:,}
+
+""")
+    return "".join(parts)
+
+
+# Merging for account="all": rows for the same instrument are combined with
+# quantity-weighted average prices, so the usual record builders apply unchanged
+def merge_holdings(holding_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for holding in itertools.chain.from_iterable(holding_lists):
+        qty = holding.get("quantity", holding.get("qty")) or 0
+        row = merged.setdefault(
+            holding.get("symbol", "N/A"),
+            {
+                "symbol": holding.get("symbol", "N/A"),
+                "quantity": 0,
+                "cost": 0.0,
+                "ltp": 0,
+            },
+        )
+        row["quantity"] += qty
+        row["cost"] += qty * (holding.get("costPrice") or 0)
+        row["ltp"] = holding.get("ltp") or row["ltp"]
+    return [
+        {
+            "symbol": row["symbol"],
+            "quantity": row["quantity"],
+            "ltp": row["ltp"],
+            "costPrice": row["cost"] / row["quantity"] if row["quantity"] else 0,
+        }
+        for row in merged.values()
+    ]
+
+
+def merge_positions(position_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    merged: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for pos in itertools.chain.from_iterable(position_lists):
+        side = 1 if (pos.get("side") or 0) > 0 else -1
+        qty = abs(pos.get("qty") or 0)
+        row = merged.setdefault(
+            (pos.get("symbol", "N/A"), side),
+            {
+                "symbol": pos.get("symbol", "N/A"),
+                "side": side,
+                "qty": 0,
+                "cost": 0.0,
+                "ltp": 0,
+                "pl": 0.0,
+            },
+        )
+        row["qty"] += qty
+        row["cost"] += qty * (pos.get("avgPrice") or 0)
+        row["ltp"] = pos.get("ltp") or row["ltp"]
+        row["pl"] += pos.get("pl") or 0
+    return [
+        {
+            "symbol": row["symbol"],
+            "side": row["side"],
+            "qty": row["qty"],
+            "avgPrice": row["cost"] / row["qty"] if row["qty"] else 0,
+            "ltp": row["ltp"],
+            "pl": row["pl"],
+        }
+        for row in merged.values()
+    ]
+
+
+def fund_summary(response: Dict[str, Any]) -> Dict[str, Any]:
+    # Handle both dict and list response formats
+    limits = response.get("fund_limit", {})
+    summary: Dict[str, Any] = (
+        limits[0] if isinstance(limits, list) and limits else limits
+    )
+    return summary
+
+
+def merge_funds(summaries: List[Dict[str, Any]]) -> Dict[str, float]:
+    totals: DefaultDict[str, float] = defaultdict(float)
+    for summary in summaries:
+        for key, value in summary.items():
+            if isinstance(value, (int, float)) and key != "id":
+                totals[key] += value
+    return dict(totals)
+
+
+def render_account_errors(errors: Dict[str, str]) -> str:
+    return "\n".join(f"{name}: {message}" for name, message in errors.items())
+
+
+def render_account_footer(
+    responses: Optional[Dict[str, Any]], errors: Dict[str, str]
+) -> str:
+    """Which accounts an account="all" result covers; empty for single-account results."""
+    if responses is None:
+        return ""
+    footer = f"\n\n👥 Accounts: {', '.join(responses)}"
+    if errors:
+        footer += "\n⚠️ Skipped:\n" + render_account_errors(errors)
+    return footer
+
+
+@mcp.tool()
+async def check_auth_status(
+    account: str = DEFAULT_ACCOUNT, output_format: str = "text"
+) -> str:
+    """Check current authentication status.
+
+    Args:
+        account: Account to check (see FYERS_ACCOUNTS)
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    selected = get_account(account)
+    if selected is None:
+        return error_result(
+            output_format,
+            f"❌ Unknown account '{account}'. Configured: {', '.join(FYERS_ACCOUNTS)}",
+        )
+    tokens = selected.tokens
+
+    if tokens.expires_at is not None and tokens.expired():
+        expired_at = datetime.fromtimestamp(tokens.expires_at, IST)
+        return error_result(
+            output_format,
+            f"❌ Token expired at {expired_at:%Y-%m-%d %H:%M} IST. Use 'authenticate' tool.",
+        )
+
+    if tokens.access_token:
+        try:
+            client = selected.get_client()
+            if client:
+                response = await client.get_profile(refresh=True)
+                if response.get("code") == 200:
+                    name = response["data"].get("name", "User")
+                    if output_format == "json":
+                        return to_json(
+                            {
+                                "authenticated": True,
+                                "name": name,
+                                "expires_at": tokens.expires_at,
+                                "auto_refresh": tokens.can_refresh(),
+                            }
+                        )
+                    if tokens.expires_at is None:
+                        return f"✅ Authenticated as: {name}"
+                    expires = datetime.fromtimestamp(tokens.expires_at, IST)
+                    refresh = (
+                        "auto-refresh on"
+                        if tokens.can_refresh()
+                        else "set the account PIN to auto-refresh"
+                    )
+                    return f"✅ Authenticated as: {name}\nToken expires: {expires:%Y-%m-%d %H:%M} IST ({refresh})"
+                else:
+                    return error_result(output_format, "❌ Token expired or invalid")
+            else:
+                return error_result(output_format, "❌ Client initialization failed")
+        except Exception as e:
+            return error_result(output_format, f"❌ Auth check failed: {str(e)}")
+    else:
+        return error_result(
+            output_format, "❌ Not authenticated. Use 'authenticate' tool."
+        )
+
+
+@mcp.tool()
+async def get_profile(output_format: str = "text") -> str:
+    """Get user profile information.
+
+    Args:
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        response = await client.get_profile()
+
+        if response.get("code") == 200:
+            data = response["data"]
+            if output_format == "json":
+                return to_json(
+                    {
+                        "name": data.get("name"),
+                        "email": data.get("email_id"),
+                        "mobile": data.get("mobile_number"),
+                        "client_id": data.get("fy_id"),
+                    }
+                )
+            return f"""✅ Profile Information:
+Name: {data.get('name', 'N/A')}
+Email: {data.get('email_id', 'N/A')}
+Mobile: {data.get('mobile_number', 'N/A')}
+Client ID: {data.get('fy_id', 'N/A')}
+"""
+        else:
+            return error_result(output_format, f"❌ Failed to get profile: {response}")
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting profile: {str(e)}")
+
+
+@mcp.tool()
+async def get_funds(account: str = DEFAULT_ACCOUNT, output_format: str = "text") -> str:
+    """Get account funds information.
+
+    Args:
+        account: Account name (see FYERS_ACCOUNTS), or "all" to add up every account
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        if account.strip().lower() == ALL_ACCOUNTS:
+            responses, errors = await fetch_all_accounts(lambda client: client.funds())
+            if not responses:
+                return error_result(
+                    output_format,
+                    "❌ Failed to get funds:\n" + render_account_errors(errors),
+                )
+            fund_data = merge_funds([fund_summary(r) for r in responses.values()])
+        else:
+            client = account_client(account)
+            if isinstance(client, str):
+                return error_result(output_format, client)
+
+            response = await client.funds()
+            if response.get("code") != 200:
+                return error_result(
+                    output_format, f"❌ Failed to get funds: {response}"
+                )
+            fund_data = fund_summary(response)
+            responses, errors = None, {}
+
+        if output_format == "json":
+            result: Dict[str, Any] = {
+                "equity_available": fund_data.get("equityAmount", 0),
+                "commodity_available": fund_data.get("commodityAmount", 0),
+                "used_margin": fund_data.get("utilisedAmount", 0),
+                "total_balance": fund_data.get("total_balance", 0),
+            }
+            if responses is not None:
+                result.update(accounts=list(responses), errors=errors)
+            return to_json(result)
+        text = f"""✅ Account Funds:
+Equity Available: ₹{fund_data.get('equityAmount', 0):,.2f}
+Commodity Available: ₹{fund_data.get('commodityAmount', 0):,.2f}
+Used Margin: ₹{fund_data.get('utilisedAmount', 0):,.2f}
+Total Balance: ₹{fund_data.get('total_balance', 0):,.2f}
+"""
+        if responses is None:
+            return text
+        return text.rstrip("\n") + render_account_footer(responses, errors)
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting funds: {str(e)}")
+
+
+@mcp.tool()
+async def get_holdings(
+    account: str = DEFAULT_ACCOUNT, output_format: str = "text"
+) -> str:
+    """Get portfolio holdings.
+
+    Args:
+        account: Account name (see FYERS_ACCOUNTS), or "all" to merge every account by symbol
+        output_format: "text" (default) or "json" for compact structured records
+    """
+    try:
+        if account.strip().lower() == ALL_ACCOUNTS:
+            responses, errors = await fetch_all_accounts(
+                lambda client: client.holdings()
+            )
+            if not responses:
+                return error_result(
+                    output_format,
+                    "❌ Failed to get holdings:\n" + render_account_errors(errors),
+                )
+            holdings = merge_holdings(
+                [r.get("holdings", []) for r in responses.values()]
+            )
+        else:
+            client = account_client(account)
+            if isinstance(client, str):
+                return error_result(output_format, client)
+
+            response = await client.holdings()
+            if response.get("code") != 200:
+                return error_result(
+                    output_format, f"❌ Failed to get holdings: {response}"
+                )
+            holdings = response.get("holdings", [])
+            responses, errors = None, {}
+
+        records = holding_records(holdings)
+        total_value = sum(r["value"] for r in records)
+        total_pnl = sum(r["pnl"] for r in records)
+
+        if output_format == "json":
+            result: Dict[str, Any] = {
+                "holdings": records,
+                "total_value": total_value,
+                "total_pnl": total_pnl,
+            }
+            if responses is not None:
+                result.update(accounts=list(responses), errors=errors)
+            return to_json(result)
+        if not records:
+            return "📊 No holdings found" + render_account_footer(responses, errors)
+        return render_holdings(records, total_value, total_pnl) + render_account_footer(
+            responses, errors
+        )
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting holdings: {str(e)}")
+
+
+@mcp.tool()
+async def get_positions(
+    account: str = DEFAULT_ACCOUNT, output_format: str = "text"
+) -> str:
+    """Get current trading positions.
+
+    Args:
+        account: Account name (see FYERS_ACCOUNTS), or "all" to merge every account by symbol and side
+        output_format: "text" (default) or "json" for compact structured records
+    """
+    try:
+        if account.strip().lower() == ALL_ACCOUNTS:
+            responses, errors = await fetch_all_accounts(
+                lambda client: client.positions()
+            )
+            if not responses:
+                return error_result(
+                    output_format,
+                    "❌ Failed to get positions:\n" + render_account_errors(errors),
+                )
+            positions = merge_positions(
+                [r.get("netPositions", []) for r in responses.values()]
+            )
+        else:
+            client = account_client(account)
+            if isinstance(client, str):
+                return error_result(output_format, client)
+
+            response = await client.positions()
+            if response.get("code") != 200:
+                return error_result(
+                    output_format, f"❌ Failed to get positions: {response}"
+                )
+            positions = response.get("netPositions", [])
+            responses, errors = None, {}
+
+        records = position_records(positions)
+        total_pnl = sum(r["pnl"] for r in records)
+
+        if output_format == "json":
+            result: Dict[str, Any] = {"positions": records, "total_pnl": total_pnl}
+            if responses is not None:
+                result.update(accounts=list(responses), errors=errors)
+            return to_json(result)
+        if not records:
+            return "📊 No open positions" + render_account_footer(responses, errors)
+        return render_positions(records, total_pnl) + render_account_footer(
+            responses, errors
+        )
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting positions: {str(e)}")
+
+
+# Optional symbol -> sector mapping (JSON file); Fyers holdings carry no sector
+SECTOR_MAP_PATH = os.getenv("FYERS_SECTOR_MAP", "")
+_sector_map: Optional[Dict[str, str]] = None
+
+
+def load_sector_map() -> Dict[str, str]:
+    """Load the sector map once; unmapped symbols fall under "Unclassified"."""
+    global _sector_map
+    if _sector_map is None:
+        _sector_map = {}
+        if SECTOR_MAP_PATH and os.path.exists(SECTOR_MAP_PATH):
+            with open(SECTOR_MAP_PATH, "r") as f:
+                _sector_map = {k.upper(): v for k, v in json.load(f).items()}
+    return _sector_map
+
+
+def portfolio_arrays(
+    holdings: List[Dict[str, Any]], positions: List[Dict[str, Any]]
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Load holdings and positions into columnar arrays.
+
+    Returns ``(symbols, numeric)`` where ``numeric`` columns are signed qty, ltp
+    and average cost. Position quantities carry the side's sign.
+    """
+    import numpy as np
+
+    rows = [
+        (
+            h.get("quantity", h.get("qty")) or 0,
+            h.get("ltp") or 0,
+            h.get("costPrice") or 0,
+        )
+        for h in holdings
+    ]
+    rows += [
+        (
+            abs(p.get("qty") or 0) * (1 if (p.get("side") or 0) > 0 else -1),
+            p.get("ltp") or 0,
+            p.get("avgPrice") or 0,
+        )
+        for p in positions
+    ]
+    symbols = np.array(
+        [h.get("symbol", "N/A") for h in holdings]
+        + [p.get("symbol", "N/A") for p in positions],
+        dtype=object,
+    )
+    numeric = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return symbols, numeric
+
+
+def _factorize(labels: Iterable[str], count: int) -> Tuple[List[str], "np.ndarray"]:
+    """Map labels to dense integer codes; returns ``(names, codes)``."""
+    import numpy as np
+
+    index: Dict[str, int] = {}
+    codes = np.fromiter(
+        (index.setdefault(label, len(index)) for label in labels),
+        dtype=np.intp,
+        count=count,
+    )
+    return list(index), codes
+
+
+def _group_exposure(
+    names: List[str], codes: "np.ndarray", values: "np.ndarray", gross: float
+) -> Dict[str, Dict[str, float]]:
+    import numpy as np
+
+    sums = np.bincount(codes, weights=values, minlength=len(names))
+    return {
+        names[i]: {
+            "value": float(sums[i]),
+            "weight": float(abs(sums[i]) / gross) if gross else 0.0,
+        }
+        for i in np.argsort(-np.abs(sums))
+    }
+
+
+def compute_portfolio_analytics(
+    symbols: "np.ndarray",
+    numeric: "np.ndarray",
+    sector_map: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Totals, exposure, concentration and drawdown-from-cost in one vectorized pass."""
+    import numpy as np
+
+    qty, ltp, avg = numeric[:, 0], numeric[:, 1], numeric[:, 2]
+    value = qty * ltp
+    cost = qty * avg
+    pnl = value - cost
+    abs_value = np.abs(value)
+    gross = float(abs_value.sum())
+    invested = float(np.abs(cost).sum())
+    weights = abs_value / gross if gross else np.zeros_like(abs_value)
+
+    # Move against cost from the holder's side: negative means under water
+    direction = np.sign(qty)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        move = np.where(avg > 0, (ltp - avg) / avg * direction, 0.0)
+    drawdown = np.minimum(move, 0.0)
+    below = drawdown < 0
+
+    count = len(symbols)
+    exchanges = _factorize(
+        (s.partition(":")[0] if ":" in s else "N/A" for s in symbols), count
+    )
+    sector_map = sector_map or {}
+    sectors = _factorize((sector_map.get(s, "Unclassified") for s in symbols), count)
+
+    top = np.argpartition(-weights, 4)[:5] if count > 5 else np.arange(count)
+    top = top[np.argsort(-weights[top])]
+    worst = int(np.argmin(drawdown)) if len(drawdown) else -1
+
+    return {
+        "count": count,
+        "gross_exposure": gross,
+        "net_exposure": float(value.sum()),
+        "invested": invested,
+        "unrealized_pnl": float(pnl.sum()),
+        "unrealized_pnl_pct": float(pnl.sum() / invested * 100) if invested else 0.0,
+        "by_exchange": _group_exposure(*exchanges, value, gross),
+        "by_sector": _group_exposure(*sectors, value, gross),
+        "top_positions": [
+            {
+                "symbol": symbols[i],
+                "value": float(value[i]),
+                "weight": float(weights[i]),
+                "pnl": float(pnl[i]),
+            }
+            for i in top
+        ],
+        "hhi": float(np.square(weights).sum()),
+        "below_cost": int(below.sum()),
+        "worst_drawdown": (
+            {"symbol": symbols[worst], "pct": float(drawdown[worst] * 100)}
+            if worst >= 0 and below.any()
+            else None
+        ),
+        "weighted_drawdown_pct": float((drawdown * weights).sum() * 100),
+    }
+
+
+def render_portfolio_analytics(a: Dict[str, Any]) -> str:
+    parts = [f"""📊 Portfolio Analytics ({a['count']} positions):
+
+💰 Totals:
+Gross Exposure: ₹{a['gross_exposure']:,.2f} | Net Exposure: ₹{a['net_exposure']:,.2f}
+Invested: ₹{a['invested']:,.2f}
+Unrealized P&L: ₹{a['unrealized_pnl']:,.2f} ({a['unrealized_pnl_pct']:+.2f}%)
+
+🏦 Exposure by Exchange:
+"""]
+    parts.extend(
+        f"{name}: ₹{g['value']:,.2f} ({g['weight'] * 100:.1f}%)\n"
+        for name, g in a["by_exchange"].items()
+    )
+    parts.append("\n🏭 Exposure by Sector:\n")
+    parts.extend(
+        f"{name}: ₹{g['value']:,.2f} ({g['weight'] * 100:.1f}%)\n"
+        for name, g in a["by_sector"].items()
+    )
+    parts.append(f"\n🎯 Concentration (HHI: {a['hhi']:.3f}):\n")
+    parts.extend(
+        f"{p['symbol']}: {p['weight'] * 100:.1f}% | P&L: ₹{p['pnl']:,.2f}\n"
+        for p in a["top_positions"]
+    )
+    parts.append(
+        f"\n📉 Drawdown from Cost:\nBelow cost: {a['below_cost']}/{a['count']} | Weighted: {a['weighted_drawdown_pct']:+.2f}%"
+    )
+    if a["worst_drawdown"]:
+        parts.append(
+            f"\nWorst: {a['worst_drawdown']['symbol']} ({a['worst_drawdown']['pct']:+.2f}%)"
+        )
+    return "".join(parts)
+
+
+@mcp.tool()
+async def get_portfolio_analytics(output_format: str = "text") -> str:
+    """Get exposure, concentration, P&L and drawdown analytics across holdings and positions.
+
+    Args:
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        holdings_response, positions_response = await asyncio.gather(
+            client.holdings(), client.positions()
+        )
+
+        for name, response in (
+            ("holdings", holdings_response),
+            ("positions", positions_response),
+        ):
+            if response.get("code") != 200:
+                return error_result(
+                    output_format, f"❌ Failed to get {name}: {response}"
+                )
+
+        symbols, numeric = portfolio_arrays(
+            holdings_response.get("holdings", []),
+            positions_response.get("netPositions", []),
+        )
+        if not len(symbols):
+            return (
+                to_json(None)
+                if output_format == "json"
+                else "📊 No holdings or positions found"
+            )
+
+        analytics = compute_portfolio_analytics(symbols, numeric, load_sector_map())
+        if output_format == "json":
+            return to_json(analytics)
+        return render_portfolio_analytics(analytics)
+
+    except Exception as e:
+        return error_result(
+            output_format, f"❌ Error computing portfolio analytics: {str(e)}"
+        )
+
+
+def parse_order_statuses(status: str) -> List[int]:
+    """Status filter names or codes ("pending,filled", "6", "open") -> Fyers status codes."""
+    codes: List[int] = []
+    for name in (part.strip().upper() for part in status.split(",") if part.strip()):
+        if name == "OPEN":
+            codes.extend(OPEN_ORDER_STATUSES)
+        elif name in ORDER_STATUSES:
+            codes.append(ORDER_STATUSES[name])
+        elif name.isdigit():
+            codes.append(int(name))
+        else:
+            raise ValueError(
+                f"unknown status {name!r} (use open, {', '.join(s.lower() for s in ORDER_STATUSES)})"
+            )
+    return codes
+
+
+def parse_ist_time(value: str, end: bool = False) -> float:
+    """ "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]" (IST) -> epoch seconds; a bare ``end`` date covers the whole day."""
+    value = value.strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            parsed = datetime.strptime(value, fmt).replace(tzinfo=IST).timestamp()
+        except ValueError:
+            continue
+        return parsed + 86399 if end and fmt == "%Y-%m-%d" else parsed
+    raise ValueError(f"invalid time {value!r} (use YYYY-MM-DD or YYYY-MM-DD HH:MM)")
+
+
+@mcp.tool()
+async def get_orders(
+    status: str = "",
+    symbol: str = "",
+    side: str = "",
+    start_time: str = "",
+    end_time: str = "",
+    cursor: str = "",
+    limit: int = 10,
+    refresh: bool = False,
+    output_format: str = "text",
+) -> str:
+    """Get orders from today's order book, newest first, with optional filters and paging.
+
+    Args:
+        status: Comma-separated statuses to include: open, pending, transit, filled, cancelled, rejected, expired
+        symbol: Only orders for this symbol (e.g., "NSE:SBIN-EQ")
+        side: "BUY" or "SELL"
+        start_time: Earliest order time, "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" (IST)
+        end_time: Latest order time, same format (a bare date includes the whole day)
+        cursor: next_cursor from the previous page to continue from
+        limit: Orders per page (default 10)
+        refresh: Download the full order book instead of updating the local copy
+        output_format: "text" (default) or "json" for compact structured records
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        try:
+            statuses = parse_order_statuses(status) if status.strip() else None
+            start = parse_ist_time(start_time) if start_time.strip() else None
+            end = parse_ist_time(end_time, end=True) if end_time.strip() else None
+        except ValueError as e:
+            return error_result(output_format, f"❌ {e}")
+        try:
+            if cursor:
+                float(cursor.partition(":")[0])
+        except ValueError:
+            return error_result(
+                output_format,
+                "❌ Invalid cursor: pass next_cursor from the previous page",
+            )
+        side_code = None
+        if side.strip():
+            side_code = ORDER_SIDES.get(side.strip().upper())
+            if side_code is None:
+                return error_result(
+                    output_format, f"❌ Unknown side {side!r} (use BUY or SELL)"
+                )
+
+        response = await client.sync_orders(refresh)
+        if response.get("code") != 200:
+            return error_result(output_format, f"❌ Failed to get orders: {response}")
+
+        orders, matched, next_cursor = client.order_book.query(
+            statuses,
+            symbol.strip().upper() or None,
+            side_code,
+            start,
+            end,
+            cursor or None,
+            limit,
+        )
+        records = order_records(orders)
+
+        if output_format == "json":
+            return to_json(
+                {"orders": records, "matched": matched, "next_cursor": next_cursor}
+            )
+        if not records:
+            return "📊 No orders found"
+        footer = f"Showing {len(records)} of {matched} matching orders"
+        if next_cursor:
+            footer += f' | next page: cursor="{next_cursor}"'
+        return render_orders(records) + footer + "\n"
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting orders: {str(e)}")
+
+
+@mcp.tool()
+async def get_quotes(symbols: str, output_format: str = "text") -> str:
+    """Get live quotes for symbols.
+
+    Args:
+        symbols: Comma-separated symbols (e.g., "NSE:SBIN-EQ,NSE:RELIANCE-EQ")
+        output_format: "text" (default) or "json" for ``{"quotes": [...], "unknown": [...]}``,
+            where "unknown" lists symbols the symbol master rejected (not fetched)
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        symbol_list = normalize_symbols(symbols)
+        if not symbol_list:
+            return error_result(output_format, "❌ No symbols provided")
+
+        # Drop symbols the symbol master does not know instead of sending them upstream
+        unknown = []
+        master = get_validation_master()
+        if master is not None:
+            unknown = [s for s in symbol_list if master.validate_symbol(s)]
+            symbol_list = [s for s in symbol_list if s not in unknown]
+
+        # Answer streamed symbols from the tick table, fetch the rest over REST
+        quotes = {}
+        if market_stream is not None:
+            for symbol in symbol_list:
+                tick = market_stream.get_tick(symbol)
+                if tick is not None:
+                    quotes[symbol] = tick
+        rest_symbols = [s for s in symbol_list if s not in quotes]
+
+        try:
+            fetched = await client.batch_quotes(rest_symbols)
+        except FyersAPIError as e:
+            return error_result(output_format, f"❌ Failed to get quotes: {e.response}")
+        quotes.update(
+            {symbol: item for symbol, item in fetched.items() if item is not None}
+        )
+
+        records = [
+            quote_record(symbol, quotes[symbol])
+            for symbol in symbol_list
+            if isinstance(quotes.get(symbol), dict)
+        ]
+        if output_format == "json":
+            return to_json({"quotes": records, "unknown": unknown})
+        if unknown:
+            return (
+                render_quotes(records)
+                + f"\n⚠️ Unknown symbols skipped: {', '.join(unknown)}"
+            )
+        return render_quotes(records)
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting quotes: {str(e)}")
+
+
+# Historical candles. Fyers caps each history request at 366 days for daily
+# candles, 100 days for minute candles and 30 days for second candles.
+HISTORY_DAILY_RESOLUTIONS = ("D", "1D")
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def history_window_seconds(resolution: str) -> int:
+    resolution = resolution.upper()
+    if resolution in HISTORY_DAILY_RESOLUTIONS:
+        return 366 * 86400
+    if resolution.endswith("S"):
+        return 30 * 86400
+    return 100 * 86400
+
+
+def split_range(start: int, end: int, window: int) -> List[Tuple[int, int]]:
+    """Split ``[start, end]`` into consecutive windows of at most ``window`` seconds."""
+    return [(lo, min(lo + window - 1, end)) for lo in range(start, end + 1, window)]
+
+
+def merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[List[int]] = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return [(lo, hi) for lo, hi in merged]
+
+
+def missing_intervals(
+    covered: List[Tuple[int, int]], start: int, end: int
+) -> List[Tuple[int, int]]:
+    """Parts of ``[start, end]`` not inside any covered interval."""
+    gaps = []
+    cursor = start
+    for lo, hi in covered:
+        if hi < cursor or lo > end:
+            continue
+        if lo > cursor:
+            gaps.append((cursor, lo - 1))
+        cursor = max(cursor, hi + 1)
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class CandleStore:
+    """On-disk candle store: one .npy array per symbol/resolution, read memory-mapped.
+
+    Each array holds rows of (timestamp, open, high, low, close, volume) sorted
+    by timestamp; a JSON sidecar records which time ranges were already fetched
+    so holidays and gaps are not requested again.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _paths(self, symbol: str, resolution: str) -> Tuple[str, str]:
+        key = re.sub(r"[^A-Za-z0-9_-]", "_", f"{symbol}_{resolution}".upper())
+        return os.path.join(self.root, f"{key}.npy"), os.path.join(
+            self.root, f"{key}.json"
+        )
+
+    def lock(self, symbol: str, resolution: str) -> asyncio.Lock:
+        return self._locks.setdefault(f"{symbol}|{resolution}", asyncio.Lock())
+
+    def load(
+        self, symbol: str, resolution: str
+    ) -> Tuple["np.ndarray", List[Tuple[int, int]]]:
+        import numpy as np
+
+        data_path, meta_path = self._paths(symbol, resolution)
+        if not os.path.exists(data_path) or not os.path.exists(meta_path):
+            return np.empty((0, 6)), []
+        with open(meta_path, "r") as f:
+            covered = [tuple(interval) for interval in json.load(f)["covered"]]
+        return np.load(data_path, mmap_mode="r"), covered
+
+    def save(
+        self,
+        symbol: str,
+        resolution: str,
+        candles: "np.ndarray",
+        covered: List[Tuple[int, int]],
+    ) -> None:
+        import numpy as np
+
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(symbol, resolution)
+        # Write to temp files and swap in so readers never see a partial file
+        with open(data_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(candles, dtype=np.float64))
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(
+                {"symbol": symbol, "resolution": resolution, "covered": covered}, f
+            )
+        os.replace(data_path + ".tmp", data_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+
+candle_store = None
+
+
+def get_candle_store() -> CandleStore:
+    global candle_store
+    if candle_store is None:
+        candle_store = CandleStore(os.path.join(FYERS_DATA_DIR, "history"))
+    return candle_store
+
+
+async def fetch_history(
+    client: "AsyncFyersClient",
+    store: CandleStore,
+    symbol: str,
+    resolution: str,
+    start: int,
+    end: int,
+) -> Tuple["np.ndarray", int]:
+    """Return candles for ``[start, end]``, fetching only ranges missing from the store.
+
+    Returns ``(candles, fetched_windows)``.
+    """
+    import numpy as np
+
+    async with store.lock(symbol, resolution):
+        stored, covered = store.load(symbol, resolution)
+        windows = [
+            window
+            for gap in missing_intervals(covered, start, end)
+            for window in split_range(
+                gap[0], gap[1], history_window_seconds(resolution)
+            )
+        ]
+
+        if windows:
+            responses = await asyncio.gather(
+                *(
+                    client.history(
+                        {
+                            "symbol": symbol,
+                            "resolution": resolution,
+                            "range_from": lo,
+                            "range_to": hi,
+                        }
+                    )
+                    for lo, hi in windows
+                )
+            )
+            for response in responses:
+                # "no_data" is an empty window (weekend, holiday, before listing), covered like any other
+                if response.get("s") not in ("ok", "no_data"):
+                    raise FyersAPIError(response)
+
+            fetched = [
+                np.asarray(r.get("candles") or [], dtype=np.float64).reshape(-1, 6)
+                for r in responses
+            ]
+            # Newly fetched rows win over stored ones with the same timestamp
+            combined = np.concatenate(fetched + [np.asarray(stored)])
+            _, first = np.unique(combined[:, 0], return_index=True)
+            stored = combined[first]
+
+            # Never mark the still-forming future as covered
+            now = int(time.time())
+            covered = merge_intervals(
+                covered + [(lo, min(hi, now)) for lo, hi in windows if lo <= now]
+            )
+            store.save(symbol, resolution, stored, covered)
+
+        timestamps = stored[:, 0]
+        lo, hi = np.searchsorted(timestamps, start, "left"), np.searchsorted(
+            timestamps, end, "right"
+        )
+        return np.array(stored[lo:hi]), len(windows)
+
+
+def render_candles(
+    symbol: str, resolution: str, candles: "np.ndarray", shown: "np.ndarray"
+) -> str:
+    first, last = candles[0], candles[-1]
+    change = last[4] - first[1]
+    change_pct = (change / first[1] * 100) if first[1] else 0
+    parts = [f"""📊 {symbol} ({resolution}) - {len(candles)} candles
+Range: {datetime.fromtimestamp(first[0], IST):%Y-%m-%d %H:%M} → {datetime.fromtimestamp(last[0], IST):%Y-%m-%d %H:%M}
+Open: ₹{first[1]:.2f} | High: ₹{candles[:, 2].max():.2f} | Low: ₹{candles[:, 3].min():.2f} | Close: ₹{last[4]:.2f}
+Change: ₹{change:+.2f} ({change_pct:+.2f}%) | Volume: {candles[:, 5].sum():,.0f}
+
+🕯️ Last {len(shown)} candles:
+"""]
+    parts.extend(
+        f"{datetime.fromtimestamp(c[0], IST):%Y-%m-%d %H:%M} | O {c[1]:.2f} H {c[2]:.2f} L {c[3]:.2f} C {c[4]:.2f} | V {c[5]:,.0f}\n"
+        for c in shown
+    )
+    return "".join(parts)
+
+
+@mcp.tool()
+async def get_history(
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    resolution: str = "D",
+    limit: int = 20,
+    output_format: str = "text",
+) -> str:
+    """Get historical OHLCV candles, served from the local store where already downloaded.
+
+    Args:
+        symbol: Trading symbol (e.g., "NSE:SBIN-EQ")
+        start_date: First date, "YYYY-MM-DD" (IST)
+        end_date: Last date, "YYYY-MM-DD" (IST)
+        resolution: Candle size: "D" for daily, minutes ("1", "5", "15", "60", ...) or seconds ("5S", ...)
+        limit: Number of most recent candles to include in the output
+        output_format: "text" (default) or "json" for compact [timestamp, open, high, low, close, volume] rows
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        symbol = symbol.strip().upper()
+        resolution = resolution.strip().upper()
+        try:
+            start = int(
+                datetime.strptime(start_date, "%Y-%m-%d")
+                .replace(tzinfo=IST)
+                .timestamp()
+            )
+            end = (
+                int(
+                    datetime.strptime(end_date, "%Y-%m-%d")
+                    .replace(tzinfo=IST)
+                    .timestamp()
+                )
+                + 86399
+            )
+        except ValueError:
+            return error_result(output_format, "❌ Dates must be in YYYY-MM-DD format")
+        if end < start:
+            return error_result(output_format, "❌ end_date is before start_date")
+
+        try:
+            candles, fetched = await fetch_history(
+                client, get_candle_store(), symbol, resolution, start, end
+            )
+        except FyersAPIError as e:
+            return error_result(
+                output_format, f"❌ Failed to get history: {e.response}"
+            )
+
+        shown = candles[-limit:] if limit > 0 else candles[:0]
+        if output_format == "json":
+            return to_json(
+                {
+                    "symbol": symbol,
+                    "resolution": resolution,
+                    "count": len(candles),
+                    "fetched_windows": fetched,
+                    "candles": shown.tolist(),
+                }
+            )
+        if not len(candles):
+            return f"📊 No candles for {symbol} between {start_date} and {end_date}"
+        return render_candles(symbol, resolution, candles, shown)
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting history: {str(e)}")
+
+
+# Option chains: Fyers returns up to 50 strikes either side of the money in one
+# request. Implied volatility and Greeks use Black-76 on the forward implied by
+# put-call parity and are solved for the whole chain at once; NSE and BSE
+# options are European, so no early exercise premium applies.
+OPTION_CHAIN_MAX_STRIKES = 50
+OPTION_RISK_FREE_RATE = float(os.getenv("FYERS_RISK_FREE_RATE", "0.065"))
+OPTION_IV_BOUNDS = (1e-4, 5.0)
+# Below this much time value (in rupees) the price says nothing about volatility
+OPTION_MIN_TIME_VALUE = 0.01
+OPTION_IV_TOLERANCE = 1e-6
+OPTION_IV_ITERATIONS = 64
+YEAR_SECONDS = 365 * 86400
+
+
+# Chebyshev coefficients for erfc(z) = t * exp(-z * z + sum(c[i] * t ** i))
+ERFC_COEFFICIENTS = (
+    -1.26551223,
+    1.00002368,
+    0.37409196,
+    0.09678418,
+    -0.18628806,
+    0.27886807,
+    -1.13520398,
+    1.48851587,
+    -0.82215223,
+    0.17087277,
+)
+
+# Option maths takes floats or NumPy arrays that broadcast together
+Floats = Union[float, "np.ndarray"]
+
+
+def norm_cdf(x: Floats) -> "np.ndarray":
+    """Standard normal CDF of an array (Chebyshev fit to erfc, relative error below 1.2e-7)."""
+    import numpy as np
+
+    z = np.abs(x) * 0.7071067811865476
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = ERFC_COEFFICIENTS[-1]
+    for c in reversed(ERFC_COEFFICIENTS[:-1]):
+        poly = c + t * poly
+    tail = 0.5 * t * np.exp(poly - z * z)
+    return np.where(x >= 0, 1.0 - tail, tail)
+
+
+def norm_pdf(x: Floats) -> "np.ndarray":
+    import numpy as np
+
+    return np.exp(-0.5 * x * x) * 0.3989422804014327
+
+
+def black76(
+    forward: Floats,
+    strike: Floats,
+    years: Floats,
+    rate: float,
+    sigma: Floats,
+    sign: Floats,
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Discounted Black-76 prices and d1; ``sign`` is +1 for calls and -1 for puts, arguments broadcast."""
+    import numpy as np
+
+    root = sigma * np.sqrt(years)
+    d1 = (np.log(forward / strike) + 0.5 * root * root) / root
+    price = (
+        np.exp(-rate * years)
+        * sign
+        * (forward * norm_cdf(sign * d1) - strike * norm_cdf(sign * (d1 - root)))
+    )
+    return price, d1
+
+
+def implied_volatility(
+    price: Floats,
+    forward: Floats,
+    strike: Floats,
+    years: Floats,
+    rate: float,
+    sign: Floats,
+) -> "np.ndarray":
+    """Black-76 implied volatility for every contract at once.
+
+    Contracts need at least ``OPTION_MIN_TIME_VALUE`` over intrinsic value.
+    Safeguarded Newton: a step is kept only inside the bracket the misses so
+    far have narrowed, otherwise the bracket is bisected, until volatility
+    moves by less than ``OPTION_IV_TOLERANCE``. Contracts priced outside the
+    no-arbitrage bounds, or not converged, come back as NaN.
+    """
+    import numpy as np
+
+    arrays = np.broadcast_arrays(
+        *(
+            np.asarray(a, dtype=np.float64)
+            for a in (price, forward, strike, years, sign)
+        )
+    )
+    shape = arrays[0].shape
+    price, forward, strike, years, sign = (a.ravel() for a in arrays)
+    discount = np.exp(-rate * years)
+    intrinsic = discount * np.maximum(sign * (forward - strike), 0.0)
+    ceiling = discount * np.where(sign > 0, forward, strike)
+    with np.errstate(invalid="ignore"):
+        valid = (
+            (years > 0)
+            & (forward > 0)
+            & (strike > 0)
+            & (price >= intrinsic + OPTION_MIN_TIME_VALUE)
+            & (price < ceiling)
+        )
+    result = np.full(price.shape, np.nan)
+    rows = np.flatnonzero(valid)
+    if not len(rows):
+        return result.reshape(shape)
+
+    p, f, k, t, w, d = (
+        a[rows] for a in (price, forward, strike, years, sign, discount)
+    )
+    lo = np.full(len(rows), OPTION_IV_BOUNDS[0])
+    hi = np.full(len(rows), OPTION_IV_BOUNDS[1])
+    # Brenner-Subrahmanyam start: exact to first order at the money
+    sigma = np.clip(np.sqrt(2 * np.pi / t) * p / (d * f), 0.01, 2.0)
+    active = np.arange(len(rows))
+    for _ in range(OPTION_IV_ITERATIONS):
+        s = sigma[active]
+        model, d1 = black76(f[active], k[active], t[active], rate, s, w[active])
+        miss = model - p[active]
+        # Price rises with volatility, so the sign of the miss narrows the bracket
+        hi[active] = np.where(miss > 0, s, hi[active])
+        lo[active] = np.where(miss < 0, s, lo[active])
+        vega = d[active] * f[active] * norm_pdf(d1) * np.sqrt(t[active])
+        with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+            step = s - miss / vega
+        moved = np.where(
+            (step > lo[active]) & (step < hi[active]),
+            step,
+            0.5 * (lo[active] + hi[active]),
+        )
+        sigma[active] = moved
+        active = active[np.abs(moved - s) > OPTION_IV_TOLERANCE]
+        if not len(active):
+            break
+    sigma[active] = np.nan
+    result[rows] = sigma
+    return result.reshape(shape)
+
+
+def option_greeks(
+    spot: Floats,
+    forward: Floats,
+    strike: Floats,
+    years: Floats,
+    rate: float,
+    sigma: Floats,
+    sign: Floats,
+) -> Dict[str, Any]:
+    """Delta, gamma, theta (per calendar day) and vega (per volatility point) against the spot.
+
+    The forward keeps a constant carry over the spot, so spot Greeks are the
+    forward ones scaled by ``forward / spot``.
+    """
+    import numpy as np
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root_t = np.sqrt(years)
+        root = sigma * root_t
+        d1 = (np.log(forward / strike) + 0.5 * root * root) / root
+        d2 = d1 - root
+        discount = np.exp(-rate * years)
+        carry = forward / spot
+        pdf = norm_pdf(d1)
+        weighted = discount * forward
+        cost_of_carry = np.log(carry) / years
+        return {
+            "delta": discount * carry * sign * norm_cdf(sign * d1),
+            "gamma": discount * carry * carry * pdf / (forward * root),
+            "theta": (
+                -weighted * pdf * sigma / (2 * root_t)
+                - sign * (cost_of_carry - rate) * weighted * norm_cdf(sign * d1)
+                - sign * rate * strike * discount * norm_cdf(sign * d2)
+            )
+            / 365,
+            "vega": weighted * pdf * root_t / 100,
+        }
+
+
+def implied_forward(
+    strikes: "np.ndarray",
+    calls: "np.ndarray",
+    puts: "np.ndarray",
+    discount: float,
+    fallback: float,
+) -> float:
+    """Forward from put-call parity at the strike where the call and put prices are closest."""
+    import numpy as np
+
+    both = (calls > 0) & (puts > 0)
+    if not both.any():
+        return fallback
+    gap = np.where(both, calls - puts, np.inf)
+    i = int(np.argmin(np.abs(gap)))
+    return float(strikes[i] + gap[i] / discount)
+
+
+def _rounded(values: "np.ndarray", digits: int) -> List[Optional[float]]:
+    """Round an array for output, with NaN (no price or no solution) as None."""
+    import numpy as np
+
+    return [None if v != v else v for v in np.round(values, digits).tolist()]
+
+
+def analyze_option_chain(
+    symbol: str,
+    data: Dict[str, Any],
+    expiry_at: float,
+    now: float,
+    min_strike: float = 0,
+    max_strike: float = 0,
+) -> Dict[str, Any]:
+    """Pair calls and puts by strike and add implied volatility and Greeks in one vectorized pass."""
+    import numpy as np
+
+    rows = data.get("optionsChain") or []
+    underlying: Dict[str, Any] = next(
+        (r for r in rows if r.get("option_type") not in ("CE", "PE")), {}
+    )
+    contracts = [r for r in rows if r.get("option_type") in ("CE", "PE")]
+    count = len(contracts)
+
+    def column(field: str) -> "np.ndarray":
+        return np.fromiter(
+            (r.get(field) or 0 for r in contracts), dtype=np.float64, count=count
+        )
+
+    strike, ltp, bid, ask, oi, volume = (
+        column(field) for field in ("strike_price", "ltp", "bid", "ask", "oi", "volume")
+    )
+    sign = np.fromiter(
+        (1.0 if r["option_type"] == "CE" else -1.0 for r in contracts),
+        dtype=np.float64,
+        count=count,
+    )
+    keep = np.ones(count, dtype=bool)
+    if min_strike:
+        keep &= strike >= min_strike
+    if max_strike:
+        keep &= strike <= max_strike
+    index = np.flatnonzero(keep)
+    strike, ltp, bid, ask, oi, volume, sign = (
+        a[index] for a in (strike, ltp, bid, ask, oi, volume, sign)
+    )
+
+    # Quote mid where both sides are quoted, last trade otherwise
+    price = np.where((bid > 0) & (ask >= bid), 0.5 * (bid + ask), ltp)
+    years = max(expiry_at - now, 0.0) / YEAR_SECONDS if expiry_at else 0.0
+    rate = OPTION_RISK_FREE_RATE
+    discount = float(np.exp(-rate * years))
+    spot = float(underlying.get("ltp") or 0)
+
+    strikes, slot = np.unique(strike, return_inverse=True)
+    side = (sign < 0).astype(np.intp)
+    grid = np.zeros((len(strikes), 2))
+    grid[slot, side] = price
+    forward = implied_forward(
+        strikes, grid[:, 0], grid[:, 1], discount, spot / discount
+    )
+    iv = implied_volatility(price, forward, strike, years, rate, sign)
+    greeks = option_greeks(spot or forward, forward, strike, years, rate, iv, sign)
+
+    legs: List[List[Optional[OptionLegRecord]]] = [[None, None] for _ in strikes]
+    columns = zip(
+        (contracts[i]["symbol"] for i in index),
+        ltp.tolist(),
+        bid.tolist(),
+        ask.tolist(),
+        oi.tolist(),
+        volume.tolist(),
+        _rounded(iv, 4),
+        _rounded(greeks["delta"], 4),
+        _rounded(greeks["gamma"], 6),
+        _rounded(greeks["theta"], 2),
+        _rounded(greeks["vega"], 2),
+    )
+    for n, (
+        ticker,
+        last,
+        best_bid,
+        best_ask,
+        open_interest,
+        traded,
+        vol,
+        delta,
+        gamma,
+        theta,
+        vega,
+    ) in enumerate(columns):
+        legs[slot[n]][side[n]] = {
+            "symbol": ticker,
+            "ltp": last,
+            "bid": best_bid,
+            "ask": best_ask,
+            "oi": open_interest,
+            "volume": traded,
+            "iv": vol,
+            "delta": delta,
+            "gamma": gamma,
+            "theta": theta,
+            "vega": vega,
+        }
+
+    call_oi, put_oi = float(oi[sign > 0].sum()), float(oi[sign < 0].sum())
+    atm = int(np.argmin(np.abs(strikes - forward))) if len(strikes) else None
+    atm_ivs = (
+        [leg["iv"] for leg in legs[atm] if leg and leg["iv"] is not None]
+        if atm is not None
+        else []
+    )
+    return {
+        "underlying": symbol,
+        "spot": spot,
+        "forward": round(forward, 2),
+        "expiry": (
+            datetime.fromtimestamp(expiry_at, IST).strftime("%Y-%m-%d")
+            if expiry_at
+            else None
+        ),
+        "days_to_expiry": round(years * 365, 3),
+        "rate": rate,
+        "atm_strike": float(strikes[atm]) if atm is not None else None,
+        "atm_iv": round(sum(atm_ivs) / len(atm_ivs), 4) if atm_ivs else None,
+        "call_oi": call_oi,
+        "put_oi": put_oi,
+        "pcr": round(put_oi / call_oi, 3) if call_oi else None,
+        "strikes": [
+            {"strike": k, "call": call, "put": put}
+            for k, (call, put) in zip(strikes.tolist(), legs)
+        ],
+    }
+
+
+def _leg_text(label: str, leg: Optional[OptionLegRecord]) -> str:
+    if leg is None:
+        return f"{label} -"
+    iv = f"{leg['iv'] * 100:.1f}%" if leg["iv"] is not None else "n/a"
+    delta = f"{leg['delta']:+.2f}" if leg["delta"] is not None else "n/a"
+    return f"{label} ₹{leg['ltp']:,.2f} IV {iv} Δ {delta} OI {leg['oi']:,.0f}"
+
+
+def render_option_chain(chain: Dict[str, Any]) -> str:
+    expiry = (
+        f"expiry {chain['expiry']} ({chain['days_to_expiry']:.1f} days)"
+        if chain["expiry"]
+        else "expiry unknown"
+    )
+    atm_iv = f"{chain['atm_iv'] * 100:.2f}%" if chain["atm_iv"] is not None else "n/a"
+    pcr = f"{chain['pcr']:.2f}" if chain["pcr"] is not None else "n/a"
+    parts = [f"""📊 {chain['underlying']} Option Chain - {expiry}
+Spot: ₹{chain['spot']:,.2f} | Forward: ₹{chain['forward']:,.2f} | ATM: {chain['atm_strike']:g} (IV {atm_iv})
+OI: calls {chain['call_oi']:,.0f} | puts {chain['put_oi']:,.0f} | PCR {pcr}
+
+"""]
+    for row in chain["strikes"]:
+        marker = " ◀ ATM" if row["strike"] == chain["atm_strike"] else ""
+        parts.append(
+            f"{row['strike']:g} | {_leg_text('CE', row['call'])} | {_leg_text('PE', row['put'])}{marker}\n"
+        )
+    parts.append(
+        f"\nGreeks: Black-76 at r = {chain['rate'] * 100:.2f}%, theta per day, vega per vol point"
+    )
+    return "".join(parts)
+
+
+@mcp.tool()
+async def get_option_chain(
+    symbol: str,
+    expiry: str = "",
+    strike_count: int = 10,
+    min_strike: float = 0,
+    max_strike: float = 0,
+    output_format: str = "text",
+) -> str:
+    """Get an option chain with implied volatility and Greeks for every strike.
+
+    Args:
+        symbol: Underlying symbol (e.g., "NSE:NIFTY50-INDEX", "NSE:SBIN-EQ")
+        expiry: Expiry date "YYYY-MM-DD"; blank for the nearest expiry
+        strike_count: Strikes to fetch either side of the money (1-50)
+        min_strike: Only include strikes at or above this (0 = no lower limit)
+        max_strike: Only include strikes at or below this (0 = no upper limit)
+        output_format: "text" (default) or "json" for compact per-strike records
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        symbol = symbol.strip().upper()
+        if not 1 <= strike_count <= OPTION_CHAIN_MAX_STRIKES:
+            return error_result(
+                output_format,
+                f"❌ strike_count must be between 1 and {OPTION_CHAIN_MAX_STRIKES}",
+            )
+        if max_strike and min_strike > max_strike:
+            return error_result(output_format, "❌ min_strike is above max_strike")
+
+        timestamp = ""
+        if expiry:
+            expiry = expiry.strip()
+            # Every chain lists the expiries, so only the first lookup for an underlying costs an extra request
+            if symbol not in client.option_expiries:
+                response = await client.option_chain(symbol, strike_count)
+                if response.get("code") != 200:
+                    return error_result(
+                        output_format, f"❌ Failed to get option chain: {response}"
+                    )
+            expiries = client.option_expiries.get(symbol, {})
+            timestamp = expiries.get(expiry, "")
+            if not timestamp:
+                return error_result(
+                    output_format,
+                    f"❌ No {expiry} expiry for {symbol}. Listed expiries: {', '.join(expiries) or 'none'}",
+                )
+
+        response = await client.option_chain(symbol, strike_count, timestamp)
+        if response.get("code") != 200:
+            return error_result(
+                output_format, f"❌ Failed to get option chain: {response}"
+            )
+        data = response.get("data") or {}
+        if not timestamp:
+            listed = [int(item["expiry"]) for item in data.get("expiryData") or []]
+            timestamp = str(min(listed)) if listed else ""
+
+        chain = analyze_option_chain(
+            symbol, data, float(timestamp or 0), time.time(), min_strike, max_strike
+        )
+        if output_format == "json":
+            return to_json(chain)
+        if not chain["strikes"]:
+            return f"📊 No option contracts for {symbol} in the requested strike range"
+        return render_option_chain(chain)
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error getting option chain: {str(e)}")
+
+
+# Symbol master: Fyers publishes one CSV per exchange segment every day
+SYMBOL_MASTER_URL = os.getenv(
+    "FYERS_SYMBOL_MASTER_URL", "https://public.fyers.in/sym_details"
+)
+SYMBOL_MASTER_SEGMENTS = [
+    s.strip()
+    for s in os.getenv(
+        "FYERS_SYMBOL_MASTER_SEGMENTS", "NSE_CM,NSE_FO,NSE_CD,BSE_CM,BSE_FO,MCX_COM"
+    ).split(",")
+    if s.strip()
+]
+SYMBOL_VALIDATION = os.getenv("FYERS_SYMBOL_VALIDATION", "1") != "0"
+SYMBOL_MASTER_RETRY = 300
+
+# Column positions in the symbol master CSVs
+(
+    SYM_COL_NAME,
+    SYM_COL_LOT,
+    SYM_COL_TICK,
+    SYM_COL_EXPIRY,
+    SYM_COL_TICKER,
+    SYM_COL_UNDERLYING,
+) = (1, 3, 4, 8, 9, 13)
+
+
+class Instrument(NamedTuple):
+    ticker: str
+    name: str
+    lot_size: int
+    tick_size: float
+    expiry: int
+
+
+class SymbolMaster:
+    """In-memory instrument index built from the symbol master CSVs.
+
+    Instruments are stored column-wise (ticker list plus array columns for lot
+    and tick size) with a dict from ticker to row. Search uses a sorted list of
+    keys (bare ticker, underlying and description) probed with bisect, which
+    answers prefix queries like a trie at a fraction of the memory.
+    """
+
+    def __init__(self) -> None:
+        self.tickers: List[str] = []
+        self.names: List[str] = []
+        self.lot_sizes = array("l")
+        self.tick_sizes = array("d")
+        self.expiries = array("q")
+        self.rows: Dict[str, int] = {}
+        self.exchanges: set = set()
+        self._keys: List[str] = []
+        self._key_rows = array("l")
+        self.loaded_on: Optional[date] = None
+
+    @classmethod
+    def from_csv(cls, paths: List[str]) -> "SymbolMaster":
+        master = cls()
+        keyed = []
+        for path in paths:
+            with open(path, newline="", encoding="utf-8", errors="replace") as f:
+                for row in csv.reader(f):
+                    if (
+                        len(row) <= SYM_COL_UNDERLYING
+                        or row[SYM_COL_TICKER] in master.rows
+                    ):
+                        continue
+                    try:
+                        lot_size = int(float(row[SYM_COL_LOT] or 1))
+                        tick_size = float(row[SYM_COL_TICK] or 0)
+                        expiry = int(float(row[SYM_COL_EXPIRY] or 0))
+                    except ValueError:
+                        # Header or malformed row
+                        continue
+                    ticker = row[SYM_COL_TICKER].upper()
+                    index = len(master.tickers)
+                    master.rows[ticker] = index
+                    master.tickers.append(ticker)
+                    master.names.append(row[SYM_COL_NAME])
+                    master.lot_sizes.append(max(lot_size, 1))
+                    master.tick_sizes.append(tick_size)
+                    master.expiries.append(expiry)
+                    master.exchanges.add(ticker.split(":", 1)[0])
+                    bare = ticker.split(":", 1)[-1]
+                    for key in {
+                        bare,
+                        row[SYM_COL_UNDERLYING].upper(),
+                        row[SYM_COL_NAME].upper(),
+                    }:
+                        if key:
+                            keyed.append((key, index))
+        keyed.sort()
+        master._keys = [key for key, _ in keyed]
+        master._key_rows = array("l", (index for _, index in keyed))
+        return master
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def get(self, ticker: str) -> Optional[Instrument]:
+        index = self.rows.get(ticker.upper())
+        if index is None:
+            return None
+        return self._instrument(index)
+
+    def _instrument(self, index: int) -> Instrument:
+        return Instrument(
+            self.tickers[index],
+            self.names[index],
+            self.lot_sizes[index],
+            self.tick_sizes[index],
+            self.expiries[index],
+        )
+
+    def covers(self, ticker: str) -> bool:
+        """Whether the ticker's exchange was loaded, so a miss really means unknown."""
+        return ticker.split(":", 1)[0].upper() in self.exchanges
+
+    def search(self, query: str, limit: int = 20) -> List[Instrument]:
+        query = query.strip().upper()
+        if ":" in query:
+            exchange, query = query.split(":", 1)
+        else:
+            exchange = ""
+        if not query:
+            return []
+
+        # Collect a bounded window of prefix matches, then rank: exact ticker
+        # first, then shorter (cash before derivatives) tickers
+        seen: Dict[int, bool] = {}
+        position = bisect.bisect_left(self._keys, query)
+        while (
+            position < len(self._keys)
+            and self._keys[position].startswith(query)
+            and len(seen) < limit * 20
+        ):
+            index = self._key_rows[position]
+            if not exchange or self.tickers[index].startswith(exchange + ":"):
+                seen.setdefault(index, self._keys[position] == query)
+            position += 1
+        ranked = sorted(
+            seen, key=lambda i: (not seen[i], len(self.tickers[i]), self.tickers[i])
+        )
+        return [self._instrument(i) for i in ranked[:limit]]
+
+    def validate_symbol(self, ticker: str) -> Optional[str]:
+        """Return why a ticker is not tradable, or None if it is known (or cannot be checked)."""
+        if not self.covers(ticker) or ticker.upper() in self.rows:
+            return None
+        suggestions = [
+            i.ticker
+            for i in self.search(ticker.split(":", 1)[-1].split("-", 1)[0], limit=3)
+        ]
+        hint = f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""
+        return f"unknown symbol {ticker}{hint}"
+
+    def validate_order(
+        self, ticker: str, quantity: int, limit_price: float = 0, stop_price: float = 0
+    ) -> Optional[str]:
+        """Check symbol, lot multiple and price ticks; return a description of the problem or None."""
+        error = self.validate_symbol(ticker)
+        if error:
+            return error
+        instrument = self.get(ticker)
+        if instrument is None:
+            return None
+        if quantity % instrument.lot_size:
+            return f"quantity {quantity} is not a multiple of the lot size {instrument.lot_size} for {instrument.ticker}"
+        tick = instrument.tick_size
+        for label, price in (("limit_price", limit_price), ("stop_price", stop_price)):
+            if tick > 0 and price and abs(round(price / tick) * tick - price) > 1e-6:
+                return f"{label} {price} is not a multiple of the tick size {tick} for {instrument.ticker}"
+        return None
+
+
+def symbol_master_paths(directory: str) -> Dict[str, str]:
+    return {
+        segment: os.path.join(directory, f"{segment}.csv")
+        for segment in SYMBOL_MASTER_SEGMENTS
+    }
+
+
+async def download_symbol_master(directory: str) -> List[str]:
+    """Download segment CSVs not yet fetched today; keep yesterday's copy if a download fails."""
+    os.makedirs(directory, exist_ok=True)
+    today = datetime.now(IST).date()
+    paths = symbol_master_paths(directory)
+    stale = {
+        segment: path
+        for segment, path in paths.items()
+        if not os.path.exists(path)
+        or datetime.fromtimestamp(os.path.getmtime(path), IST).date() != today
+    }
+
+    if stale:
+        import aiohttp
+
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=60)
+        ) as session:
+
+            async def fetch(segment: str, path: str) -> None:
+                try:
+                    async with session.get(
+                        f"{SYMBOL_MASTER_URL}/{segment}.csv"
+                    ) as response:
+                        response.raise_for_status()
+                        body = await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    return
+                with open(path + ".tmp", "wb") as f:
+                    f.write(body)
+                os.replace(path + ".tmp", path)
+
+            await asyncio.gather(
+                *(fetch(segment, path) for segment, path in stale.items())
+            )
+
+    return [path for path in paths.values() if os.path.exists(path)]
+
+
+symbol_master = None
+_symbol_master_task = None
+# monotonic() counts from boot, so start far enough back that the first load is always due
+_symbol_master_failed_at = float("-inf")
+
+
+async def _load_symbol_master() -> Optional[SymbolMaster]:
+    paths = await download_symbol_master(os.path.join(FYERS_DATA_DIR, "symbols"))
+    if not paths:
+        return None
+    return await asyncio.to_thread(SymbolMaster.from_csv, paths)
+
+
+async def _refresh_symbol_master() -> Optional[SymbolMaster]:
+    global symbol_master, _symbol_master_failed_at
+    try:
+        master = await _load_symbol_master()
+    except Exception:
+        master = None
+    if master is None:
+        _symbol_master_failed_at = time.monotonic()
+        return symbol_master
+    master.loaded_on = datetime.now(IST).date()
+    symbol_master = master
+    return symbol_master
+
+
+def refresh_symbol_master() -> Optional[asyncio.Future]:
+    """Start loading today's symbol index in the background, or join the load in progress.
+
+    Returns None when the index is already current or a retry after a failed load is not due yet.
+    """
+    global _symbol_master_task
+    if (
+        symbol_master is not None
+        and symbol_master.loaded_on == datetime.now(IST).date()
+    ):
+        return None
+    # Concurrent callers share one download/parse
+    if _symbol_master_task is not None and not _symbol_master_task.done():
+        return _symbol_master_task
+    if time.monotonic() - _symbol_master_failed_at < SYMBOL_MASTER_RETRY:
+        return None
+    _symbol_master_task = asyncio.ensure_future(_refresh_symbol_master())
+    return _symbol_master_task
+
+
+async def get_symbol_master() -> Optional[SymbolMaster]:
+    """Return the symbol index, (re)loading it once per day. None if no master is available."""
+    task = refresh_symbol_master()
+    if task is not None:
+        await asyncio.shield(task)
+    return symbol_master
+
+
+def get_validation_master() -> Optional[SymbolMaster]:
+    """Symbol index used to check orders and quotes locally, unless disabled.
+
+    Never waits for a download: while today's index loads in the background the previous one
+    is used, and with none loaded yet (or after a failed load) checks are skipped.
+    """
+    if not SYMBOL_VALIDATION:
+        return None
+    refresh_symbol_master()
+    return symbol_master
+
+
+@mcp.tool()
+async def search_symbols(
+    query: str, limit: int = 20, output_format: str = "text"
+) -> str:
+    """Search instruments in the Fyers symbol master by ticker, underlying or name prefix.
+
+    Args:
+        query: Prefix to search for (e.g., "SBIN", "NSE:RELI", "NIFTY25")
+        limit: Maximum number of matches to return
+        output_format: "text" (default) or "json" for compact structured records
+    """
+    try:
+        master = await get_symbol_master()
+        if master is None:
+            return error_result(
+                output_format, "❌ Symbol master unavailable (download failed)"
+            )
+
+        matches = master.search(query, limit)
+        if output_format == "json":
+            return to_json(
+                [
+                    {
+                        "symbol": i.ticker,
+                        "name": i.name,
+                        "lot_size": i.lot_size,
+                        "tick_size": i.tick_size,
+                    }
+                    for i in matches
+                ]
+            )
+        if not matches:
+            return f"📊 No symbols match '{query}'"
+
+        parts = [f"📊 Symbols matching '{query}':\n\n"]
+        parts.extend(
+            f"{i.ticker} - {i.name} | Lot: {i.lot_size} | Tick: {i.tick_size}\n"
+            for i in matches
+        )
+        return "".join(parts)
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error searching symbols: {str(e)}")
+
+
+@mcp.tool()
+async def subscribe_quotes(symbols: str, output_format: str = "text") -> str:
+    """Stream live ticks for symbols so get_quotes answers them without REST calls.
+
+    Args:
+        symbols: Comma-separated symbols (e.g., "NSE:SBIN-EQ,NSE:RELIANCE-EQ")
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        stream = get_market_stream()
+        if not stream:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        symbol_list = normalize_symbols(symbols)
+        await stream.subscribe(symbol_list)
+
+        if output_format == "json":
+            return to_json(
+                {
+                    "subscribed": symbol_list,
+                    "streaming": len(stream.symbols),
+                    "connected": stream.connected,
+                }
+            )
+        status = "connected" if stream.connected else "connecting"
+        return f"✅ Subscribed to {len(symbol_list)} symbol(s)\nStreaming: {len(stream.symbols)} symbol(s) | Socket: {status}"
+    except Exception as e:
+        return error_result(output_format, f"❌ Error subscribing to quotes: {str(e)}")
+
+
+@mcp.tool()
+async def unsubscribe_quotes(symbols: str, output_format: str = "text") -> str:
+    """Stop streaming ticks for symbols.
+
+    Args:
+        symbols: Comma-separated symbols (e.g., "NSE:SBIN-EQ")
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        symbol_list = normalize_symbols(symbols)
+        if market_stream is None:
+            if output_format == "json":
+                return to_json({"unsubscribed": [], "streaming": 0})
+            return "📊 No active quote subscriptions"
+
+        await market_stream.unsubscribe(symbol_list)
+
+        if output_format == "json":
+            return to_json(
+                {"unsubscribed": symbol_list, "streaming": len(market_stream.symbols)}
+            )
+        return f"✅ Unsubscribed from {len(symbol_list)} symbol(s)\nStreaming: {len(market_stream.symbols)} symbol(s)"
+    except Exception as e:
+        return error_result(
+            output_format, f"❌ Error unsubscribing from quotes: {str(e)}"
+        )
+
+
+@mcp.tool()
+async def place_order(
+    symbol: str,
+    quantity: int,
+    order_type: str,
+    side: str,
+    product_type: str = "MARGIN",
+    limit_price: float = 0,
+    stop_price: float = 0,
+    validity: str = "DAY",
+    allow_duplicate: bool = False,
+    strategy: str = "",
+    output_format: str = "text",
+) -> str:
+    """Place a new order. Pre-trade risk checks run locally before it is sent.
+
+    Args:
+        symbol: Trading symbol (e.g., "NSE:SBIN-EQ")
+        quantity: Number of shares
+        order_type: Order type ("MARKET", "LIMIT", "STOP", "STOPLIMIT")
+        side: Order side ("BUY" or "SELL")
+        product_type: Product type ("MARGIN", "INTRADAY", "CNC", "BO", "CO")
+        limit_price: Limit price (for LIMIT orders)
+        stop_price: Stop price (for STOP orders)
+        validity: Order validity ("DAY", "IOC", "GTD")
+        allow_duplicate: Send even if an identical order went out in the last few seconds
+        strategy: Tag for the trade journal; its fills are reported under this strategy by query_trade_journal
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        error = validate_order_spec(
+            {
+                "symbol": symbol,
+                "quantity": quantity,
+                "order_type": order_type,
+                "side": side,
+                "limit_price": limit_price,
+                "stop_price": stop_price,
+            }
+        )
+        master = get_validation_master()
+        if master is not None and not error:
+            error = master.validate_order(symbol, quantity, limit_price, stop_price)
+        if error:
+            return error_result(output_format, f"❌ Order rejected: {error}")
+
+        order_data = build_order_data(
+            symbol,
+            quantity,
+            order_type,
+            side,
+            product_type,
+            limit_price,
+            stop_price,
+            validity,
+        )
+        problems, holds = await client.pre_trade_check([order_data], allow_duplicate)
+        if problems[0]:
+            return error_result(
+                output_format, f"❌ Order rejected by risk check: {problems[0]}"
+            )
+
+        # Subscribe before sending so fills are pushed rather than polled for
+        get_order_stream()
+        response = None
+        try:
+            response = await client.place_order(order_data, strategy)
+        except FyersAPIError as e:
+            response = e.response
+            raise
+        finally:
+            client.risk.settle(holds, [response])
+
+        if response.get("s") == "ok":
+            order_id = response.get("id", "Unknown")
+            if output_format == "json":
+                return to_json(
+                    {
+                        "order_id": order_id,
+                        "symbol": symbol,
+                        "qty": quantity,
+                        "side": side.upper(),
+                        "type": order_type.upper(),
+                    }
+                )
+            return f"✅ Order placed successfully!\nOrder ID: {order_id}\nSymbol: {symbol}\nQty: {quantity} {side}\nType: {order_type}"
+        else:
+            return error_result(
+                output_format,
+                f"❌ Order placement failed: {response.get('message', 'Unknown error')}",
+            )
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error placing order: {str(e)}")
+
+
+@mcp.tool()
+async def modify_order(
+    order_id: str,
+    quantity: Optional[int] = None,
+    limit_price: Optional[float] = None,
+    stop_price: Optional[float] = None,
+    output_format: str = "text",
+) -> str:
+    """Modify an existing order.
+
+    Args:
+        order_id: Order ID to modify
+        quantity: New quantity (optional)
+        limit_price: New limit price (optional)
+        stop_price: New stop price (optional)
+        output_format: "text" (default) or "json" for a compact structured result
+    """
+    try:
+        client = get_fyers_client()
+        if not client:
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        modify_data: Dict[str, Any] = {"id": order_id}
+
+        if quantity is not None:
+            modify_data["qty"] = quantity
+        if limit_price is not None:
+            modify_data["limitPrice"] = limit_price
+        if stop_price is not None:
+            modify_data["stopPrice"] = stop_price
+
+        problem = (await client.pre_modify_check([modify_data]))[0]
+        if problem:
+            return error_result(
+                output_format, f"❌ Modification rejected by risk check: {problem}"
+            )
+
+        response = None
+        try:
+            response = await client.modify_order(modify_data)
+        except FyersAPIError as e:
+            response = e.response
+            raise
+        finally:
+            client.risk.settle_modify([order_id], [response])
+
+        if response.get("s") == "ok":
+            if output_format == "json":
+                return to_json({"order_id": order_id})
+            return f"✅ Order modified successfully!\nOrder ID: {order_id}"
+        else:
+            return error_result(
+                output_format,
+                f"❌ Order modification failed: {response.get('message', 'Unknown error')}",
+            )
+
+    except Exception as e:
+        return error_result(output_format, f"❌ Error modifying order: {str(e)}")
+
 
 @mcp.tool()
-def get_profile() -> str:
-    """Get user profile information."""
+async def cancel_order(order_id: str, output_format: str = "text") -> str:
+    """Cancel an existing order.
+
+    Args:
+        order_id: Order ID to cancel
+        output_format: "text" (default) or "json" for a compact structured result
+    """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        response = client.get_profile()
-        
-        if response.get("code") == 200:
-            data = response["data"]
-            return f"""✅ Profile Information:
-Name: {data.get('name', 'N/A')}
-Email: {data.get('email_id', 'N/A')}
-Mobile: {data.get('mobile_number', 'N/A')}
-Client ID: {data.get('fy_id', 'N/A')}
-"""
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        cancel_data = {"id": order_id}
+
+        response = await client.cancel_order(cancel_data)
+
+        if response.get("s") == "ok":
+            if output_format == "json":
+                return to_json({"order_id": order_id})
+            return f"✅ Order cancelled successfully!\nOrder ID: {order_id}"
         else:
-            return f"❌ Failed to get profile: {response}"
-            
+            return error_result(
+                output_format,
+                f"❌ Order cancellation failed: {response.get('message', 'Unknown error')}",
+            )
+
     except Exception as e:
-        return f"❌ Error getting profile: {str(e)}"
+        return error_result(output_format, f"❌ Error cancelling order: {str(e)}")
+
+
+# wait_for_order_status re-checks by ID this often: without the order socket, and as a safety net with it
+ORDER_WAIT_POLL = float(os.getenv("FYERS_ORDER_WAIT_POLL", "1"))
+ORDER_WAIT_STREAM_POLL = 15.0
+ORDER_STATUS_NAMES = {code: name.lower() for name, code in ORDER_STATUSES.items()}
+
 
 @mcp.tool()
-def get_funds() -> str:
-    """Get account funds information."""
+async def wait_for_order_status(
+    order_id: str,
+    status: str = "filled",
+    timeout: float = 60,
+    output_format: str = "text",
+) -> str:
+    """Wait until an order reaches a status, instead of polling get_orders.
+
+    Returns as soon as the order update socket reports the status, or when the order reaches a
+    final state that rules it out (e.g. rejected while waiting for filled), or on timeout.
+
+    Args:
+        order_id: Order ID returned by place_order
+        status: Comma-separated target statuses: filled, cancelled, rejected, pending, transit, expired, open
+        timeout: Seconds to wait at most (default 60)
+        output_format: "text" (default) or "json" for a compact structured result
+    """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        response = client.funds()
-        
-        if response.get("code") == 200:
-            # Handle both dict and list response formats
-            if isinstance(response.get("fund_limit"), list) and response["fund_limit"]:
-                fund_data = response["fund_limit"][0]
-            else:
-                fund_data = response.get("fund_limit", {})
-            
-            return f"""✅ Account Funds:
-Equity Available: ₹{fund_data.get('equityAmount', 0):,.2f}
-Commodity Available: ₹{fund_data.get('commodityAmount', 0):,.2f}
-Used Margin: ₹{fund_data.get('utilisedAmount', 0):,.2f}
-Total Balance: ₹{fund_data.get('total_balance', 0):,.2f}
-"""
-        else:
-            return f"❌ Failed to get funds: {response}"
-            
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        try:
+            targets = parse_order_statuses(status)
+        except ValueError as e:
+            return error_result(output_format, f"❌ {e}")
+        if not targets:
+            return error_result(output_format, "❌ No target status given")
+
+        stream = get_order_stream()
+        book = client.order_book
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + max(timeout, 0)
+
+        order = book.orders.get(order_id)
+        if order is None or not (stream and stream.connected):
+            response = await client.fetch_order(order_id)
+            if response.get("code") != 200:
+                return error_result(
+                    output_format, f"❌ Failed to get order: {response}"
+                )
+            order = book.orders.get(order_id)
+        if order is None:
+            return error_result(output_format, f"❌ Order {order_id} not found")
+
+        while (
+            order.get("status") not in targets
+            and order.get("status") not in FINAL_ORDER_STATUSES
+        ):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            poll = (
+                ORDER_WAIT_STREAM_POLL
+                if stream and stream.connected
+                else ORDER_WAIT_POLL
+            )
+            if not await book.wait_change(order_id, min(poll, remaining)):
+                await client.fetch_order(order_id)
+            order = book.orders.get(order_id, order)
+
+        reached = order.get("status") in targets
+        status_name = ORDER_STATUS_NAMES.get(
+            order.get("status", 0), str(order.get("status"))
+        )
+        waited = loop.time() - started
+        if output_format == "json":
+            return to_json(
+                {
+                    "order_id": order_id,
+                    "reached": reached,
+                    "status": status_name,
+                    "waited": round(waited, 3),
+                    "streaming": bool(stream and stream.connected),
+                    "order": order_records([order])[0],
+                }
+            )
+        record = order_records([order])[0]
+        details = f"Order ID: {order_id}\nSymbol: {record['symbol']} | {record['side']} {record['qty']}\nStatus: {status_name} | waited {waited:.1f}s"
+        if reached:
+            return f"✅ Order reached {status_name}\n{details}"
+        if order.get("status") in FINAL_ORDER_STATUSES:
+            message = f"\nMessage: {order['message']}" if order.get("message") else ""
+            return f"❌ Order ended as {status_name}, not {status}\n{details}{message}"
+        return f"⏳ Timed out after {waited:.0f}s waiting for {status}\n{details}"
     except Exception as e:
-        return f"❌ Error getting funds: {str(e)}"
+        return error_result(output_format, f"❌ Error waiting for order: {str(e)}")
+
+
+def basket_records(
+    labels: List[str], responses: List[Dict[str, Any]]
+) -> List[BasketLegRecord]:
+    return [
+        {
+            "leg": label,
+            "ok": response.get("s") == "ok",
+            "order_id": response.get("id"),
+            "message": (
+                None
+                if response.get("s") == "ok"
+                else response.get("message", "Unknown error")
+            ),
+        }
+        for label, response in zip(labels, responses)
+    ]
+
+
+def format_basket_result(
+    action: str, records: List[BasketLegRecord], output_format: str = "text"
+) -> str:
+    """Render per-leg basket results."""
+    accepted = sum(1 for r in records if r["ok"])
+    if output_format == "json":
+        return to_json({"accepted": accepted, "total": len(records), "legs": records})
+
+    status = "✅" if accepted == len(records) else "⚠️" if accepted else "❌"
+    parts = [f"{status} Basket {action}: {accepted}/{len(records)} orders accepted\n\n"]
+    for i, r in enumerate(records, 1):
+        if r["ok"]:
+            parts.append(
+                f"✅ {i}. {r['leg']} | Order ID: {r['order_id'] or 'Unknown'}\n"
+            )
+        else:
+            parts.append(f"❌ {i}. {r['leg']} | {r['message']}\n")
+    return "".join(parts)
+
 
 @mcp.tool()
-def get_holdings() -> str:
-    """Get portfolio holdings."""
+async def place_basket_orders(
+    orders: List[Dict[str, Any]],
+    allow_duplicates: bool = False,
+    output_format: str = "text",
+) -> str:
+    """Place several orders at once. Every leg is validated and risk checked before any is sent.
+
+    Args:
+        orders: List of orders, each with "symbol", "quantity", "order_type", "side" and optional
+            "product_type", "limit_price", "stop_price", "validity", "strategy" (same meaning as place_order)
+        allow_duplicates: Send legs even if identical orders went out in the last few seconds
+        output_format: "text" (default) or "json" for compact per-leg records
+    """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        response = client.holdings()
-        
-        if response.get("code") == 200:
-            holdings = response.get("holdings", [])
-            
-            if not holdings:
-                return "📊 No holdings found"
-            
-            result = "📊 Portfolio Holdings:\n\n"
-            total_value = 0
-            total_pnl = 0
-            
-            for holding in holdings:
-                symbol = holding.get("symbol", "N/A")
-                qty = holding.get("quantity", holding.get("qty", 0))
-                ltp = holding.get("ltp", 0)
-                avg_price = holding.get("costPrice", 0)
-                current_value = qty * ltp
-                pnl = current_value - (qty * avg_price)
-                pnl_pct = (pnl / (qty * avg_price) * 100) if avg_price > 0 else 0
-                
-                total_value += current_value
-                total_pnl += pnl
-                
-                result += f"""📈 {symbol}
-Qty: {qty} | LTP: ₹{ltp:.2f} | Avg: ₹{avg_price:.2f}
-Current Value: ₹{current_value:,.2f}
-P&L: ₹{pnl:,.2f} ({pnl_pct:+.2f}%)
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        if not orders:
+            return error_result(output_format, "❌ No orders provided")
+
+        errors = [
+            f"Leg {i}: {error}"
+            for i, spec in enumerate(orders, 1)
+            if (error := validate_order_spec(spec))
+        ]
+        master = get_validation_master()
+        if master is not None and not errors:
+            errors = [
+                f"Leg {i}: {error}"
+                for i, spec in enumerate(orders, 1)
+                if (
+                    error := master.validate_order(
+                        spec["symbol"],
+                        spec["quantity"],
+                        spec.get("limit_price", 0),
+                        spec.get("stop_price", 0),
+                    )
+                )
+            ]
+        if errors:
+            return error_result(
+                output_format,
+                "❌ Basket rejected, no orders were sent:\n" + "\n".join(errors),
+            )
+
+        legs = [
+            build_order_data(
+                spec["symbol"],
+                spec["quantity"],
+                spec["order_type"],
+                spec["side"],
+                spec.get("product_type", "MARGIN"),
+                spec.get("limit_price", 0),
+                spec.get("stop_price", 0),
+                spec.get("validity", "DAY"),
+            )
+            for spec in orders
+        ]
+        problems, holds = await client.pre_trade_check(legs, allow_duplicates)
+        if any(problems):
+            errors = [
+                f"Leg {i}: {problem}"
+                for i, problem in enumerate(problems, 1)
+                if problem
+            ]
+            return error_result(
+                output_format,
+                "❌ Basket rejected by risk check, no orders were sent:\n"
+                + "\n".join(errors),
+            )
+
+        get_order_stream()
+        try:
+            responses = await client.place_basket_orders(
+                legs, [str(spec.get("strategy") or "") for spec in orders]
+            )
+        except BaseException:
+            # No answer for any leg: the holds stay until a sync settles them
+            client.risk.settle(holds, [None] * len(legs))
+            raise
+        client.risk.settle(holds, responses)
+
+        labels = [
+            f"{spec['symbol']} {spec['side'].upper()} {spec['quantity']}"
+            for spec in orders
+        ]
+        return format_basket_result(
+            "placed", basket_records(labels, responses), output_format
+        )
 
-"""
-            
-            result += f"""💰 Summary:
-Total Value: ₹{total_value:,.2f}
-Total P&L: ₹{total_pnl:,.2f}"""
-            return result
-        else:
-            return f"❌ Failed to get holdings: {response}"
-            
     except Exception as e:
-        return f"❌ Error getting holdings: {str(e)}"
+        return error_result(output_format, f"❌ Error placing basket: {str(e)}")
+
 
 @mcp.tool()
-def get_positions() -> str:
-    """Get current trading positions."""
+async def modify_basket_orders(
+    orders: List[Dict[str, Any]], output_format: str = "text"
+) -> str:
+    """Modify several pending orders at once.
+
+    Args:
+        orders: List of changes, each with "order_id" and any of "quantity", "limit_price", "stop_price"
+        output_format: "text" (default) or "json" for compact per-leg records
+    """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        response = client.positions()
-        
-        if response.get("code") == 200:
-            positions = response.get("netPositions", [])
-            
-            if not positions:
-                return "📊 No open positions"
-            
-            result = "📊 Current Positions:\n\n"
-            total_pnl = 0
-            
-            for pos in positions:
-                symbol = pos.get("symbol", "N/A")
-                qty = pos.get("qty", 0)
-                side = pos.get("side", 0)
-                avg_price = pos.get("avgPrice", 0)
-                ltp = pos.get("ltp", 0)
-                pnl = pos.get("pl", 0)
-                
-                side_text = "LONG" if side > 0 else "SHORT"
-                total_pnl += pnl
-                
-                result += f"""📈 {symbol} ({side_text})
-Qty: {abs(qty)} | Avg: ₹{avg_price:.2f} | LTP: ₹{ltp:.2f}
-P&L: ₹{pnl:,.2f}
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        if not orders:
+            return error_result(output_format, "❌ No orders provided")
+
+        errors = [
+            f"Leg {i}: missing order_id"
+            for i, spec in enumerate(orders, 1)
+            if not spec.get("order_id")
+        ]
+        if errors:
+            return error_result(
+                output_format,
+                "❌ Basket rejected, no orders were sent:\n" + "\n".join(errors),
+            )
+
+        legs = []
+        for spec in orders:
+            modify_data = {"id": spec["order_id"]}
+            if spec.get("quantity") is not None:
+                modify_data["qty"] = spec["quantity"]
+            if spec.get("limit_price") is not None:
+                modify_data["limitPrice"] = spec["limit_price"]
+            if spec.get("stop_price") is not None:
+                modify_data["stopPrice"] = spec["stop_price"]
+            legs.append(modify_data)
+
+        errors = [
+            f"Leg {i}: {problem}"
+            for i, problem in enumerate(await client.pre_modify_check(legs), 1)
+            if problem
+        ]
+        if errors:
+            return error_result(
+                output_format,
+                "❌ Basket rejected by risk check, no orders were sent:\n"
+                + "\n".join(errors),
+            )
+
+        order_ids = [leg["id"] for leg in legs]
+        try:
+            responses = await client.modify_basket_orders(legs)
+        except BaseException:
+            client.risk.settle_modify(order_ids, [None] * len(legs))
+            raise
+        client.risk.settle_modify(order_ids, responses)
+        return format_basket_result(
+            "modified",
+            basket_records([spec["order_id"] for spec in orders], responses),
+            output_format,
+        )
 
-"""
-            
-            result += f"💰 Total P&L: ₹{total_pnl:,.2f}"
-            return result
-        else:
-            return f"❌ Failed to get positions: {response}"
-            
     except Exception as e:
-        return f"❌ Error getting positions: {str(e)}"
+        return error_result(output_format, f"❌ Error modifying basket: {str(e)}")
+
 
 @mcp.tool()
-def get_orders() -> str:
-    """Get order history."""
+async def cancel_basket_orders(order_ids: str, output_format: str = "text") -> str:
+    """Cancel several orders at once.
+
+    Args:
+        order_ids: Comma-separated order IDs
+        output_format: "text" (default) or "json" for compact per-leg records
+    """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        response = client.orderbook()
-        
-        if response.get("code") == 200:
-            orders = response.get("orderBook", [])
-            
-            if not orders:
-                return "📊 No orders found"
-            
-            result = "📊 Recent Orders:\n\n"
-            
-            for order in orders[-10:]:
-                symbol = order.get("symbol", "N/A")
-                side = order.get("side", 0)
-                qty = order.get("qty", 0)
-                price = order.get("limitPrice", 0)
-                status = order.get("status", "N/A")
-                order_type = order.get("type", "N/A")
-                
-                side_text = "BUY" if side > 0 else "SELL"
-                
-                result += f"""📋 {symbol} - {side_text}
-Qty: {qty} | Price: ₹{price:.2f}
-Type: {order_type} | Status: {status}
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        ids = list(dict.fromkeys(i.strip() for i in order_ids.split(",") if i.strip()))
+        if not ids:
+            return error_result(output_format, "❌ No order IDs provided")
+
+        responses = await client.cancel_basket_orders(
+            [{"id": order_id} for order_id in ids]
+        )
+        return format_basket_result(
+            "cancelled", basket_records(ids, responses), output_format
+        )
 
-"""
-            
-            return result
-        else:
-            return f"❌ Failed to get orders: {response}"
-            
     except Exception as e:
-        return f"❌ Error getting orders: {str(e)}"
+        return error_result(output_format, f"❌ Error cancelling basket: {str(e)}")
+
+
+def render_trade_journal(result: Dict[str, Any], period: str, group_by: str) -> str:
+    total = result["total"]
+    parts = [f"""📓 Trade Journal ({period})
+Realized P&L: ₹{total['realized_pnl']:+,.2f} | Turnover: ₹{total['turnover']:,.2f}
+Fills: {total['fills']} | Orders placed: {total['orders']} ({total['rejected']} rejected, {total['unanswered']} unanswered) | Symbols with open quantity: {total['open_symbols']}
+"""]
+    if result["groups"]:
+        parts.append(f"\nBy {group_by}:\n")
+    for key, g in result["groups"].items():
+        parts.append(
+            f"{key or '(untagged)'}: P&L ₹{g['realized_pnl']:+,.2f} | turnover ₹{g['turnover']:,.2f} | {g['fills']} fills | "
+            f"{g['orders']} orders | {g['winners']} winning / {g['losers']} losing symbols | {g['open_symbols']} open\n"
+        )
+    return "".join(parts)
+
 
 @mcp.tool()
-def get_quotes(symbols: str) -> str:
-    """Get live quotes for symbols.
-    
+async def query_trade_journal(
+    start_date: str = "",
+    end_date: str = "",
+    symbol: str = "",
+    strategy: str = "",
+    group_by: str = "strategy",
+    account: str = DEFAULT_ACCOUNT,
+    output_format: str = "text",
+) -> str:
+    """Realized P&L, turnover and per-strategy stats from the local trade journal, without calling Fyers.
+
+    The journal records every order sent by this server and every fill it sees, across sessions.
+    Realized P&L is on the quantity bought and sold within the period, at average prices per symbol.
+
     Args:
-        symbols: Comma-separated symbols (e.g., "NSE:SBIN-EQ,NSE:RELIANCE-EQ")
+        start_date: First day, "YYYY-MM-DD" (IST); blank for the start of the journal
+        end_date: Last day, "YYYY-MM-DD" (IST); blank for today
+        symbol: Only this symbol (e.g., "NSE:SBIN-EQ")
+        strategy: Only orders placed with this strategy tag
+        group_by: Break totals down by "strategy" (default), "symbol", "day" or "account"
+        account: Account name from FYERS_ACCOUNTS, or "all"
+        output_format: "text" (default) or "json" for a compact structured result
     """
     try:
-        client = get_fyers_client()
-        if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        symbol_list = [s.strip() for s in symbols.split(",")]
-        
-        response = client.quotes({"symbols": symbol_list})
-        
-        if response.get("code") == 200:
-            quotes_data = response.get("d", [])
-            if isinstance(quotes_data, list):
-                quotes = {item.get('n', 'Unknown'): item for item in quotes_data}
-            else:
-                quotes = quotes_data
-            
-            result = "📊 Live Quotes:\n\n"
-            
-            for symbol_name, data in quotes.items():
-                if isinstance(data, dict):
-                    quote = data.get('v', data)
-                    ltp = quote.get('lp', quote.get('c', 0))
-                    change = quote.get('ch', quote.get('change', 0))
-                    change_pct = quote.get('chp', quote.get('changePer', 0))
-                    volume = quote.get('volume', quote.get('vol', 0))
-                    
-                    result += f"""📈 {symbol_name}
-LTP: ₹{ltp:.2f}
-Change: ₹{change:+.2f} ({change_pct:+.2f}%)
-Volume: {volume:,}
+        journal = get_trade_journal()
+        if journal is None:
+            reason = trade_journal_error or "disabled (FYERS_TRADE_JOURNAL=0)"
+            return error_result(
+                output_format, f"❌ Trade journal unavailable: {reason}"
+            )
 
-"""
-            
-            return result
-        else:
-            return f"❌ Failed to get quotes: {response}"
-            
+        try:
+            for value in (start_date, end_date):
+                if value.strip():
+                    datetime.strptime(value.strip(), "%Y-%m-%d")
+        except ValueError:
+            return error_result(output_format, "❌ Dates must be in YYYY-MM-DD format")
+        selected = None
+        if account.strip().lower() != ALL_ACCOUNTS:
+            resolved = get_account(account)
+            if resolved is None:
+                return error_result(
+                    output_format,
+                    f"❌ Unknown account '{account}'. Configured: {', '.join(FYERS_ACCOUNTS)}",
+                )
+            selected = resolved.name
+
+        try:
+            result = await journal.call(
+                journal.query,
+                start_date.strip(),
+                end_date.strip(),
+                selected,
+                symbol.strip().upper() or None,
+                strategy.strip() or None,
+                group_by.strip().lower(),
+            )
+        except ValueError as e:
+            return error_result(output_format, f"❌ {e}")
+
+        if output_format == "json":
+            return to_json(
+                {
+                    "start_date": start_date.strip() or None,
+                    "end_date": end_date.strip() or None,
+                    "account": selected or ALL_ACCOUNTS,
+                    **result,
+                }
+            )
+        period = f"{start_date.strip() or 'start'} → {end_date.strip() or 'today'} | account: {selected or ALL_ACCOUNTS}"
+        return render_trade_journal(result, period, group_by.strip().lower())
     except Exception as e:
-        return f"❌ Error getting quotes: {str(e)}"
+        return error_result(output_format, f"❌ Error querying trade journal: {str(e)}")
+
 
 @mcp.tool()
-def place_order(symbol: str, quantity: int, order_type: str, side: str, product_type: str = "MARGIN", limit_price: float = 0, stop_price: float = 0, validity: str = "DAY") -> str:
-    """Place a new order.
-    
+async def get_cache_stats(output_format: str = "text") -> str:
+    """Get hit/miss counters and lifetimes for the account and option chain cache.
+
     Args:
-        symbol: Trading symbol (e.g., "NSE:SBIN-EQ")
-        quantity: Number of shares
-        order_type: Order type ("MARKET", "LIMIT", "STOP", "STOPLIMIT")
-        side: Order side ("BUY" or "SELL")
-        product_type: Product type ("MARGIN", "INTRADAY", "CNC", "BO", "CO")
-        limit_price: Limit price (for LIMIT orders)
-        stop_price: Stop price (for STOP orders)
-        validity: Order validity ("DAY", "IOC", "GTD")
+        output_format: "text" (default) or "json" for a compact structured result
     """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        # Map string values to API constants
-        type_map = {"MARKET": 1, "LIMIT": 2, "STOP": 3, "STOPLIMIT": 4}
-        side_map = {"BUY": 1, "SELL": -1}
-        
-        order_data = {
-            "symbol": symbol,
-            "qty": quantity,
-            "type": type_map.get(order_type.upper(), 2),
-            "side": side_map.get(side.upper(), 1),
-            "productType": product_type,
-            "limitPrice": limit_price,
-            "stopPrice": stop_price,
-            "validity": validity,
-            "disclosedQty": 0,
-            "offlineOrder": False
-        }
-        
-        response = client.place_order(order_data)
-        
-        if response.get("code") == 201:
-            order_id = response.get("id", "Unknown")
-            return f"✅ Order placed successfully!\nOrder ID: {order_id}\nSymbol: {symbol}\nQty: {quantity} {side}\nType: {order_type}"
-        else:
-            return f"❌ Order placement failed: {response.get('message', 'Unknown error')}"
-            
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        stats = client.cache.stats()
+        book = client.order_book.stats()
+        risk = client.risk.stats()
+        journal = trade_journal.stats() if trade_journal is not None else None
+        if output_format == "json":
+            return to_json(
+                {
+                    **{
+                        endpoint: {**counts, "ttl": client.cache.ttls[endpoint]}
+                        for endpoint, counts in stats.items()
+                    },
+                    "order_book": book,
+                    "risk": risk,
+                    "trade_journal": journal,
+                }
+            )
+
+        parts = ["📊 Cache Statistics:\n\n"]
+        for endpoint, counts in stats.items():
+            total = counts["hits"] + counts["misses"]
+            hit_rate = (counts["hits"] / total * 100) if total else 0
+            parts.append(
+                f"{endpoint}: {counts['hits']} hits / {counts['misses']} misses ({hit_rate:.0f}% hit rate) | TTL: {client.cache.ttls[endpoint]:g}s\n"
+            )
+        synced = (
+            f"synced {book['synced_ago']:g}s ago"
+            if book["synced_ago"] is not None
+            else "not loaded"
+        )
+        parts.append(
+            f"\n📒 Order book: {book['orders']} orders ({book['open']} open) | {book['pending_refetch']} to refetch | {synced}\n"
+        )
+        rejected = (
+            ", ".join(f"{check}×{n}" for check, n in risk["rejected"].items()) or "none"
+        )
+        funds = (
+            f"funds {risk['funds_age']:g}s old"
+            if risk["funds_age"] is not None
+            else "no funds yet"
+        )
+        positions = {"live": "positions live", None: "no positions yet"}.get(
+            risk["positions"], f"positions {risk['positions']}s old"
+        )
+        parts.append(
+            f"🧯 Risk checks: {risk['checked']} orders checked | rejected: {rejected} | {risk['open_orders']} open | ₹{risk['margin_held']:,.2f} margin held | {funds}, {positions}\n"
+        )
+        if journal is not None:
+            parts.append(
+                f"📓 Trade journal: {journal['submissions']} order writes | {journal['fills']} fills logged this session | {journal['errors']} write errors\n"
+            )
+
+        return "".join(parts)
     except Exception as e:
-        return f"❌ Error placing order: {str(e)}"
+        return error_result(output_format, f"❌ Error getting cache stats: {str(e)}")
+
 
 @mcp.tool()
-def modify_order(order_id: str, quantity: Optional[int] = None, limit_price: Optional[float] = None, stop_price: Optional[float] = None) -> str:
-    """Modify an existing order.
-    
+async def get_rate_limit_stats(output_format: str = "text") -> str:
+    """Get client-side rate limiter queue depth and wait times.
+
     Args:
-        order_id: Order ID to modify
-        quantity: New quantity (optional)
-        limit_price: New limit price (optional)
-        stop_price: New stop price (optional)
+        output_format: "text" (default) or "json" for a compact structured result
     """
     try:
         client = get_fyers_client()
         if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        modify_data = {"id": order_id}
-        
-        if quantity is not None:
-            modify_data["qty"] = quantity
-        if limit_price is not None:
-            modify_data["limitPrice"] = limit_price
-        if stop_price is not None:
-            modify_data["stopPrice"] = stop_price
-        
-        response = client.modify_order(modify_data)
-        
-        if response.get("code") == 200:
-            return f"✅ Order modified successfully!\nOrder ID: {order_id}"
-        else:
-            return f"❌ Order modification failed: {response.get('message', 'Unknown error')}"
-            
+            return error_result(
+                output_format, "❌ Not authenticated. Use 'authenticate' tool first."
+            )
+
+        stats = client.scheduler.stats()
+        if output_format == "json":
+            return to_json(stats)
+
+        parts = [f"""📊 Rate Limiter:
+Queue Depth: {stats['queue_depth']} (max {stats['max_queue_depth']})
+
+"""]
+        for request_class, counts in stats["classes"].items():
+            parts.append(
+                f"{request_class}: {counts['requests']} requests | {counts['throttled']} throttled | avg wait {counts['avg_wait'] * 1000:.1f} ms | max wait {counts['max_wait'] * 1000:.1f} ms\n"
+            )
+
+        return "".join(parts)
     except Exception as e:
-        return f"❌ Error modifying order: {str(e)}"
+        return error_result(
+            output_format, f"❌ Error getting rate limit stats: {str(e)}"
+        )
+
 
 @mcp.tool()
-def cancel_order(order_id: str) -> str:
-    """Cancel an existing order.
-    
+async def get_server_metrics(output_format: str = "text") -> str:
+    """Get per-tool and per-Fyers-endpoint latency, error and payload size metrics.
+
     Args:
-        order_id: Order ID to cancel
+        output_format: "text" (default) or "json" for a compact structured result
     """
     try:
-        client = get_fyers_client()
-        if not client:
-            return "❌ Not authenticated. Use 'authenticate' tool first."
-        
-        cancel_data = {"id": order_id}
-        
-        response = client.cancel_order(cancel_data)
-        
-        if response.get("code") == 200:
-            return f"✅ Order cancelled successfully!\nOrder ID: {order_id}"
-        else:
-            return f"❌ Order cancellation failed: {response.get('message', 'Unknown error')}"
-            
+        snapshot = server_metrics.snapshot()
+        snapshot["resilience"] = resilience.snapshot()
+        if daemon_server is not None:
+            snapshot["daemon"] = daemon_server.stats()
+        if output_format == "json":
+            return to_json(snapshot)
+
+        parts = [
+            f"📊 Server Metrics (uptime {snapshot['uptime'] / 60:.0f} min):\n\n🛠️ Tools:\n"
+        ]
+        for tool, m in sorted(snapshot["tools"].items()):
+            parts.append(
+                f"{tool}: {m['count']} calls | {m['errors']} errors | p50 {m['p50'] * 1000:.1f} ms | p99 {m['p99'] * 1000:.1f} ms | upstream {m['upstream_share'] * 100:.0f}%\n"
+            )
+        parts.append("\n🌐 Fyers API:\n")
+        for endpoint, m in sorted(snapshot["upstream"].items()):
+            errors = (
+                ", ".join(f"{code}×{n}" for code, n in m["errors"].items()) or "none"
+            )
+            parts.append(
+                f"{endpoint}: {m['count']} calls | p50 {m['p50'] * 1000:.1f} ms | p99 {m['p99'] * 1000:.1f} ms | decode {m['decode_mean'] * 1000:.2f} ms | {m['bytes_mean']:,.0f} B avg | errors: {errors}\n"
+            )
+        if snapshot["resilience"]:
+            parts.append("\n🛡️ Resilience:\n")
+            for endpoint, r in snapshot["resilience"].items():
+                parts.append(
+                    f"{endpoint}: breaker {r['breaker']} ({r['trips']} trips, {r['rejected']} rejected) | {r['retries']} retries | {r['hedges']} hedges, {r['hedge_wins']} won\n"
+                )
+        if "daemon" in snapshot:
+            d = snapshot["daemon"]
+            parts.append(
+                f"\n🔌 Daemon: {d['clients']} front-ends connected ({d['connections']} since start) | {d['calls']} calls served | up {d['uptime'] / 60:.0f} min\n"
+            )
+
+        return "".join(parts)
     except Exception as e:
-        return f"❌ Error cancelling order: {str(e)}"
+        return error_result(output_format, f"❌ Error getting server metrics: {str(e)}")
+
+
+# Shared state daemon: with FYERS_DAEMON=1 the stdio server is a thin front-end
+# that forwards every tool call over a Unix socket to one daemon process, which
+# owns the Fyers session, caches, rate limits and sockets for all front-ends.
+# The first front-end starts the daemon (`fyers_mcp_complete.py --daemon` also
+# runs one by hand); it exits after FYERS_DAEMON_IDLE seconds without clients.
+DAEMON_ENABLED = os.getenv("FYERS_DAEMON", "0") != "0"
+DAEMON_SOCKET = os.getenv(
+    "FYERS_DAEMON_SOCKET", os.path.join(FYERS_DATA_DIR, "daemon.sock")
+)
+DAEMON_IDLE = float(os.getenv("FYERS_DAEMON_IDLE", "900"))
+DAEMON_START_TIMEOUT = 10.0
+# One request or result per line; history and order book results can be large
+DAEMON_MAX_MESSAGE = 64 * 1024 * 1024
+
+
+class DaemonError(Exception):
+    """The daemon could not run a forwarded call."""
+
+
+def spawn_daemon() -> None:
+    """Start a detached daemon that outlives this front-end; its output goes to daemon.log."""
+    import fcntl
+    import subprocess
+
+    os.makedirs(os.path.dirname(DAEMON_SOCKET) or ".", exist_ok=True)
+    # A running daemon holds the lock; one still importing is marked by the spawn time written here
+    with open(DAEMON_SOCKET + ".lock", "a+") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        lock.seek(0)
+        spawned = lock.read().strip()
+        if spawned and time.time() - float(spawned) < DAEMON_START_TIMEOUT:
+            return
+        lock.truncate(0)
+        lock.write(str(time.time()))
+        lock.flush()
+    with open(
+        os.path.join(os.path.dirname(DAEMON_SOCKET) or ".", "daemon.log"), "ab"
+    ) as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--daemon"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+
+class DaemonLink:
+    """Front-end end of the daemon socket: one connection, calls in flight matched by ID.
+
+    If no daemon answers and one cannot be started, calls run in this process
+    from then on (``local``), so the server keeps working without it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.local = False
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._write_lock = asyncio.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connecting: Optional[asyncio.Task] = None
+        self._read_task: Optional[asyncio.Task] = None
+
+    async def _try_open(self) -> bool:
+        try:
+            reader, writer = await asyncio.open_unix_connection(
+                self.path, limit=DAEMON_MAX_MESSAGE
+            )
+        except OSError:
+            return False
+        self._writer = writer
+        self._read_task = asyncio.create_task(self._read_loop(reader, writer))
+        return True
+
+    async def _open(self) -> None:
+        if await self._try_open():
+            return
+        spawn_daemon()
+        deadline = time.monotonic() + DAEMON_START_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            if await self._try_open():
+                return
+        raise ConnectionError(f"no daemon answering on {self.path}")
+
+    async def connect(self) -> bool:
+        """Connect, starting the daemon if needed; returns False when calls should run locally."""
+        if self.local:
+            return False
+        if self._writer is not None and not self._writer.is_closing():
+            return True
+        if self._connecting is None or self._connecting.done():
+            self._connecting = asyncio.create_task(self._open())
+        try:
+            await asyncio.shield(self._connecting)
+            return True
+        except Exception as e:
+            if not self.local:
+                self.local = True
+                print(
+                    f"⚠️ Fyers daemon unavailable ({e}), running tools in this process",
+                    file=sys.stderr,
+                )
+            return False
+
+    async def _read_loop(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("daemon connection closed"))
+
+    async def call(self, tool: str, arguments: Dict[str, Any]) -> str:
+        """Run ``tool`` in the daemon and return its result."""
+        writer = self._writer
+        if writer is None:
+            raise ConnectionError("not connected")
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            line = json.dumps(
+                {"id": request_id, "tool": tool, "args": arguments},
+                separators=(",", ":"),
+                default=str,
+            )
+            async with self._write_lock:
+                writer.write(line.encode() + b"\n")
+                await writer.drain()
+            message = await future
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in message:
+            raise DaemonError(message["error"])
+        result: str = message["result"]
+        return result
+
+    async def close(self) -> None:
+        if self._connecting is not None:
+            self._connecting.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None:
+            self._read_task.cancel()
+
+
+daemon_link: Optional[DaemonLink] = None
+
+
+@asynccontextmanager
+async def daemon_frontend_lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+
+    global daemon_link
+    daemon_link = DaemonLink(DAEMON_SOCKET)
+    # Connect (or start the daemon) while the host finishes the handshake
+    task = asyncio.create_task(daemon_link.connect())
+    try:
+        yield {}
+    finally:
+        task.cancel()
+        await daemon_link.close()
+        daemon_link = None
+
+
+class DaemonServer:
+    """Serves tool calls from front-ends on a Unix socket, on this process's shared state."""
+
+    def __init__(self, path: str, idle: float = DAEMON_IDLE) -> None:
+        self.path = path
+        self.idle = idle
+        self.clients = 0
+        self.connections = 0
+        self.calls = 0
+        self.started = time.time()
+        self.last_active = time.monotonic()
+        self._stop: Optional[asyncio.Event] = None
+
+    async def _serve_call(
+        self,
+        request: Dict[str, Any],
+        writer: asyncio.StreamWriter,
+        write_lock: asyncio.Lock,
+    ) -> None:
+        self.calls += 1
+        fn = mcp.tool_functions.get(request.get("tool", ""))
+
+        try:
+            if fn is None:
+                raise DaemonError(
+                    f"unknown tool {request.get('tool')!r}, is the daemon older than this front-end?"
+                )
+            response = {
+                "id": request.get("id"),
+                "result": await fn(**request.get("args", {})),
+            }
+        except Exception as e:
+            response = {"id": request.get("id"), "error": str(e) or type(e).__name__}
+        await self._reply(response, writer, write_lock)
+
+    async def _reply(
+        self,
+        response: Dict[str, Any],
+        writer: asyncio.StreamWriter,
+        write_lock: asyncio.Lock,
+    ) -> None:
+        line = json.dumps(
+            response, separators=(",", ":"), ensure_ascii=False, default=str
+        )
+        async with write_lock:
+            if not writer.is_closing():
+                writer.write(line.encode() + b"\n")
+                await writer.drain()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.clients += 1
+        self.connections += 1
+        write_lock = asyncio.Lock()
+        calls = set()
+        try:
+            while line := await reader.readline():
+                self.last_active = time.monotonic()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    # A bad line is answered on its own; the connection and its other calls go on
+                    await self._reply(
+                        {"id": None, "error": f"malformed request: {e}"},
+                        writer,
+                        write_lock,
+                    )
+                    continue
+                task = asyncio.create_task(
+                    self._serve_call(request, writer, write_lock)
+                )
+                calls.add(task)
+                task.add_done_callback(calls.discard)
+        except (OSError, ValueError):
+            # The front-end went away, or sent a line over DAEMON_MAX_MESSAGE
+            pass
+        finally:
+            # Calls in flight still finish before the connection closes: they may be order writes
+            if calls:
+                await asyncio.gather(*calls, return_exceptions=True)
+            self.clients -= 1
+            self.last_active = time.monotonic()
+            writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "socket": self.path,
+            "pid": os.getpid(),
+            "clients": self.clients,
+            "connections": self.connections,
+            "calls": self.calls,
+            "uptime": round(time.time() - self.started, 1),
+        }
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self) -> bool:
+        """Serve until stopped or idle; returns False if another daemon already owns the socket."""
+        import fcntl
+        import signal
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stop.set)
+        try:
+            # A socket file left by a daemon that died is stale: we hold the lock
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            async with server_lifespan(mcp):
+                umask = os.umask(0o177)
+                try:
+                    server = await asyncio.start_unix_server(
+                        self._handle, self.path, limit=DAEMON_MAX_MESSAGE
+                    )
+                finally:
+                    os.umask(umask)
+                print(f"🚀 Fyers MCP daemon listening on {self.path}", file=sys.stderr)
+                async with server:
+                    while not self._stop.is_set():
+                        try:
+                            await asyncio.wait_for(
+                                self._stop.wait(),
+                                timeout=min(self.idle, 5) if self.idle > 0 else None,
+                            )
+                        except asyncio.TimeoutError:
+                            pass
+                        if (
+                            self.idle > 0
+                            and self.clients == 0
+                            and time.monotonic() - self.last_active >= self.idle
+                        ):
+                            break
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            lock.close()
+        return True
+
+
+daemon_server: Optional[DaemonServer] = None
+
+
+async def run_daemon() -> int:
+    global daemon_server
+    daemon_server = DaemonServer(DAEMON_SOCKET)
+    if not await daemon_server.run():
+        print(f"A daemon is already running on {DAEMON_SOCKET}", file=sys.stderr)
+    return 0
+
 
 if __name__ == "__main__":
-    print("🚀 Starting Smart Fyers MCP Server...")
+    if "--daemon" in sys.argv[1:]:
+        sys.exit(asyncio.run(run_daemon()))
+    print("🚀 Starting Smart Fyers MCP Server...", file=sys.stderr)
     try:
         mcp.run(transport="stdio")
     except Exception as e:
-        print(f"❌ Server failed to start: {e}")
-        sys.exit(1)
\ No newline at end of file
+        print(f"❌ Server failed to start: {e}", file=sys.stderr)
+        sys.exit(1)
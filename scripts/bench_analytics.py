@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Portfolio analytics benchmark on synthetic holdings and positions.
+
+Times array loading and the vectorized analytics pass at growing portfolio
+sizes, next to the per-holding Python loop used for text rendering.
+
+Usage:  python scripts/bench_analytics.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import fyers_mcp_complete as server
+
+
+def synthetic_portfolio(size: int):
+    rng = random.Random(size)
+    exchanges = ["NSE", "BSE", "MCX"]
+    holdings = [
+        {
+            "symbol": f"{rng.choice(exchanges)}:SYM{i}-EQ",
+            "quantity": rng.randint(1, 500),
+            "ltp": rng.uniform(10, 5000),
+            "costPrice": rng.uniform(10, 5000),
+        }
+        for i in range(size // 2)
+    ]
+    positions = [
+        {
+            "symbol": f"{rng.choice(exchanges)}:POS{i}-EQ",
+            "qty": rng.randint(1, 500),
+            "side": rng.choice([1, -1]),
+            "avgPrice": rng.uniform(10, 5000),
+            "ltp": rng.uniform(10, 5000),
+        }
+        for i in range(size - size // 2)
+    ]
+    sectors = {h["symbol"]: f"Sector{i % 12}" for i, h in enumerate(holdings)}
+    return holdings, positions, sectors
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes):
+    print(
+        f"{'positions':>10} | {'load arrays':>12} | {'analytics':>10} | {'loop records':>12}"
+    )
+    for size in sizes:
+        holdings, positions, sectors = synthetic_portfolio(size)
+        symbols, numeric = server.portfolio_arrays(holdings, positions)
+        load = best_of(lambda: server.portfolio_arrays(holdings, positions))
+        analytics = best_of(
+            lambda: server.compute_portfolio_analytics(symbols, numeric, sectors)
+        )
+        loop = best_of(
+            lambda: server.holding_records(
+                holdings
+                + [
+                    {
+                        "symbol": p["symbol"],
+                        "qty": p["qty"],
+                        "ltp": p["ltp"],
+                        "costPrice": p["avgPrice"],
+                    }
+                    for p in positions
+                ]
+            )
+        )
+        print(
+            f"{size:>10} | {load * 1000:9.2f} ms | {analytics * 1000:7.2f} ms | {loop * 1000:9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000]
+    )
+    args = parser.parse_args()
+    main(args.sizes)
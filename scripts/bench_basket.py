@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Basket order benchmark: N single place_order calls vs one basket call.
+
+Compares sequential place_order tool calls with place_basket_orders via the
+multi-order endpoint and via bounded single-order fan-out.
+
+Usage:  python scripts/bench_basket.py --legs 40 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_fyers import start_mock
+
+
+async def main(legs: int, latency: float):
+    runner, base_url = await start_mock(latency)
+    # Lift client-side pacing so the benchmark measures submission paths
+    for bucket in ("PER_SECOND", "PER_MINUTE", "ORDER", "ACCOUNT", "DATA"):
+        os.environ[f"FYERS_RATE_LIMIT_{bucket}"] = "100000"
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_ACCESS_TOKEN": "mock-token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            # Synthetic basket symbols are not in the mock symbol master and have no real quotes
+            "FYERS_SYMBOL_VALIDATION": "0",
+            "FYERS_RISK_PRICE_BAND": "0",
+            # The same basket is sent three times on purpose
+            "FYERS_RISK_DUPLICATE_WINDOW": "0",
+            # The Fyers order socket is not simulated
+            "FYERS_ORDER_STREAM": "0",
+        }
+    )
+    import fyers_mcp_complete as server
+
+    basket = [
+        {
+            "symbol": f"NSE:STOCK{i}-EQ",
+            "quantity": 1 + i % 5,
+            "order_type": "LIMIT",
+            "side": "BUY" if i % 2 else "SELL",
+            "limit_price": 100.0 + i,
+        }
+        for i in range(legs)
+    ]
+
+    try:
+        await server.get_profile()
+
+        start = time.perf_counter()
+        for spec in basket:
+            await server.place_order(
+                spec["symbol"],
+                spec["quantity"],
+                spec["order_type"],
+                spec["side"],
+                limit_price=spec["limit_price"],
+            )
+        sequential = time.perf_counter() - start
+
+        server.BASKET_MULTI_ORDER = True
+        runner.app["hits"].clear()
+        start = time.perf_counter()
+        multi_result = await server.place_basket_orders(basket)
+        multi = time.perf_counter() - start
+        multi_calls = sum(runner.app["hits"].values())
+
+        server.BASKET_MULTI_ORDER = False
+        runner.app["hits"].clear()
+        start = time.perf_counter()
+        fanout_result = await server.place_basket_orders(basket)
+        fanout = time.perf_counter() - start
+        fanout_calls = sum(runner.app["hits"].values())
+
+        print(
+            f"{legs}-leg basket, mock latency {latency * 1000:.0f} ms, fan-out concurrency {server.BASKET_CONCURRENCY}"
+        )
+        print(
+            f"sequential place_order : {sequential * 1000:8.1f} ms | {legs} upstream calls"
+        )
+        print(
+            f"basket (multi-order)   : {multi * 1000:8.1f} ms | {multi_calls} upstream calls | {multi_result.splitlines()[0]}"
+        )
+        print(
+            f"basket (fan-out)       : {fanout * 1000:8.1f} ms | {fanout_calls} upstream calls | {fanout_result.splitlines()[0]}"
+        )
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--legs", type=int, default=40)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Mock per-request latency in seconds",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.legs, args.latency))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: N concurrent MCP tool calls against the local mock Fyers API.
+
+Usage:  python scripts/bench_concurrency.py --calls 20 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_fyers import start_mock
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def main(calls: int, latency: float, with_cache: bool):
+    runner, base_url = await start_mock(latency)
+    if not with_cache:
+        # Measure upstream concurrency, not cache hits
+        for endpoint in ("PROFILE", "FUNDS", "HOLDINGS", "POSITIONS", "ORDERS"):
+            os.environ[f"FYERS_CACHE_TTL_{endpoint}"] = "0"
+    # Lift client-side pacing so the benchmark measures the transport
+    for bucket in ("PER_SECOND", "PER_MINUTE", "ORDER", "ACCOUNT", "DATA"):
+        os.environ[f"FYERS_RATE_LIMIT_{bucket}"] = "100000"
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_ACCESS_TOKEN": "mock-token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+        }
+    )
+    import fyers_mcp_complete as server
+
+    tools = [
+        lambda: server.get_quotes("NSE:SBIN-EQ,NSE:RELIANCE-EQ"),
+        server.get_positions,
+        server.get_holdings,
+        server.get_funds,
+        server.get_orders,
+    ]
+
+    try:
+        # Warm the keep-alive pool so connection setup isn't measured
+        await server.get_profile()
+
+        start = time.perf_counter()
+        sequential = [await timed(tools[i % len(tools)]()) for i in range(calls)]
+        sequential_wall = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = await asyncio.gather(
+            *(timed(tools[i % len(tools)]()) for i in range(calls))
+        )
+        concurrent_wall = time.perf_counter() - start
+
+        print(
+            f"{calls} tool calls, mock latency {latency * 1000:.0f} ms, pool size {server.FYERS_POOL_SIZE}"
+        )
+        for label, samples, wall in (
+            ("sequential", sequential, sequential_wall),
+            ("concurrent", concurrent, concurrent_wall),
+        ):
+            print(
+                f"{label:>10}: wall {wall * 1000:8.1f} ms | "
+                f"p50 {percentile(samples, 50) * 1000:7.1f} ms | "
+                f"p99 {percentile(samples, 99) * 1000:7.1f} ms | "
+                f"mean {statistics.mean(samples) * 1000:7.1f} ms"
+            )
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Mock per-request latency in seconds",
+    )
+    parser.add_argument(
+        "--with-cache", action="store_true", help="Keep the read cache enabled"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency, args.with_cache))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Shared state daemon: run several stdio front-ends the way separate MCP hosts
+would, once each with its own state and once with FYERS_DAEMON=1, and compare
+the upstream calls they cost against the local mock.
+
+Also checks that the first front-end starts exactly one daemon, that a
+front-end recovers when the daemon is killed (a new one is started), and
+that the daemon exits once it has been idle.
+
+Usage:  python scripts/bench_daemon.py --sessions 4 --rounds 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+
+from bench_startup import SERVER, response, send
+from mock_fyers import start_mock
+
+CALLS = [
+    ("get_profile", {}),
+    ("get_funds", {}),
+    ("get_positions", {}),
+    ("get_orders", {}),
+    ("get_quotes", {"symbols": "NSE:SBIN-EQ,NSE:TCS-EQ"}),
+]
+
+
+class Session:
+    """One stdio server process, driven over JSON-RPC like an MCP host."""
+
+    def __init__(self, env):
+        self.env = env
+        self.proc = None
+        self.ids = iter(range(1, 1_000_000))
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable,
+            SERVER,
+            env=self.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await self.request(
+            "initialize",
+            {
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "bench", "version": "0"},
+            },
+        )
+        await send(self.proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def request(self, method, params):
+        request_id = next(self.ids)
+        await send(
+            self.proc,
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params},
+        )
+        return await response(self.proc, request_id)
+
+    async def call(self, tool, arguments):
+        result = await self.request(
+            "tools/call", {"name": tool, "arguments": arguments}
+        )
+        return "".join(block.get("text", "") for block in result["result"]["content"])
+
+    async def close(self):
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 5)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+
+
+async def run_sessions(env, sessions: int, rounds: int):
+    """Start the sessions and have each make ``rounds`` passes over CALLS; returns (sessions, seconds, failed calls)."""
+    started = [Session(env) for _ in range(sessions)]
+    await asyncio.gather(*(s.start() for s in started))
+    failed = 0
+    start = time.perf_counter()
+
+    async def drive(session):
+        nonlocal failed
+        for _ in range(rounds):
+            for tool, arguments in CALLS:
+                failed += (await session.call(tool, arguments)).startswith("❌")
+
+    await asyncio.gather(*(drive(s) for s in started))
+    return started, time.perf_counter() - start, failed
+
+
+async def wait_for(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def main(sessions: int, rounds: int, latency: float):
+    runner, base_url = await start_mock(latency)
+    app = runner.app
+    data_dir = tempfile.mkdtemp(prefix="fyers-daemon-")
+    socket_path = os.path.join(data_dir, "daemon.sock")
+    env = {
+        **os.environ,
+        "FYERS_CLIENT_ID": "MOCK-100",
+        "FYERS_ACCESS_TOKEN": "mock-token",
+        "FYERS_API_URL": f"{base_url}/api/v3",
+        "FYERS_DATA_URL": f"{base_url}/data",
+        "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+        "FYERS_DATA_DIR": data_dir,
+        "FYERS_ORDER_STREAM": "0",
+        "FYERS_DAEMON_IDLE": "2",
+    }
+    checks = []
+    try:
+        print(
+            f"{sessions} front-ends x {rounds} rounds of {len(CALLS)} tools, mock latency {latency * 1000:.0f} ms"
+        )
+        for label, daemon in (("separate processes", "0"), ("shared daemon", "1")):
+            app["hits"].clear()
+            started, elapsed, failed = await run_sessions(
+                {**env, "FYERS_DAEMON": daemon}, sessions, rounds
+            )
+            upstream = {
+                path: n
+                for path, n in app["hits"].items()
+                if not path.startswith("/sym_details")
+            }
+            print(
+                f"{label:<20}: {sum(upstream.values()):4d} upstream calls | {elapsed * 1000:7.1f} ms | {failed} failed | {dict(sorted(upstream.items()))}"
+            )
+            if daemon == "0":
+                separate = sum(upstream.values())
+                for session in started:
+                    await session.close()
+                continue
+            print(
+                "(the shared daemon time includes starting the daemon on the first call)"
+            )
+
+            checks.append(("every call answered through the daemon", failed == 0))
+            checks.append(
+                (
+                    f"daemon needs fewer upstream calls ({sum(upstream.values())} vs {separate})",
+                    sum(upstream.values()) < separate,
+                )
+            )
+            checks.append(
+                (
+                    "funds fetched once for all front-ends",
+                    upstream.get("/api/v3/funds") == 1,
+                )
+            )
+            metrics = json.loads(
+                await started[0].call("get_server_metrics", {"output_format": "json"})
+            )["data"]["daemon"]
+            checks.append(
+                (
+                    f"one daemon serves all {sessions} front-ends",
+                    metrics["clients"] == sessions,
+                )
+            )
+
+            os.kill(metrics["pid"], signal.SIGKILL)
+            await asyncio.sleep(0.2)
+            lost = await started[0].call("get_funds", {})
+            recovered = await started[0].call("get_funds", {})
+            checks.append(
+                (
+                    "a call after the daemon dies starts a new one",
+                    recovered.startswith("✅")
+                    and not lost.startswith("❌ Fyers daemon error"),
+                )
+            )
+            restarted = json.loads(
+                await started[1].call("get_server_metrics", {"output_format": "json"})
+            )["data"]["daemon"]
+            checks.append(
+                (
+                    "other front-ends reconnect to the new daemon",
+                    restarted["pid"] != metrics["pid"],
+                )
+            )
+
+            for session in started:
+                await session.close()
+            checks.append(
+                (
+                    "daemon exits once idle",
+                    await wait_for(lambda: not os.path.exists(socket_path), 10),
+                )
+            )
+    finally:
+        await runner.cleanup()
+
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        default=4,
+        help="Front-end processes, one per simulated MCP host",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=3, help="Passes over the tool list per front-end"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Mock per-request latency in seconds",
+    )
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.sessions, args.rounds, args.latency)) else 1)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Trade journal: check that order writes and fills are recorded once, and time
+queries over months of history.
+
+The first part places, modifies and cancels orders (single and basket)
+against the mock Fyers API, feeds partial and complete fills through the order
+book as the order socket or a REST sync would, and checks the journal rows,
+strategy tags and realized P&L, including after reopening the database. The
+second part loads a synthetic history into a fresh journal and times
+query_trade_journal's queries over it.
+
+Usage:  python scripts/bench_journal.py [--days 120] [--fills-per-day 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_fyers import start_mock
+
+
+def placed_id(result: str) -> str:
+    return result.split("Order ID: ")[1].split("\n")[0]
+
+
+async def check_recording(server, app):
+    client = server.get_fyers_client()
+    journal = server.get_trade_journal()
+    checks = []
+
+    def fill(order_id, filled, price, status=6):
+        order = {
+            **app["orders"][order_id],
+            "status": status,
+            "filledQty": filled,
+            "tradedPrice": price,
+        }
+        app["orders"][order_id] = order
+        client.order_book.apply(order)
+
+    buy = placed_id(
+        await server.place_order(
+            "NSE:SBIN-EQ", 10, "LIMIT", "BUY", limit_price=600, strategy="momentum"
+        )
+    )
+    sell = placed_id(
+        await server.place_order(
+            "NSE:SBIN-EQ", 10, "LIMIT", "SELL", limit_price=610, strategy="momentum"
+        )
+    )
+    fill(buy, 10, 600.0, status=2)
+    fill(sell, 4, 610.0)
+    fill(sell, 10, 612.0, status=2)
+    # Seen again from a REST sync: already recorded
+    client.order_book.orders.pop(sell)
+    client.order_book.apply(app["orders"][sell])
+    journal.flush()
+    rows = journal.db.execute(
+        "SELECT qty, price, strategy FROM fills WHERE order_id = ? ORDER BY filled_qty",
+        (sell,),
+    ).fetchall()
+    checks.append(
+        ("a partial and a final fill give two rows", [r[0] for r in rows] == [4, 6])
+    )
+    checks.append(
+        (
+            "the second fill is priced from the moving average",
+            abs(rows[1][1] - (6120 - 2440) / 6) < 1e-9,
+        )
+    )
+    checks.append(
+        (
+            "fills carry the strategy of their order",
+            {r[2] for r in rows} == {"momentum"},
+        )
+    )
+
+    result = journal.query(strategy="momentum")["total"]
+    checks.append(
+        (
+            "realized P&L on matched quantity at average prices",
+            result["realized_pnl"] == 120.0,
+        )
+    )
+    checks.append(("turnover counts both sides", result["turnover"] == 6000.0 + 6120.0))
+
+    pending = placed_id(
+        await server.place_order(
+            "NSE:TCS-EQ", 1, "LIMIT", "BUY", limit_price=3500, strategy="meanrev"
+        )
+    )
+    await server.modify_order(pending, limit_price=3490)
+    await server.cancel_order(pending)
+    journal.flush()
+    actions = journal.db.execute(
+        "SELECT action, strategy, symbol FROM submissions WHERE order_id = ? ORDER BY seq",
+        (pending,),
+    ).fetchall()
+    checks.append(
+        (
+            "place, modify and cancel are logged in order",
+            [a[0] for a in actions] == ["place", "modify", "cancel"],
+        )
+    )
+    checks.append(
+        (
+            "modify and cancel inherit the strategy and symbol",
+            all(a[1] == "meanrev" and a[2] == "NSE:TCS-EQ" for a in actions),
+        )
+    )
+
+    await server.place_basket_orders(
+        [
+            {
+                "symbol": "NSE:SBIN-EQ",
+                "quantity": 1,
+                "order_type": "LIMIT",
+                "side": "BUY",
+                "limit_price": 600,
+                "strategy": "pairs",
+            },
+            {
+                "symbol": "NSE:RELIANCE-EQ",
+                "quantity": 1,
+                "order_type": "LIMIT",
+                "side": "SELL",
+                "limit_price": 2500,
+                "strategy": "pairs",
+            },
+        ],
+        allow_duplicates=True,
+    )
+    journal.flush()
+    legs = journal.db.execute(
+        "SELECT order_id, ok FROM submissions WHERE strategy = 'pairs'"
+    ).fetchall()
+    checks.append(
+        (
+            "each basket leg is logged with its own order ID",
+            len(legs) == 2 and all(leg[0] and leg[1] == 1 for leg in legs),
+        )
+    )
+
+    text = await server.query_trade_journal()
+    checks.append(
+        (
+            "query_trade_journal reports per-strategy stats",
+            "momentum: P&L ₹+120.00" in text and "pairs:" in text,
+        )
+    )
+    checks.append(
+        (
+            "an unknown group_by is rejected",
+            (await server.query_trade_journal(group_by="week")).startswith("❌"),
+        )
+    )
+
+    # A new session on the same file sees the history and does not record the fill again
+    journal.close()
+    server.trade_journal = None
+    client.order_book.orders.pop(buy)
+    client.order_book.apply(app["orders"][buy])
+    reopened = server.get_trade_journal()
+    reopened.flush()
+    checks.append(
+        (
+            "history survives a restart without duplicates",
+            reopened.query(strategy="momentum")["total"]["fills"] == 3,
+        )
+    )
+    return checks
+
+
+def load_history(journal, days: int, fills_per_day: int, seed: int = 1):
+    """Fill ``journal`` with ``days`` trading days of random round trips."""
+    rng = random.Random(seed)
+    symbols = [f"NSE:SYM{i:03d}-EQ" for i in range(100)]
+    strategies = ["momentum", "meanrev", "pairs", "breakout", ""]
+    day = date(2026, 1, 1)
+    rows = []
+    order = 0
+    for _ in range(days):
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        stamp = day.isoformat()
+        for _ in range(fills_per_day // 2):
+            symbol, strategy = rng.choice(symbols), rng.choice(strategies)
+            qty, price = rng.randint(1, 100), rng.uniform(100, 3000)
+            for side, fill_price in ((1, price), (-1, price * rng.uniform(0.98, 1.02))):
+                order += 1
+                rows.append(
+                    (
+                        "default",
+                        f"O{order}",
+                        qty,
+                        qty * fill_price,
+                        0.0,
+                        stamp,
+                        symbol,
+                        side,
+                        qty,
+                        fill_price,
+                        "INTRADAY",
+                        strategy,
+                    )
+                )
+        day += timedelta(days=1)
+    journal.db.execute("BEGIN")
+    journal.db.executemany(
+        "INSERT INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+    )
+    journal.db.execute("COMMIT")
+    return len(rows), rows[0][5], rows[-1][5]
+
+
+def time_query(journal, repeat: int, **kwargs):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        journal.query(**kwargs)
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2]
+
+
+async def main(days: int, fills_per_day: int, repeat: int):
+    runner, base_url = await start_mock(0.005)
+    app = runner.app
+    data_dir = tempfile.mkdtemp(prefix="fyers-journal-")
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_ACCESS_TOKEN": "mock-token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            "FYERS_DATA_DIR": data_dir,
+            "FYERS_ORDER_STREAM": "0",
+            "FYERS_RISK_CHECKS": "0",
+        }
+    )
+    import fyers_mcp_complete as server
+
+    try:
+        checks = await check_recording(server, app)
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+    journal = server.TradeJournal(os.path.join(data_dir, "history.sqlite3"))
+    journal.flush()
+    start = time.perf_counter()
+    count, first, last = load_history(journal, days, fills_per_day)
+    print(
+        f"loaded {count:,} fills from {first} to {last} in {time.perf_counter() - start:.1f} s "
+        f"({os.path.getsize(journal.path) / 1e6:.0f} MB)"
+    )
+    start = time.perf_counter()
+    journal.query()
+    rollup = journal.db.execute("SELECT COUNT(*) FROM daily_totals").fetchone()[0]
+    print(
+        f"first query reads {rollup:,} daily totals rows in {(time.perf_counter() - start) * 1000:.1f} ms\n"
+    )
+    month = (date.fromisoformat(last) - timedelta(days=30)).isoformat()
+    queries = [
+        ("all history by strategy", {}),
+        ("all history by symbol", {"group_by": "symbol"}),
+        ("all history by day", {"group_by": "day"}),
+        ("last 30 days by strategy", {"start_day": month}),
+        ("one symbol, all history", {"symbol": "NSE:SYM042-EQ"}),
+        ("one strategy, last 30 days", {"start_day": month, "strategy": "pairs"}),
+    ]
+    print(f"{'query':<28} {'p50 ms':>8}")
+    for label, kwargs in queries:
+        print(f"{label:<28} {time_query(journal, repeat, **kwargs) * 1000:>8.1f}")
+    journal.close()
+
+    print()
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--days", type=int, default=120, help="Trading days of synthetic history"
+    )
+    parser.add_argument(
+        "--fills-per-day", type=int, default=1000, help="Synthetic fills per day"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.days, args.fills_per_day, args.repeat)) else 1)
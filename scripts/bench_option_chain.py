@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Option chains: check get_option_chain against the mock Fyers API and time the
+vectorized implied volatility and Greeks.
+
+The mock prices every contract with Black-76 on a known volatility smile, so
+the checks compare the implied volatilities the server solves for with the
+smile, and its Greeks with finite differences of the same pricer. They also
+verify that a chain costs one upstream request, that repeat calls are served
+from the cache and that strike filtering and expiry selection work. The
+timing part solves the chain in one batch and contract by contract.
+
+Usage:  python scripts/bench_option_chain.py [--contracts 10000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_fyers import OPTION_RATE, option_vol, start_mock
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """Best wall time of ``fn()`` in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(contracts: int, latency: float):
+    runner, base_url = await start_mock(latency)
+    app = runner.app
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_ACCESS_TOKEN": "mock-token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-options-"),
+            "FYERS_ORDER_STREAM": "0",
+            "FYERS_RISK_FREE_RATE": str(OPTION_RATE),
+            "FYERS_CACHE_TTL_OPTION_CHAIN": "30",
+        }
+    )
+    import numpy as np
+
+    import fyers_mcp_complete as server
+
+    checks = []
+    hits = lambda: app["hits"]["/data/options-chain-v3"]
+
+    try:
+        start = time.perf_counter()
+        chain = json.loads(
+            await server.get_option_chain(
+                "NSE:NIFTY50-INDEX", strike_count=50, output_format="json"
+            )
+        )["data"]
+        cold = time.perf_counter() - start
+        checks.append(
+            (
+                f"101 strikes from one upstream request ({hits()})",
+                len(chain["strikes"]) == 101 and hits() == 1,
+            )
+        )
+
+        years = chain["days_to_expiry"] / 365
+        legs = [
+            (row["strike"], leg, sign)
+            for row in chain["strikes"]
+            for leg, sign in ((row["call"], 1), (row["put"], -1))
+        ]
+        errors = [
+            abs(leg["iv"] - option_vol(strike, chain["forward"]))
+            for strike, leg, _ in legs
+            if leg["iv"] is not None
+        ]
+        checks.append(
+            (
+                f"IV matches the smile for all {len(errors)} solved contracts (max error {max(errors):.1e})",
+                max(errors) < 1e-4,
+            )
+        )
+        # Far wings are worth (almost) nothing this close to expiry and have no meaningful IV
+        discount = np.exp(-chain["rate"] * years)
+        time_value = [
+            leg["ltp"] - discount * max(sign * (chain["forward"] - strike), 0)
+            for strike, leg, sign in legs
+        ]
+        unsolved = [
+            value for (_, leg, _), value in zip(legs, time_value) if leg["iv"] is None
+        ]
+        checks.append(
+            (
+                f"every contract with time value is solved ({len(unsolved)} without)",
+                all(value < 0.5 for value in unsolved),
+            )
+        )
+
+        # Greeks against central differences of the pricer, spot held at a constant carry
+        strike, leg, sign = legs[len(legs) // 2 + 7]
+        spot, sigma, r = chain["spot"], leg["iv"], chain["rate"]
+
+        def price(s=spot, t=years, vol=sigma):
+            return float(server.black76(s * np.exp(r * t), strike, t, r, vol, sign)[0])
+
+        h, dt = spot * 1e-4, 1 / 365 / 24
+        numeric = {
+            "delta": (price(spot + h) - price(spot - h)) / (2 * h),
+            "gamma": (price(spot + h) - 2 * price() + price(spot - h)) / (h * h),
+            "theta": (price(t=years - dt) - price(t=years + dt)) / (2 * dt) / 365,
+            "vega": (price(vol=sigma + 1e-4) - price(vol=sigma - 1e-4)) / 2e-4 / 100,
+        }
+        greeks = server.option_greeks(
+            spot, spot * np.exp(r * years), strike, years, r, sigma, sign
+        )
+        close = {
+            name: abs(float(greeks[name]) - value) <= 1e-3 * max(1.0, abs(value))
+            for name, value in numeric.items()
+        }
+        checks.append(
+            (
+                f"Greeks match finite differences ({', '.join(f'{n} {v:.4g}' for n, v in numeric.items())})",
+                all(close.values()),
+            )
+        )
+        parity = [
+            row["call"]["delta"] - row["put"]["delta"]
+            for row in chain["strikes"]
+            if row["call"]["iv"] and row["put"]["iv"]
+        ]
+        checks.append(
+            (
+                f"call delta - put delta is 1 at the {len(parity)} strikes with both IVs",
+                max(abs(d - 1) for d in parity) < 2e-4,
+            )
+        )
+
+        before = hits()
+        start = time.perf_counter()
+        await server.get_option_chain(
+            "NSE:NIFTY50-INDEX", strike_count=50, output_format="json"
+        )
+        cached = time.perf_counter() - start
+        checks.append(
+            (
+                f"repeat call served from the cache ({cached * 1000:.1f} ms vs {cold * 1000:.1f} ms cold)",
+                hits() == before,
+            )
+        )
+
+        narrow = json.loads(
+            await server.get_option_chain(
+                "NSE:NIFTY50-INDEX",
+                strike_count=50,
+                min_strike=23800,
+                max_strike=24200,
+                output_format="json",
+            )
+        )["data"]
+        checks.append(
+            (
+                "strike range filter keeps 23800-24200 only",
+                [row["strike"] for row in narrow["strikes"]]
+                == list(range(23800, 24201, 50))
+                and hits() == before,
+            )
+        )
+
+        client = server.get_fyers_client()
+        later = list(client.option_expiries["NSE:NIFTY50-INDEX"])[1]
+        chain = json.loads(
+            await server.get_option_chain(
+                "NSE:NIFTY50-INDEX", expiry=later, output_format="json"
+            )
+        )["data"]
+        checks.append(
+            (
+                f"expiry {later} fetched by date in one request",
+                chain["expiry"] == later and hits() == before + 1,
+            )
+        )
+        result = await server.get_option_chain("NSE:NIFTY50-INDEX", expiry="2001-01-01")
+        checks.append(
+            (
+                "unknown expiry is rejected with the listed ones",
+                result.startswith("❌ No 2001-01-01 expiry") and later in result,
+            )
+        )
+        result = await server.get_option_chain("NSE:SBIN-EQ", strike_count=5)
+        checks.append(
+            (
+                "text output for a stock chain",
+                result.startswith("📊 NSE:SBIN-EQ Option Chain") and "◀ ATM" in result,
+            )
+        )
+
+        # Timing: one batch against a solve per contract, on the chain and on a large synthetic book
+        rng = np.random.default_rng(1)
+        n = contracts
+        forward = 24000.0
+        strikes = rng.uniform(0.7, 1.3, n) * forward
+        years = rng.uniform(2, 90, n) / 365
+        signs = np.where(rng.random(n) < 0.5, 1.0, -1.0)
+        vols = np.array([option_vol(k, forward) for k in strikes])
+        prices = server.black76(forward, strikes, years, OPTION_RATE, vols, signs)[0]
+        solved = server.implied_volatility(
+            prices, forward, strikes, years, OPTION_RATE, signs
+        )
+        ok = ~np.isnan(solved)
+        print(
+            f"synthetic book: {ok.sum()}/{n} solved, max IV error {np.abs(solved[ok] - vols[ok]).max():.1e}"
+        )
+        print(f"{'batch':<26} {'contracts':>9} {'total ms':>9} {'us/contract':>12}")
+        for label, size in (("one chain", 202), ("synthetic book", n)):
+            args = (
+                prices[:size],
+                forward,
+                strikes[:size],
+                years[:size],
+                OPTION_RATE,
+                signs[:size],
+            )
+            batch = timed(lambda: server.implied_volatility(*args))
+            loop_size = min(size, 500)
+            loop = (
+                timed(
+                    lambda: [
+                        server.implied_volatility(
+                            prices[i],
+                            forward,
+                            strikes[i],
+                            years[i],
+                            OPTION_RATE,
+                            signs[i],
+                        )
+                        for i in range(loop_size)
+                    ],
+                    1,
+                )
+                * size
+                / loop_size
+            )
+            greeks = timed(
+                lambda: server.option_greeks(
+                    forward,
+                    forward,
+                    strikes[:size],
+                    years[:size],
+                    OPTION_RATE,
+                    vols[:size],
+                    signs[:size],
+                )
+            )
+            print(
+                f"{label + ' IV, vectorized':<26} {size:>9} {batch * 1000:>9.2f} {batch / size * 1e6:>12.2f}"
+            )
+            print(
+                f"{label + ' IV, per contract':<26} {size:>9} {loop * 1000:>9.2f} {loop / size * 1e6:>12.2f}"
+            )
+            print(
+                f"{label + ' Greeks':<26} {size:>9} {greeks * 1000:>9.2f} {greeks / size * 1e6:>12.2f}"
+            )
+        print()
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--contracts",
+        type=int,
+        default=10000,
+        help="Contracts in the synthetic book for the timing run",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Mock per-request latency in seconds",
+    )
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.contracts, args.latency)) else 1)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Pre-trade risk engine: check that bad orders are stopped locally, and time
+each check.
+
+The first part drives place_order and place_basket_orders against the mock
+Fyers API and verifies that unknown order types, fat-finger prices, oversized
+orders, position and margin breaches and duplicates are rejected without an
+upstream call, and that margin held by an order is released when it is
+cancelled. The second part times every check on the engine's in-memory state.
+
+Usage:  python scripts/bench_risk.py [--iterations 100000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_fyers import start_mock
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def time_calls(fn, iterations: int):
+    """Per-call latencies of ``fn()`` in seconds."""
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(iterations):
+        start = clock()
+        fn()
+        samples.append(clock() - start)
+    return [ns / 1e9 for ns in samples]
+
+
+async def main(iterations: int, latency: float):
+    runner, base_url = await start_mock(latency)
+    app = runner.app
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_ACCESS_TOKEN": "mock-token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-risk-"),
+            "FYERS_ORDER_STREAM": "0",
+            "FYERS_RISK_MAX_NOTIONAL": "500000",
+            "FYERS_RISK_MAX_POSITION": "100",
+        }
+    )
+    import fyers_mcp_complete as server
+
+    client = server.get_fyers_client()
+    checks = []
+
+    def sent():
+        return (
+            app["hits"]["/api/v3/orders/sync"] + app["hits"]["/api/v3/multi-order/sync"]
+        )
+
+    async def rejected(label, call, expect):
+        before = sent()
+        result = await call
+        checks.append(
+            (label, result.startswith("❌") and expect in result and sent() == before)
+        )
+
+    try:
+        result = await server.place_order(
+            "NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610
+        )
+        checks.append(("a sane order goes through", result.startswith("✅")))
+
+        await rejected(
+            "unknown order_type is rejected, not sent as LIMIT",
+            server.place_order("NSE:SBIN-EQ", 1, "LIMT", "BUY", limit_price=610),
+            "unknown order_type",
+        )
+        await rejected(
+            "unknown side is rejected, not sent as BUY",
+            server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BYU", limit_price=610),
+            "unknown side",
+        )
+        await rejected(
+            "fat-finger limit price is outside the band",
+            server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=6125),
+            "above the last price",
+        )
+        await rejected(
+            "order value over the notional limit",
+            server.place_order("NSE:RELIANCE-EQ", 300, "MARKET", "BUY"),
+            "over the ₹500,000.00 limit",
+        )
+        await rejected(
+            "position limit counts the held position",
+            server.place_order("NSE:INFY-EQ", 95, "LIMIT", "BUY", limit_price=1460),
+            "over the 100 limit",
+        )
+        result = await server.place_order(
+            "NSE:INFY-EQ", 95, "LIMIT", "SELL", limit_price=1460
+        )
+        checks.append(
+            ("reducing the same position is allowed", result.startswith("✅"))
+        )
+        await rejected(
+            "margin above the available funds",
+            server.place_order(
+                "NSE:TCS-EQ", 80, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+            ),
+            "margin",
+        )
+        await rejected(
+            "an identical order a moment later is a duplicate",
+            server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610),
+            "identical order",
+        )
+        result = await server.place_order(
+            "NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610, allow_duplicate=True
+        )
+        checks.append(("allow_duplicate sends it anyway", result.startswith("✅")))
+
+        # Margin held by a sent order counts until the broker reports it cancelled
+        result = await server.place_order(
+            "NSE:TCS-EQ", 60, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+        )
+        big = result.split("Order ID: ")[1].split("\n")[0]
+        await rejected(
+            "margin held by an open order is not available again",
+            server.place_order(
+                "NSE:TCS-EQ", 20, "LIMIT", "BUY", product_type="CNC", limit_price=3485
+            ),
+            "margin",
+        )
+        await server.cancel_order(big)
+        await server.get_orders()
+        result = await server.place_order(
+            "NSE:TCS-EQ", 20, "LIMIT", "BUY", product_type="CNC", limit_price=3485
+        )
+        checks.append(("cancelling it releases the margin", result.startswith("✅")))
+
+        await rejected(
+            "one bad leg stops the whole basket",
+            server.place_basket_orders(
+                [
+                    {
+                        "symbol": "NSE:SBIN-EQ",
+                        "quantity": 2,
+                        "order_type": "LIMIT",
+                        "side": "BUY",
+                        "limit_price": 611,
+                    },
+                    {
+                        "symbol": "NSE:TCS-EQ",
+                        "quantity": 1,
+                        "order_type": "LIMIT",
+                        "side": "SELL",
+                        "limit_price": 34.9,
+                    },
+                ]
+            ),
+            "Leg 2: limit_price",
+        )
+        await rejected(
+            "modify_order checks the new price against the band",
+            server.modify_order(big, limit_price=349),
+            "below the last price",
+        )
+
+        # Per-check latency on the state built up above
+        risk = client.risk
+        order = server.build_order_data(
+            "NSE:INFY-EQ", 5, "LIMIT", "BUY", "MARGIN", 1461, 0, "DAY"
+        )
+        prepared = risk.prepare(order)
+        rows = [("prepare", lambda: risk.prepare(order))]
+        rows += [
+            (name, lambda fn=getattr(risk, f"check_{name}"): fn(prepared))
+            for name in risk.CHECKS
+        ]
+
+        def full_check():
+            problem, hold = risk.check(order, allow_duplicate=True)
+            risk.settle([hold], [None])
+
+        rows.append(("check + settle", full_check))
+        print(f"{'check':<16} {'mean us':>8} {'p50 us':>8} {'p99 us':>8}")
+        for name, fn in rows:
+            samples = time_calls(fn, iterations)
+            print(
+                f"{name:<16} {sum(samples) / len(samples) * 1e6:>8.2f} {percentile(samples, 50) * 1e6:>8.2f} {percentile(samples, 99) * 1e6:>8.2f}"
+            )
+        upstream = server.server_metrics.snapshot()["upstream"].get("POST /orders/sync")
+        if upstream:
+            print(
+                f"for comparison, POST /orders/sync p50 {upstream['p50'] * 1000:.1f} ms (mock latency {latency * 1000:.0f} ms)"
+            )
+        print(f"risk engine: {risk.stats()}\n")
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=100000, help="Timed calls per check"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Mock per-request latency in seconds",
+    )
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.iterations, args.latency)) else 1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: spawn the stdio server the way an MCP host does and time
+the initialize handshake and the first tool response, against the local mock.
+
+Usage:  python scripts/bench_startup.py --runs 5 --tool get_funds [--prewarm --pause 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SERVER = os.path.join(ROOT, "fyers_mcp_complete.py")
+
+from mock_fyers import start_mock
+
+
+async def send(proc, message):
+    proc.stdin.write(json.dumps(message).encode() + b"\n")
+    await proc.stdin.drain()
+
+
+async def response(proc, request_id):
+    while True:
+        line = await proc.stdout.readline()
+        if not line:
+            raise RuntimeError("server exited before answering")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+async def cold_start(env, tool, pause):
+    """Return (seconds from spawn to initialize result, first tool call latency, seconds from spawn to first tool result).
+
+    ``pause`` emulates the host idling between the handshake and its first call;
+    it is not counted in the spawn-to-result time.
+    """
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        SERVER,
+        env=env,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await send(
+            proc,
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "bench", "version": "0"},
+                },
+            },
+        )
+        await response(proc, 1)
+        initialized = time.perf_counter() - start
+        await send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        await asyncio.sleep(pause)
+        called = time.perf_counter()
+        await send(
+            proc,
+            {
+                "jsonrpc": "2.0",
+                "id": 2,
+                "method": "tools/call",
+                "params": {"name": tool, "arguments": {}},
+            },
+        )
+        result = await response(proc, 2)
+        answered = time.perf_counter()
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return initialized, answered - called, answered - start - pause
+    finally:
+        proc.stdin.close()
+        try:
+            await asyncio.wait_for(proc.wait(), 5)
+        except asyncio.TimeoutError:
+            proc.kill()
+
+
+async def import_time(env):
+    """Seconds spent importing the server module in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import fyers_mcp_complete; print(time.perf_counter() - t)"
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", code, cwd=ROOT, env=env, stdout=asyncio.subprocess.PIPE
+    )
+    out, _ = await proc.communicate()
+    return float(out)
+
+
+async def main(runs: int, tool: str, latency: float, prewarm: bool, pause: float):
+    runner, base_url = await start_mock(latency)
+    env = {
+        **os.environ,
+        "FYERS_CLIENT_ID": "MOCK-100",
+        "FYERS_ACCESS_TOKEN": "mock-token",
+        "FYERS_API_URL": f"{base_url}/api/v3",
+        "FYERS_DATA_URL": f"{base_url}/data",
+        "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+        "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-bench-"),
+        "FYERS_PREWARM": "1" if prewarm else "0",
+    }
+    try:
+        imports = [await import_time(env) for _ in range(runs)]
+        samples = [await cold_start(env, tool, pause) for _ in range(runs)]
+
+        print(
+            f"{runs} cold starts, first tool {tool}, mock latency {latency * 1000:.0f} ms, prewarm {'on' if prewarm else 'off'}"
+        )
+        rows = (
+            ("import module", imports),
+            ("initialize", [s[0] for s in samples]),
+            ("first tool call", [s[1] for s in samples]),
+            ("first tool result", [s[2] for s in samples]),
+        )
+        for label, values in rows:
+            print(
+                f"{label:>18}: median {statistics.median(values) * 1000:7.1f} ms | min {min(values) * 1000:7.1f} ms"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--tool",
+        default="get_funds",
+        help="Tool called right after the handshake (no arguments)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Mock per-request latency in seconds",
+    )
+    parser.add_argument(
+        "--prewarm", action="store_true", help="Start the server with FYERS_PREWARM=1"
+    )
+    parser.add_argument(
+        "--pause",
+        type=float,
+        default=0,
+        help="Seconds between the handshake and the first call",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.tool, args.latency, args.prewarm, args.pause))
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: drive every MCP tool at controlled concurrency against the
+local Fyers API simulator and report throughput and tail latency per tool.
+
+Calls go through the FastMCP tool layer (argument validation and metrics
+included), so the numbers are what a host would see minus stdio framing.
+Save a run with --save and compare later runs against it with --baseline to
+catch regressions; the script exits 1 when a tool fails more often than in the
+baseline or its p99 or throughput is worse by more than --tolerance.
+
+Usage:  python scripts/bench_tools.py --concurrency 1 8 32 --calls 40 --latency 0.02
+        python scripts/bench_tools.py --error-rate 0.05 --rate-limit 50 --jitter 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_fyers import start_mock
+
+# Arguments each tool is benchmarked with; order IDs refer to orders the warm-up places.
+# Orders are resent on purpose, so the duplicate check is waived.
+WORKLOADS = {
+    "check_auth_status": {},
+    "get_profile": {},
+    "get_funds": {},
+    "get_holdings": {},
+    "get_positions": {},
+    "get_portfolio_analytics": {},
+    "get_orders": {},
+    "get_quotes": {"symbols": "NSE:SBIN-EQ,NSE:RELIANCE-EQ,NSE:TCS-EQ"},
+    "get_history": {
+        "symbol": "NSE:SBIN-EQ",
+        "start_date": "2024-01-01",
+        "end_date": "2024-12-31",
+    },
+    "search_symbols": {"query": "SBI"},
+    "get_option_chain": {"symbol": "NSE:NIFTY50-INDEX", "strike_count": 20},
+    "place_order": {
+        "symbol": "NSE:SBIN-EQ",
+        "quantity": 1,
+        "order_type": "LIMIT",
+        "side": "BUY",
+        "limit_price": 600,
+        "allow_duplicate": True,
+    },
+    "modify_order": {"order_id": "MOCK00000001", "limit_price": 601},
+    "cancel_order": {"order_id": "MOCK00000001"},
+    "wait_for_order_status": {
+        "order_id": "MOCK00000001",
+        "status": "cancelled,pending",
+        "timeout": 1,
+    },
+    "place_basket_orders": {
+        "orders": [
+            {
+                "symbol": "NSE:SBIN-EQ",
+                "quantity": 1,
+                "order_type": "LIMIT",
+                "side": "BUY",
+                "limit_price": 600,
+            },
+            {
+                "symbol": "NSE:TCS-EQ",
+                "quantity": 1,
+                "order_type": "MARKET",
+                "side": "SELL",
+            },
+        ],
+        "allow_duplicates": True,
+    },
+    "modify_basket_orders": {
+        "orders": [
+            {"order_id": "MOCK00000001", "limit_price": 602},
+            {"order_id": "MOCK00000002", "quantity": 2},
+        ]
+    },
+    "cancel_basket_orders": {"order_ids": "MOCK00000001,MOCK00000002"},
+    "query_trade_journal": {"group_by": "symbol"},
+    "get_cache_stats": {},
+    "get_rate_limit_stats": {},
+    "get_server_metrics": {},
+}
+
+SKIPPED = {
+    "authenticate": "interactive browser login, see simulate_oauth.py",
+    "subscribe_quotes": "needs the market data socket, see fake_data_socket.py",
+    "unsubscribe_quotes": "needs the market data socket, see fake_data_socket.py",
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def result_text(result) -> str:
+    """Flatten a FastMCP call_tool result to the tool's returned string."""
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        return json.dumps(result)
+    return "".join(getattr(block, "text", "") for block in result)
+
+
+async def load(server, call, calls: int, concurrency: int):
+    """Run ``calls`` invocations of ``call(i)`` with ``concurrency`` in flight and summarise them."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(calls))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            start = time.perf_counter()
+            try:
+                failed = server.is_error_result(result_text(await call(i)))
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "calls": calls,
+        "errors": errors,
+        "throughput": calls / wall,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+    }
+
+
+def regressions(results, baseline, tolerance: float):
+    """Rows with more errors, or whose p99 grew or throughput fell by more than ``tolerance``, than the baseline."""
+    found = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        # Failed calls are fast, so check errors first or they pass as a speed-up
+        if row["errors"] > base["errors"]:
+            found.append(f"{key}: errors {base['errors']} -> {row['errors']}")
+        if row["p99"] > base["p99"] * (1 + tolerance):
+            found.append(
+                f"{key}: p99 {base['p99'] * 1000:.1f} -> {row['p99'] * 1000:.1f} ms"
+            )
+        if row["throughput"] < base["throughput"] * (1 - tolerance):
+            found.append(
+                f"{key}: throughput {base['throughput']:.0f} -> {row['throughput']:.0f} calls/s"
+            )
+    return found
+
+
+async def main(args) -> int:
+    runner, base_url = await start_mock(
+        args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    if not args.with_cache:
+        # Measure the upstream path, not cache hits
+        for endpoint in (
+            "PROFILE",
+            "FUNDS",
+            "HOLDINGS",
+            "POSITIONS",
+            "ORDERS",
+            "OPTION_CHAIN",
+        ):
+            os.environ[f"FYERS_CACHE_TTL_{endpoint}"] = "0"
+    if not args.client_limits:
+        # Lift client-side pacing so the benchmark measures the server, not the quota
+        for bucket in ("PER_SECOND", "PER_MINUTE", "ORDER", "ACCOUNT", "DATA"):
+            os.environ[f"FYERS_RATE_LIMIT_{bucket}"] = "100000"
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_ACCESS_TOKEN": "mock-token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-bench-"),
+            # The Fyers order socket is not simulated; order tracking falls back to REST
+            "FYERS_ORDER_STREAM": "0",
+        }
+    )
+    import fyers_mcp_complete as server
+
+    registered = {tool.name for tool in await server.mcp.list_tools()}
+    tools = [
+        name
+        for name in WORKLOADS
+        if name in registered and (not args.tools or name in args.tools)
+    ]
+    uncovered = sorted(registered - set(WORKLOADS) - set(SKIPPED))
+
+    results = {}
+    try:
+        # Warm-up: opens the keep-alive pool, loads the symbol master, fills the candle store
+        # and places the orders the modify/cancel workloads refer to
+        for name in tools:
+            await server.mcp.call_tool(name, WORKLOADS[name])
+
+        print(
+            f"mock latency {args.latency * 1000:.0f} ms + jitter {args.jitter * 1000:.0f} ms, "
+            f"error rate {args.error_rate:.0%}, rate limit {args.rate_limit or 'off'}, "
+            f"{args.calls} calls per tool and level, cache {'on' if args.with_cache else 'off'}"
+        )
+        print(
+            f"{'tool':<24} {'conc':>4} {'errors':>6} {'calls/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for concurrency in args.concurrency:
+            rows = [
+                (name, lambda i, name=name: server.mcp.call_tool(name, WORKLOADS[name]))
+                for name in tools
+            ]
+            # Named apart when --tools narrows the mix so it is not compared with a full-run baseline
+            mixed = "(mixed subset)" if args.tools else "(mixed)"
+            rows.append(
+                (
+                    mixed,
+                    lambda i: server.mcp.call_tool(
+                        tools[i % len(tools)], WORKLOADS[tools[i % len(tools)]]
+                    ),
+                )
+            )
+            for name, call in rows:
+                calls = args.calls * len(tools) if name == mixed else args.calls
+                row = await load(server, call, calls, concurrency)
+                results[f"{name}@{concurrency}"] = row
+                print(
+                    f"{name:<24} {concurrency:>4} {row['errors']:>6} {row['throughput']:>9.1f} "
+                    f"{row['p50'] * 1000:>8.1f} {row['p95'] * 1000:>8.1f} {row['p99'] * 1000:>8.1f} {row['max'] * 1000:>8.1f}"
+                )
+
+        app = runner.app
+        print(
+            f"\nmock: {sum(app['hits'].values())} requests, {sum(app['errors'].values())} injected errors, {sum(app['throttled'].values())} throttled (429)"
+        )
+        for name, reason in SKIPPED.items():
+            print(f"skipped {name}: {reason}")
+        if uncovered:
+            print(f"no workload defined for: {', '.join(uncovered)}")
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="Calls in flight, one run per level",
+    )
+    parser.add_argument(
+        "--calls", type=int, default=40, help="Calls per tool and concurrency level"
+    )
+    parser.add_argument("--tools", nargs="+", help="Only benchmark these tools")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Mock per-request latency in seconds",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        help="Mean extra mock latency in seconds (exponential tail)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="Fraction of mock API calls failing with HTTP 500",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=0,
+        help="Mock requests per second before HTTP 429 (0 = off)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=1, help="Seed for mock jitter and errors"
+    )
+    parser.add_argument(
+        "--with-cache", action="store_true", help="Keep the read cache enabled"
+    )
+    parser.add_argument(
+        "--client-limits",
+        action="store_true",
+        help="Keep the client-side Fyers rate limits",
+    )
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative regression (default 0.25)",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
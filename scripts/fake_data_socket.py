@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Local fake market data socket for exercising MarketDataStream without Fyers.
+
+FakeTickServer is a websockets server that streams JSON ticks for whatever
+symbols a client subscribes to. FakeDataSocket is a client with the same
+interface as the SDK's FyersDataSocket, so it can be passed to
+MarketDataStream as ``socket_factory``.
+
+Usage:  python scripts/fake_data_socket.py
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import websockets
+from websockets.sync.client import connect
+
+
+class FakeTickServer:
+    """Streams a tick per subscribed symbol every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.connections = set()
+        self.subscribe_requests = []
+        self._server = None
+
+    async def _handler(self, websocket):
+        symbols = set()
+        self.connections.add(websocket)
+
+        async def pump():
+            while True:
+                for symbol in list(symbols):
+                    await websocket.send(
+                        json.dumps(
+                            {
+                                "type": "sf",
+                                "symbol": symbol,
+                                "ltp": round(random.uniform(100, 200), 2),
+                                "ch": 1.25,
+                                "chp": 0.8,
+                                "vol_traded_today": random.randint(1000, 100000),
+                            }
+                        )
+                    )
+                await asyncio.sleep(self.interval)
+
+        pump_task = asyncio.create_task(pump())
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message["T"] == "SUB":
+                    symbols.update(message["symbols"])
+                    self.subscribe_requests.append(sorted(message["symbols"]))
+                elif message["T"] == "UNSUB":
+                    symbols.difference_update(message["symbols"])
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            pump_task.cancel()
+            self.connections.discard(websocket)
+
+    async def start(self) -> str:
+        self._server = await websockets.serve(self._handler, "127.0.0.1", 0)
+        port = next(iter(self._server.sockets)).getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def drop_all(self):
+        """Close every client connection to simulate a socket outage."""
+        for websocket in list(self.connections):
+            await websocket.close()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+class FakeDataSocket:
+    """Thread-based client mirroring the FyersDataSocket methods used by the server."""
+
+    def __init__(self, url, on_message, on_error, on_close):
+        self.url = url
+        self.on_message = on_message
+        self.on_error = on_error
+        self.on_close = on_close
+        self._ws = None
+
+    def _reader(self):
+        try:
+            for raw in self._ws:
+                self.on_message(json.loads(raw))
+        except Exception as e:
+            self.on_error(e)
+        finally:
+            self._ws = None
+            self.on_close({"code": 200, "message": "Connection closed"})
+
+    def connect(self):
+        try:
+            self._ws = connect(self.url)
+        except OSError as e:
+            self.on_error(e)
+            return
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def is_connected(self):
+        return self._ws is not None
+
+    def subscribe(self, symbols, data_type="SymbolUpdate"):
+        self._ws.send(json.dumps({"T": "SUB", "symbols": symbols}))
+
+    def unsubscribe(self, symbols, data_type="SymbolUpdate"):
+        self._ws.send(json.dumps({"T": "UNSUB", "symbols": symbols}))
+
+    def close_connection(self):
+        if self._ws is not None:
+            self._ws.close()
+
+
+async def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def main():
+    os.environ["FYERS_STREAM_RECONNECT_MIN"] = "0.05"
+    import fyers_mcp_complete as server
+
+    fake = FakeTickServer()
+    url = await fake.start()
+    stream = server.MarketDataStream(
+        "FAKE-100:token",
+        socket_factory=lambda token, on_message, on_error, on_close: FakeDataSocket(
+            url, on_message, on_error, on_close
+        ),
+    )
+    symbols = ["NSE:SBIN-EQ", "NSE:RELIANCE-EQ", "NSE:TCS-EQ"]
+    checks = []
+
+    try:
+        await stream.subscribe(symbols)
+        checks.append(
+            (
+                "ticks arrive for subscribed symbols",
+                await wait_for(lambda: len(stream.ticks) == len(symbols)),
+            )
+        )
+
+        start = time.perf_counter()
+        for _ in range(100000):
+            stream.get_tick("NSE:SBIN-EQ")
+        per_lookup_us = (time.perf_counter() - start) / 100000 * 1e6
+        checks.append((f"tick lookup {per_lookup_us:.2f} us", per_lookup_us < 10))
+
+        await fake.drop_all()
+        checks.append(
+            ("stream notices the drop", await wait_for(lambda: not stream.connected))
+        )
+        checks.append(
+            (
+                "stream reconnects",
+                await wait_for(lambda: stream.connected and stream.reconnects >= 1),
+            )
+        )
+        checks.append(
+            (
+                "symbols resubscribed after reconnect",
+                await wait_for(
+                    lambda: len(fake.subscribe_requests) >= 2
+                    and fake.subscribe_requests[-1] == sorted(symbols)
+                ),
+            )
+        )
+
+        await stream.unsubscribe(["NSE:TCS-EQ"])
+        checks.append(
+            (
+                "unsubscribed symbol leaves the table",
+                stream.get_tick("NSE:TCS-EQ") is None,
+            )
+        )
+
+        server.market_stream = stream
+        os.environ.setdefault("FYERS_CLIENT_ID", "FAKE-100")
+        os.environ.setdefault("FYERS_ACCESS_TOKEN", "token")
+        result = await server.get_quotes("NSE:SBIN-EQ,NSE:RELIANCE-EQ")
+        checks.append(
+            ("get_quotes answers streamed symbols locally", result.count("📈") == 2)
+        )
+    finally:
+        await stream.stop()
+        await fake.stop()
+
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
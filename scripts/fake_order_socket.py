@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Local fake order update socket for exercising OrderUpdateStream and
+wait_for_order_status without Fyers, on top of the mock REST API.
+
+FakeOrderServer is a websockets server that pushes order, position and trade
+events to every connected client. FakeOrderSocket is a client with the same
+interface and callback payloads as the SDK's FyersOrderSocket, so it can be
+passed to OrderUpdateStream as ``socket_factory``.
+
+Usage:  python scripts/fake_order_socket.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import websockets
+from websockets.sync.client import connect
+
+from mock_fyers import start_mock
+
+
+class FakeOrderServer:
+    """Pushes events in the shape FyersOrderSocket hands to its callbacks."""
+
+    def __init__(self):
+        self.connections = set()
+        self.subscriptions = []
+        self._server = None
+
+    async def _handler(self, websocket):
+        self.connections.add(websocket)
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get("T") == "SUB_ORD":
+                    self.subscriptions.append(message["SLIST"])
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(websocket)
+
+    async def push(self, kind: str, payload: dict):
+        for websocket in list(self.connections):
+            await websocket.send(json.dumps({"s": "ok", kind: payload}))
+
+    async def start(self) -> str:
+        self._server = await websockets.serve(self._handler, "127.0.0.1", 0)
+        port = next(iter(self._server.sockets)).getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def drop_all(self):
+        """Close every client connection to simulate a socket outage."""
+        for websocket in list(self.connections):
+            await websocket.close()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+class FakeOrderSocket:
+    """Thread-based client mirroring the FyersOrderSocket methods used by the server."""
+
+    def __init__(self, url, on_orders, on_positions, on_trades, on_error, on_close):
+        self.url = url
+        self.callbacks = {
+            "orders": on_orders,
+            "positions": on_positions,
+            "trades": on_trades,
+        }
+        self.on_error = on_error
+        self.on_close = on_close
+        self._ws = None
+
+    def _reader(self):
+        try:
+            for raw in self._ws:
+                message = json.loads(raw)
+                for kind, callback in self.callbacks.items():
+                    if kind in message:
+                        callback(message)
+        except Exception as e:
+            self.on_error(e)
+        finally:
+            self._ws = None
+            self.on_close({"code": 200, "message": "Connection closed"})
+
+    def connect(self):
+        try:
+            self._ws = connect(self.url)
+        except OSError as e:
+            self.on_error(e)
+            return
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def is_connected(self):
+        return self._ws is not None
+
+    def subscribe(self, data_type):
+        self._ws.send(
+            json.dumps({"T": "SUB_ORD", "SLIST": data_type.split(","), "SUB_T": 1})
+        )
+
+    def close_connection(self):
+        if self._ws is not None:
+            self._ws.close()
+
+
+async def wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def later(delay: float, action):
+    await asyncio.sleep(delay)
+    return await action()
+
+
+async def main():
+    runner, base_url = await start_mock(0.01)
+    app = runner.app
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "FAKE-100",
+            "FYERS_ACCESS_TOKEN": "token",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-orders-"),
+            "FYERS_STREAM_RECONNECT_MIN": "0.05",
+            "FYERS_ORDER_WAIT_POLL": "0.25",
+        }
+    )
+    import fyers_mcp_complete as server
+
+    fake = FakeOrderServer()
+    url = await fake.start()
+    stream = server.OrderUpdateStream(
+        "FAKE-100:token",
+        server.get_fyers_client,
+        socket_factory=lambda token, *callbacks: FakeOrderSocket(url, *callbacks),
+    )
+    server.order_stream = stream
+    client = server.get_fyers_client()
+    checks = []
+
+    async def fill(order_id, status=2, message=""):
+        order = {**app["orders"][order_id], "status": status, "message": message}
+        app["orders"][order_id] = order
+        await fake.push("orders", order)
+        return time.perf_counter()
+
+    def placed_id(result):
+        return result.split("Order ID: ")[1].split("\n")[0]
+
+    try:
+        stream.start()
+        checks.append(
+            (
+                "stream connects and seeds positions",
+                await wait_for(lambda: client.live_positions is not None),
+            )
+        )
+        checks.append(
+            (
+                "subscribes to orders, trades and positions",
+                fake.subscriptions[-1] == server.ORDER_STREAM_TYPES.split(","),
+            )
+        )
+
+        order_id = placed_id(
+            await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=600)
+        )
+        before = app["hits"]["/api/v3/orders"]
+        filler = asyncio.create_task(later(0.2, lambda: fill(order_id)))
+        result = await server.wait_for_order_status(order_id, "filled", timeout=5)
+        push_latency = time.perf_counter() - filler.result()
+        checks.append(
+            (
+                "wait_for_order_status resolves on the pushed fill",
+                result.startswith("✅ Order reached filled"),
+            )
+        )
+        checks.append(
+            (
+                f"resolved {push_latency * 1000:.1f} ms after the push",
+                push_latency < 0.05,
+            )
+        )
+        checks.append(
+            (
+                "one REST lookup while waiting",
+                app["hits"]["/api/v3/orders"] - before == 1,
+            )
+        )
+
+        order_id = placed_id(
+            await server.place_order("NSE:TCS-EQ", 1, "LIMIT", "SELL", limit_price=3500)
+        )
+        asyncio.create_task(
+            later(0.1, lambda: fill(order_id, status=5, message="Insufficient funds"))
+        )
+        result = await server.wait_for_order_status(order_id, "filled", timeout=5)
+        checks.append(
+            (
+                "a rejection ends the wait early",
+                result.startswith("❌ Order ended as rejected")
+                and "Insufficient funds" in result,
+            )
+        )
+
+        order_id = placed_id(
+            await server.place_order("NSE:TCS-EQ", 1, "LIMIT", "SELL", limit_price=3500)
+        )
+        result = await server.wait_for_order_status(order_id, "filled", timeout=0.3)
+        checks.append(
+            (
+                "times out while the order stays pending",
+                result.startswith("⏳ Timed out"),
+            )
+        )
+
+        before = app["hits"]["/api/v3/positions"]
+        await fake.push(
+            "positions",
+            {
+                "id": "NSE:SBIN-EQ-MARGIN",
+                "symbol": "NSE:SBIN-EQ",
+                "netQty": 1,
+                "side": 1,
+                "netAvg": 600.0,
+                "ltp": 601.0,
+                "pl": 1.0,
+            },
+        )
+        await wait_for(lambda: "NSE:SBIN-EQ-MARGIN" in client.live_positions)
+        result = await server.get_positions()
+        checks.append(
+            (
+                "pushed position shows in get_positions without REST",
+                "NSE:SBIN-EQ" in result and app["hits"]["/api/v3/positions"] == before,
+            )
+        )
+
+        await fake.drop_all()
+        checks.append(
+            (
+                "drop takes the book and positions offline",
+                await wait_for(
+                    lambda: client.live_positions is None and not client.order_book.live
+                ),
+            )
+        )
+        checks.append(
+            (
+                "stream reconnects and goes live again",
+                await wait_for(
+                    lambda: stream.connected and client.live_positions is not None
+                ),
+            )
+        )
+        checks.append(
+            ("reconnect forces a full order book resync", client.order_book.resync)
+        )
+
+        # Without the socket the same wait falls back to polling by ID
+        await stream.stop()
+        server.order_stream = None
+        server.ORDER_STREAM_ENABLED = False
+        order_id = placed_id(
+            await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=601)
+        )
+        filler = asyncio.create_task(later(0.2, lambda: fill(order_id)))
+        result = await server.wait_for_order_status(order_id, "filled", timeout=5)
+        poll_latency = time.perf_counter() - filler.result()
+        checks.append(
+            (
+                f"polling fallback resolves ({poll_latency * 1000:.0f} ms after the fill)",
+                result.startswith("✅"),
+            )
+        )
+    finally:
+        await stream.stop()
+        await fake.stop()
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
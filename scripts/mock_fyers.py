@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Fyers API v3 REST endpoints used by the MCP server.
+
+Besides a fixed per-request latency it can simulate a slow tail (``jitter``),
+random server errors (``error_rate``) and the Fyers per-second request quota
+(``rate_limit``, answered with HTTP 429 like the real API).
+
+Run standalone:  python scripts/mock_fyers.py --port 9000 --latency 0.05 [--jitter 0.02 --error-rate 0.01 --rate-limit 10]
+Then point the server at it with
+FYERS_API_URL=http://127.0.0.1:9000/api/v3, FYERS_DATA_URL=http://127.0.0.1:9000/data
+and FYERS_SYMBOL_MASTER_URL=http://127.0.0.1:9000/sym_details
+"""
+
+import argparse
+import asyncio
+import itertools
+import math
+import random
+import time
+from collections import Counter, deque
+from urllib.parse import urlencode
+
+import jwt
+from aiohttp import web
+
+PROFILE = {
+    "name": "Mock Trader",
+    "email_id": "mock@example.com",
+    "mobile_number": "9999999999",
+    "fy_id": "XM0000",
+}
+FUNDS = [
+    {
+        "id": 10,
+        "title": "Total Balance",
+        "equityAmount": 250000.0,
+        "commodityAmount": 0.0,
+    },
+    {
+        "id": 2,
+        "title": "Utilized Amount",
+        "equityAmount": 15000.0,
+        "commodityAmount": 0.0,
+    },
+]
+HOLDINGS = [
+    {"symbol": "NSE:SBIN-EQ", "quantity": 100, "costPrice": 560.0, "ltp": 612.5},
+    {"symbol": "NSE:RELIANCE-EQ", "quantity": 20, "costPrice": 2450.0, "ltp": 2512.3},
+    {"symbol": "NSE:TCS-EQ", "quantity": 5, "costPrice": 3600.0, "ltp": 3488.0},
+]
+POSITIONS = [
+    {
+        "symbol": "NSE:INFY-EQ",
+        "qty": 10,
+        "side": 1,
+        "avgPrice": 1450.0,
+        "ltp": 1462.0,
+        "pl": 120.0,
+    },
+]
+# Fyers answers accepted order writes with s="ok" and these codes, per HTTP method
+WRITE_RESULTS = {
+    "POST": (1101, "Order submitted"),
+    "PATCH": (1102, "Order modified"),
+    "DELETE": (1103, "Order cancelled"),
+}
+# Last prices quoted for known symbols, so pre-trade price band checks see realistic quotes
+PRICES = {row["symbol"]: row["ltp"] for row in HOLDINGS + POSITIONS}
+
+# Option chains: underlying -> (spot, strike step). Contracts are priced with Black-76 on
+# spot carried at OPTION_RATE and the volatility smile in option_vol, so IVs can be checked
+OPTION_UNDERLYINGS = {"NSE:NIFTY50-INDEX": (24012.35, 50), "NSE:SBIN-EQ": (612.5, 5)}
+OPTION_RATE = 0.065
+OPTION_EXPIRY_DAYS = (7, 14, 28, 56)
+
+
+def option_vol(strike: float, forward: float) -> float:
+    """Smile used to price the mock chain: 14% at the money, higher in the wings."""
+    moneyness = math.log(strike / forward)
+    return 0.14 - 0.1 * moneyness + 1.5 * moneyness * moneyness
+
+
+def option_price(forward: float, strike: float, years: float, sign: int) -> float:
+    sigma = option_vol(strike, forward)
+    root = sigma * math.sqrt(years)
+    d1 = (math.log(forward / strike) + 0.5 * root * root) / root
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    return (
+        math.exp(-OPTION_RATE * years)
+        * sign
+        * (forward * cdf(sign * d1) - strike * cdf(sign * (d1 - root)))
+    )
+
+
+def option_expiries(now: float) -> list:
+    """Expiry timestamps (15:30 IST) OPTION_EXPIRY_DAYS days ahead, like the Fyers expiryData list."""
+    today = int(now // 86400) * 86400 + 36000
+    return [today + days * 86400 for days in OPTION_EXPIRY_DAYS]
+
+
+def option_chain(symbol: str, strike_count: int, expiry: int, now: float) -> dict:
+    spot, step = OPTION_UNDERLYINGS[symbol]
+    years = (expiry - now) / (365 * 86400)
+    forward = spot * math.exp(OPTION_RATE * years)
+    atm = round(spot / step) * step
+    short = symbol.split(":")[1].split("-")[0].replace("50", "")
+    stamp = time.strftime("%y%m%d", time.gmtime(expiry))
+    rows = [
+        {
+            "symbol": symbol,
+            "ltp": spot,
+            "fp": forward,
+            "option_type": "",
+            "strike_price": -1,
+        }
+    ]
+    for strike in range(
+        atm - strike_count * step, atm + (strike_count + 1) * step, step
+    ):
+        for option_type, sign in (("CE", 1), ("PE", -1)):
+            price = option_price(forward, strike, years, sign)
+            # Quotes straddle the model price, so their mid is exact
+            spread = price * 0.002
+            rows.append(
+                {
+                    "symbol": f"NSE:{short}{stamp}{strike}{option_type}",
+                    "option_type": option_type,
+                    "strike_price": strike,
+                    "ltp": round(price, 2),
+                    "bid": price - spread,
+                    "ask": price + spread,
+                    "oi": 1000 * (1 + abs(strike - atm) // step),
+                    "volume": 5000,
+                    "ltpch": 0.0,
+                }
+            )
+    return {
+        "callOi": sum(r["oi"] for r in rows if r["option_type"] == "CE"),
+        "putOi": sum(r["oi"] for r in rows if r["option_type"] == "PE"),
+        "expiryData": [
+            {"date": time.strftime("%d-%m-%Y", time.gmtime(ts)), "expiry": str(ts)}
+            for ts in option_expiries(now)
+        ],
+        "optionsChain": rows,
+    }
+
+
+# Symbol master rows: (ticker, description, lot size, tick size)
+SYMBOLS = {
+    "NSE_CM": [
+        ("NSE:SBIN-EQ", "STATE BANK OF INDIA", 1, 0.05),
+        ("NSE:RELIANCE-EQ", "RELIANCE INDUSTRIES LTD", 1, 0.05),
+        ("NSE:TCS-EQ", "TATA CONSULTANCY SERV LT", 1, 0.05),
+        ("NSE:INFY-EQ", "INFOSYS LIMITED", 1, 0.05),
+        ("NSE:NIFTY50-INDEX", "NIFTY 50", 1, 0.05),
+    ],
+    "NSE_FO": [
+        ("NSE:SBIN25DECFUT", "SBIN 25 Dec 30 FUT", 750, 0.05),
+        ("NSE:NIFTY25DECFUT", "NIFTY 25 Dec 30 FUT", 75, 0.1),
+    ],
+}
+
+
+def symbol_master_csv(segment: str) -> str:
+    """Rows in the Fyers sym_details column layout (ticker in column 9, underlying in 13)."""
+    lines = []
+    for token, (ticker, name, lot, tick) in enumerate(SYMBOLS.get(segment, []), 1):
+        underlying = ticker.split(":")[1].split("-")[0].split("25")[0]
+        row = [
+            str(10000 + token),
+            name,
+            "0",
+            str(lot),
+            str(tick),
+            "",
+            "0915-1530|1815-1915:",
+            "",
+            "0",
+            ticker,
+            "10",
+            "10",
+            str(token),
+            underlying,
+            str(token),
+            "-1.0",
+            "XX",
+            "",
+            "None",
+            "0.0",
+            "",
+        ]
+        lines.append(",".join(row))
+    return "\n".join(lines) + "\n"
+
+
+# Login and symbol master downloads are never throttled or failed on purpose
+FAULT_EXEMPT = (
+    "/api/v3/generate-authcode",
+    "/api/v3/validate-authcode",
+    "/api/v3/validate-refresh-token",
+    "/sym_details/",
+)
+
+
+def order_time() -> str:
+    """Current time in the Fyers orderDateTime format (IST)."""
+    return time.strftime("%d-%b-%Y %H:%M:%S", time.gmtime(time.time() + 19800))
+
+
+def create_app(
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit: int = 0,
+    seed=None,
+) -> web.Application:
+    """Build the mock app.
+
+    Every endpoint sleeps ``latency`` seconds plus an exponentially distributed
+    extra delay with mean ``jitter``. A fraction ``error_rate`` of API calls
+    fail with HTTP 500, and with ``rate_limit`` set, calls beyond that many in
+    any one-second window get HTTP 429. ``app["hits"]``, ``app["errors"]`` and
+    ``app["throttled"]`` count requests per path; ``app["orders"]`` is the
+    order book by ID, for tests that fill or reject orders.
+    """
+    order_ids = itertools.count(1)
+    orders = {}
+    hits = Counter()
+    errors = Counter()
+    throttled = Counter()
+    recent = deque()
+    rng = random.Random(seed)
+
+    def ok(**payload):
+        return web.json_response({"s": "ok", "code": 200, "message": "", **payload})
+
+    async def delay(request, handler):
+        hits[request.path] += 1
+        simulated = not request.path.startswith(FAULT_EXEMPT)
+        if simulated and rate_limit:
+            now = time.monotonic()
+            while recent and now - recent[0] >= 1:
+                recent.popleft()
+            if len(recent) >= rate_limit:
+                throttled[request.path] += 1
+                return web.json_response(
+                    {"s": "error", "code": 429, "message": "request limit reached"},
+                    status=429,
+                )
+            recent.append(now)
+        await asyncio.sleep(
+            latency + (rng.expovariate(1 / jitter) if jitter > 0 else 0)
+        )
+        if simulated and error_rate and rng.random() < error_rate:
+            errors[request.path] += 1
+            return web.json_response(
+                {"s": "error", "code": 500, "message": "Internal server error"},
+                status=500,
+            )
+        return await handler(request)
+
+    async def profile(request):
+        return ok(data=PROFILE)
+
+    async def funds(request):
+        return ok(fund_limit=FUNDS)
+
+    async def holdings(request):
+        return ok(holdings=HOLDINGS)
+
+    async def positions(request):
+        return ok(netPositions=POSITIONS)
+
+    async def orderbook(request):
+        order_id = request.query.get("id")
+        if order_id is not None:
+            return ok(orderBook=[orders[order_id]] if order_id in orders else [])
+        return ok(orderBook=list(orders.values()))
+
+    async def quotes(request):
+        symbols = [s for s in request.query.get("symbols", "").split(",") if s]
+        if len(symbols) > 50:
+            return web.json_response(
+                {"s": "error", "code": -300, "message": "Maximum 50 symbols allowed"}
+            )
+        data = [
+            {
+                "n": symbol,
+                "s": "ok",
+                "v": {
+                    "lp": PRICES.get(symbol, 100.0 + i),
+                    "ch": 1.5,
+                    "chp": 1.2,
+                    "volume": 1000 * (i + 1),
+                },
+            }
+            for i, symbol in enumerate(symbols)
+        ]
+        return ok(d=data)
+
+    async def options_chain(request):
+        symbol = request.query.get("symbol", "")
+        strike_count = int(request.query.get("strikecount", 10))
+        if symbol not in OPTION_UNDERLYINGS:
+            return web.json_response(
+                {"s": "error", "code": -300, "message": "Invalid symbol"}
+            )
+        if not 1 <= strike_count <= 50:
+            return web.json_response(
+                {
+                    "s": "error",
+                    "code": -300,
+                    "message": "strikecount must be between 1 and 50",
+                }
+            )
+        now = time.time()
+        expiries = option_expiries(now)
+        timestamp = request.query.get("timestamp", "")
+        expiry = int(timestamp) if timestamp else expiries[0]
+        if expiry not in expiries:
+            return web.json_response(
+                {"s": "error", "code": -300, "message": "Invalid expiry"}
+            )
+        return ok(data=option_chain(symbol, strike_count, expiry, now))
+
+    async def history(request):
+        resolution = request.query.get("resolution", "D").upper()
+        start, end = int(request.query["range_from"]), int(request.query["range_to"])
+        daily = resolution in ("D", "1D")
+        if end - start > (366 if daily else 100) * 86400:
+            return web.json_response(
+                {
+                    "s": "error",
+                    "code": -300,
+                    "message": "Range exceeds maximum allowed days",
+                }
+            )
+        step = (
+            86400
+            if daily
+            else int(resolution.rstrip("S")) * (1 if resolution.endswith("S") else 60)
+        )
+        candles = []
+        for ts in range(start - start % step, end + 1, step):
+            if ts >= start and time.gmtime(ts).tm_wday < 5:
+                price = 100 + (ts // step) % 50
+                candles.append([ts, price, price + 2, price - 1, price + 1, 1000])
+        if not candles:
+            # Weekends, holidays and ranges before listing: Fyers says "no_data" rather than "ok"
+            return web.json_response({"s": "no_data", "code": 200, "candles": []})
+        return web.json_response({"s": "ok", "code": 200, "candles": candles})
+
+    async def symbol_master(request):
+        return web.Response(
+            text=symbol_master_csv(request.match_info["segment"]),
+            content_type="text/csv",
+        )
+
+    def issue_token():
+        return jwt.encode(
+            {"sub": "access_token", "exp": int(time.time()) + 86400},
+            "mock-signing-key-for-local-testing-only",
+            algorithm="HS256",
+        )
+
+    async def generate_authcode(request):
+        # Stands in for the Fyers login page: "logs in" and redirects straight back
+        query = urlencode(
+            {
+                "s": "ok",
+                "code": 200,
+                "auth_code": "mock-auth-code",
+                "state": request.query.get("state", ""),
+            }
+        )
+        raise web.HTTPFound(f"{request.query['redirect_uri']}?{query}")
+
+    async def validate_authcode(request):
+        body = await request.json()
+        if (
+            body.get("grant_type") != "authorization_code"
+            or body.get("code") != "mock-auth-code"
+        ):
+            return web.json_response(
+                {"s": "error", "code": -16, "message": "Invalid auth code"}
+            )
+        return ok(access_token=issue_token(), refresh_token="mock-refresh-token")
+
+    async def refresh_token(request):
+        body = await request.json()
+        if (
+            body.get("grant_type") != "refresh_token"
+            or not body.get("refresh_token")
+            or not body.get("pin")
+        ):
+            return web.json_response(
+                {"s": "error", "code": -16, "message": "Invalid refresh token or pin"}
+            )
+        return ok(access_token=issue_token())
+
+    async def place_order(request):
+        body = await request.json()
+        order_id = f"MOCK{next(order_ids):08d}"
+        orders[order_id] = {
+            **body,
+            "id": order_id,
+            "status": 6,
+            "orderDateTime": order_time(),
+        }
+        return web.json_response(
+            {"s": "ok", "code": 1101, "message": "Order submitted", "id": order_id}
+        )
+
+    async def modify_order(request):
+        body = await request.json()
+        order = orders.get(body.get("id"))
+        if order is not None:
+            order.update(
+                {
+                    key: value
+                    for key, value in body.items()
+                    if key in ("qty", "limitPrice", "stopPrice")
+                }
+            )
+        return web.json_response(
+            {"s": "ok", "code": 1102, "message": "Order modified", "id": body.get("id")}
+        )
+
+    async def cancel_order(request):
+        body = await request.json()
+        order = orders.get(body.get("id"))
+        if order is not None:
+            order["status"] = 1
+        return web.json_response(
+            {
+                "s": "ok",
+                "code": 1103,
+                "message": "Order cancelled",
+                "id": body.get("id"),
+            }
+        )
+
+    async def multi_order(request):
+        legs = await request.json()
+        if len(legs) > 10:
+            return web.json_response(
+                {"s": "error", "code": -50, "message": "Maximum 10 orders allowed"}
+            )
+        data = []
+        for leg in legs:
+            if request.method == "POST":
+                order_id = f"MOCK{next(order_ids):08d}"
+                orders[order_id] = {
+                    **leg,
+                    "id": order_id,
+                    "status": 6,
+                    "orderDateTime": order_time(),
+                }
+            else:
+                order_id = leg.get("id")
+                order = orders.get(order_id)
+                if order is not None and request.method == "PATCH":
+                    order.update(
+                        {
+                            key: value
+                            for key, value in leg.items()
+                            if key in ("qty", "limitPrice", "stopPrice")
+                        }
+                    )
+                elif order is not None:
+                    order["status"] = 1
+            code, message = WRITE_RESULTS[request.method]
+            data.append(
+                {
+                    "statusCode": 200,
+                    "body": {
+                        "s": "ok",
+                        "code": code,
+                        "message": message,
+                        "id": order_id,
+                    },
+                }
+            )
+        return ok(data=data)
+
+    app = web.Application(middlewares=[web.middleware(delay)])
+    app["hits"] = hits
+    app["orders"] = orders
+    app["errors"] = errors
+    app["throttled"] = throttled
+    app.router.add_get("/api/v3/profile", profile)
+    app.router.add_get("/api/v3/funds", funds)
+    app.router.add_get("/api/v3/holdings", holdings)
+    app.router.add_get("/api/v3/positions", positions)
+    app.router.add_get("/api/v3/orders", orderbook)
+    app.router.add_get("/api/v3/generate-authcode", generate_authcode)
+    app.router.add_post("/api/v3/validate-authcode", validate_authcode)
+    app.router.add_post("/api/v3/validate-refresh-token", refresh_token)
+    app.router.add_post("/api/v3/orders/sync", place_order)
+    app.router.add_patch("/api/v3/orders/sync", modify_order)
+    app.router.add_delete("/api/v3/orders/sync", cancel_order)
+    for method in ("POST", "PATCH", "DELETE"):
+        app.router.add_route(method, "/api/v3/multi-order/sync", multi_order)
+    app.router.add_get("/data/quotes", quotes)
+    app.router.add_get("/data/history", history)
+    app.router.add_get("/data/options-chain-v3", options_chain)
+    app.router.add_get("/sym_details/{segment}.csv", symbol_master)
+    return app
+
+
+async def start_mock(latency: float = 0.05, port: int = 0, **faults):
+    """Start the mock on 127.0.0.1 and return ``(runner, base_url)``.
+
+    ``faults`` are passed to :func:`create_app` (``jitter``, ``error_rate``,
+    ``rate_limit``, ``seed``); the app is ``runner.app``.
+    """
+    runner = web.AppRunner(create_app(latency, **faults))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Fyers API server")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Per-request latency in seconds"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        help="Mean extra latency in seconds (exponential tail)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="Fraction of API calls answered with HTTP 500",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=0,
+        help="Requests per second before HTTP 429 (0 = unlimited)",
+    )
+    parser.add_argument("--seed", type=int, help="Seed for jitter and error injection")
+    args = parser.parse_args()
+    app = create_app(
+        args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    web.run_app(app, host="127.0.0.1", port=args.port)
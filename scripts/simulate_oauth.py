@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Simulated OAuth login against the local mock: the mock's generate-authcode
+endpoint redirects straight back to the server's callback listener, standing in
+for the browser round-trip.
+
+Usage:  python scripts/simulate_oauth.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import aiohttp
+
+from mock_fyers import start_mock
+
+
+async def main():
+    runner, base_url = await start_mock(0.01)
+    os.environ.update(
+        {
+            "FYERS_CLIENT_ID": "MOCK-100",
+            "FYERS_SECRET_KEY": "mock-secret",
+            "FYERS_API_URL": f"{base_url}/api/v3",
+            "FYERS_DATA_URL": f"{base_url}/data",
+            "FYERS_SYMBOL_MASTER_URL": f"{base_url}/sym_details",
+            "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-oauth-"),
+            "FYERS_AUTH_PORT": "0",
+            "FYERS_AUTH_BROWSER": "0",
+        }
+    )
+    os.environ.pop("FYERS_ACCESS_TOKEN", None)
+    import fyers_mcp_complete as server
+
+    checks = []
+    try:
+        checks.append(
+            (
+                "not authenticated before login",
+                "Not authenticated" in await server.get_funds(),
+            )
+        )
+
+        start = time.perf_counter()
+        result = await server.authenticate()
+        elapsed = time.perf_counter() - start
+        checks.append(
+            (
+                f"authenticate returns pending in {elapsed * 1000:.0f} ms",
+                result.startswith("⏳") and elapsed < 1,
+            )
+        )
+
+        flow = server.auth_flow
+        async with aiohttp.ClientSession() as session:
+            # A redirect with the wrong state is refused and the flow keeps waiting
+            async with session.get(
+                f"{flow.redirect_uri}?auth_code=forged&state=wrong"
+            ) as response:
+                checks.append(
+                    (
+                        "forged redirect rejected",
+                        response.status == 400 and flow.status == "pending",
+                    )
+                )
+
+            # Other tools keep answering while the login is pending
+            start = time.perf_counter()
+            await server.get_cache_stats()
+            checks.append(
+                (
+                    "server responsive while login pending",
+                    time.perf_counter() - start < 0.1,
+                )
+            )
+
+            # The "browser": open the auth URL and follow the redirect to the callback
+            async with session.get(flow.auth_url) as response:
+                checks.append(
+                    (
+                        "callback page served",
+                        response.status == 200
+                        and "Successful" in await response.text(),
+                    )
+                )
+
+        result = await server.authenticate(wait_seconds=5)
+        checks.append(("follow-up call reports success", result.startswith("✅")))
+        checks.append(
+            (
+                "token saved to the store",
+                os.path.exists(server.get_token_manager().path),
+            )
+        )
+        checks.append(
+            (
+                "refresh token kept",
+                server.get_token_manager().refresh_token == "mock-refresh-token",
+            )
+        )
+        checks.append(
+            (
+                "tools work after login",
+                "Mock Trader" in await server.check_auth_status(),
+            )
+        )
+        checks.append(
+            (
+                "next call starts a new login",
+                (await server.authenticate()).startswith("⏳"),
+            )
+        )
+    finally:
+        if server.auth_flow is not None:
+            await server.auth_flow.cancel()
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+    for label, passed in checks:
+        print(f"{'PASS' if passed else 'FAIL'}  {label}")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,126 @@
+"""
+Shared fixtures: the server module with fresh state per test, and the mock
+Fyers API from scripts/mock_fyers.py with the server pointed at it.
+
+Fault injection for the mock is set per test with the ``mock`` marker, e.g.
+``@pytest.mark.mock(latency=0.05, error_rate=0.3, seed=1)``.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path[:0] = [ROOT, SCRIPTS]
+
+# Read once at import: credentials for the default account, no order socket, and client
+# pacing lifted so tests are not throttled by the real Fyers quota
+os.environ.update(
+    {
+        "FYERS_CLIENT_ID": "MOCK-100",
+        "FYERS_ACCESS_TOKEN": "mock-token",
+        "FYERS_DATA_DIR": tempfile.mkdtemp(prefix="fyers-tests-"),
+        "FYERS_ORDER_STREAM": "0",
+        **{
+            f"FYERS_RATE_LIMIT_{bucket}": "100000"
+            for bucket in ("PER_SECOND", "PER_MINUTE", "ORDER", "ACCOUNT", "DATA")
+        },
+    }
+)
+
+import fyers_mcp_complete  # noqa: E402
+from mock_fyers import start_mock  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The server module with no accounts, caches, streams or journal, and its files in tmp_path."""
+    fyers = fyers_mcp_complete
+    monkeypatch.setattr(fyers, "FYERS_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(fyers, "TOKEN_STORE_PATH", str(tmp_path / "token.json"))
+    monkeypatch.setattr(fyers, "TRADE_JOURNAL_PATH", str(tmp_path / "journal.sqlite3"))
+    monkeypatch.setattr(fyers, "DAEMON_SOCKET", str(tmp_path / "daemon.sock"))
+    monkeypatch.setattr(fyers, "SYMBOL_MASTER_SEGMENTS", ["NSE_CM", "NSE_FO"])
+    monkeypatch.setattr(fyers, "accounts", {})
+    monkeypatch.setattr(fyers, "market_stream", None)
+    monkeypatch.setattr(fyers, "order_stream", None)
+    monkeypatch.setattr(fyers, "trade_journal", None)
+    monkeypatch.setattr(fyers, "trade_journal_error", None)
+    monkeypatch.setattr(fyers, "candle_store", None)
+    monkeypatch.setattr(fyers, "symbol_master", None)
+    monkeypatch.setattr(fyers, "_symbol_master_task", None)
+    monkeypatch.setattr(fyers, "_symbol_master_failed_at", float("-inf"))
+    monkeypatch.setattr(fyers, "_sector_map", None)
+    monkeypatch.setattr(fyers, "auth_flow", None)
+    monkeypatch.setattr(fyers, "daemon_link", None)
+    monkeypatch.setattr(fyers, "resilience", fyers.Resilience())
+    monkeypatch.setattr(fyers, "server_metrics", fyers.ServerMetrics())
+    # Keep fault tests fast; the delays themselves are not under test
+    monkeypatch.setattr(fyers, "RETRY_BACKOFF", 0.01)
+    yield fyers
+    if fyers.trade_journal is not None:
+        fyers.trade_journal.close()
+
+
+@pytest.fixture
+def unchecked(server, monkeypatch):
+    """Send orders without symbol or risk checks, so only the write path is exercised."""
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+
+
+@pytest.fixture
+async def api(request, server, monkeypatch):
+    """Start the mock Fyers API and point the server at it; yields the mock's aiohttp app."""
+    marker = request.node.get_closest_marker("mock")
+    options = {"latency": 0.001, **(marker.kwargs if marker else {})}
+    runner, base_url = await start_mock(**options)
+    monkeypatch.setattr(server, "FYERS_API_URL", f"{base_url}/api/v3")
+    monkeypatch.setattr(server, "FYERS_DATA_URL", f"{base_url}/data")
+    monkeypatch.setattr(server, "SYMBOL_MASTER_URL", f"{base_url}/sym_details")
+    try:
+        yield runner.app
+    finally:
+        await shutdown(server)
+        await runner.cleanup()
+
+
+async def shutdown(server):
+    """Stop everything a test may have started on the event loop."""
+    if server.auth_flow is not None:
+        await server.auth_flow.cancel()
+    for account in server.accounts.values():
+        await account.tokens.stop()
+    await server.reset_fyers_client()
+    task = server._symbol_master_task
+    if task is not None and not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def order_id(result: str) -> str:
+    """The order ID from a place_order text result."""
+    return result.split("Order ID: ")[1].split("\n")[0]
+
+
+def basket(legs):
+    """``legs`` LIMIT BUY orders for one share each of distinct symbols."""
+    return [
+        {
+            "symbol": f"NSE:SYM{i:03d}-EQ",
+            "quantity": 1,
+            "order_type": "LIMIT",
+            "side": "BUY",
+            "limit_price": 100 + i,
+        }
+        for i in range(legs)
+    ]
@@ -0,0 +1,120 @@
+"""Several Fyers logins behind one server: per-account clients and account="all" aggregation."""
+
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def accounts(server, monkeypatch):
+    """alpha logged in; beta configured but without a token."""
+    monkeypatch.setattr(server, "FYERS_ACCOUNTS", ["default", "alpha", "beta"])
+    monkeypatch.setenv("FYERS_ALPHA_CLIENT_ID", "MOCK-200")
+    monkeypatch.setenv("FYERS_ALPHA_ACCESS_TOKEN", "alpha-token")
+    monkeypatch.setenv("FYERS_BETA_CLIENT_ID", "MOCK-300")
+
+
+async def test_each_account_has_its_own_client(server, api, accounts):
+    default, alpha = server.get_fyers_client(), server.get_fyers_client("ALPHA")
+    assert default is not alpha and alpha.client_id == "MOCK-200"
+    assert server.get_account("alpha").tokens.path.endswith("token-alpha.json")
+    assert server.get_fyers_client("beta") is None
+    assert (await server.get_funds(account="beta")).startswith(
+        "❌ Not authenticated. Use 'authenticate(account=\"beta\")'"
+    )
+    assert (await server.get_funds(account="gamma")).startswith(
+        "❌ Unknown account 'gamma'. Configured: default, alpha, beta"
+    )
+
+
+async def test_all_merges_holdings(server, api, accounts):
+    merged = json.loads(await server.get_holdings(account="all", output_format="json"))[
+        "data"
+    ]
+    single = json.loads(await server.get_holdings(output_format="json"))["data"]
+    assert merged["accounts"] == ["default", "alpha"]
+    assert merged["errors"] == {
+        "beta": "Not authenticated. Use 'authenticate(account=\"beta\")' tool first."
+    }
+    assert [h["symbol"] for h in merged["holdings"]] == [
+        h["symbol"] for h in single["holdings"]
+    ]
+    assert [h["qty"] for h in merged["holdings"]] == [
+        2 * h["qty"] for h in single["holdings"]
+    ]
+    assert merged["total_value"] == pytest.approx(2 * single["total_value"])
+    # Fetched once per logged-in account, in parallel
+    assert api["hits"]["/api/v3/holdings"] == 2
+
+    text = await server.get_holdings(account="all")
+    assert text.endswith(
+        "👥 Accounts: default, alpha\n⚠️ Skipped:\nbeta: Not authenticated. Use 'authenticate(account=\"beta\")' tool first."
+    )
+
+
+async def test_all_adds_up_funds_and_positions(server, api, accounts):
+    single = json.loads(await server.get_funds(output_format="json"))["data"]
+    merged = json.loads(await server.get_funds(account="all", output_format="json"))[
+        "data"
+    ]
+    assert merged["total_balance"] == pytest.approx(2 * single["total_balance"])
+    positions = json.loads(
+        await server.get_positions(account="all", output_format="json")
+    )["data"]
+    assert [(p["symbol"], p["qty"]) for p in positions["positions"]] == [
+        ("NSE:INFY-EQ", 20)
+    ]
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_all_fails_only_when_every_account_fails(
+    server, api, accounts, monkeypatch
+):
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    result = await server.get_funds(account="all")
+    assert result.startswith("❌ Failed to get funds:\ndefault: ")
+    assert "\nalpha: " in result and "\nbeta: Not authenticated" in result
+
+
+def test_merging(server):
+    holdings = server.merge_holdings(
+        [
+            [{"symbol": "NSE:A-EQ", "quantity": 10, "costPrice": 100.0, "ltp": 110.0}],
+            [
+                {
+                    "symbol": "NSE:A-EQ",
+                    "quantity": 30,
+                    "costPrice": 120.0,
+                    "ltp": 111.0,
+                },
+                {"symbol": "NSE:B-EQ", "quantity": None},
+            ],
+        ]
+    )
+    assert holdings == [
+        {"symbol": "NSE:A-EQ", "quantity": 40, "ltp": 111.0, "costPrice": 115.0},
+        {"symbol": "NSE:B-EQ", "quantity": 0, "ltp": 0, "costPrice": 0},
+    ]
+    positions = server.merge_positions(
+        [
+            [{"symbol": "NSE:A-EQ", "side": 1, "qty": 10, "avgPrice": 100.0, "pl": 5}],
+            [
+                {
+                    "symbol": "NSE:A-EQ",
+                    "side": -1,
+                    "qty": -5,
+                    "avgPrice": 101.0,
+                    "pl": -2,
+                }
+            ],
+        ]
+    )
+    assert [(p["side"], p["qty"], p["pl"]) for p in positions] == [
+        (1, 10, 5),
+        (-1, 5, -2),
+    ]
+    assert server.merge_funds(
+        [{"id": 10, "equityAmount": 5.0}, {"id": 10, "equityAmount": 7.0}]
+    ) == {"equityAmount": 12.0}
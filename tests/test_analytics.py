@@ -0,0 +1,95 @@
+"""Portfolio analytics over the mock's holdings and positions, and the vectorized pass itself."""
+
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_analytics_over_mock_portfolio(server, api):
+    a = json.loads(await server.get_portfolio_analytics(output_format="json"))["data"]
+    # SBIN 100 @ 612.5, RELIANCE 20 @ 2512.3, TCS 5 @ 3488 held; INFY 10 @ 1462 long
+    assert a["count"] == 4
+    assert a["gross_exposure"] == pytest.approx(61250 + 50246 + 17440 + 14620)
+    assert a["net_exposure"] == pytest.approx(a["gross_exposure"])
+    assert a["invested"] == pytest.approx(56000 + 49000 + 18000 + 14500)
+    assert a["unrealized_pnl"] == pytest.approx(a["gross_exposure"] - a["invested"])
+    assert list(a["by_exchange"]) == ["NSE"] and a["by_exchange"]["NSE"][
+        "weight"
+    ] == pytest.approx(1)
+    assert a["by_sector"] == {
+        "Unclassified": {
+            "value": pytest.approx(a["gross_exposure"]),
+            "weight": pytest.approx(1),
+        }
+    }
+    assert [p["symbol"] for p in a["top_positions"]] == [
+        "NSE:SBIN-EQ",
+        "NSE:RELIANCE-EQ",
+        "NSE:TCS-EQ",
+        "NSE:INFY-EQ",
+    ]
+    assert a["below_cost"] == 1
+    assert a["worst_drawdown"] == {
+        "symbol": "NSE:TCS-EQ",
+        "pct": pytest.approx((3488 - 3600) / 3600 * 100),
+    }
+    assert (
+        api["hits"]["/api/v3/holdings"] == 1 and api["hits"]["/api/v3/positions"] == 1
+    )
+
+    text = await server.get_portfolio_analytics()
+    assert text.startswith("📊 Portfolio Analytics (4 positions)")
+    assert "Worst: NSE:TCS-EQ (-3.11%)" in text
+
+
+async def test_sector_map(server, api, tmp_path, monkeypatch):
+    path = tmp_path / "sectors.json"
+    path.write_text(
+        json.dumps({"nse:sbin-eq": "Banks", "NSE:TCS-EQ": "IT", "NSE:INFY-EQ": "IT"})
+    )
+    monkeypatch.setattr(server, "SECTOR_MAP_PATH", str(path))
+    a = json.loads(await server.get_portfolio_analytics(output_format="json"))["data"]
+    assert list(a["by_sector"]) == ["Banks", "Unclassified", "IT"]
+    assert a["by_sector"]["IT"]["value"] == pytest.approx(17440 + 14620)
+
+
+def test_shorts_and_concentration(server):
+    holdings = [
+        {"symbol": "NSE:A-EQ", "quantity": 10, "ltp": 110.0, "costPrice": 100.0}
+    ]
+    positions = [
+        {"symbol": "NSE:B-EQ", "qty": 10, "side": -1, "avgPrice": 100.0, "ltp": 110.0},
+        {
+            "symbol": "BSE:C-EQ",
+            "qty": None,
+            "side": None,
+            "avgPrice": None,
+            "ltp": None,
+        },
+    ]
+    symbols, numeric = server.portfolio_arrays(holdings, positions)
+    assert numeric.tolist() == [[10, 110, 100], [-10, 110, 100], [0, 0, 0]]
+    a = server.compute_portfolio_analytics(symbols, numeric)
+    assert a["gross_exposure"] == 2200 and a["net_exposure"] == 0
+    # The short is under water as the price rose
+    assert a["unrealized_pnl"] == 0 and a["below_cost"] == 1
+    assert a["worst_drawdown"] == {"symbol": "NSE:B-EQ", "pct": pytest.approx(-10)}
+    assert a["hhi"] == pytest.approx(0.5)
+    assert a["by_exchange"]["BSE"] == {"value": 0.0, "weight": 0.0}
+
+
+def test_top_positions_are_capped_at_five(server):
+    holdings = [
+        {"symbol": f"NSE:S{i}-EQ", "quantity": 1, "ltp": float(i + 1), "costPrice": 1.0}
+        for i in range(8)
+    ]
+    symbols, numeric = server.portfolio_arrays(holdings, [])
+    top = server.compute_portfolio_analytics(symbols, numeric)["top_positions"]
+    assert [p["symbol"] for p in top] == [f"NSE:S{i}-EQ" for i in range(7, 2, -1)]
+
+
+def test_empty_portfolio(server):
+    symbols, numeric = server.portfolio_arrays([], [])
+    assert len(symbols) == 0 and numeric.shape == (0, 3)
@@ -0,0 +1,84 @@
+"""Basket place, modify and cancel: validated up front, submitted in parallel or as multi-orders."""
+
+import json
+
+import pytest
+
+from .conftest import basket
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    "multi, legs, calls", [(True, 25, 3), (True, 10, 1), (False, 25, 25)]
+)
+async def test_basket_submission(
+    server, api, unchecked, monkeypatch, multi, legs, calls
+):
+    monkeypatch.setattr(server, "BASKET_MULTI_ORDER", multi)
+    result = json.loads(
+        await server.place_basket_orders(basket(legs), output_format="json")
+    )["data"]
+    assert result["accepted"] == result["total"] == legs
+    assert len({leg["order_id"] for leg in result["legs"]}) == legs
+    path = "/api/v3/multi-order/sync" if multi else "/api/v3/orders/sync"
+    assert api["hits"][path] == calls
+    assert len(api["orders"]) == legs
+
+
+async def test_basket_legs_keep_input_order(server, api, unchecked):
+    result = json.loads(
+        await server.place_basket_orders(basket(12), output_format="json")
+    )["data"]
+    assert [leg["leg"] for leg in result["legs"]] == [
+        f"NSE:SYM{i:03d}-EQ BUY 1" for i in range(12)
+    ]
+    assert [api["orders"][leg["order_id"]]["symbol"] for leg in result["legs"]] == [
+        f"NSE:SYM{i:03d}-EQ" for i in range(12)
+    ]
+
+
+async def test_invalid_basket_sends_nothing(server, api, unchecked):
+    legs = basket(3)
+    legs[1]["side"] = "HOLD"
+    result = await server.place_basket_orders(legs)
+    assert result.startswith(
+        "❌ Basket rejected, no orders were sent:\nLeg 2: unknown side"
+    )
+    assert api["hits"]["/api/v3/multi-order/sync"] == 0
+    assert (await server.place_basket_orders([])).startswith("❌ No orders provided")
+
+
+async def test_modify_and_cancel_baskets(server, api, unchecked):
+    placed = json.loads(
+        await server.place_basket_orders(basket(3), output_format="json")
+    )["data"]
+    ids = [leg["order_id"] for leg in placed["legs"]]
+    modified = await server.modify_basket_orders(
+        [{"order_id": ids[0], "limit_price": 99}, {"order_id": ids[1], "quantity": 2}]
+    )
+    assert modified.startswith("✅ Basket modified: 2/2 orders accepted")
+    assert (
+        api["orders"][ids[0]]["limitPrice"] == 99 and api["orders"][ids[1]]["qty"] == 2
+    )
+    assert (await server.modify_basket_orders([{"limit_price": 1}])).startswith(
+        "❌ Basket rejected"
+    )
+
+    cancelled = await server.cancel_basket_orders(",".join(ids + [ids[0]]))
+    assert cancelled.startswith("✅ Basket cancelled: 3/3 orders accepted")
+    assert all(api["orders"][i]["status"] == 1 for i in ids)
+
+
+async def test_oversized_multi_order_chunk_fails_per_leg(
+    server, api, unchecked, monkeypatch
+):
+    monkeypatch.setattr(server, "BASKET_CHUNK_SIZE", 11)
+    result = json.loads(
+        await server.place_basket_orders(basket(11), output_format="json")
+    )["data"]
+    assert result["accepted"] == 0
+    assert {leg["message"] for leg in result["legs"]} == {"Maximum 10 orders allowed"}
+    assert (await server.place_basket_orders(basket(11))).startswith(
+        "❌ Basket placed: 0/11"
+    )
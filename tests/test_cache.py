@@ -0,0 +1,65 @@
+"""The response cache for read-only account endpoints and its invalidation on order writes."""
+
+import asyncio
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_repeat_reads_are_served_from_cache(server, api):
+    for _ in range(3):
+        assert not server.is_error_result(await server.get_funds())
+        assert not server.is_error_result(await server.get_profile())
+    assert api["hits"]["/api/v3/funds"] == 1
+    assert api["hits"]["/api/v3/profile"] == 1
+    stats = json.loads(await server.get_cache_stats(output_format="json"))["data"]
+    assert stats["funds"] == {"hits": 2, "misses": 1, "ttl": server.CACHE_TTLS["funds"]}
+
+
+async def test_concurrent_misses_share_one_request(server, api):
+    client = server.get_fyers_client()
+    responses = await asyncio.gather(*(client.holdings() for _ in range(5)))
+    assert all(response["code"] == 200 for response in responses)
+    assert api["hits"]["/api/v3/holdings"] == 1
+
+
+async def test_zero_ttl_disables_caching(server, api, monkeypatch):
+    monkeypatch.setitem(server.CACHE_TTLS, "holdings", 0)
+    await server.get_holdings()
+    await server.get_holdings()
+    assert api["hits"]["/api/v3/holdings"] == 2
+
+
+async def test_order_writes_invalidate_account_state(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    await server.get_funds()
+    await server.get_holdings()
+    assert (
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=600)
+    ).startswith("✅")
+    await server.get_funds()
+    await server.get_holdings()
+    assert api["hits"]["/api/v3/funds"] == 2
+    assert api["hits"]["/api/v3/holdings"] == 1
+
+
+def test_results_fetched_before_an_invalidation_are_dropped(server):
+    cache = server.TTLCache({"funds": 60})
+    generation = cache.generation("funds")
+    cache.invalidate("funds")
+    cache.set("funds", {"code": 200}, generation=generation)
+    assert cache.get("funds") is None
+    cache.set("funds", {"code": 200}, generation=cache.generation("funds"))
+    assert cache.get("funds") == {"code": 200}
+
+
+def test_cache_evicts_least_recently_used(server):
+    cache = server.TTLCache({"option_chain": 60}, maxsize=2)
+    cache.set("option_chain", 1, "a")
+    cache.set("option_chain", 2, "b")
+    cache.get("option_chain", "a")
+    cache.set("option_chain", 3, "c")
+    assert cache.get("option_chain", "b") is None
+    assert cache.get("option_chain", "a") == 1
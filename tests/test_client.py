@@ -0,0 +1,63 @@
+"""The shared async client: one pooled session, overlapping tools, and order writes through it."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from .conftest import order_id
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reads_share_one_session(server, api):
+    client = server.get_fyers_client()
+    await client.get_profile()
+    session = client._session
+    await client.funds()
+    assert client._session is session
+    assert server.get_fyers_client() is client
+
+
+@pytest.mark.mock(latency=0.1)
+async def test_independent_tools_overlap(server, api):
+    # Distinct endpoints, so a sequential client would take five round trips
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        server.get_profile(),
+        server.get_funds(),
+        server.get_holdings(),
+        server.get_positions(),
+        server.get_orders(),
+    )
+    elapsed = time.perf_counter() - start
+    assert not any(server.is_error_result(result) for result in results)
+    assert elapsed < 0.35
+
+
+async def test_place_modify_cancel(server, api, unchecked):
+    placed = await server.place_order("NSE:SBIN-EQ", 5, "LIMIT", "BUY", limit_price=600)
+    assert placed.startswith("✅ Order placed successfully!")
+    placed_id = order_id(placed)
+    assert (
+        api["orders"][placed_id]["qty"] == 5 and api["orders"][placed_id]["side"] == 1
+    )
+
+    assert (await server.modify_order(placed_id, limit_price=601)).startswith(
+        "✅ Order modified"
+    )
+    assert api["orders"][placed_id]["limitPrice"] == 601
+    cancelled = json.loads(await server.cancel_order(placed_id, output_format="json"))
+    assert cancelled == {"ok": True, "data": {"order_id": placed_id}}
+    assert api["orders"][placed_id]["status"] == 1
+
+
+async def test_invalid_orders_are_rejected_before_sending(server, api, unchecked):
+    for args in [
+        ("NSE:SBIN-EQ", 0, "LIMIT", "BUY"),
+        ("NSE:SBIN-EQ", 1, "LIMIT", "BUY"),
+        ("NSE:SBIN-EQ", 1, "STOP", "SELL"),
+    ]:
+        assert (await server.place_order(*args)).startswith("❌ Order rejected")
+    assert api["hits"]["/api/v3/orders/sync"] == 0
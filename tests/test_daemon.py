@@ -0,0 +1,136 @@
+"""Shared state daemon: stdio front-ends in separate processes sharing one daemon's session and caches."""
+
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+
+from bench_daemon import CALLS, Session, run_sessions, wait_for
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def env(server, api, tmp_path):
+    """Environment for front-end processes pointed at the mock; the daemon exits a second after the last one."""
+    environ = {
+        **os.environ,
+        "FYERS_API_URL": server.FYERS_API_URL,
+        "FYERS_DATA_URL": server.FYERS_DATA_URL,
+        "FYERS_SYMBOL_MASTER_URL": server.SYMBOL_MASTER_URL,
+        "FYERS_DATA_DIR": str(tmp_path / "daemon"),
+        "FYERS_DAEMON_IDLE": "1",
+    }
+    socket_path = tmp_path / "daemon" / "daemon.sock"
+    yield environ
+    # Leave no daemon behind for the next test
+    assert await wait_for(lambda: not socket_path.exists(), 10)
+
+
+def upstream_calls(api):
+    return {
+        path: n
+        for path, n in api["hits"].items()
+        if not path.startswith("/sym_details")
+    }
+
+
+async def close(sessions):
+    await asyncio.gather(*(session.close() for session in sessions))
+
+
+async def test_front_ends_share_one_daemon(server, api, env):
+    sessions, _, failed = await run_sessions({**env, "FYERS_DAEMON": "0"}, 3, 2)
+    await close(sessions)
+    separate = upstream_calls(api)
+    assert failed == 0 and separate["/api/v3/funds"] == 3
+
+    api["hits"].clear()
+    sessions, _, failed = await run_sessions({**env, "FYERS_DAEMON": "1"}, 3, 2)
+    try:
+        shared = upstream_calls(api)
+        assert failed == 0
+        assert shared["/api/v3/funds"] == 1 and sum(shared.values()) < sum(
+            separate.values()
+        )
+        daemon = json.loads(
+            await sessions[0].call("get_server_metrics", {"output_format": "json"})
+        )["data"]["daemon"]
+        assert daemon["clients"] == 3 and daemon["calls"] >= 3 * 2 * len(CALLS)
+        assert daemon["pid"] not in {session.proc.pid for session in sessions}
+    finally:
+        await close(sessions)
+
+
+async def test_killed_daemon_is_replaced(server, api, env):
+    sessions = [Session({**env, "FYERS_DAEMON": "1"}) for _ in range(2)]
+    await asyncio.gather(*(session.start() for session in sessions))
+    try:
+        first = json.loads(
+            await sessions[0].call("get_server_metrics", {"output_format": "json"})
+        )["data"]["daemon"]
+        os.kill(first["pid"], signal.SIGKILL)
+        await asyncio.sleep(0.2)
+        # The call in flight may fail, but not with a daemon error, and the next one starts a new daemon
+        lost = await sessions[0].call("get_funds", {})
+        assert not lost.startswith("❌ Fyers daemon error")
+        assert (await sessions[0].call("get_funds", {})).startswith("✅")
+        second = json.loads(
+            await sessions[1].call("get_server_metrics", {"output_format": "json"})
+        )["data"]["daemon"]
+        assert second["pid"] != first["pid"]
+    finally:
+        await close(sessions)
+
+
+@pytest.fixture
+async def daemon(server, api, tmp_path):
+    """A DaemonServer handling connections in this process; yields a function opening one."""
+    daemon = server.DaemonServer(str(tmp_path / "inproc.sock"))
+    unix_server = await asyncio.start_unix_server(
+        daemon._handle, daemon.path, limit=1024
+    )
+
+    async def connect():
+        return await asyncio.open_unix_connection(daemon.path, limit=1 << 20)
+
+    try:
+        yield connect
+    finally:
+        unix_server.close()
+        await unix_server.wait_closed()
+
+
+async def replies(reader):
+    return [json.loads(line) async for line in reader]
+
+
+@pytest.mark.mock(latency=0.2)
+async def test_malformed_lines_get_an_error_frame(server, daemon):
+    reader, writer = await daemon()
+    writer.write(b'{"id": 1, "tool": "get_funds", "args": {}}\n{not json\n[1, 2]\n')
+    # The front-end stops sending while get_funds is still waiting on the API
+    writer.write_eof()
+    frames = await replies(reader)
+    errors = [frame for frame in frames if frame["id"] is None]
+    assert len(errors) == 2 and all(
+        frame["error"].startswith("malformed request") for frame in errors
+    )
+    assert [frame["result"][:1] for frame in frames if frame["id"] == 1] == ["✅"]
+    writer.close()
+
+
+@pytest.mark.mock(latency=0.2)
+async def test_calls_in_flight_finish_after_an_oversized_line(server, daemon):
+    reader, writer = await daemon()
+    writer.write(b'{"id": 1, "tool": "get_funds", "args": {}}\n' + b"x" * 4096 + b"\n")
+    await writer.drain()
+    frames = await replies(reader)
+    assert (
+        len(frames) == 1
+        and frames[0]["id"] == 1
+        and frames[0]["result"].startswith("✅")
+    )
+    writer.close()
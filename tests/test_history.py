@@ -0,0 +1,92 @@
+"""Historical candles: range splitting, the on-disk store and no_data windows."""
+
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def history(server, *args, **kwargs):
+    return json.loads(await server.get_history(*args, output_format="json", **kwargs))[
+        "data"
+    ]
+
+
+async def test_long_ranges_are_split_and_stored(server, api):
+    first = await history(server, "NSE:SBIN-EQ", "2023-01-01", "2024-12-31", limit=5)
+    assert first["fetched_windows"] == 2 and api["hits"]["/data/history"] == 2
+    # Weekdays only, one daily candle each
+    assert first["count"] == 522
+    assert len(first["candles"]) == 5
+
+    again = await history(server, "nse:sbin-eq", "2023-06-01", "2024-06-30", limit=5)
+    assert again["fetched_windows"] == 0 and api["hits"]["/data/history"] == 2
+    assert again["candles"][-1][0] <= server.parse_ist_time("2024-06-30", end=True)
+
+
+async def test_only_missing_ranges_are_fetched(server, api):
+    await history(server, "NSE:SBIN-EQ", "2024-03-01", "2024-03-31")
+    extended = await history(server, "NSE:SBIN-EQ", "2024-02-01", "2024-04-30", limit=0)
+    # The gaps before and after the stored month
+    assert extended["fetched_windows"] == 2
+    assert extended["count"] == 64 and extended["candles"] == []
+
+
+async def test_minute_resolution_uses_smaller_windows(server, api):
+    result = await history(
+        server, "NSE:SBIN-EQ", "2024-01-01", "2024-08-31", resolution="60"
+    )
+    assert result["fetched_windows"] == 3
+    assert api["hits"]["/data/history"] == 3
+
+
+async def test_no_data_windows_are_empty_and_covered(server, api):
+    # A weekend: Fyers answers s="no_data"
+    text = await server.get_history("NSE:SBIN-EQ", "2024-01-06", "2024-01-07")
+    assert text == "📊 No candles for NSE:SBIN-EQ between 2024-01-06 and 2024-01-07"
+    result = await history(server, "NSE:SBIN-EQ", "2024-01-06", "2024-01-07")
+    assert result["count"] == 0 and result["fetched_windows"] == 0
+    assert api["hits"]["/data/history"] == 1
+
+
+async def test_store_survives_a_restart(server, api, monkeypatch):
+    await history(server, "NSE:SBIN-EQ", "2024-01-01", "2024-01-31")
+    monkeypatch.setattr(server, "candle_store", None)
+    result = await history(server, "NSE:SBIN-EQ", "2024-01-01", "2024-01-31")
+    assert result["fetched_windows"] == 0 and result["count"] == 23
+
+
+async def test_text_output_and_bad_input(server, api):
+    text = await server.get_history("NSE:SBIN-EQ", "2024-01-01", "2024-01-31", limit=3)
+    assert text.startswith("📊 NSE:SBIN-EQ (D) - 23 candles")
+    assert text.count(" | V ") == 3
+    assert (
+        await server.get_history("NSE:SBIN-EQ", "2024/01/01", "2024-01-31")
+    ).startswith("❌ Dates must be")
+    assert (
+        await server.get_history("NSE:SBIN-EQ", "2024-02-01", "2024-01-31")
+    ).startswith("❌ end_date is before")
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_failed_windows_are_not_marked_covered(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    assert (
+        await server.get_history("NSE:SBIN-EQ", "2024-01-01", "2024-01-31")
+    ).startswith("❌ Failed to get history")
+    assert server.get_candle_store().load("NSE:SBIN-EQ", "D")[1] == []
+
+
+def test_interval_helpers(server):
+    assert server.split_range(0, 25, 10) == [(0, 9), (10, 19), (20, 25)]
+    assert server.merge_intervals([(10, 19), (0, 9), (30, 40)]) == [(0, 19), (30, 40)]
+    assert server.missing_intervals([(10, 19), (30, 40)], 0, 50) == [
+        (0, 9),
+        (20, 29),
+        (41, 50),
+    ]
+    assert server.missing_intervals([(0, 50)], 10, 20) == []
+    assert server.history_window_seconds("d") == 366 * 86400
+    assert server.history_window_seconds("5S") == 30 * 86400
+    assert server.history_window_seconds("15") == 100 * 86400
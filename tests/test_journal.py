@@ -0,0 +1,184 @@
+"""Trade journal: order writes and fills recorded once, realized P&L, and the writer thread."""
+
+import os
+import threading
+
+import pytest
+
+from bench_journal import load_history
+
+from .conftest import order_id
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def journal(server, api, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    return server.get_trade_journal()
+
+
+def fill(server, api, order, filled, price, status=6):
+    """Report a (partial) fill through the order book, as the order socket or a REST sync would."""
+    api["orders"][order] = {
+        **api["orders"][order],
+        "status": status,
+        "filledQty": filled,
+        "tradedPrice": price,
+    }
+    server.get_fyers_client().order_book.apply(api["orders"][order])
+
+
+async def test_fills_are_recorded_once(server, api, journal):
+    buy = order_id(
+        await server.place_order(
+            "NSE:SBIN-EQ", 10, "LIMIT", "BUY", limit_price=600, strategy="momentum"
+        )
+    )
+    sell = order_id(
+        await server.place_order(
+            "NSE:SBIN-EQ", 10, "LIMIT", "SELL", limit_price=610, strategy="momentum"
+        )
+    )
+    fill(server, api, buy, 10, 600.0, status=2)
+    fill(server, api, sell, 4, 610.0)
+    fill(server, api, sell, 10, 612.0, status=2)
+    # Seen again from a REST sync: already recorded
+    book = server.get_fyers_client().order_book
+    book.orders.pop(sell)
+    book.apply(api["orders"][sell])
+    journal.flush()
+
+    rows = journal.db.execute(
+        "SELECT qty, price, strategy FROM fills WHERE order_id = ? ORDER BY filled_qty",
+        (sell,),
+    ).fetchall()
+    # The second fill is priced from the moving average
+    assert [(qty, strategy) for qty, _, strategy in rows] == [
+        (4, "momentum"),
+        (6, "momentum"),
+    ]
+    assert rows[1][1] == pytest.approx((6120 - 2440) / 6)
+    total = journal.query(strategy="momentum")["total"]
+    # Realized on the matched quantity at average prices; turnover counts both sides
+    assert total["realized_pnl"] == 120.0 and total["turnover"] == 6000.0 + 6120.0
+
+    # A new session on the same file sees the history and does not record the fill again
+    journal.close()
+    server.trade_journal = None
+    book.orders.pop(buy)
+    book.apply(api["orders"][buy])
+    reopened = server.get_trade_journal()
+    reopened.flush()
+    assert reopened.query(strategy="momentum")["total"]["fills"] == 3
+
+
+async def test_writes_are_logged_with_their_strategy(server, api, journal):
+    pending = order_id(
+        await server.place_order(
+            "NSE:TCS-EQ", 1, "LIMIT", "BUY", limit_price=3500, strategy="meanrev"
+        )
+    )
+    await server.modify_order(pending, limit_price=3490)
+    await server.cancel_order(pending)
+    await server.place_basket_orders(
+        [
+            {
+                "symbol": "NSE:SBIN-EQ",
+                "quantity": 1,
+                "order_type": "LIMIT",
+                "side": "BUY",
+                "limit_price": 600,
+                "strategy": "pairs",
+            },
+            {
+                "symbol": "NSE:RELIANCE-EQ",
+                "quantity": 1,
+                "order_type": "LIMIT",
+                "side": "SELL",
+                "limit_price": 2500,
+                "strategy": "pairs",
+            },
+        ]
+    )
+    journal.flush()
+    actions = journal.db.execute(
+        "SELECT action, strategy, symbol FROM submissions WHERE order_id = ? ORDER BY seq",
+        (pending,),
+    ).fetchall()
+    # Modify and cancel inherit the strategy and symbol of the placement
+    assert actions == [
+        ("place", "meanrev", "NSE:TCS-EQ"),
+        ("modify", "meanrev", "NSE:TCS-EQ"),
+        ("cancel", "meanrev", "NSE:TCS-EQ"),
+    ]
+    legs = journal.db.execute(
+        "SELECT order_id, ok FROM submissions WHERE strategy = 'pairs'"
+    ).fetchall()
+    assert len(legs) == 2 and all(leg_id and ok == 1 for leg_id, ok in legs)
+
+
+async def test_query_tool(server, api, journal):
+    buy = order_id(
+        await server.place_order(
+            "NSE:SBIN-EQ", 10, "LIMIT", "BUY", limit_price=600, strategy="momentum"
+        )
+    )
+    sell = order_id(
+        await server.place_order(
+            "NSE:SBIN-EQ", 10, "LIMIT", "SELL", limit_price=612, strategy="momentum"
+        )
+    )
+    fill(server, api, buy, 10, 600.0, status=2)
+    fill(server, api, sell, 10, 612.0, status=2)
+    text = await server.query_trade_journal()
+    assert "momentum: P&L ₹+120.00" in text
+    assert (await server.query_trade_journal(group_by="week")).startswith("❌")
+    assert (await server.query_trade_journal(start_date="01-01-2026")).startswith(
+        "❌ Dates must be"
+    )
+    assert (await server.query_trade_journal(account="nobody")).startswith(
+        "❌ Unknown account"
+    )
+
+
+async def test_database_work_stays_off_the_event_loop(server, api, journal):
+    thread = await journal.call(lambda: threading.current_thread().name)
+    assert (
+        thread.startswith("trade-journal") and thread != threading.current_thread().name
+    )
+
+
+async def test_orders_go_through_without_a_journal(server, api, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setattr(server, "TRADE_JOURNAL_PATH", str(blocker / "journal.sqlite3"))
+    assert (
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=600)
+    ).startswith("✅")
+    journal = server.get_trade_journal()
+    journal.flush()
+    assert journal.errors >= 1 and journal.stats()["last_error"]
+    assert (await server.query_trade_journal()).startswith("❌")
+
+
+def test_queries_over_history(server, tmp_path):
+    journal = server.TradeJournal(os.path.join(tmp_path, "history.sqlite3"))
+    try:
+        journal.flush()
+        count, first, last = load_history(journal, days=20, fills_per_day=50)
+        assert count == 20 * 50
+        total = journal.query()["total"]
+        assert total["fills"] == count
+        # Turnover adds up the same whichever way it is grouped
+        for group_by in ("symbol", "day", "account"):
+            assert journal.query(group_by=group_by)["total"][
+                "turnover"
+            ] == pytest.approx(total["turnover"])
+        assert journal.query(start_day=last)["total"]["fills"] == 50
+        assert journal.query(end_day=first)["total"]["fills"] == 50
+    finally:
+        journal.close()
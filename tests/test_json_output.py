@@ -0,0 +1,81 @@
+"""output_format="json": compact ``{"ok":...}`` envelopes for every tool, on success and on failure."""
+
+import inspect
+import json
+
+import pytest
+
+from bench_tools import WORKLOADS, result_text
+
+pytestmark = pytest.mark.anyio
+
+
+def json_tools(server):
+    return [
+        name
+        for name in WORKLOADS
+        if "output_format" in inspect.signature(getattr(server, name)).parameters
+    ]
+
+
+def test_every_tool_but_authenticate_takes_output_format(server):
+    assert set(WORKLOADS) - set(json_tools(server)) == set()
+    assert "output_format" not in inspect.signature(server.authenticate).parameters
+
+
+async def test_every_tool_answers_in_compact_json(server, api):
+    for name in json_tools(server):
+        text = result_text(
+            await server.mcp.call_tool(
+                name, {**WORKLOADS[name], "output_format": "json"}
+            )
+        )
+        assert text.startswith('{"ok":true,"data":'), (name, text)
+        assert (
+            json.dumps(json.loads(text), separators=(",", ":"), ensure_ascii=False)
+            == text
+        ), name
+
+
+async def test_json_matches_text(server, api):
+    funds = json.loads(await server.get_funds(output_format="json"))["data"]
+    text = await server.get_funds()
+    assert f"Total Balance: ₹{funds['total_balance']:,.2f}" in text
+    holdings = json.loads(await server.get_holdings(output_format="json"))["data"]
+    assert [h["symbol"] for h in holdings["holdings"]] == [
+        "NSE:SBIN-EQ",
+        "NSE:RELIANCE-EQ",
+        "NSE:TCS-EQ",
+    ]
+    assert (
+        f"Total Value: ₹{holdings['total_value']:,.2f}" in await server.get_holdings()
+    )
+    quotes = json.loads(await server.get_quotes("NSE:SBIN-EQ", output_format="json"))[
+        "data"
+    ]["quotes"]
+    assert quotes[0]["symbol"] == "NSE:SBIN-EQ" and quotes[0]["ltp"] == 612.5
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_failures_are_json_too(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    result = await server.get_funds(output_format="json")
+    error = json.loads(result)
+    assert error["ok"] is False and not error["error"].startswith("❌")
+    assert server.is_error_result(result)
+
+
+async def test_bad_input_is_reported_as_json(server, api):
+    for result in [
+        await server.get_orders(status="done", output_format="json"),
+        await server.get_history(
+            "NSE:SBIN-EQ", "2024/01/01", "2024-01-31", output_format="json"
+        ),
+        await server.place_order(
+            "NSE:SBIN-EQ", 0, "LIMIT", "BUY", output_format="json"
+        ),
+        await server.get_funds(account="nobody", output_format="json"),
+    ]:
+        assert json.loads(result)["ok"] is False, result
+    assert server.error_result("text", "❌ boom") == "❌ boom"
+    assert server.error_result("json", "❌ boom") == '{"ok":false,"error":"boom"}'
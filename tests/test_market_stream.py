@@ -0,0 +1,87 @@
+"""The streamed tick table behind get_quotes (fake data socket from scripts/fake_data_socket.py)."""
+
+import json
+
+import pytest
+
+from fake_data_socket import FakeDataSocket, FakeTickServer, wait_for
+
+pytestmark = pytest.mark.anyio
+
+
+SYMBOLS = ["NSE:SBIN-EQ", "NSE:RELIANCE-EQ", "NSE:TCS-EQ"]
+
+
+@pytest.fixture
+async def ticks(server, monkeypatch):
+    monkeypatch.setattr(server, "STREAM_RECONNECT_MIN", 0.05)
+    fake = FakeTickServer()
+    url = await fake.start()
+    stream = server.MarketDataStream(
+        "MOCK-100:mock-token",
+        socket_factory=lambda token, on_message, on_error, on_close: FakeDataSocket(
+            url, on_message, on_error, on_close
+        ),
+    )
+    try:
+        yield fake, stream
+    finally:
+        await stream.stop()
+        await fake.stop()
+
+
+async def test_stream_keeps_a_tick_table(ticks):
+    fake, stream = ticks
+    await stream.subscribe(SYMBOLS)
+    assert await wait_for(lambda: len(stream.ticks) == len(SYMBOLS))
+    tick = stream.get_tick("NSE:SBIN-EQ")
+    assert set(tick) == {"lp", "ch", "chp", "volume", "ts"} and 100 <= tick["lp"] <= 200
+
+    await stream.unsubscribe(["NSE:TCS-EQ"])
+    assert stream.get_tick("NSE:TCS-EQ") is None
+    assert stream.symbols == set(SYMBOLS) - {"NSE:TCS-EQ"}
+
+
+async def test_stream_reconnects_and_resubscribes(ticks):
+    fake, stream = ticks
+    await stream.subscribe(SYMBOLS)
+    assert await wait_for(
+        lambda: stream.connected and len(stream.ticks) == len(SYMBOLS)
+    )
+    await fake.drop_all()
+    assert await wait_for(lambda: not stream.connected)
+    # Stale ticks are not served while the socket is down
+    assert stream.get_tick("NSE:SBIN-EQ") is None
+    assert await wait_for(lambda: stream.connected and stream.reconnects >= 1)
+    assert await wait_for(lambda: len(fake.subscribe_requests) >= 2)
+    assert fake.subscribe_requests[-1] == sorted(SYMBOLS)
+
+
+async def test_get_quotes_answers_streamed_symbols_locally(
+    server, api, ticks, monkeypatch
+):
+    fake, stream = ticks
+    monkeypatch.setattr(server, "market_stream", stream)
+    result = await server.subscribe_quotes("NSE:SBIN-EQ,NSE:RELIANCE-EQ")
+    assert result.startswith("✅ Subscribed to 2 symbol(s)")
+    assert await wait_for(lambda: len(stream.ticks) == 2)
+
+    result = await server.get_quotes("NSE:SBIN-EQ,NSE:RELIANCE-EQ")
+    assert result.count("📈") == 2
+    assert api["hits"]["/data/quotes"] == 0
+
+    # Symbols not streamed still go over REST
+    await server.get_quotes("NSE:SBIN-EQ,NSE:TCS-EQ")
+    assert api["hits"]["/data/quotes"] == 1
+
+    unsubscribed = json.loads(
+        await server.unsubscribe_quotes("NSE:RELIANCE-EQ", output_format="json")
+    )["data"]
+    assert unsubscribed == {"unsubscribed": ["NSE:RELIANCE-EQ"], "streaming": 1}
+
+
+async def test_unsubscribe_without_a_stream(server):
+    assert (
+        await server.unsubscribe_quotes("NSE:SBIN-EQ")
+        == "📊 No active quote subscriptions"
+    )
@@ -0,0 +1,79 @@
+"""Tool and upstream metrics: the get_server_metrics tool and the Prometheus endpoint."""
+
+import json
+
+import aiohttp
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_tool_and_upstream_metrics(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    await server.get_funds()
+    await server.get_holdings()
+    await server.get_funds(account="nobody")
+    m = json.loads(await server.get_server_metrics(output_format="json"))["data"]
+    assert (
+        m["tools"]["get_funds"]["count"] == 2 and m["tools"]["get_funds"]["errors"] == 1
+    )
+    assert m["tools"]["get_holdings"]["errors"] == 0
+    upstream = m["upstream"]["GET /holdings"]
+    assert (
+        upstream["count"] == 1
+        and upstream["bytes_mean"] > 0
+        and upstream["errors"] == {}
+    )
+
+    text = await server.get_server_metrics()
+    assert text.startswith("📊 Server Metrics (uptime 0 min):\n\n🛠️ Tools:\n")
+    assert "get_funds: 2 calls | 1 errors |" in text
+    assert "GET /holdings: 1 calls |" in text and "errors: none" in text
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_upstream_errors_by_code(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    await server.get_funds()
+    m = json.loads(await server.get_server_metrics(output_format="json"))["data"]
+    assert m["upstream"]["GET /funds"]["errors"] == {"500": 1}
+    assert m["tools"]["get_funds"]["errors"] == 1
+    assert "GET /funds" in m["resilience"]
+
+
+async def test_prometheus_endpoint(server, api):
+    await server.get_funds()
+    runner = await server.start_metrics_server(0)
+    try:
+        host, port = runner.addresses[0][:2]
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://{host}:{port}/metrics") as response:
+                assert response.status == 200 and response.content_type == "text/plain"
+                body = await response.text()
+    finally:
+        await runner.cleanup()
+    assert "# TYPE fyers_mcp_tool_latency_seconds histogram" in body
+    assert 'fyers_mcp_tool_latency_seconds_count{tool="get_funds"} 1' in body
+    assert 'fyers_mcp_tool_latency_seconds_bucket{tool="get_funds",le="+Inf"} 1' in body
+    assert 'fyers_mcp_upstream_response_bytes_count{endpoint="GET /funds"} 1' in body
+    assert body.endswith("\n")
+
+
+def test_histogram(server):
+    h = server.Histogram((0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        h.observe(value)
+    assert h.counts == [1, 2, 1, 1] and h.count == 5 and h.sum == pytest.approx(5.605)
+    # Interpolated inside the bucket holding the rank, capped at the last bound
+    assert h.quantile(0.5) == pytest.approx(0.01 + 0.09 * 1.5 / 2)
+    assert h.quantile(0.99) == 1.0
+    assert server.Histogram((1.0,)).quantile(0.5) == 0.0
+    assert h.summary()["mean"] == pytest.approx(5.605 / 5)
+
+
+@pytest.mark.mock(latency=0.05, jitter=0.05, seed=2)
+async def test_latency_is_attributed_to_upstream(server, api):
+    await server.get_holdings()
+    tools = server.server_metrics.snapshot()["tools"]
+    assert tools["get_holdings"]["mean"] >= 0.05
+    assert tools["get_holdings"]["upstream_share"] > 0.8
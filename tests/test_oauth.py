@@ -0,0 +1,80 @@
+"""The non-blocking OAuth login against the mock's authcode endpoints."""
+
+import os
+import time
+
+import aiohttp
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def login(server, api, monkeypatch):
+    """No token yet, an app secret, and a callback listener on a free port without a browser."""
+    monkeypatch.delenv("FYERS_ACCESS_TOKEN")
+    monkeypatch.setenv("FYERS_SECRET_KEY", "mock-secret")
+    monkeypatch.setattr(server, "AUTH_PORT", 0)
+    monkeypatch.setattr(server, "AUTH_OPEN_BROWSER", False)
+
+
+async def test_oauth_login(server, api, login):
+    assert "Not authenticated" in await server.get_funds()
+
+    start = time.perf_counter()
+    result = await server.authenticate()
+    assert result.startswith("⏳") and time.perf_counter() - start < 1
+    flow = server.auth_flow
+    async with aiohttp.ClientSession() as session:
+        # A redirect with the wrong state is refused and the flow keeps waiting
+        async with session.get(
+            f"{flow.redirect_uri}?auth_code=forged&state=wrong"
+        ) as response:
+            assert response.status == 400 and flow.status == "pending"
+
+        # Other tools keep answering while the login is pending
+        start = time.perf_counter()
+        await server.get_cache_stats()
+        assert time.perf_counter() - start < 0.1
+
+        # The "browser": the mock's authcode endpoint redirects straight to the callback
+        async with session.get(flow.auth_url) as response:
+            assert response.status == 200 and "Successful" in await response.text()
+
+    assert (await server.authenticate(wait_seconds=5)).startswith("✅")
+    tokens = server.get_token_manager()
+    assert os.path.exists(tokens.path) and tokens.refresh_token == "mock-refresh-token"
+    assert "Mock Trader" in await server.check_auth_status()
+    # A later call starts a fresh login
+    assert (await server.authenticate()).startswith("⏳")
+
+
+async def test_login_without_a_secret_is_refused(server, api, login, monkeypatch):
+    monkeypatch.delenv("FYERS_SECRET_KEY")
+    assert (await server.authenticate()).startswith("❌")
+    assert server.auth_flow is None
+
+
+async def test_finished_login_does_not_block_another_account(
+    server, api, login, monkeypatch
+):
+    monkeypatch.setattr(server, "FYERS_ACCOUNTS", ["default", "beta"])
+    monkeypatch.setenv("FYERS_BETA_CLIENT_ID", "MOCK-300")
+    monkeypatch.setenv("FYERS_BETA_SECRET_KEY", "beta-secret")
+    assert (await server.authenticate()).startswith("⏳")
+    assert (await server.authenticate(account="beta", wait_seconds=0)).startswith(
+        "⏳ A login for account 'default' is in progress"
+    )
+
+    # The default login finishes but is never reported
+    async with aiohttp.ClientSession() as session:
+        async with session.get(server.auth_flow.auth_url) as response:
+            assert response.status == 200
+    await server.auth_flow.wait(5)
+    assert server.auth_flow.status == "success"
+
+    assert (await server.authenticate(account="beta")).startswith(
+        "⏳ Waiting for login in the browser"
+    )
+    assert server.auth_flow.account.name == "beta"
+    assert "Mock Trader" in await server.check_auth_status()
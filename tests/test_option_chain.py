@@ -0,0 +1,139 @@
+"""Option chains: implied volatility and Greeks against the mock's Black-76 prices on a known smile."""
+
+import json
+
+import numpy as np
+import pytest
+
+from mock_fyers import OPTION_RATE, option_vol
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def chain(server, api, monkeypatch):
+    monkeypatch.setattr(server, "OPTION_RISK_FREE_RATE", OPTION_RATE)
+    monkeypatch.setitem(server.CACHE_TTLS, "option_chain", 30)
+    result = await server.get_option_chain(
+        "NSE:NIFTY50-INDEX", strike_count=50, output_format="json"
+    )
+    return json.loads(result)["data"]
+
+
+def legs(chain):
+    return [
+        (row["strike"], leg, sign)
+        for row in chain["strikes"]
+        for leg, sign in ((row["call"], 1), (row["put"], -1))
+    ]
+
+
+async def test_one_request_per_chain(server, api, chain):
+    assert len(chain["strikes"]) == 101 and api["hits"]["/data/options-chain-v3"] == 1
+    # A repeat and a narrower strike range come from the cache
+    await server.get_option_chain(
+        "NSE:NIFTY50-INDEX", strike_count=50, output_format="json"
+    )
+    narrow = json.loads(
+        await server.get_option_chain(
+            "NSE:NIFTY50-INDEX",
+            strike_count=50,
+            min_strike=23800,
+            max_strike=24200,
+            output_format="json",
+        )
+    )["data"]
+    assert [row["strike"] for row in narrow["strikes"]] == list(range(23800, 24201, 50))
+    assert api["hits"]["/data/options-chain-v3"] == 1
+
+
+async def test_implied_volatility_matches_the_smile(chain):
+    years = chain["days_to_expiry"] / 365
+    solved = [(strike, leg) for strike, leg, _ in legs(chain) if leg["iv"] is not None]
+    assert (
+        max(
+            abs(leg["iv"] - option_vol(strike, chain["forward"]))
+            for strike, leg in solved
+        )
+        < 1e-4
+    )
+    # Far wings are worth (almost) nothing this close to expiry and have no meaningful IV
+    discount = np.exp(-chain["rate"] * years)
+    for strike, leg, sign in legs(chain):
+        if leg["iv"] is None:
+            assert (
+                leg["ltp"] - discount * max(sign * (chain["forward"] - strike), 0) < 0.5
+            )
+
+
+async def test_greeks_match_finite_differences(server, chain):
+    strike, leg, sign = legs(chain)[len(legs(chain)) // 2 + 7]
+    spot, sigma, r, years = (
+        chain["spot"],
+        leg["iv"],
+        chain["rate"],
+        chain["days_to_expiry"] / 365,
+    )
+
+    def price(s=spot, t=years, vol=sigma):
+        return float(server.black76(s * np.exp(r * t), strike, t, r, vol, sign)[0])
+
+    h, dt = spot * 1e-4, 1 / 365 / 24
+    numeric = {
+        "delta": (price(spot + h) - price(spot - h)) / (2 * h),
+        "gamma": (price(spot + h) - 2 * price() + price(spot - h)) / (h * h),
+        "theta": (price(t=years - dt) - price(t=years + dt)) / (2 * dt) / 365,
+        "vega": (price(vol=sigma + 1e-4) - price(vol=sigma - 1e-4)) / 2e-4 / 100,
+    }
+    greeks = server.option_greeks(
+        spot, spot * np.exp(r * years), strike, years, r, sigma, sign
+    )
+    for name, value in numeric.items():
+        assert float(greeks[name]) == pytest.approx(value, rel=1e-3, abs=1e-3), name
+    parity = [
+        row["call"]["delta"] - row["put"]["delta"]
+        for row in chain["strikes"]
+        if row["call"]["iv"] and row["put"]["iv"]
+    ]
+    assert parity and max(abs(d - 1) for d in parity) < 2e-4
+
+
+async def test_expiry_selection(server, api, chain):
+    later = list(server.get_fyers_client().option_expiries["NSE:NIFTY50-INDEX"])[1]
+    result = json.loads(
+        await server.get_option_chain(
+            "NSE:NIFTY50-INDEX", expiry=later, output_format="json"
+        )
+    )["data"]
+    assert result["expiry"] == later and api["hits"]["/data/options-chain-v3"] == 2
+    unknown = await server.get_option_chain("NSE:NIFTY50-INDEX", expiry="2001-01-01")
+    assert unknown.startswith("❌ No 2001-01-01 expiry") and later in unknown
+
+
+async def test_text_output(server, api):
+    result = await server.get_option_chain("NSE:SBIN-EQ", strike_count=5)
+    assert result.startswith("📊 NSE:SBIN-EQ Option Chain") and "◀ ATM" in result
+
+
+def test_vectorized_solver_on_a_synthetic_book(server):
+    rng = np.random.default_rng(1)
+    forward = 24000.0
+    strikes = rng.uniform(0.7, 1.3, 2000) * forward
+    years = rng.uniform(2, 90, 2000) / 365
+    signs = np.where(rng.random(2000) < 0.5, 1.0, -1.0)
+    vols = np.array([option_vol(k, forward) for k in strikes])
+    prices = server.black76(forward, strikes, years, OPTION_RATE, vols, signs)[0]
+    solved = server.implied_volatility(
+        prices, forward, strikes, years, OPTION_RATE, signs
+    )
+    ok = ~np.isnan(solved)
+    assert np.abs(solved[ok] - vols[ok]).max() < 1e-4
+    intrinsic = np.exp(-OPTION_RATE * years) * np.maximum(
+        signs * (forward - strikes), 0
+    )
+    assert (prices - intrinsic)[~ok].max() < 0.5
+    # One contract at a time gives the same answer as the batch
+    single = server.implied_volatility(
+        prices[0], forward, strikes[0], years[0], OPTION_RATE, signs[0]
+    )
+    assert float(single) == pytest.approx(solved[0], nan_ok=True)
@@ -0,0 +1,132 @@
+"""The local order book behind get_orders: filters, pages and incremental sync."""
+
+import json
+
+import pytest
+
+from .conftest import basket, order_id
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_get_orders_filters_and_pages(server, api, unchecked):
+    ids = [
+        order_id(
+            await server.place_order(
+                "NSE:SBIN-EQ", 1, "LIMIT", side, limit_price=600 + i
+            )
+        )
+        for i, side in enumerate(["BUY", "SELL"] * 6)
+    ]
+    await server.cancel_order(ids[0])
+
+    page = json.loads(await server.get_orders(limit=5, output_format="json"))["data"]
+    assert page["matched"] == 12 and len(page["orders"]) == 5
+    assert [o["id"] for o in page["orders"]] == ids[::-1][:5]
+    rest = json.loads(
+        await server.get_orders(
+            limit=10, cursor=page["next_cursor"], output_format="json"
+        )
+    )["data"]
+    assert [o["id"] for o in rest["orders"]] == ids[::-1][5:]
+    assert rest["next_cursor"] is None
+
+    sells = json.loads(
+        await server.get_orders(side="sell", limit=50, output_format="json")
+    )["data"]
+    assert sells["matched"] == 6 and {o["side"] for o in sells["orders"]} == {"SELL"}
+    cancelled = json.loads(
+        await server.get_orders(status="cancelled", output_format="json")
+    )["data"]
+    assert [o["id"] for o in cancelled["orders"]] == [ids[0]]
+    assert (
+        json.loads(await server.get_orders(status="open", output_format="json"))[
+            "data"
+        ]["matched"]
+        == 11
+    )
+    assert (
+        json.loads(await server.get_orders(symbol="NSE:TCS-EQ", output_format="json"))[
+            "data"
+        ]["matched"]
+        == 0
+    )
+
+    text = await server.get_orders(limit=2)
+    assert "Showing 2 of 12 matching orders | next page: cursor=" in text
+
+
+async def test_get_orders_rejects_bad_filters(server, api):
+    assert (await server.get_orders(status="done")).startswith(
+        "❌ unknown status 'DONE'"
+    )
+    assert (await server.get_orders(side="HOLD")).startswith("❌ Unknown side")
+    assert (await server.get_orders(start_time="yesterday")).startswith(
+        "❌ invalid time"
+    )
+    assert (await server.get_orders(cursor="page2")).startswith("❌ Invalid cursor")
+    assert await server.get_orders() == "📊 No orders found"
+
+
+async def test_order_book_syncs_incrementally(server, api, unchecked):
+    await server.get_orders()
+    book = server.get_fyers_client().order_book
+    synced_at = book.synced_at
+    placed = order_id(
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=600)
+    )
+    assert book.dirty == {placed}
+
+    result = json.loads(await server.get_orders(output_format="json"))["data"]
+    assert [o["id"] for o in result["orders"]] == [placed]
+    # Fetched by ID, not by downloading the whole book again
+    assert book.synced_at == synced_at and not book.dirty
+    hits = api["hits"]["/api/v3/orders"]
+    await server.get_orders()
+    assert api["hits"]["/api/v3/orders"] == hits
+
+    await server.get_orders(refresh=True)
+    assert book.synced_at > synced_at
+
+
+async def test_many_writes_trigger_a_full_sync(server, api, unchecked):
+    await server.get_orders()
+    book = server.get_fyers_client().order_book
+    synced_at = book.synced_at
+    await server.place_basket_orders(basket(server.ORDER_BOOK_DIFF_MAX + 1))
+    assert book.needs_full_sync()
+    result = json.loads(await server.get_orders(limit=50, output_format="json"))["data"]
+    assert result["matched"] == server.ORDER_BOOK_DIFF_MAX + 1
+    assert book.synced_at > synced_at
+
+
+def test_order_book_time_window(server):
+    book = server.OrderBook()
+    book.replace(
+        [
+            {
+                "id": f"O{i}",
+                "symbol": "NSE:SBIN-EQ",
+                "side": 1,
+                "status": 2,
+                "orderDateTime": f"15-Oct-2026 09:{15 + i}:00",
+            }
+            for i in range(5)
+        ]
+    )
+    start, end = server.parse_ist_time("2026-10-15 09:16"), server.parse_ist_time(
+        "2026-10-15 09:18"
+    )
+    orders, matched, cursor = book.query(start=start, end=end)
+    assert (
+        [o["id"] for o in orders] == ["O3", "O2", "O1"]
+        and matched == 3
+        and cursor is None
+    )
+    assert (
+        book.replace(
+            [{"id": "O0", "status": 1, "orderDateTime": "15-Oct-2026 09:15:00"}]
+        )
+        == 5
+    )
+    assert list(book.orders) == ["O0"] and book.query(statuses=[2])[1] == 0
@@ -0,0 +1,141 @@
+"""Order update socket (fake socket from scripts/fake_order_socket.py) and wait_for_order_status."""
+
+import asyncio
+import time
+
+import pytest
+
+from fake_order_socket import FakeOrderServer, FakeOrderSocket, wait_for
+
+from .conftest import order_id
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def socket(server, api, monkeypatch):
+    monkeypatch.setattr(server, "STREAM_RECONNECT_MIN", 0.05)
+    monkeypatch.setattr(server, "ORDER_WAIT_POLL", 0.25)
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    fake = FakeOrderServer()
+    url = await fake.start()
+    stream = server.OrderUpdateStream(
+        "MOCK-100:mock-token",
+        server.get_fyers_client,
+        socket_factory=lambda token, *callbacks: FakeOrderSocket(url, *callbacks),
+    )
+    monkeypatch.setattr(server, "order_stream", stream)
+    stream.start()
+    try:
+        yield fake
+    finally:
+        await stream.stop()
+        await fake.stop()
+
+
+async def fill(api, fake, order, status=2, message="", delay=0.0):
+    """Change an order in the mock's book after ``delay`` and push it; returns when it was pushed."""
+    await asyncio.sleep(delay)
+    api["orders"][order] = {
+        **api["orders"][order],
+        "status": status,
+        "message": message,
+    }
+    await fake.push("orders", api["orders"][order])
+    return time.perf_counter()
+
+
+async def place(server, symbol="NSE:SBIN-EQ"):
+    return order_id(
+        await server.place_order(symbol, 1, "LIMIT", "BUY", limit_price=600)
+    )
+
+
+async def test_stream_connects_and_subscribes(server, api, socket):
+    client = server.get_fyers_client()
+    assert await wait_for(lambda: client.live_positions is not None)
+    assert socket.subscriptions[-1] == server.ORDER_STREAM_TYPES.split(",")
+    assert client.order_book.live
+
+
+async def test_wait_resolves_on_the_pushed_fill(server, api, socket):
+    assert await wait_for(lambda: server.order_stream.connected)
+    placed = await place(server)
+    before = api["hits"]["/api/v3/orders"]
+    filler = asyncio.create_task(fill(api, socket, placed, delay=0.2))
+    result = await server.wait_for_order_status(placed, "filled", timeout=5)
+    assert result.startswith("✅ Order reached filled")
+    assert time.perf_counter() - filler.result() < 0.05
+    # One lookup to learn the order, then only pushes
+    assert api["hits"]["/api/v3/orders"] - before == 1
+
+
+async def test_rejection_ends_the_wait(server, api, socket):
+    placed = await place(server, "NSE:TCS-EQ")
+    asyncio.create_task(
+        fill(api, socket, placed, status=5, message="Insufficient funds", delay=0.1)
+    )
+    result = await server.wait_for_order_status(placed, "filled", timeout=5)
+    assert result.startswith(
+        "❌ Order ended as rejected, not filled"
+    ) and result.endswith("Message: Insufficient funds")
+
+
+async def test_wait_times_out(server, api, socket):
+    placed = await place(server)
+    result = await server.wait_for_order_status(placed, "filled", timeout=0.3)
+    assert result.startswith("⏳ Timed out")
+    assert (await server.wait_for_order_status(placed, "done")).startswith("❌")
+
+
+async def test_pushed_positions_replace_rest(server, api, socket):
+    client = server.get_fyers_client()
+    assert await wait_for(lambda: client.live_positions is not None)
+    before = api["hits"]["/api/v3/positions"]
+    await socket.push(
+        "positions",
+        {
+            "id": "NSE:SBIN-EQ-MARGIN",
+            "symbol": "NSE:SBIN-EQ",
+            "netQty": 1,
+            "side": 1,
+            "netAvg": 600.0,
+            "ltp": 601.0,
+            "pl": 1.0,
+        },
+    )
+    assert await wait_for(lambda: "NSE:SBIN-EQ-MARGIN" in client.live_positions)
+    assert "NSE:SBIN-EQ" in await server.get_positions()
+    assert api["hits"]["/api/v3/positions"] == before
+
+
+async def test_reconnect_resyncs(server, api, socket):
+    client = server.get_fyers_client()
+    assert await wait_for(lambda: client.live_positions is not None)
+    await socket.drop_all()
+    assert await wait_for(
+        lambda: client.live_positions is None and not client.order_book.live
+    )
+    assert await wait_for(
+        lambda: server.order_stream.connected and client.live_positions is not None
+    )
+    # Updates may have been missed while offline
+    assert client.order_book.resync
+
+
+async def test_polling_without_the_socket(server, api, monkeypatch):
+    monkeypatch.setattr(server, "ORDER_WAIT_POLL", 0.1)
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    assert server.get_order_stream() is None
+    placed = await place(server)
+
+    async def fill_later():
+        await asyncio.sleep(0.2)
+        api["orders"][placed]["status"] = 2
+
+    asyncio.create_task(fill_later())
+    result = await server.wait_for_order_status(placed, "filled", timeout=5)
+    assert result.startswith("✅ Order reached filled")
+    assert api["hits"]["/api/v3/orders"] >= 3
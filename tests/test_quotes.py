@@ -0,0 +1,63 @@
+"""Quote batching: large requests chunked, concurrent ones coalesced into one call."""
+
+import asyncio
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_large_requests_are_chunked(server, api, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    symbols = [f"NSE:SYM{i:03d}-EQ" for i in range(120)]
+    records = json.loads(
+        await server.get_quotes(",".join(symbols), output_format="json")
+    )["data"]["quotes"]
+    assert [r["symbol"] for r in records] == symbols
+    assert api["hits"]["/data/quotes"] == 3
+
+
+async def test_concurrent_requests_are_coalesced(server, api, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    results = await asyncio.gather(
+        server.get_quotes("NSE:SBIN-EQ,NSE:TCS-EQ"),
+        server.get_quotes("NSE:TCS-EQ,NSE:RELIANCE-EQ"),
+        server.get_quotes("nse:sbin-eq"),
+    )
+    assert [result.count("📈") for result in results] == [2, 2, 1]
+    assert api["hits"]["/data/quotes"] == 1
+
+
+async def test_quote_values(server, api, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    result = json.loads(
+        await server.get_quotes("NSE:SBIN-EQ, NSE:SBIN-EQ", output_format="json")
+    )["data"]
+    assert result == {
+        "quotes": [
+            {
+                "symbol": "NSE:SBIN-EQ",
+                "ltp": 612.5,
+                "change": 1.5,
+                "change_pct": 1.2,
+                "volume": 1000,
+            }
+        ],
+        "unknown": [],
+    }
+    assert (await server.get_quotes(" , ")).startswith("❌ No symbols")
+
+
+async def test_failed_chunk_fails_only_its_callers(server):
+    async def fetch(chunk):
+        if "BAD" in chunk:
+            return {"s": "error", "code": -300, "message": "Invalid symbol"}
+        return {"s": "ok", "code": 200, "d": [{"n": s, "v": {"lp": 1}} for s in chunk]}
+
+    batcher = server.QuoteBatcher(fetch, window=0.001, chunk_size=2)
+    good, bad = await asyncio.gather(
+        batcher.get(["A", "B"]), batcher.get(["BAD"]), return_exceptions=True
+    )
+    assert good == {"A": {"n": "A", "v": {"lp": 1}}, "B": {"n": "B", "v": {"lp": 1}}}
+    assert isinstance(bad, server.FyersAPIError)
@@ -0,0 +1,144 @@
+"""Retries, the circuit breaker and hedged reads under the mock's error, 429 and latency faults."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_reads_are_retried_then_fail(server, api):
+    result = await server.get_funds()
+    assert result.startswith("❌")
+    assert api["hits"]["/api/v3/funds"] == server.RETRY_ATTEMPTS
+    assert server.resilience.retries["GET /funds"] == server.RETRY_ATTEMPTS - 1
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_writes_are_not_retried_after_a_server_error(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    result = await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=600)
+    assert result.startswith("❌ Order placement failed")
+    # Fyers may have taken the order, so it is not sent twice
+    assert api["hits"]["/api/v3/orders/sync"] == 1
+
+
+@pytest.mark.mock(error_rate=1.0)
+async def test_breaker_fails_fast_and_recovers(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(server, "BREAKER_COOLDOWN", 0.2)
+    monkeypatch.setitem(server.CACHE_TTLS, "funds", 0)
+    client = server.get_fyers_client()
+    for _ in range(server.BREAKER_FAILURES):
+        await client.funds()
+    breaker = server.resilience.breaker("GET /funds")
+    assert breaker.state == "open" and breaker.trips == 1
+
+    hits = api["hits"]["/api/v3/funds"]
+    with pytest.raises(server.CircuitOpenError):
+        await client.funds()
+    assert api["hits"]["/api/v3/funds"] == hits
+    assert (await server.get_funds()).startswith("❌")
+    # Other endpoints are unaffected
+    assert server.resilience.breaker("GET /holdings").state == "closed"
+
+    await asyncio.sleep(0.25)
+    # Half-open: one probe goes through; it fails again here, so the breaker reopens
+    await client.funds()
+    assert breaker.state == "open" and breaker.trips == 2
+    assert api["hits"]["/api/v3/funds"] == hits + 1
+
+
+async def test_breaker_closes_after_a_good_probe(server, api, monkeypatch):
+    monkeypatch.setattr(server, "BREAKER_COOLDOWN", 0)
+    breaker = server.resilience.breaker("GET /funds")
+    for _ in range(server.BREAKER_FAILURES):
+        breaker.record(False)
+    assert breaker.state == "open"
+    response = await server.get_fyers_client().funds()
+    assert response["code"] == 200
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+@pytest.mark.mock(rate_limit=3)
+async def test_throttled_reads_wait_out_the_window(server, api, monkeypatch):
+    client = server.get_fyers_client()
+    responses = await asyncio.gather(*(client.funds(refresh=True) for _ in range(7)))
+    assert all(response["code"] == 200 for response in responses)
+    assert api["throttled"]["/api/v3/funds"] > 0
+    assert server.resilience.retries["GET /funds"] == api["throttled"]["/api/v3/funds"]
+    # 429s are not failures of the endpoint
+    assert server.resilience.breaker("GET /funds").state == "closed"
+
+
+@pytest.mark.mock(rate_limit=1)
+async def test_throttled_writes_are_resent_once_each(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    results = await asyncio.gather(
+        server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=600),
+        server.place_order("NSE:TCS-EQ", 1, "LIMIT", "BUY", limit_price=3400),
+    )
+    assert all(result.startswith("✅") for result in results)
+    assert api["throttled"]["/api/v3/orders/sync"] >= 1
+    # A 429 means Fyers did not act, so the resend does not duplicate the order
+    assert len(api["orders"]) == 2
+
+
+@pytest.mark.mock(latency=0.2)
+async def test_slow_reads_are_hedged(server, api, monkeypatch):
+    monkeypatch.setattr(server, "HEDGE_READS", True)
+    monkeypatch.setattr(server, "HEDGE_DELAY", 0.05)
+    response = await server.get_fyers_client().get_profile()
+    assert response["code"] == 200
+    assert server.resilience.hedges["GET /profile"] == 1
+    assert api["hits"]["/api/v3/profile"] == 2
+
+
+async def test_hedge_delay_follows_the_endpoint_p95(server, monkeypatch):
+    monkeypatch.setattr(server, "HEDGE_DELAY", 0.5)
+    assert server.resilience.hedge_delay("GET /quotes") == 0.5
+    for _ in range(server.HEDGE_MIN_SAMPLES):
+        server.server_metrics.record_upstream("GET /quotes", 0.02, 0.0, 100, 200, False)
+    assert 0.01 < server.resilience.hedge_delay("GET /quotes") <= 0.025
+
+
+@pytest.fixture
+async def odd_bodies(server, monkeypatch):
+    """An API host answering funds with a JSON list (as a proxy might) and profile with a bare number."""
+
+    async def funds(request):
+        return web.json_response(["Bad Gateway"], status=502)
+
+    async def profile(request):
+        return web.json_response(42)
+
+    app = web.Application()
+    app.router.add_get("/api/v3/funds", funds)
+    app.router.add_get("/api/v3/profile", profile)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    monkeypatch.setattr(server, "FYERS_API_URL", f"http://{host}:{port}/api/v3")
+    try:
+        yield
+    finally:
+        await server.reset_fyers_client()
+        await runner.cleanup()
+
+
+async def test_bodies_that_are_not_objects_are_error_responses(server, odd_bodies):
+    result = await server.get_funds()
+    assert result.startswith("❌") and "Bad Gateway" in result
+    # Retried and counted like any other 5xx
+    assert server.resilience.retries["GET /funds"] == server.RETRY_ATTEMPTS - 1
+    assert server.resilience.breaker("GET /funds").failures == server.RETRY_ATTEMPTS
+    assert server.server_metrics.snapshot()["upstream"]["GET /funds"]["errors"] == {
+        "502": server.RETRY_ATTEMPTS
+    }
+    response = await server.get_fyers_client().get_profile()
+    assert response == {"s": "error", "code": 200, "message": "42"}
@@ -0,0 +1,371 @@
+"""Pre-trade risk checks: bad orders are stopped locally, before anything is sent."""
+
+import time
+
+import pytest
+
+from mock_fyers import order_time
+
+from .conftest import order_id
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limits(server, monkeypatch):
+    monkeypatch.setattr(server, "RISK_MAX_NOTIONAL", 500000)
+    monkeypatch.setattr(server, "RISK_MAX_POSITION", 100)
+
+
+def sent(api):
+    return api["hits"]["/api/v3/orders/sync"] + api["hits"]["/api/v3/multi-order/sync"]
+
+
+async def assert_rejected(api, call, expect):
+    before = sent(api)
+    result = await call
+    assert result.startswith("❌") and expect in result, result
+    assert sent(api) == before
+
+
+async def test_sane_order_goes_through(server, api, limits):
+    assert (
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610)
+    ).startswith("✅")
+
+
+@pytest.mark.parametrize(
+    "args, kwargs, expect",
+    [
+        (("NSE:SBIN-EQ", 1, "LIMT", "BUY"), {"limit_price": 610}, "unknown order_type"),
+        (("NSE:SBIN-EQ", 1, "LIMIT", "BYU"), {"limit_price": 610}, "unknown side"),
+        (
+            ("NSE:SBIN-EQ", 1, "LIMIT", "BUY"),
+            {"limit_price": 6125},
+            "above the last price",
+        ),
+        (("NSE:RELIANCE-EQ", 300, "MARKET", "BUY"), {}, "over the ₹500,000.00 limit"),
+        (
+            ("NSE:INFY-EQ", 95, "LIMIT", "BUY"),
+            {"limit_price": 1460},
+            "over the 100 limit",
+        ),
+        (
+            ("NSE:TCS-EQ", 80, "LIMIT", "BUY"),
+            {"product_type": "CNC", "limit_price": 3490},
+            "margin",
+        ),
+    ],
+)
+async def test_bad_orders_are_not_sent(server, api, limits, args, kwargs, expect):
+    await assert_rejected(api, server.place_order(*args, **kwargs), expect)
+
+
+async def test_reducing_a_position_is_allowed(server, api, limits):
+    assert (
+        await server.place_order("NSE:INFY-EQ", 95, "LIMIT", "SELL", limit_price=1460)
+    ).startswith("✅")
+
+
+async def test_duplicates(server, api, limits):
+    assert (
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610)
+    ).startswith("✅")
+    await assert_rejected(
+        api,
+        server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610),
+        "identical order",
+    )
+    result = await server.place_order(
+        "NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610, allow_duplicate=True
+    )
+    assert result.startswith("✅")
+
+
+async def test_open_orders_hold_margin_until_cancelled(server, api, limits):
+    big = order_id(
+        await server.place_order(
+            "NSE:TCS-EQ", 60, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+        )
+    )
+    await assert_rejected(
+        api,
+        server.place_order(
+            "NSE:TCS-EQ", 20, "LIMIT", "BUY", product_type="CNC", limit_price=3485
+        ),
+        "margin",
+    )
+    await server.cancel_order(big)
+    await server.get_orders()
+    result = await server.place_order(
+        "NSE:TCS-EQ", 20, "LIMIT", "BUY", product_type="CNC", limit_price=3485
+    )
+    assert result.startswith("✅")
+
+
+async def send_unanswered(server, monkeypatch):
+    """Place a big CNC order and give up on the response before the mock answers."""
+    client = server.get_fyers_client()
+    await client.refresh_risk({"NSE:TCS-EQ"})
+    with monkeypatch.context() as patch:
+        patch.setattr(server, "FYERS_TIMEOUT", 0.05)
+        await client.close()
+        result = await server.place_order(
+            "NSE:TCS-EQ", 60, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+        )
+        assert result.startswith("❌") and "may have gone through" in result
+    await client.close()
+    return client
+
+
+@pytest.mark.mock(latency=0.2)
+async def test_unanswered_write_keeps_its_hold_if_it_went_through(
+    server, api, limits, monkeypatch
+):
+    client = await send_unanswered(server, monkeypatch)
+    # The broker took the order; only the answer was lost
+    order = server.build_order_data(
+        "NSE:TCS-EQ", 60, "LIMIT", "BUY", "CNC", 3490, 0, "DAY"
+    )
+    api["orders"]["MOCK-LOST"] = {
+        **order,
+        "id": "MOCK-LOST",
+        "status": 6,
+        "orderDateTime": order_time(),
+    }
+    assert (
+        client.risk.stats()["unanswered"] == 1
+        and client.risk.stats()["margin_held"] > 0
+    )
+    # The resend syncs the order book first and finds the order live at the broker, counted once
+    resend = server.place_order(
+        "NSE:TCS-EQ", 60, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+    )
+    await assert_rejected(api, resend, "open orders +60/-0")
+    assert "MOCK-LOST" in client.risk.open and client.risk.stats()["unanswered"] == 0
+    await assert_rejected(
+        api,
+        server.place_order(
+            "NSE:TCS-EQ", 20, "LIMIT", "BUY", product_type="CNC", limit_price=3485
+        ),
+        "margin",
+    )
+
+
+@pytest.mark.mock(latency=0.2)
+async def test_unanswered_write_is_released_if_it_did_not(
+    server, api, limits, monkeypatch
+):
+    client = await send_unanswered(server, monkeypatch)
+    assert not api["orders"]
+    result = await server.place_order(
+        "NSE:TCS-EQ", 60, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+    )
+    assert result.startswith("✅")
+    assert client.risk.stats()["unanswered"] == 0
+
+
+def test_unanswered_write_blocks_duplicates_until_resolved(server, monkeypatch):
+    monkeypatch.setattr(server, "RISK_DUPLICATE_WINDOW", 0.001)
+    risk = server.RiskEngine()
+    order = server.build_order_data(
+        "NSE:SBIN-EQ", 1, "LIMIT", "BUY", "MARGIN", 600, 0, "DAY"
+    )
+    _, hold = risk.check(order)
+    risk.settle([hold], [None])
+    time.sleep(0.01)
+    assert "got no answer" in risk.check(order)[0]
+    # An explicit refusal releases the hold at once
+    _, other = risk.check({**order, "qty": 2})
+    risk.settle([other], [{"s": "error", "message": "Invalid order"}])
+    assert risk.stats()["open_orders"] == 1
+    risk.resolve_unanswered([], time.monotonic())
+    assert risk.check(order)[0] is None and risk.stats()["unanswered"] == 0
+
+
+async def test_one_bad_leg_stops_the_basket(server, api, limits):
+    await assert_rejected(
+        api,
+        server.place_basket_orders(
+            [
+                {
+                    "symbol": "NSE:SBIN-EQ",
+                    "quantity": 2,
+                    "order_type": "LIMIT",
+                    "side": "BUY",
+                    "limit_price": 611,
+                },
+                {
+                    "symbol": "NSE:TCS-EQ",
+                    "quantity": 1,
+                    "order_type": "LIMIT",
+                    "side": "SELL",
+                    "limit_price": 34.9,
+                },
+            ]
+        ),
+        "Leg 2: limit_price",
+    )
+    # The passing leg's hold was released with the rest of the basket
+    assert server.get_fyers_client().risk.stats()["margin_held"] == 0
+
+
+async def test_modifications_are_checked_against_the_band(server, api, limits):
+    placed = order_id(
+        await server.place_order("NSE:TCS-EQ", 1, "LIMIT", "BUY", limit_price=3490)
+    )
+    before = api["hits"]["/api/v3/orders/sync"]
+    result = await server.modify_order(placed, limit_price=349)
+    assert (
+        result.startswith("❌ Modification rejected by risk check")
+        and "below the last price" in result
+    )
+    assert api["hits"]["/api/v3/orders/sync"] == before
+    assert (await server.modify_order(placed, limit_price=3480)).startswith("✅")
+
+
+async def test_modifications_are_checked_as_the_order_they_make(server, api, limits):
+    placed = order_id(
+        await server.place_order(
+            "NSE:TCS-EQ", 10, "LIMIT", "BUY", product_type="CNC", limit_price=3490
+        )
+    )
+    await assert_rejected(
+        api, server.modify_order(placed, quantity=200), "over the ₹500,000.00 limit"
+    )
+    await assert_rejected(
+        api, server.modify_order(placed, quantity=120), "over the 100 limit"
+    )
+    await assert_rejected(
+        api,
+        server.modify_basket_orders([{"order_id": placed, "quantity": 80}]),
+        "margin",
+    )
+    risk = server.get_fyers_client().risk
+    assert risk.stats()["margin_held"] == 10 * 3490
+    # An accepted change holds the added margin and counts the added quantity
+    assert (await server.modify_order(placed, quantity=50)).startswith("✅")
+    assert (
+        risk.stats()["margin_held"] == 50 * 3490 and risk.open_buy["NSE:TCS-EQ"] == 50
+    )
+    await assert_rejected(
+        api,
+        server.place_order(
+            "NSE:TCS-EQ", 60, "LIMIT", "BUY", product_type="CNC", limit_price=3485
+        ),
+        "over the 100 limit",
+    )
+
+
+def test_refused_modifications_are_undone(server):
+    risk = server.RiskEngine()
+    risk.set_funds(
+        {"fund_limit": [{"id": 10, "equityAmount": 100000}]}, time.monotonic()
+    )
+    order = {
+        "id": "O1",
+        "symbol": "NSE:SBIN-EQ",
+        "qty": 10,
+        "side": 1,
+        "type": 1,
+        "productType": "CNC",
+        "limitPrice": 600,
+        "status": 6,
+    }
+    risk.on_order(order)
+    assert risk.check_modify(order, {"id": "O1", "qty": 100}) is None
+    assert risk.held["equity"] == 90 * 600 and risk.open_buy["NSE:SBIN-EQ"] == 100
+    risk.settle_modify(["O1"], [{"s": "error", "message": "Order not found"}])
+    assert risk.held["equity"] == 0 and risk.open_buy["NSE:SBIN-EQ"] == 10
+    # Lowering the quantity needs no check and frees nothing the funds snapshot already counts
+    assert risk.check_modify(order, {"id": "O1", "qty": 5}) is None
+    assert risk.held["equity"] == 0 and risk.open_buy["NSE:SBIN-EQ"] == 5
+
+
+async def test_checks_can_be_turned_off(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    assert (
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=6125)
+    ).startswith("✅")
+    assert api["hits"]["/data/quotes"] == 0
+
+
+async def test_unreachable_state_does_not_block_orders(server, api, monkeypatch):
+    # Without funds and positions the checks that need them are skipped, not failed
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 1)
+    for path in ("/funds", "/positions"):
+        server.resilience.breaker(f"GET {path}").state = "open"
+        server.resilience.breaker(f"GET {path}").opened_at = float("inf")
+    assert (
+        await server.place_order("NSE:SBIN-EQ", 1, "LIMIT", "BUY", limit_price=610)
+    ).startswith("✅")
+
+
+def test_engine_checks_without_the_network(server):
+    risk = server.RiskEngine()
+    risk.note_quotes({"NSE:SBIN-EQ": {"v": {"lp": 612.5}}})
+    order = server.build_order_data(
+        "NSE:SBIN-EQ", 1, "LIMIT", "BUY", "MARGIN", 700, 0, "DAY"
+    )
+    problem, hold = risk.check(order)
+    assert problem.startswith("limit_price 700") and hold is None
+    assert risk.stats()["rejected"] == {"price_band": 1}
+
+
+async def test_write_success_follows_s_not_code(server, api, unchecked):
+    # The mock answers writes with codes 1101/1102/1103 and s="ok", like Fyers
+    client = server.get_fyers_client()
+    response = await client.place_order(
+        server.build_order_data(
+            "NSE:SBIN-EQ", 1, "MARKET", "BUY", "MARGIN", 0, 0, "DAY"
+        )
+    )
+    assert response["s"] == "ok" and response["code"] == 1101
+    assert server.basket_records(["leg"], [response])[0]["ok"]
+    error = {"s": "error", "code": -50, "message": "Invalid order"}
+    assert server.basket_records(["leg"], [error])[0] == {
+        "leg": "leg",
+        "ok": False,
+        "order_id": None,
+        "message": "Invalid order",
+    }
+
+
+def test_null_numeric_fields_read_as_zero(server):
+    order = {
+        "id": "N1",
+        "symbol": "NSE:SBIN-EQ",
+        "side": None,
+        "qty": None,
+        "limitPrice": None,
+        "status": 6,
+    }
+    assert server.order_records([order])[0] == {
+        "id": "N1",
+        "symbol": "NSE:SBIN-EQ",
+        "side": "SELL",
+        "qty": 0,
+        "price": 0,
+        "type": "N/A",
+        "status": 6,
+        "time": "",
+    }
+    assert "Qty: 0 | Price: ₹0.00" in server.render_orders(
+        server.order_records([order])
+    )
+    position = {
+        "symbol": "NSE:SBIN-EQ",
+        "side": None,
+        "qty": None,
+        "avgPrice": None,
+        "ltp": None,
+        "pl": None,
+    }
+    records = server.position_records([position])
+    assert records[0]["qty"] == 0 and records[0]["pnl"] == 0
+    # The risk engine tracks such an order without tripping over the nulls
+    risk = server.RiskEngine()
+    risk.on_order({**order, "filledQty": None, "tradedPrice": None})
+    assert risk.stats()["open_orders"] == 1
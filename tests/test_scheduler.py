@@ -0,0 +1,68 @@
+"""The client-side rate limit scheduler: token buckets per request class, orders first."""
+
+import asyncio
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_orders_jump_the_queue(server):
+    buckets = {
+        "second": (1, 0.05),
+        "minute": (1000, 60),
+        "order": (1000, 1),
+        "account": (1000, 1),
+        "data": (1000, 1),
+    }
+    scheduler = server.RequestScheduler(buckets)
+    await scheduler.acquire("account")
+    released = []
+
+    async def request(request_class):
+        await scheduler.acquire(request_class)
+        released.append(request_class)
+
+    reads = [asyncio.create_task(request("account")) for _ in range(3)]
+    await asyncio.sleep(0)
+    order = asyncio.create_task(request("order"))
+    await asyncio.gather(order, *reads)
+    assert released[0] == "order"
+    stats = scheduler.stats()
+    assert stats["max_queue_depth"] == 4 and stats["queue_depth"] == 0
+    assert stats["classes"]["account"]["requests"] == 4
+    assert stats["classes"]["account"]["throttled"] == 3
+    assert stats["classes"]["order"]["max_wait"] > 0
+
+
+async def test_bucket_paces_to_its_rate(server):
+    buckets = {
+        "second": (2, 0.1),
+        "minute": (1000, 60),
+        "order": (1000, 1),
+        "account": (1000, 1),
+        "data": (1000, 1),
+    }
+    scheduler = server.RequestScheduler(buckets)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(scheduler.acquire("data") for _ in range(6)))
+    # Two at once, then one every 0.05 s
+    assert loop.time() - start >= 0.18
+
+
+def test_endpoint_classes(server):
+    assert server.endpoint_class("POST", "/orders/sync") == "order"
+    assert server.endpoint_class("DELETE", "/multi-order/sync") == "order"
+    assert server.endpoint_class("GET", "/orders") == "account"
+    assert server.endpoint_class("GET", "/quotes", data_api=True) == "data"
+
+
+async def test_rate_limit_stats_tool(server, api):
+    await server.get_funds()
+    await server.get_quotes("NSE:SBIN-EQ")
+    stats = json.loads(await server.get_rate_limit_stats(output_format="json"))["data"]
+    assert stats["classes"]["account"]["requests"] >= 1
+    assert stats["classes"]["data"]["requests"] >= 1
+    assert (await server.get_rate_limit_stats()).startswith("📊 Rate Limiter")
@@ -0,0 +1,49 @@
+"""Cold start: a light module import, a clean stdio stream and a first tool call over the real protocol."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bench_startup import ROOT, cold_start
+
+pytestmark = pytest.mark.anyio
+
+
+def test_heavy_modules_are_imported_on_first_use():
+    code = (
+        "import sys, json, fyers_mcp_complete; "
+        "print(json.dumps(sorted(m for m in ('aiohttp', 'numpy', 'fyers_apiv3', 'http.server', 'webbrowser') if m in sys.modules)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=os.environ,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert json.loads(out.stdout) == []
+
+
+@pytest.mark.parametrize("prewarm", [False, True])
+async def test_first_tool_call_over_stdio(server, api, prewarm):
+    env = {
+        **os.environ,
+        "FYERS_API_URL": server.FYERS_API_URL,
+        "FYERS_DATA_URL": server.FYERS_DATA_URL,
+        "FYERS_SYMBOL_MASTER_URL": server.SYMBOL_MASTER_URL,
+        "FYERS_DATA_DIR": str(server.FYERS_DATA_DIR),
+        "FYERS_PREWARM": "1" if prewarm else "0",
+    }
+    # Any stray stdout write would break the JSON-RPC framing cold_start reads
+    initialized, call, total = await cold_start(
+        env, "get_funds", pause=0.3 if prewarm else 0
+    )
+    assert 0 < initialized < total and call > 0
+    assert api["hits"]["/api/v3/funds"] == 1
+    if prewarm:
+        # The connection was opened during the pause, before the first call
+        assert api["hits"]["/api/v3/profile"] == 1
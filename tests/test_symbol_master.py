@@ -0,0 +1,178 @@
+"""Symbol master: search, order validation, and background loading that never holds up a request."""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+from aiohttp import web
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_search(server, api):
+    matches = json.loads(await server.search_symbols("SBI", output_format="json"))[
+        "data"
+    ]
+    assert [m["symbol"] for m in matches] == ["NSE:SBIN-EQ", "NSE:SBIN25DECFUT"]
+    assert matches[1]["lot_size"] == 750
+    # By underlying, by description and restricted to an exchange
+    nifty = json.loads(await server.search_symbols("NIFTY", output_format="json"))[
+        "data"
+    ]
+    assert {m["symbol"] for m in nifty} == {"NSE:NIFTY50-INDEX", "NSE:NIFTY25DECFUT"}
+    assert "NSE:INFY-EQ - INFOSYS LIMITED" in await server.search_symbols("infosys")
+    assert await server.search_symbols("BSE:SBIN") == "📊 No symbols match 'BSE:SBIN'"
+    assert api["hits"]["/sym_details/NSE_CM.csv"] == 1
+
+
+async def test_orders_are_validated_locally(server, api, monkeypatch):
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    await server.get_symbol_master()
+    unknown = await server.place_order("NSE:SBI-EQ", 1, "MARKET", "BUY")
+    assert (
+        unknown
+        == "❌ Order rejected: unknown symbol NSE:SBI-EQ (did you mean NSE:SBIN-EQ, NSE:SBIN25DECFUT?)"
+    )
+    lot = await server.place_order("NSE:SBIN25DECFUT", 100, "MARKET", "BUY")
+    assert "not a multiple of the lot size 750" in lot
+    tick = await server.place_order(
+        "NSE:NIFTY25DECFUT", 75, "LIMIT", "BUY", limit_price=24000.05
+    )
+    assert "not a multiple of the tick size 0.1" in tick
+    basket = await server.place_basket_orders(
+        [
+            {
+                "symbol": "NSE:SBIN-EQ",
+                "quantity": 1,
+                "order_type": "MARKET",
+                "side": "BUY",
+            },
+            {
+                "symbol": "NSE:NOPE-EQ",
+                "quantity": 1,
+                "order_type": "MARKET",
+                "side": "BUY",
+            },
+        ]
+    )
+    assert basket.startswith(
+        "❌ Basket rejected, no orders were sent:\nLeg 2: unknown symbol NSE:NOPE-EQ"
+    )
+    assert (
+        api["hits"]["/api/v3/orders/sync"]
+        == api["hits"]["/api/v3/multi-order/sync"]
+        == 0
+    )
+
+    # Exchanges the master does not cover are not second-guessed
+    assert (
+        await server.place_order("MCX:GOLD25DECFUT", 1, "MARKET", "BUY")
+    ).startswith("✅")
+    assert (
+        await server.place_order("NSE:SBIN25DECFUT", 1500, "MARKET", "BUY")
+    ).startswith("✅")
+
+
+async def test_unknown_quote_symbols_are_skipped(server, api):
+    await server.get_symbol_master()
+    result = await server.get_quotes("NSE:SBIN-EQ,NSE:SBI-EQ")
+    assert result.count("📈") == 1
+    assert result.endswith("⚠️ Unknown symbols skipped: NSE:SBI-EQ")
+    # JSON callers can tell an unknown symbol from a missing quote
+    records = json.loads(
+        await server.get_quotes("NSE:SBIN-EQ,NSE:SBI-EQ", output_format="json")
+    )["data"]
+    assert [q["symbol"] for q in records["quotes"]] == ["NSE:SBIN-EQ"] and records[
+        "unknown"
+    ] == ["NSE:SBI-EQ"]
+
+
+@pytest.fixture
+async def slow_master(server, monkeypatch):
+    """A symbol master host that takes far longer to answer than any request may wait."""
+    release = asyncio.Event()
+
+    async def segment(request):
+        await release.wait()
+        return web.Response(text="", content_type="text/csv")
+
+    app = web.Application()
+    app.router.add_get("/sym_details/{segment}.csv", segment)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    host, port = runner.addresses[0][:2]
+    monkeypatch.setattr(
+        server, "SYMBOL_MASTER_URL", f"http://{host}:{port}/sym_details"
+    )
+    try:
+        yield
+    finally:
+        release.set()
+        await runner.cleanup()
+
+
+async def test_requests_never_wait_for_the_download(
+    server, api, slow_master, monkeypatch
+):
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    start = time.perf_counter()
+    assert (await server.get_quotes("NSE:SBI-EQ")).count("📈") == 1
+    assert (await server.place_order("NSE:SBI-EQ", 1, "MARKET", "BUY")).startswith("✅")
+    assert time.perf_counter() - start < 0.5
+    # One load runs in the background for everyone
+    task = server._symbol_master_task
+    assert task is not None and not task.done()
+    server.get_validation_master()
+    assert server._symbol_master_task is task
+
+
+async def test_failed_load_fails_open_and_backs_off(server, api, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_MASTER_URL", "http://127.0.0.1:9/sym_details")
+    monkeypatch.setattr(server, "RISK_CHECKS_ENABLED", False)
+    assert await server.get_symbol_master() is None
+    assert (await server.search_symbols("SBIN")).startswith(
+        "❌ Symbol master unavailable"
+    )
+    # Orders go out unchecked, and no new download is started until the retry is due
+    assert (await server.place_order("NSE:SBI-EQ", 1, "MARKET", "BUY")).startswith("✅")
+    assert server.refresh_symbol_master() is None
+
+
+async def test_stale_copy_is_used_when_the_download_fails(server, api, monkeypatch):
+    await server.get_symbol_master()
+    paths = server.symbol_master_paths(
+        os.path.join(server.FYERS_DATA_DIR, "symbols")
+    ).values()
+    for path in paths:
+        os.utime(path, (0, 0))
+    # A restart the next day, with the symbol master host down
+    monkeypatch.setattr(server, "symbol_master", None)
+    monkeypatch.setattr(server, "SYMBOL_MASTER_URL", "http://127.0.0.1:9/sym_details")
+    master = await server.get_symbol_master()
+    assert master is not None and master.get("NSE:SBIN-EQ") is not None
+    assert all(os.path.getmtime(path) == 0 for path in paths)
+
+
+async def test_validation_can_be_disabled(server, api, monkeypatch):
+    monkeypatch.setattr(server, "SYMBOL_VALIDATION", False)
+    assert server.get_validation_master() is None
+    assert server._symbol_master_task is None
+
+
+def test_index(server, tmp_path):
+    path = tmp_path / "NSE_CM.csv"
+    header = ",".join(f"col{i}" for i in range(21))
+    row = "1,ACME LTD,0,1,0.05,,,,0,NSE:ACME-EQ,10,10,1,ACME,1,-1.0,XX,,None,0.0,"
+    path.write_text(f"{header}\n{row}\n{row}\nshort,row\n")
+    master = server.SymbolMaster.from_csv([str(path)])
+    assert (
+        len(master) == 1
+        and master.covers("nse:anything")
+        and not master.covers("BSE:ACME")
+    )
+    assert master.get("nse:acme-eq") == ("NSE:ACME-EQ", "ACME LTD", 1, 0.05, 0)
+    assert [i.ticker for i in master.search("acme ltd")] == ["NSE:ACME-EQ"]
+    assert master.search("") == [] and master.search("NSE:") == []
@@ -0,0 +1,127 @@
+"""The token store and proactive refresh against the mock's validate-refresh-token endpoint."""
+
+import asyncio
+import json
+import os
+import stat
+import time
+
+import jwt
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def make_token(expires_in: float) -> str:
+    return jwt.encode(
+        {"sub": "access_token", "exp": int(time.time() + expires_in)},
+        "signing-key-for-the-test-suite-only",
+        algorithm="HS256",
+    )
+
+
+@pytest.fixture
+def credentials(server, monkeypatch):
+    """The default account with an app secret and PIN, so its token can be refreshed."""
+    monkeypatch.setenv("FYERS_SECRET_KEY", "mock-secret")
+    monkeypatch.setenv("FYERS_PIN", "1234")
+
+
+def test_token_store_is_private_and_atomic(server):
+    tokens = server.TokenManager(server.TOKEN_STORE_PATH, "MOCK-100")
+    access = make_token(3600)
+    tokens.save(access, "refresh-1")
+    assert stat.S_IMODE(os.stat(tokens.path).st_mode) == 0o600
+    assert os.listdir(os.path.dirname(tokens.path)) == [os.path.basename(tokens.path)]
+    stored = json.load(open(tokens.path))
+    assert stored["access_token"] == access and stored["refresh_token"] == "refresh-1"
+
+    # Saving a new access token keeps the refresh token
+    tokens.save(make_token(7200))
+    reloaded = server.TokenManager(tokens.path, "MOCK-100")
+    assert reloaded.refresh_token == "refresh-1"
+    assert reloaded.expires_at == pytest.approx(time.time() + 7200, abs=5)
+
+
+def test_latest_of_stored_and_env_token_wins(server):
+    stored, pasted = make_token(3600), make_token(7200)
+    server.TokenManager(server.TOKEN_STORE_PATH, "MOCK-100").save(stored)
+    assert (
+        server.TokenManager(
+            server.TOKEN_STORE_PATH, "MOCK-100", env_token=pasted
+        ).access_token
+        == pasted
+    )
+    assert (
+        server.TokenManager(
+            server.TOKEN_STORE_PATH, "MOCK-100", env_token=make_token(60)
+        ).access_token
+        == stored
+    )
+    assert server.token_expiry("not-a-jwt") is None
+
+
+async def test_expired_token_is_reported(server, api, monkeypatch):
+    monkeypatch.setenv("FYERS_ACCESS_TOKEN", make_token(-60))
+    assert (await server.check_auth_status()).startswith("❌ Token expired at")
+    assert (await server.get_funds()).startswith("❌ Not authenticated")
+    assert api["hits"]["/api/v3/funds"] == 0
+
+
+async def test_refresh_switches_the_live_client(server, api, credentials):
+    server.TokenManager(server.TOKEN_STORE_PATH, "MOCK-100").save(
+        make_token(600), "mock-refresh"
+    )
+    client = server.get_fyers_client()
+    tokens = server.get_token_manager()
+    old = client.access_token
+    assert await tokens.refresh()
+    assert tokens.refreshes == 1 and client.access_token == tokens.access_token != old
+    assert tokens.expires_at > time.time() + 86000
+    assert json.load(open(tokens.path))["access_token"] == tokens.access_token
+    status = await server.check_auth_status()
+    assert (
+        status.startswith("✅ Authenticated as: Mock Trader")
+        and "auto-refresh on" in status
+    )
+
+
+async def test_bad_pin_keeps_the_old_token(server, api, credentials):
+    server.TokenManager(server.TOKEN_STORE_PATH, "MOCK-100").save(
+        make_token(600), "mock-refresh"
+    )
+    tokens = server.get_token_manager()
+    old = tokens.access_token
+    tokens.pin = ""
+    assert not await tokens.refresh()
+    assert (
+        tokens.access_token == old
+        and tokens.last_error == "Invalid refresh token or pin"
+    )
+
+
+async def test_token_is_refreshed_ahead_of_expiry(
+    server, api, credentials, monkeypatch
+):
+    monkeypatch.setattr(server, "TOKEN_REFRESH_MARGIN", 3600 - 0.2)
+    server.TokenManager(server.TOKEN_STORE_PATH, "MOCK-100").save(
+        make_token(3600), "mock-refresh"
+    )
+    client = server.get_fyers_client()
+    tokens = server.get_token_manager()
+    for _ in range(50):
+        if tokens.refreshes:
+            break
+        await asyncio.sleep(0.05)
+    assert tokens.refreshes == 1 and api["hits"]["/api/v3/validate-refresh-token"] == 1
+    assert client.access_token == tokens.access_token
+    # The next refresh is a day away
+    assert not tokens._task.done()
+
+
+async def test_no_refresher_without_a_pin(server, api, monkeypatch):
+    monkeypatch.setenv("FYERS_ACCESS_TOKEN", make_token(3600))
+    server.get_fyers_client()
+    tokens = server.get_token_manager()
+    assert not tokens.can_refresh() and tokens._task is None
+    assert "set the account PIN to auto-refresh" in await server.check_auth_status()
@@ -0,0 +1,58 @@
+"""Every registered tool, called through the FastMCP layer against the mock API."""
+
+import json
+
+import pytest
+
+from bench_tools import SKIPPED, WORKLOADS, regressions, result_text
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_every_tool_has_a_workload(server):
+    registered = {tool.name for tool in await server.mcp.list_tools()}
+    assert registered - set(WORKLOADS) - set(SKIPPED) == set()
+    assert set(WORKLOADS) | set(SKIPPED) <= registered
+
+
+async def call_all(server):
+    failed = {}
+    for name, arguments in WORKLOADS.items():
+        text = result_text(await server.mcp.call_tool(name, arguments))
+        if server.is_error_result(text):
+            failed[name] = text
+    return failed
+
+
+async def test_every_tool_succeeds(server, api):
+    assert await call_all(server) == {}
+    assert set(server.server_metrics.tool_latency) == set(WORKLOADS)
+
+
+@pytest.mark.mock(latency=0.005, jitter=0.01, seed=3)
+async def test_every_tool_succeeds_with_a_slow_tail(server, api):
+    assert await call_all(server) == {}
+
+
+@pytest.mark.mock(error_rate=0.2, seed=5)
+async def test_reads_ride_out_server_errors(server, api, monkeypatch):
+    # Each read gets enough attempts that 20% failures (seeded) never surface
+    monkeypatch.setattr(server, "RETRY_ATTEMPTS", 6)
+    monkeypatch.setitem(server.CACHE_TTLS, "funds", 0)
+    monkeypatch.setitem(server.CACHE_TTLS, "holdings", 0)
+    for _ in range(10):
+        assert not server.is_error_result(await server.get_funds())
+        holdings = json.loads(await server.get_holdings(output_format="json"))
+        assert holdings["ok"] and len(holdings["data"]["holdings"]) == 3
+    assert sum(api["errors"].values()) > 0
+    assert sum(server.resilience.retries.values()) == sum(api["errors"].values())
+
+
+def test_regressions_flag_errors_latency_and_throughput():
+    base = {"get_funds@8": {"errors": 0, "p99": 0.010, "throughput": 100.0}}
+    same = {"get_funds@8": {"errors": 0, "p99": 0.011, "throughput": 90.0}}
+    worse = {"get_funds@8": {"errors": 2, "p99": 0.020, "throughput": 50.0}}
+    assert regressions(same, base, 0.25) == []
+    found = regressions(worse, base, 0.25)
+    assert len(found) == 3 and found[0].startswith("get_funds@8: errors 0 -> 2")
+    assert regressions({"new@1": worse["get_funds@8"]}, base, 0.25) == []